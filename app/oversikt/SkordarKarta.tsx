@@ -10,7 +10,11 @@ declare global {
   interface Window { maplibregl: any }
 }
 
-type Punkt = { lng: number; lat: number };
+type Punkt = { lng: number; lat: number; antal?: number };   // antal = stammar bakom pricken (kluster-cell)
+
+/* Förberäknade kluster (hpr_stam_kluster, se 20261022_hpr_stam_kluster.sql): celler ≈ 10 m vid
+   zoom 19 — finare än en prick på skärmen, men bara några hundra rader i stället för varje stam. */
+const KLUSTER_ZOOM = 19;
 type Linje = [number, number][];   // [[lng,lat], ...]
 
 /* Origo för objektets SVG-markörer. Replikerar planeringsvyns objektKartCenter + svgToLatLon
@@ -38,7 +42,7 @@ function svgToLatLon(x: number, y: number, c: Origo): Punkt {
    Rör ALDRIG planeringsvyn — läser samma källor, eget minimalt lager. */
 export default function SkordarKarta({ vo, objektId }: { vo?: string | null; objektId?: string | null }) {
   // null = laddar; { punkter, grans } = klart. punkter=[] → ingen sektion.
-  const [data, setData] = useState<{ punkter: Punkt[]; grans: Linje[] } | null>(null);
+  const [data, setData] = useState<{ punkter: Punkt[]; grans: Linje[]; stammar: number } | null>(null);
   // Vet vi att det finns en HPR-fil (snabb koll före den tunga stam-hämtningen)? Då reserverar vi
   // kartans plats direkt med ett skelett → ingen 280px-hopp när kartan sen dyker in.
   const [hasFil, setHasFil] = useState(false);
@@ -59,8 +63,20 @@ export default function SkordarKarta({ vo, objektId }: { vo?: string | null; obj
         const fil = (filer ?? []).find((f: any) => String(f.objekt_nyckel ?? '').split(':')[1] === v);
         if (fil) {
           if (!cancelled) setHasFil(true);   // fil finns → reservera kartplats medan stammar laddas
+          // Kluster-celler först; saknas de (fil importerad före pyramiden) → varje stam som förr.
           let offset = 0;
           while (true) {
+            const { data: d, error } = await supabase
+              .from('hpr_stam_kluster').select('lat, lng, antal').eq('hpr_fil_id', fil.id).eq('zoom', KLUSTER_ZOOM)
+              .range(offset, offset + 999);
+            if (error || !d || d.length === 0) break;
+            for (const c of d as any[]) punkter.push({ lng: c.lng, lat: c.lat, antal: c.antal });
+            if (d.length < 1000) break;
+            offset += 1000;
+          }
+          offset = 0;
+          const harKluster = punkter.length > 0;
+          while (!harKluster) {
             const { data: d, error } = await supabase
               .from('hpr_stammar').select('lat, lng').eq('hpr_fil_id', fil.id).not('lat', 'is', null)
               .range(offset, offset + 999);
@@ -72,7 +88,8 @@ export default function SkordarKarta({ vo, objektId }: { vo?: string | null; obj
         }
       }
       if (cancelled) return;
-      if (punkter.length === 0) { setData({ punkter: [], grans: [] }); return; }   // ingen sektion
+      if (punkter.length === 0) { setData({ punkter: [], grans: [], stammar: 0 }); return; }   // ingen sektion
+      const stammar = punkter.reduce((n, p) => n + (p.antal ?? 1), 0);
 
       // Traktgräns — bara om objektet har härledbart origo OCH en boundary-markering.
       const grans: Linje[] = [];
@@ -95,7 +112,7 @@ export default function SkordarKarta({ vo, objektId }: { vo?: string | null; obj
           }
         }
       }
-      if (!cancelled) setData({ punkter, grans });
+      if (!cancelled) setData({ punkter, grans, stammar });
     })();
     return () => { cancelled = true; };
   }, [vo, objektId]);
@@ -133,7 +150,7 @@ export default function SkordarKarta({ vo, objektId }: { vo?: string | null; obj
     const grans = data!.grans;
     const stamGeo = {
       type: 'FeatureCollection' as const,
-      features: pts.map(p => ({ type: 'Feature' as const, geometry: { type: 'Point' as const, coordinates: [p.lng, p.lat] }, properties: {} })),
+      features: pts.map(p => ({ type: 'Feature' as const, geometry: { type: 'Point' as const, coordinates: [p.lng, p.lat] }, properties: { antal: p.antal ?? 1 } })),
     };
     const gransGeo = {
       type: 'FeatureCollection' as const,
@@ -162,12 +179,13 @@ export default function SkordarKarta({ vo, objektId }: { vo?: string | null; obj
         });
       }
       // Stammar: neutralgrå kluster + prickar (ingen sortimentfärg, inget orange/grönt).
-      map.addSource('stammar', { type: 'geojson', data: stamGeo, cluster: true, clusterRadius: 44, clusterMaxZoom: 15 });
+      map.addSource('stammar', { type: 'geojson', data: stamGeo, cluster: true, clusterRadius: 44, clusterMaxZoom: 15,
+        clusterProperties: { antal: ['+', ['get', 'antal']] } });
       map.addLayer({
         id: 'stam-cluster', type: 'circle', source: 'stammar', filter: ['has', 'point_count'],
         paint: {
           'circle-color': 'rgba(88,88,96,0.60)',
-          'circle-radius': ['interpolate', ['linear'], ['get', 'point_count'], 2, 11, 25, 17, 200, 26],
+          'circle-radius': ['interpolate', ['linear'], ['get', 'antal'], 2, 11, 25, 17, 200, 26],
           'circle-stroke-color': 'rgba(255,255,255,0.85)', 'circle-stroke-width': 1.5,
         },
       });
@@ -208,7 +226,7 @@ export default function SkordarKarta({ vo, objektId }: { vo?: string | null; obj
       <div style={{ fontSize: 14, fontWeight: 600, color: C.t3, marginBottom: 10 }}>Var skördaren kört</div>
       <div ref={containerRef} style={{ height: 280, borderRadius: 14, overflow: 'hidden', border: `1px solid ${C.border}` }} />
       <div style={{ fontSize: 11.5, color: C.t3, marginTop: 6 }}>
-        {data.punkter.length.toLocaleString('sv-SE')} avverkade stammar
+        {data.stammar.toLocaleString('sv-SE')} avverkade stammar
         {data.grans.length > 0 ? ' · streckad linje = ungefärlig traktgräns' : ''}
       </div>
     </div>
@@ -5,6 +5,8 @@ Triggar MOM-import (skogsmaskin_import_version_6.py) och HPR-import (import_hpr.
 automatiskt när nya filer dyker upp.
 
 Körs som bakgrundsprocess via auto_import_watch.bat eller Windows Autostart.
+Metrik för larm (kö, senaste import per maskin, importtider):
+http://127.0.0.1:49282/metrics — se METRIK nedan.
 """
 
 import os
@@ -16,7 +18,10 @@ import logging
 import threading
 import socket
 import errno
+import json
+import re
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
 try:
@@ -62,6 +67,9 @@ PERIODIC_SCAN_INTERVAL = 300  # 5 min — skyddsnät om watchdog missar events
 
 PYTHON_EXE = sys.executable  # samma python som kör detta script
 
+# Lokal metrik-endpoint (Prometheus-textformat), se METRIK nedan. 0 = av.
+METRIK_PORT = int(os.getenv('IMPORT_METRIK_PORT', '49282'))
+
 # ============================================================
 # LOGGNING
 # ============================================================
@@ -137,6 +145,174 @@ def _acquire_single_instance(port: int = _SINGLE_INSTANCE_PORT) -> bool:
     return True
 
 
+# ============================================================
+# METRIK
+# ============================================================
+# http://127.0.0.1:<METRIK_PORT>/metrics i Prometheus-textformat — för larm när
+# genomflödet sjunker eller filer blir liggande, utan att läsa import_logg.txt.
+# Bara localhost; ingen beroende-lib (prometheus_client) på importdatorn.
+#
+# Per-fil-siffrorna kommer från MOM-importerns IMPORT_MATNING-rader (en JSON-rad
+# per fil, se import_matning.py) som läses ur subprocessens logg-utskrift.
+# Köns djup räknas vid varje skrapning. Räknarna nollställs vid omstart
+# (Prometheus hanterar det); import_watch_start_tidpunkt_sekunder visar när.
+
+_FIL_HINKAR = (0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600)
+_KORNING_HINKAR = (1, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+_METRIK = {
+    # namn: (typ, hjälptext, hinkar för histogram)
+    'import_inkommande_filer': ('gauge', 'Filer som ligger i Inkommande (kö), per filtyp', None),
+    'import_senaste_ok_tidpunkt_sekunder': ('gauge', 'Unix-tid för senaste lyckade filimport per maskin', None),
+    'import_senaste_ok_alder_sekunder': ('gauge', 'Sekunder sedan senaste lyckade filimport per maskin', None),
+    'import_fil_sekunder': ('histogram', 'Importtid per fil (IMPORT_MATNING total_s), per filtyp', _FIL_HINKAR),
+    'import_filer_totalt': ('counter', 'Processade filer per filtyp och status', None),
+    'import_korning_sekunder': ('histogram', 'Körtid per import-subprocess (mom, hpr, fordelning)', _KORNING_HINKAR),
+    'import_korningar_totalt': ('counter', 'Import-subprocesser per skript och utfall', None),
+    'import_fordelning_totalt': ('counter', 'Fördelningsscriptets utfall per fil', None),
+    'import_periodisk_scan_fangster_totalt': ('counter',
+                                              'Filer i Inkommande som inget watchdog-event sett (missade events), '
+                                              'en gång per fil, per filtyp', None),
+    'import_watch_start_tidpunkt_sekunder': ('gauge', 'Unix-tid när watchern startade', None),
+}
+
+_metrik_las = threading.Lock()
+_metrik_varden: dict[tuple, float] = {}   # (namn, etiketter) -> värde
+_metrik_hist: dict[tuple, list] = {}      # (namn, etiketter) -> [per hink..., +Inf, summa]
+_senaste_ok: dict[str, float] = {}        # maskin_id -> unix-tid
+_START_TID = time.time()
+
+
+def _etiketter(etiketter: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in etiketter.items()))
+
+
+def _rakna(namn: str, n: float = 1, **etiketter):
+    nyckel = (namn, _etiketter(etiketter))
+    with _metrik_las:
+        _metrik_varden[nyckel] = _metrik_varden.get(nyckel, 0) + n
+
+
+def _observera(namn: str, varde: float, **etiketter):
+    hinkar = _METRIK[namn][2]
+    nyckel = (namn, _etiketter(etiketter))
+    with _metrik_las:
+        h = _metrik_hist.setdefault(nyckel, [0] * (len(hinkar) + 1) + [0.0])
+        for i, grans in enumerate(hinkar):
+            if varde <= grans:
+                h[i] += 1
+        h[len(hinkar)] += 1
+        h[-1] += varde
+
+
+def _las_import_matning(utskrift: str):
+    """Bokför IMPORT_MATNING-raderna (en per fil) ur importerns logg-utskrift."""
+    for rad in (utskrift or '').splitlines():
+        i = rad.find('IMPORT_MATNING ')
+        if i < 0:
+            continue
+        try:
+            m = json.loads(rad[i + len('IMPORT_MATNING '):])
+        except ValueError:
+            continue
+        filtyp = (m.get('filtyp') or 'okand').lower()
+        status = m.get('status') or 'okand'
+        _rakna('import_filer_totalt', filtyp=filtyp, status=status)
+        if status == 'hoppad':
+            continue  # redan importerad — säger inget om importtiden
+        _observera('import_fil_sekunder', float(m.get('total_s') or 0), filtyp=filtyp)
+        if status in ('OK', 'dubblett') and m.get('maskin_id'):
+            try:
+                klar = datetime.fromisoformat(m['start']).timestamp() + float(m.get('total_s') or 0)
+            except (KeyError, TypeError, ValueError):
+                klar = time.time()
+            with _metrik_las:
+                _senaste_ok[m['maskin_id']] = max(klar, _senaste_ok.get(m['maskin_id'], 0))
+
+
+def _etikett_text(etiketter: tuple, extra: tuple = ()) -> str:
+    par = etiketter + extra
+    if not par:
+        return ''
+    esc = lambda v: v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{esc(v)}"' for k, v in par) + '}'
+
+
+def _metrik_text() -> str:
+    """Alla mätvärden i Prometheus-textformat (version 0.0.4)."""
+    nu = time.time()
+    ko: dict[str, int] = {'mom': 0, 'hpr': 0, 'hqc': 0, 'fpr': 0}
+    try:
+        for e in os.scandir(WATCH_DIR):
+            ext = os.path.splitext(e.name)[1].lower().lstrip('.')
+            if ext in ko and e.is_file():
+                ko[ext] += 1
+    except OSError:
+        pass
+
+    with _metrik_las:
+        varden = dict(_metrik_varden)
+        hist = {k: list(v) for k, v in _metrik_hist.items()}
+        senaste = dict(_senaste_ok)
+    for filtyp, n in ko.items():
+        varden[('import_inkommande_filer', (('filtyp', filtyp),))] = n
+    for maskin_id, t in senaste.items():
+        et = (('maskin_id', maskin_id),)
+        varden[('import_senaste_ok_tidpunkt_sekunder', et)] = round(t, 3)
+        varden[('import_senaste_ok_alder_sekunder', et)] = round(nu - t, 3)
+    varden[('import_watch_start_tidpunkt_sekunder', ())] = round(_START_TID, 3)
+
+    rader = []
+    for namn, (typ, hjalp, hinkar) in _METRIK.items():
+        rader.append(f'# HELP {namn} {hjalp}')
+        rader.append(f'# TYPE {namn} {typ}')
+        if typ == 'histogram':
+            for (n, et), h in sorted(hist.items()):
+                if n != namn:
+                    continue
+                for grans, antal in zip(hinkar, h):
+                    rader.append(f'{namn}_bucket{_etikett_text(et, (("le", str(grans)),))} {antal}')
+                rader.append(f'{namn}_bucket{_etikett_text(et, (("le", "+Inf"),))} {h[len(hinkar)]}')
+                rader.append(f'{namn}_sum{_etikett_text(et)} {round(h[-1], 3)}')
+                rader.append(f'{namn}_count{_etikett_text(et)} {h[len(hinkar)]}')
+        else:
+            for (n, et), v in sorted(varden.items()):
+                if n == namn:
+                    rader.append(f'{namn}{_etikett_text(et)} {v}')
+    return '\n'.join(rader) + '\n'
+
+
+class _MetrikHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        kropp = _metrik_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(kropp)))
+        self.end_headers()
+        self.wfile.write(kropp)
+
+    def log_message(self, format, *args):
+        pass  # skrapning var 15:e sekund ska inte fylla import_logg.txt
+
+
+def start_metrik_server(port: int = METRIK_PORT):
+    """Starta metrik-endpointen i en daemon-tråd. Fel här får ALDRIG stoppa
+    bevakningen — loggas och sväljs."""
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer(('127.0.0.1', port), _MetrikHandler)
+    except OSError as e:
+        logger.warning(f"Metrik-endpoint kunde inte starta på port {port} (ej kritiskt): {e}")
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True, name='metrik').start()
+    logger.info(f"Metrik: http://127.0.0.1:{port}/metrics")
+    return server
+
+
 # ============================================================
 # IMPORT-FUNKTIONER
 # ============================================================
@@ -145,6 +321,23 @@ def _acquire_single_instance(port: int = _SINGLE_INSTANCE_PORT) -> bool:
 _processed_files: dict[str, float] = {}
 DEDUP_WINDOW = 60  # sekunder — ignorera samma fil inom detta fönster
 
+# Filnamn som ett watchdog-event (eller startskanningen) redan sett. Periodisk
+# scan räknar bara filer som INTE finns här som missade events — en fil som
+# ligger kvar efter misslyckad import, eller som eventvägen ännu väntar på,
+# räknas alltså inte (och en missad fil räknas en gång, inte var 5:e minut).
+_sedda_filer: set[str] = set()
+_sedda_las = threading.Lock()
+
+
+def _markera_sedd(filepath) -> bool:
+    """Registrera filen som sedd. True om den inte var sedd förut."""
+    namn = os.path.basename(str(filepath)).lower()
+    with _sedda_las:
+        if namn in _sedda_filer:
+            return False
+        _sedda_filer.add(namn)
+        return True
+
 # UTF-8 environment för subprocess (fixar encoding på Windows)
 _env = os.environ.copy()
 _env['PYTHONUTF8'] = '1'
@@ -153,6 +346,7 @@ _env['PYTHONUTF8'] = '1'
 def run_mom_import():
     """Kör skogsmaskin_import_version_6.py icke-interaktivt."""
     logger.info("Startar MOM-import: skogsmaskin_import_version_6.py")
+    t0, utfall = time.monotonic(), 'fel'
     try:
         result = subprocess.run(
             [PYTHON_EXE, MOM_IMPORT_SCRIPT],
@@ -167,20 +361,29 @@ def run_mom_import():
         )
         if result.returncode == 0:
             logger.info("MOM-import klar (OK)")
+            utfall = 'ok'
         else:
             logger.error(f"MOM-import avslutades med kod {result.returncode}")
+        # Importerns logging skriver till stderr — där ligger IMPORT_MATNING-raderna
+        _las_import_matning(result.stderr)
+        _las_import_matning(result.stdout)
         if result.stderr:
             for line in result.stderr.strip().split("\n")[-5:]:
                 logger.warning(f"  stderr: {line}")
     except subprocess.TimeoutExpired:
         logger.error("MOM-import timeout (>600s)")
+        utfall = 'timeout'
     except Exception as e:
         logger.error(f"MOM-import fel: {e}")
+    finally:
+        _observera('import_korning_sekunder', time.monotonic() - t0, skript='mom')
+        _rakna('import_korningar_totalt', skript='mom', utfall=utfall)
 
 
 def run_hpr_import():
     """Kör import_hpr.py."""
     logger.info("Startar HPR-import: import_hpr.py")
+    t0, utfall = time.monotonic(), 'fel'
     try:
         result = subprocess.run(
             [PYTHON_EXE, HPR_IMPORT_SCRIPT],
@@ -194,6 +397,7 @@ def run_hpr_import():
         )
         if result.returncode == 0:
             logger.info("HPR-import klar (OK)")
+            utfall = 'ok'
         else:
             logger.error(f"HPR-import avslutades med kod {result.returncode}")
         if result.stderr:
@@ -201,8 +405,12 @@ def run_hpr_import():
                 logger.warning(f"  stderr: {line}")
     except subprocess.TimeoutExpired:
         logger.error("HPR-import timeout (>600s)")
+        utfall = 'timeout'
     except Exception as e:
         logger.error(f"HPR-import fel: {e}")
+    finally:
+        _observera('import_korning_sekunder', time.monotonic() - t0, skript='hpr')
+        _rakna('import_korningar_totalt', skript='hpr', utfall=utfall)
 
 
 def notify_vercel():
@@ -245,19 +453,32 @@ def post_hpr_fordelning(filepath: str):
         if not os.path.isfile(filepath):
             logger.warning(f"Fördelning: {basename} finns inte i Inkommande (redan flyttad?) — "
                            f"backfill_fordelning_hpr.py tar den från Behandlade senare.")
+            _rakna('import_fordelning_totalt', utfall='saknas')
             return
         if not _NPX:
             logger.warning("Fördelning: npx hittades inte i PATH — hoppar över (Node/npm saknas?).")
+            _rakna('import_fordelning_totalt', utfall='ingen_npx')
             return
         if not os.path.isfile(FORDELNING_SCRIPT):
             logger.warning(f"Fördelning: {FORDELNING_SCRIPT} saknas — hoppar över.")
+            _rakna('import_fordelning_totalt', utfall='inget_script')
             return
 
-        result = subprocess.run(
-            [_NPX, "tsx", FORDELNING_SCRIPT, filepath],
-            cwd=SCRIPT_DIR, capture_output=True, text=True,
-            encoding="utf-8", errors="replace", timeout=300, env=_env,
-        )
+        t0 = time.monotonic()
+        try:
+            result = subprocess.run(
+                [_NPX, "tsx", FORDELNING_SCRIPT, filepath],
+                cwd=SCRIPT_DIR, capture_output=True, text=True,
+                encoding="utf-8", errors="replace", timeout=300, env=_env,
+            )
+        finally:
+            _observera('import_korning_sekunder', time.monotonic() - t0, skript='fordelning')
+        # Utfallet ur statusraden ("→ imported/duplicate/validation_failed/fel").
+        m = re.search(r'→ (\w+)', (result.stdout or '') + (result.stderr or ''))
+        utfall = m.group(1) if m else ('ok' if result.returncode == 0 else 'fel')
+        _rakna('import_fordelning_totalt', utfall=utfall)
+        _rakna('import_korningar_totalt', skript='fordelning',
+               utfall='ok' if result.returncode == 0 else 'fel')
         # Scriptets statusrad ("Fördelning: ... → imported/duplicate/...") på stdout.
         loggat = False
         for line in (result.stdout or "").splitlines():
@@ -275,7 +496,10 @@ def post_hpr_fordelning(filepath: str):
                 logger.warning(f"Fördelning: {basename} → scriptet avslutades med kod {result.returncode}")
     except subprocess.TimeoutExpired:
         logger.warning(f"Fördelning: timeout (>300s) för {os.path.basename(filepath)} — ej kritiskt.")
+        _rakna('import_fordelning_totalt', utfall='timeout')
+        _rakna('import_korningar_totalt', skript='fordelning', utfall='timeout')
     except Exception as e:
+        _rakna('import_fordelning_totalt', utfall='undantag')
         logger.warning(f"Fördelning: oväntat fel för {os.path.basename(filepath)} "
                        f"(ej kritiskt, arkiveringen påverkas inte): {e}")
 
@@ -308,6 +532,11 @@ def periodic_scan():
             total = len(mom_files) + len(hpr_files) + len(other)
             if total == 0:
                 continue
+            # Missade events = filer som inget event sett (se _sedda_filer)
+            for filtyp, filer in (('mom', mom_files), ('hpr', hpr_files), ('hqc_fpr', other)):
+                missade = sum(_markera_sedd(f) for f in filer)
+                if missade:
+                    _rakna('import_periodisk_scan_fangster_totalt', missade, filtyp=filtyp)
             logger.info(
                 f"Periodisk scan [skyddsnät]: {len(mom_files)} .mom, "
                 f"{len(hpr_files)} .hpr, {len(other)} .hqc/.fpr i Inkommande"
@@ -357,6 +586,7 @@ class IncomingFileHandler(FileSystemEventHandler):
         self._handle(event.dest_path, 'moved')
 
     def _handle(self, filepath: str, event_type: str):
+        _markera_sedd(filepath)   # före filtret: även .hqc/.fpr-events räknas som sedda
         ext = os.path.splitext(filepath)[1].lower()
         basename = os.path.basename(filepath)
 
@@ -418,6 +648,9 @@ def main():
     logger.info(f"Python: {PYTHON_EXE}")
     logger.info("=" * 60)
 
+    # Metrik-endpoint före befintliga filer — en lång startimport syns också
+    start_metrik_server()
+
     # Verifiera att allt finns
     if not os.path.isdir(WATCH_DIR):
         logger.error(f"Bevakad mapp finns inte: {WATCH_DIR}")
@@ -443,6 +676,9 @@ def main():
     logger.info(f"  .hpr: {len(existing_hpr)} st")
     for f in sorted(existing_hpr):
         logger.info(f"    - {f.name}")
+    # Startskanningen har sett allt som redan låg här — inga missade events
+    for f in Path(WATCH_DIR).iterdir():
+        _markera_sedd(f)
 
     if existing_mom:
         logger.info(f"Kör MOM-import för {len(existing_mom)} filer...")
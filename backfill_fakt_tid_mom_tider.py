@@ -12,35 +12,23 @@ Kör som:
   python backfill_fakt_tid_mom_tider.py --skarp --alla
 """
 import os, re, sys, argparse, requests
-from datetime import datetime, timedelta, timezone
+from datetime import datetime
 from collections import defaultdict
-from unittest.mock import MagicMock
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# ── Importera parse_mom_file + config från huvudimportskriptet ────────────────
-# Watchdog startar INTE (main() anropas bara under if __name__ == '__main__').
-# Mock:a watchdog så att module-level import ej kraschar.
-for _m in ['watchdog', 'watchdog.observers', 'watchdog.events',
-           'watchdog.observers.polling', 'watchdog.observers.inotify']:
-    if _m not in sys.modules:
-        sys.modules[_m] = MagicMock()
-
-import importlib.util as _ilu
-_spec = _ilu.spec_from_file_location(
-    "importskript",
-    os.path.join(SCRIPT_DIR, "skogsmaskin_import_version_6.py"),
-)
-_mod = _ilu.module_from_spec(_spec)
-_spec.loader.exec_module(_mod)
-
-parse_mom_file = _mod.parse_mom_file
-BEHANDLADE     = _mod.BEHANDLADE
+# ── parse_mom_file + config från importpaketet ───────────────────────────────
+# skogsimport.parsers/klient drar inte in watchdog och startar ingenting.
+sys.path.insert(0, SCRIPT_DIR)
+import import_profil
+import mom_timmar
+from skogsimport.klient import SUPABASE_HEADERS, init_supabase
+from skogsimport.konfig import BEHANDLADE, SUPABASE_URL
+from skogsimport.parsers import parse_mom_file
+from stanford_arkiv import ar_stanford, stanford_namn
 
 # init_supabase() fyller SUPABASE_HEADERS (tom dict vid module load)
-_mod.init_supabase()
-SUPABASE_URL     = _mod.SUPABASE_URL
-SUPABASE_HEADERS = _mod.SUPABASE_HEADERS
+init_supabase()
 
 
 # ── fil_recency med FIXAD regex (stöder 14-siffriga maskin-tidsstämplar) ─────
@@ -93,7 +81,7 @@ def mom_filer_for_datum(maskin_id: str, datum: str) -> list[str]:
     datum_ren = datum.replace('-', '')
     resultat = []
     for f in os.listdir(mapp):
-        if not f.lower().endswith('.mom'):
+        if not ar_stanford(f, '.mom'):
             continue
         if re.search(rf'_({datum_ren}\d{{6}})(?=\.|_|$)', f):
             resultat.append(os.path.join(mapp, f))
@@ -146,14 +134,6 @@ TID_FIELDS = [
     'processing_sek', 'terrain_sek', 'other_work_sek',
     'maintenance_sek', 'disturbance_sek', 'rast_sek', 'avbrott_sek',
 ]
-MOM_TYP_FIELDS = [
-    ('processing_sek', 'processing'),
-    ('terrain_sek',    'terrain'),
-    ('kort_stopp_sek', 'kort_stopp'),
-    ('other_work_sek', 'other'),
-    ('disturbance_sek','disturbance'),
-]
-MOM_TYP_MAP = {f: t for f, t in MOM_TYP_FIELDS}
 
 
 def _weight(entry: dict) -> int:
@@ -263,7 +243,7 @@ def rebygg_dag(maskin_id: str, datum: str) -> dict:
             'operator_id': opid,
             **{k: (int(v) if k in INT_FIELDS else v) for k, v in agg.items()},
             'tomgang_sek': int(tom),
-            'filnamn':    os.path.basename(vinnande_fil) if vinnande_fil else None,
+            'filnamn':    stanford_namn(vinnande_fil) if vinnande_fil else None,
         }
         fakt_tid_rows.append(row)
 
@@ -275,57 +255,16 @@ def rebygg_dag(maskin_id: str, datum: str) -> dict:
         except Exception:
             vd = {}
 
-        dedup_segs: dict = {}
-        for ek, entry in vd.get('tid_entries', {}).items():
-            if str(entry.get('datum') or '') != datum:
-                continue
-            if len(ek) == 4:
-                start_str, em, _, eop = ek
-            else:
-                start_str, em, _ = ek
-                eop = entry.get('operator_id')
-            if not start_str:
-                continue
-            for field in MOM_TYP_MAP:
-                sek = entry.get(field) or 0
-                if sek > 0:
-                    dedup_segs[(em, start_str, field)] = (eop, sek)
-
-        tider_agg: dict = {}
-        for (em, start_str, field), (eop, sek) in dedup_segs.items():
-            typ = MOM_TYP_MAP[field]
-            try:
-                dt_s = datetime.fromisoformat(start_str)
-            except Exception:
-                continue
-            dt_e = dt_s + timedelta(seconds=sek)
-            cur  = dt_s
-            while cur < dt_e:
-                nxt      = cur.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
-                chunk_e  = min(nxt, dt_e)
-                chunk_s  = (chunk_e - cur).total_seconds()
-                if chunk_s > 0:
-                    hu = cur.replace(minute=0, second=0, microsecond=0).astimezone(timezone.utc)
-                    tk = (em, eop, hu.strftime('%Y-%m-%dT%H:%M:%SZ'), typ)
-                    tider_agg[tk] = tider_agg.get(tk, 0) + chunk_s
-                cur = nxt
-
-        mom_rows = [
-            {
-                'maskin_id':  k[0],
-                'operator_id': k[1],
-                'timme':      k[2],
-                'typ':        k[3],
-                'minuter':    round(v / 60),
-            }
-            for k, v in tider_agg.items()
-        ]
+        # Samma timdelning som importen (mom_timmar)
+        tider_agg = mom_timmar.timhinkar(
+            mom_timmar.segment_ur_tid_entries(vd.get('tid_entries', {}), datum))
+        mom_rows = mom_timmar.till_rader(tider_agg)
 
     return {
         'fakt_tid_rows': fakt_tid_rows,
         'mom_rows':       mom_rows,
         'filer':          len(filer),
-        'vinnande_fil':   os.path.basename(vinnande_fil) if vinnande_fil else None,
+        'vinnande_fil':   stanford_namn(vinnande_fil) if vinnande_fil else None,
     }
 
 
@@ -356,11 +295,11 @@ def hitta_drabbade() -> list[tuple[str, str]]:
 
         datum_filer: dict[str, list[str]] = defaultdict(list)
         for f in os.listdir(mom_mapp):
-            if not f.lower().endswith('.mom'):
+            if not ar_stanford(f, '.mom'):
                 continue
             ts = maskin_ts(f)
             if ts:
-                datum_filer[ts.strftime('%Y-%m-%d')].append(f)
+                datum_filer[ts.strftime('%Y-%m-%d')].append(stanford_namn(f))
 
         for datum, filer in sorted(datum_filer.items()):
             if len(filer) < 2:
@@ -452,18 +391,17 @@ def kor_dag(maskin_id: str, datum: str):
         'datum,maskin_id,objekt_id,operator_id',
     )
 
-    # mom_tider: DELETE berörda timmar → INSERT
-    timmar = sorted({r['timme'] for r in res['mom_rows']})
-    for i in range(0, len(timmar), 20):
-        chunk = ','.join(f'"{t}"' for t in timmar[i:i+20])
-        requests.delete(
-            f"{SUPABASE_URL}/rest/v1/mom_tider"
-            f"?maskin_id=eq.{maskin_id}&timme=in.({chunk})",
-            headers=SUPABASE_HEADERS,
-            timeout=60,
-        )
-    if res['mom_rows']:
-        sb_upsert('mom_tider', res['mom_rows'], 'maskin_id,operator_id,timme,typ')
+    # mom_tider: DELETE + INSERT för timmar vars innehåll ändrats
+    mom = mom_timmar.skriv_timmar(res['mom_rows'], SUPABASE_URL, SUPABASE_HEADERS, requests)
+    if not mom['ok']:
+        raise RuntimeError(f"mom_tider {maskin_id} {datum}: {'; '.join(mom['varningar'])}")
+
+    # Importerns fingeravtryck för dagen gäller inte längre — nästa MOM-import
+    # ska jämföra mot det som står nu, inte hoppa över dagen (se meta_mom_dag)
+    try:
+        sb_delete('meta_mom_dag', f'maskin_id=eq.{maskin_id}&datum=eq.{datum}')
+    except requests.HTTPError:
+        pass  # tabellen saknas (migrationen 20261026 ej körd) — inget att glömma
 
     ny_g15 = g15h(res['fakt_tid_rows'])
     print(f"  >> {maskin_id} {datum}: "
@@ -503,7 +441,9 @@ def main():
                        help="T.ex. PONS20SDJAA270231:2026-07-18,PONS20SDJAA270231:2026-07-08")
     scope.add_argument('--alla', action='store_true',
                        help="Hitta och rätta alla drabbade dagar automatiskt")
+    import_profil.lagg_till_flagga(p)
     args = p.parse_args()
+    import_profil.aktivera(args.profile, 'backfill_fakt_tid_mom_tider')
 
     if args.datum:
         par = []
@@ -516,7 +456,8 @@ def main():
             par.append((maskin.strip(), datum.strip()))
     else:
         print("Söker drabbade dagar i Behandlade + Supabase …\n")
-        par = hitta_drabbade()
+        with import_profil.profil('backfill_fakt_tid_mom_tider', 'hitta_drabbade'):
+            par = hitta_drabbade()
         if not par:
             print("Inga drabbade dagar hittades.")
             return
@@ -528,7 +469,8 @@ def main():
         print(f"{'='*62}")
         total_delta = 0.0
         for maskin_id, datum in par:
-            total_delta += dry_run_dag(maskin_id, datum)
+            with import_profil.profil(f'{maskin_id}_{datum}', 'dry_run'):
+                total_delta += dry_run_dag(maskin_id, datum)
         print(f"\n{'─'*62}")
         print(f"Totalt tillägg G15h : {total_delta:+.2f} h över {len(par)} dag(ar)")
         if total_delta > 0:
@@ -539,7 +481,8 @@ def main():
         print(f"SKARP KÖRNING — {len(par)} dag(ar)")
         print(f"{'='*62}\n")
         for maskin_id, datum in par:
-            kor_dag(maskin_id, datum)
+            with import_profil.profil(f'{maskin_id}_{datum}', 'skarp'):
+                kor_dag(maskin_id, datum)
         verifiera()
         print("\nKlar!")
 
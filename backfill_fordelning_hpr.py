@@ -35,6 +35,8 @@ from pathlib import Path
 
 import requests
 
+from stanford_arkiv import lista_stanford, open_stanford, stanford_namn
+
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 BEHANDLADE = Path(r"C:\Users\lindq\Kompersmåla Skog\Maskindata - Dokument\MOM-filer\Behandlade")
 DEFAULT_MASKIN = "PONS20SDJAA270231"
@@ -42,7 +44,7 @@ DEFAULT_API = "http://localhost:3000/api/hpr-import"
 
 # Filnamn slutar på _YYYYMMDDHHMMSS.hpr eller _YYYYMMDDHHMMSS_N.hpr (delfil
 # efter 4000-stammarstaket). Sorteringsnyckel = (tidsstämpel, delnummer).
-TS_RE = re.compile(r"_(\d{14})(?:_(\d+))?\.hpr$", re.IGNORECASE)
+TS_RE = re.compile(r"_(\d{14})(?:_(\d+))?\.hpr(?:\.gz|\.zst)?$", re.IGNORECASE)
 
 
 def env_local(name: str) -> str | None:
@@ -76,15 +78,15 @@ def collect(maskin: str, name_filter: str | None, fillista: str | None) -> list[
         if not d.is_dir():
             print(f"VARNING: {d} finns inte — hoppar över")
             continue
-        files += [p for p in d.glob("*.hpr")] + [p for p in d.glob("*.HPR")]
+        files += [Path(p) for p in lista_stanford(d, ".hpr")]
     files = sorted(set(files), key=sort_key)
     if name_filter:
-        files = [p for p in files if name_filter.lower() in p.name.lower()]
+        files = [p for p in files if name_filter.lower() in stanford_namn(p).lower()]
     if fillista:
         # Exakt namnlista (en per rad) — t.ex. filer som avvisades i en tidigare
         # körning. Saknade namn larmas, aldrig tyst tappade.
         onskade = [r.strip() for r in open(fillista, encoding="utf-8") if r.strip()]
-        hittade = {p.name: p for p in files}
+        hittade = {stanford_namn(p): p for p in files}
         saknas = [n for n in onskade if n not in hittade]
         if saknas:
             print(f"VARNING: {len(saknas)} namn i {fillista} hittades INTE bland filerna:")
@@ -95,7 +97,8 @@ def collect(maskin: str, name_filter: str | None, fillista: str | None) -> list[
 
 
 def post_file(p: Path, api_url: str, supabase_url: str, service_key: str, import_key: str) -> str:
-    data = p.read_bytes()
+    with open_stanford(p) as f:
+        data = f.read()
     digest = hashlib.sha256(data).hexdigest()
     # Gzippa före uppladdning (HPR = XML, ~8:1) för att komma under Supabase
     # Storages uppladdningsgräns; routen dekomprimerar och hashar originalet.
@@ -121,7 +124,7 @@ def post_file(p: Path, api_url: str, supabase_url: str, service_key: str, import
     resp = requests.post(
         api_url,
         params={"key": import_key},
-        json={"storage_path": storage_path, "skip_raw_copy": True, "source_name": p.name},
+        json={"storage_path": storage_path, "skip_raw_copy": True, "source_name": stanford_namn(p)},
         timeout=180,
     )
     if resp.status_code not in (200, 422):
@@ -165,7 +168,7 @@ def main():
     if args.dry_run:
         print("\n--dry-run: inget importerat. Full fillista:")
         for p in files:
-            print(f"  {p.name}")
+            print(f"  {stanford_namn(p)}")
         return
 
     supabase_url = env_local("NEXT_PUBLIC_SUPABASE_URL") or env_local("SUPABASE_URL")
@@ -188,10 +191,10 @@ def main():
         kind = res.split(" ")[0].rstrip(":")
         counts[kind] = counts.get(kind, 0) + 1
         if kind not in ("imported", "duplicate"):
-            failures.append(f"{p.name}: {res}")
+            failures.append(f"{stanford_namn(p)}: {res}")
         if "COMPLETED" in res:
-            completed.append(f"{p.name}: {res}")
-        print(f"[{i}/{len(files)}] {p.name}: {res}", flush=True)
+            completed.append(f"{stanford_namn(p)}: {res}")
+        print(f"[{i}/{len(files)}] {stanford_namn(p)}: {res}", flush=True)
 
     print(f"\nKLART på {(time.time() - t0) / 60:.1f} min. Utfall: {counts}")
     if completed:
@@ -5,7 +5,8 @@ backfill_mom_tider.py
 Fyller mom_tider med timvisa tidssegment fran befintliga MOM-filer i Behandlade/.
 
 ISOLERAT: Ror ENBART mom_tider. Inga andra tabeller berors.
-IDEMPOTENT: DAG-REBUILD (delete + insert) per (maskin_id, timme) - safe att kora om.
+IDEMPOTENT: delete + insert per (maskin_id, timme) for timmar vars innehall
+andrats (mom_timmar.skriv_timmar) - safe att kora om.
 
 MOM-filer ar kumulativa (varje ny fil innehaller all tidigare data + nytt).
 Deduplikering sker pa segmentniva: (maskin_id, op_id, start_time, typ) - sista fil vinner.
@@ -24,15 +25,19 @@ Anvandning:
 
 import os
 import sys
-import json
 import logging
 import argparse
 import xml.etree.ElementTree as ET
-from datetime import datetime, timezone, date as date_t, timedelta
+from datetime import datetime, date as date_t, timedelta
 from pathlib import Path
 from collections import defaultdict
 import requests
 
+import import_profil
+import mom_timmar
+from mom_timmar import TYP_MAP
+from stanford_arkiv import lista_stanford, open_stanford
+
 # -- Konfiguration -----------------------------------------------------------
 
 BEHANDLADE = r"C:\Users\lindq\Kompersmåla Skog\Maskindata - Dokument\MOM-filer\Behandlade"
@@ -65,15 +70,6 @@ HEADERS = {
     'Prefer': 'return=minimal',
 }
 
-TYP_FIELDS = [
-    ('processing_sek',  'processing'),
-    ('terrain_sek',     'terrain'),
-    ('kort_stopp_sek',  'kort_stopp'),
-    ('other_work_sek',  'other'),
-    ('disturbance_sek', 'disturbance'),
-]
-TYP_MAP = {f: t for f, t in TYP_FIELDS}
-
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s %(levelname)s %(message)s',
@@ -123,7 +119,8 @@ def parse_file_to_segs(filepath: Path, maskin_filter):
     sa att sista fil vinner - identisk logik som importkoden (raw_tid_entries).
     """
     try:
-        tree = ET.parse(filepath)
+        with open_stanford(filepath) as f:
+            tree = ET.parse(f)
     except ET.ParseError as e:
         log.warning(f"  XML-fel i {filepath.name}: {e}")
         return {}
@@ -191,63 +188,14 @@ def parse_file_to_segs(filepath: Path, maskin_filter):
 
 def bucket_segs(all_segs: dict, fran, till) -> dict:
     """
-    Konverterar deduplicerade rasegment -> timvisa buckets MED TIMDELNING.
-    Nyckeln: (maskin_id, op_id, timme_utc, typ) -> sekunder.
-
-    Segment som korsar timgranser delas proportionellt efter faktisk tid i varje hink:
-      06:52+01:00 start, 99 min => kl 6: 7 min, kl 7: 60 min, kl 8: 32 min.
+    Deduplicerade rasegment -> timvisa buckets MED TIMDELNING:
+    (maskin_id, op_id, timme_utc, typ) -> sekunder. Samma motor som importen
+    (mom_timmar.timhinkar, NumPy for stora mangder).
 
-    Datumfiltret appliceras pa varje chunks lokala datum (inte bara starttiden).
-    datetime.fromisoformat() bevarar UTC-offset - parse_datetime() i importkoden
-    STRIPPAR den, anvand INTE den.
+    Datumfiltret appliceras pa varje timmes lokala datum (segmentets offset),
+    inte bara starttiden.
     """
-    agg = {}
-    for (maskin_id, start_str, typ), (op_id, sek) in all_segs.items():
-        try:
-            dt_start = datetime.fromisoformat(start_str)
-        except Exception:
-            continue
-
-        # Pre-filter: startdatum langt utanfor intervallet (+ 1 dags marginal)
-        start_date = dt_start.date()
-        if fran and start_date < fran - timedelta(days=1):
-            continue
-        if till and start_date > till + timedelta(days=1):
-            continue
-
-        dt_end = dt_start + timedelta(seconds=sek)
-
-        # Dela upp segmentet per lokal heltimme
-        current = dt_start
-        while current < dt_end:
-            # Nasta heltimme i lokal tid (offset foljder med replace)
-            next_hour = (current.replace(minute=0, second=0, microsecond=0)
-                         + timedelta(hours=1))
-            chunk_end = min(next_hour, dt_end)
-            chunk_sek = (chunk_end - current).total_seconds()
-
-            if chunk_sek <= 0:
-                current = next_hour
-                continue
-
-            # Hinkens lokal-heltimme -> UTC
-            hour_local = current.replace(minute=0, second=0, microsecond=0)
-            hour_utc = hour_local.astimezone(timezone.utc)
-
-            # Datumfilter pa chunkets lokala datum
-            chunk_date = hour_local.date()
-            if fran and chunk_date < fran:
-                current = next_hour
-                continue
-            if till and chunk_date > till:
-                break  # Tid gar framat, ingen mening att fortsatta
-
-            timme_utc = hour_utc.strftime('%Y-%m-%dT%H:%M:%SZ')
-            k = (maskin_id, op_id, timme_utc, typ)
-            agg[k] = agg.get(k, 0) + chunk_sek
-
-            current = next_hour
-    return agg
+    return mom_timmar.timhinkar(all_segs, fran, till)
 
 
 # -- Hitta MOM-filer ---------------------------------------------------------
@@ -265,7 +213,7 @@ def find_mom_files(maskin_filter):
         for sub in ['mom', 'MOM', 'Mom']:
             mom_dir = behandlade / maskin_filter / sub
             if mom_dir.exists():
-                files = sorted(mom_dir.glob('*.mom')) + sorted(mom_dir.glob('*.MOM'))
+                files = [Path(f) for f in lista_stanford(mom_dir, '.mom')]
                 break
     else:
         for maskin_dir in sorted(behandlade.iterdir()):
@@ -274,7 +222,7 @@ def find_mom_files(maskin_filter):
             for sub in ['mom', 'MOM', 'Mom']:
                 mom_dir = maskin_dir / sub
                 if mom_dir.exists():
-                    files.extend(sorted(mom_dir.glob('*.mom')) + sorted(mom_dir.glob('*.MOM')))
+                    files.extend(Path(f) for f in lista_stanford(mom_dir, '.mom'))
                     break
 
     return files
@@ -283,40 +231,13 @@ def find_mom_files(maskin_filter):
 # -- Supabase-skrivning ------------------------------------------------------
 
 def write_to_db(rows: list) -> bool:
-    """DAG-REBUILD: delete per (maskin_id, timme), sedan insert i batchar."""
-    if not rows:
-        return True
-
-    to_delete = defaultdict(set)
-    for r in rows:
-        to_delete[r['maskin_id']].add(r['timme'])
-
-    for del_maskin, timme_set in to_delete.items():
-        timme_list = sorted(timme_set)
-        for i in range(0, len(timme_list), 20):
-            chunk = ','.join(timme_list[i:i + 20])
-            try:
-                requests.delete(
-                    f"{SUPABASE_URL}/rest/v1/mom_tider"
-                    f"?maskin_id=eq.{del_maskin}&timme=in.({chunk})",
-                    headers=HEADERS, timeout=60,
-                )
-            except Exception as e:
-                log.warning(f"  Delete-fel {del_maskin}: {e}")
-
-    for i in range(0, len(rows), 500):
-        batch = rows[i:i + 500]
-        resp = requests.post(
-            f"{SUPABASE_URL}/rest/v1/mom_tider",
-            headers=HEADERS,
-            data=json.dumps(batch),
-            timeout=60,
-        )
-        if resp.status_code not in (200, 201):
-            log.error(f"  Insert-fel: {resp.status_code} {resp.text[:300]}")
-            return False
-
-    return True
+    """Delete + insert per (maskin_id, timme) - bara timmar vars innehall
+    skiljer sig fran det lagrade (mom_timmar.skriv_timmar)."""
+    res = mom_timmar.skriv_timmar(rows, SUPABASE_URL, HEADERS, requests)
+    for varning in res['varningar']:
+        log.warning(f"  {varning}")
+    log.info(f"  {res['andrade']}/{res['timmar']} timmar andrade, {res['rader']} rader skrivna")
+    return res['ok']
 
 
 # -- Rapport -----------------------------------------------------------------
@@ -371,7 +292,9 @@ def main():
     ap.add_argument('--till',   help='Slutdatum YYYY-MM-DD')
     ap.add_argument('--datum',  help='Visa timvis rapport for ett datum (dry-run)')
     ap.add_argument('--dry-run', action='store_true', help='Rakna rader, skriv ej till DB')
+    import_profil.lagg_till_flagga(ap)
     args = ap.parse_args()
+    import_profil.aktivera(args.profile, 'backfill_mom_tider')
 
     maskin_filter = args.maskin
     fran = date_t.fromisoformat(args.fran) if args.fran else None
@@ -392,7 +315,8 @@ def main():
     # Bygg global segmentdict - sista fil vinner (kumulativ-dedup)
     all_segs: dict = {}
     for i, filepath in enumerate(files, 1):
-        file_segs = parse_file_to_segs(filepath, maskin_filter)
+        with import_profil.profil(str(filepath), 'parse'):
+            file_segs = parse_file_to_segs(filepath, maskin_filter)
         all_segs.update(file_segs)  # Overwrite - sista fil vinner
         if i % 100 == 0:
             log.info(f"  Parsade {i}/{len(files)} filer ({len(all_segs)} unika segment hittills)...")
@@ -400,7 +324,8 @@ def main():
     log.info(f"Deduplicerade segment: {len(all_segs)} unika (maskin, start_time, typ) — op_id deduplikerat")
 
     # Bucket efter datumfilter
-    global_agg = bucket_segs(all_segs, fran, till)
+    with import_profil.profil('backfill_mom_tider', 'bucket'):
+        global_agg = bucket_segs(all_segs, fran, till)
 
     # Summering per maskin + dag (UTC-datum)
     per_dag = defaultdict(lambda: defaultdict(int))
@@ -436,7 +361,9 @@ def main():
     ]
 
     log.info(f"Skriver {len(rows)} rader till mom_tider ...")
-    if write_to_db(rows):
+    with import_profil.profil('backfill_mom_tider', 'skriv'):
+        skrivet = write_to_db(rows)
+    if skrivet:
         log.info(f"OK - {len(rows)} rader sparade")
     else:
         log.error("Misslyckades - se ovan")
@@ -0,0 +1,507 @@
+"""benchmark_import.py — end-to-end-benchmark av importen, med regressionströsklar.
+
+Ingen kan i dag säga om en ändring i upsert_data eller en parser gjorde
+importen snabbare eller långsammare. Här körs importvägarna mot en syntetisk
+korpus (stanford_syntet.py) och en lokal PostgREST (lokal_postgrest.py), och
+varje körning sparas som JSON som kan jämföras med en tidigare.
+
+Fall:
+  process_file/<typ>   importerns process_file över korpusens MOM/HPR/HQC/FPR,
+                       en filtyp i taget
+  backlog              process_existing_files över hela Inkommande
+  mom_keep/<n>         en MOM-fil när Behandlade redan har n-1 filer från
+                       samma dag — _keep-omskanningen (1/10/50)
+  import_hpr/<mb>      import_hpr.main på en kumulativ ögonblicksbild om
+                       ungefär så många MB (10/50/150)
+  gap_check            gap_check.main över en månad, mot en databas fylld av
+                       samma månads MOM-import
+  importtid/<modul>    `import <modul>` i en ny Python-process (interpretatorns
+                       start inräknad) — vad ett verktyg som bara parsar, och
+                       importprogrammet, betalar innan första raden körs
+
+Per fall mäts: väggtid, CPU-tid (inkl. barnprocesser, t.ex. gap_checks
+processpool), högsta RSS, och från servern antal HTTP-anrop, fel och bytes
+in/ut per (metod, tabell). Varje upprepning körs i en NY process mot en NY
+server och en ny kopia av korpusen — inget tillstånd läcker mellan körningar.
+Korpusgenerering och förberedelser ingår inte i tiden. Median över
+--upprepa körningar (RSS: max).
+
+Processerna får LOKAL_POSTGREST_URL (vinner över .env.local — kan aldrig nå
+den riktiga databasen), MOM_FILER_MAPP (arbetsmappen i stället för OneDrive)
+och INTAG_VANTETID_S=0 (importens sekundsömn per fil skulle annars vara det
+enda som syns).
+
+  python benchmark_import.py kor [--fall process_file,backlog,mom_keep,import_hpr,gap_check,importtid]
+        [--upprepa 3] [--seed 1] [--snabb] [--latens-ms 0] [--ut fil.json]
+  python benchmark_import.py jamfor bas.json ny.json [--troskel 0.10]
+
+jamfor flaggar varje mått som blivit mer än --troskel sämre (och större än
+brusgolvet: 50 ms tid, 5 MB RSS) och avslutar med kod 1 om något fall
+regresserat — för att köras före/efter en ändring på samma maskin.
+Resultaten hamnar som standard i benchmark_resultat/ (git-ignorerad).
+
+Mått som bara finns på Linux/macOS (resource-modulen): CPU för barnprocesser
+och RSS. På Windows blir de null.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:         # Windows
+    resource = None
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO)
+# lokal_postgrest och stanford_syntet importeras i huvudprocessens funktioner,
+# inte här: arbetsprocessen kör samma fil, och deras minne och stdlib ska inte
+# ingå i det som mäts.
+
+RESULTAT_MAPP = os.path.join(REPO, 'benchmark_resultat')
+FALL = ('process_file', 'backlog', 'mom_keep', 'import_hpr', 'gap_check', 'importtid')
+MOM_KEEP_ANTAL = (1, 10, 50)
+HPR_MB = (10, 50, 150)
+GAP_DAGAR = 31
+# Från det billigaste (bara parsers) till hela programmet via det gamla namnet
+IMPORT_MODULER = ('skogsimport.parsers', 'skogsimport.intag', 'skogsmaskin_import_version_6')
+TROSKEL = 0.10
+# Skillnader under brusgolvet flaggas aldrig, hur stora de än är relativt
+BRUSGOLV = {'wall_s': 0.05, 'cpu_s': 0.05, 'peak_rss_mb': 5.0}
+JAMFORDA_MATT = ('wall_s', 'cpu_s', 'peak_rss_mb', 'http_anrop', 'http_bytes_in')
+_FILTYPER = ('mom', 'hpr', 'hqc', 'fpr')
+_SKORDARE = 'PONS20SDJAA270231'
+
+
+# ── Mätning (i arbetsprocessen) ──────────────────────────────────────────
+
+def _cpu_s() -> float:
+    """Processens CPU-tid, plus avslutade barnprocessers."""
+    if resource is None:
+        return time.process_time()
+    sj, barn = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    return sj.ru_utime + sj.ru_stime + barn.ru_utime + barn.ru_stime
+
+
+def _peak_rss_mb(barn: bool = False) -> Optional[float]:
+    """Toppminne för arbetsprocessen, eller (barn=True) för den största
+    avslutade barnprocessen — importtid mäter barnet, inte arbetaren."""
+    if resource is None:
+        return None
+    kb = resource.getrusage(resource.RUSAGE_CHILDREN if barn else resource.RUSAGE_SELF).ru_maxrss
+    return round(kb / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)   # macOS: bytes
+
+
+def _arbetare(spec_fil: str) -> int:
+    """Kör EN mätning i den här processen (startas av _kor_arbetare)."""
+    with open(spec_fil, encoding='utf-8') as f:
+        spec = json.load(f)
+    op, ut = spec['op'], {}
+    if op in ('process_file', 'backlog'):
+        import skogsmaskin_import_version_6 as imp
+    elif op == 'import_hpr':
+        import import_hpr
+    elif op == 'gap_check':
+        import gap_check
+        gap_check.TAK_CACHE_DIR = os.path.join(spec['mapp'], '.gap_cache')
+        sys.argv = ['gap_check.py', '--quiet', '--days', str(spec['dagar'])]
+    elif op == 'importtid':
+        # Den här processen har redan benchmarkens egen stdlib (json,
+        # subprocess, ...) laddad — mät i en ren interpretator i stället
+        kommando = [sys.executable, '-c', f"import {spec['modul']}"]
+
+    t0, c0 = time.perf_counter(), _cpu_s()
+    try:
+        if op == 'process_file':
+            ut['ok'] = sum(bool(imp.process_file(f)) for f in spec['filer'])
+        elif op == 'backlog':
+            imp.process_existing_files()
+        elif op == 'import_hpr':
+            import_hpr.main()
+        elif op == 'gap_check':
+            try:
+                gap_check.main()
+            except SystemExit as e:
+                ut['exitkod'] = e.code
+        elif op == 'importtid':
+            ut['exitkod'] = subprocess.call(kommando, cwd=REPO)
+            if ut['exitkod']:
+                ut['fel'] = f"import {spec['modul']} avslutades med kod {ut['exitkod']}"
+    except Exception:
+        ut['fel'] = traceback.format_exc()[-2000:]
+    ut.update(wall_s=time.perf_counter() - t0, cpu_s=_cpu_s() - c0,
+              peak_rss_mb=_peak_rss_mb(barn=(op == 'importtid')))
+    with open(spec['resultat'], 'w', encoding='utf-8') as f:
+        json.dump(ut, f)
+    return 0
+
+
+# ── Korpus och förberedelser (i huvudprocessen, otajmat) ─────────────────
+
+class _Korpus:
+    """Genererade korpusar, en gång per körning, kopieras in i varje arbetsmapp."""
+
+    def __init__(self, rot: str, seed: str):
+        self.rot, self.seed, self._klara = rot, seed, {}
+
+    def hamta(self, namn: str, **param) -> str:
+        import stanford_syntet
+        if namn not in self._klara:
+            mapp = os.path.join(self.rot, namn)
+            param.setdefault('maskiner', [stanford_syntet.tolka_maskin(m) for m in stanford_syntet.STANDARD_MASKINER])
+            t0 = time.perf_counter()
+            stat = stanford_syntet.generera(mapp, seed=self.seed, **param)
+            print(f'  korpus {namn}: {sum(s["filer"] for s in stat.values())} filer, '
+                  f'{sum(s["bytes"] for s in stat.values()) / 1e6:.1f} MB ({time.perf_counter() - t0:.1f} s)',
+                  flush=True)
+            self._klara[namn] = mapp
+        return self._klara[namn]
+
+
+def _filer(mapp: str, ext: str = '') -> List[str]:
+    """Korpusens filer i mtime-ordning (= ordningen de kom från maskinerna)."""
+    ut = [os.path.join(rot, f) for rot, _, filer in os.walk(mapp) for f in filer if f.lower().endswith(ext)]
+    return sorted(ut, key=lambda p: (os.path.getmtime(p), p))
+
+
+def _kopiera(filer: List[str], mal: str) -> List[str]:
+    os.makedirs(mal, exist_ok=True)
+    ut = []
+    for f in filer:
+        ut.append(shutil.copy2(f, os.path.join(mal, os.path.basename(f))))
+    return ut
+
+
+def _forena_mom_mappar(behandlade: str) -> None:
+    """Importern flyttar till <maskin>/MOM men _keep och gap_check läser
+    <maskin>/mom — samma mapp på Windows, två på ett skiftlägeskänsligt
+    filsystem. Slå ihop dem som Windows ser dem."""
+    if not os.path.isdir(behandlade):
+        return
+    for maskin in os.listdir(behandlade):
+        stor, liten = os.path.join(behandlade, maskin, 'MOM'), os.path.join(behandlade, maskin, 'mom')
+        if not os.path.isdir(stor) or (os.path.exists(liten) and os.path.samefile(stor, liten)):
+            continue
+        os.makedirs(liten, exist_ok=True)
+        for f in os.listdir(stor):
+            os.replace(os.path.join(stor, f), os.path.join(liten, f))
+        os.rmdir(stor)
+
+
+# ── Körning ──────────────────────────────────────────────────────────────
+
+def _kor_arbetare(spec: dict, mapp: str, url: str) -> dict:
+    spec = dict(spec, mapp=mapp, resultat=os.path.join(mapp, '_resultat.json'))
+    spec_fil = os.path.join(mapp, '_spec.json')
+    with open(spec_fil, 'w', encoding='utf-8') as f:
+        json.dump(spec, f)
+    env = dict(os.environ, LOKAL_POSTGREST_URL=url, MOM_FILER_MAPP=os.path.join(mapp, 'MOM-filer'),
+               HPR_IMPORT_LOGG=os.path.join(mapp, 'hpr_import_logg.txt'),
+               INTAG_VANTETID_S='0', PYTHONIOENCODING='utf-8')
+    with open(os.path.join(mapp, '_arbetare.log'), 'w', encoding='utf-8') as logg:
+        kod = subprocess.call([sys.executable, os.path.abspath(__file__), '_arbetare', spec_fil],
+                              cwd=mapp, env=env, stdout=logg, stderr=subprocess.STDOUT)
+    if not os.path.exists(spec['resultat']):
+        with open(os.path.join(mapp, '_arbetare.log'), encoding='utf-8', errors='replace') as f:
+            return {'fel': f'arbetsprocessen avslutades med kod {kod}:\n' + f.read()[-2000:]}
+    with open(spec['resultat'], encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _kor_fall(namn: str, forbered: Callable[[str], dict], upprepa: int, server_param: dict) -> dict:
+    """forbered(mapp) lägger korpusen på plats och returnerar arbetsspecen;
+    specen kan ha 'forberedelse' (en spec som körs före mätningen, mot samma
+    server, utan att räknas)."""
+    import lokal_postgrest
+    korningar = []
+    for _ in range(upprepa):
+        mapp = tempfile.mkdtemp(prefix='bench_')
+        server = lokal_postgrest.starta(**server_param)
+        url = f'http://127.0.0.1:{server.server_address[1]}'
+        try:
+            spec = forbered(mapp)
+            if spec.get('forberedelse'):
+                forb = _kor_arbetare(spec.pop('forberedelse'), mapp, url)
+                if forb.get('fel'):
+                    korningar.append({'fel': 'förberedelsen: ' + forb['fel']})
+                    break
+                _forena_mom_mappar(os.path.join(mapp, 'MOM-filer', 'Behandlade'))
+            server.handler.stat.nollstall()
+            res = _kor_arbetare(spec, mapp, url)
+            res['http'] = server.handler.stat.som_json()
+            korningar.append(res)
+            if res.get('fel'):
+                break
+        finally:
+            server.shutdown()
+            server.server_close()
+            shutil.rmtree(mapp, ignore_errors=True)
+
+    fel = next((k['fel'] for k in korningar if k.get('fel')), None)
+    if fel:
+        print(f'  {namn:<22} FEL\n{fel}', flush=True)
+        return {'fel': fel}
+    http = korningar[0]['http']
+    ut = {
+        'wall_s': round(statistics.median(k['wall_s'] for k in korningar), 4),
+        'cpu_s': round(statistics.median(k['cpu_s'] for k in korningar), 4),
+        'peak_rss_mb': max((k['peak_rss_mb'] for k in korningar if k['peak_rss_mb'] is not None), default=None),
+        'http_anrop': int(statistics.median(k['http']['anrop'] for k in korningar)),
+        'http_fel': int(statistics.median(k['http']['fel'] for k in korningar)),
+        'http_bytes_in': int(statistics.median(k['http']['bytes_in'] for k in korningar)),
+        'http_bytes_ut': int(statistics.median(k['http']['bytes_ut'] for k in korningar)),
+        'wall_s_alla': [round(k['wall_s'], 4) for k in korningar],
+        'per_anrop': {k: {m: v[m] for m in ('anrop', 'rader', 'bytes_in', 'bytes_ut', 'fel')}
+                      for k, v in http['per_anrop'].items()},
+    }
+    for extra in ('ok', 'exitkod', 'filer', 'korpus_mb'):
+        v = korningar[0].get(extra, spec.get(extra))
+        if v is not None:
+            ut[extra] = len(v) if isinstance(v, list) else v
+    print(f'  {namn:<22} {ut["wall_s"]:8.2f} s  cpu {ut["cpu_s"]:7.2f} s  '
+          f'rss {ut["peak_rss_mb"] if ut["peak_rss_mb"] is not None else "-":>7} MB  '
+          f'{ut["http_anrop"]:6d} anrop  {ut["http_bytes_in"] / 1e6:8.2f} MB ut', flush=True)
+    return ut
+
+
+def _fall_process_file(korpus: _Korpus, snabb: bool) -> Dict[str, Callable]:
+    kalla = korpus.hamta('inkommande', dagar=1 if snabb else 2)
+
+    def forbered(typ):
+        def f(mapp):
+            filer = _kopiera(_filer(kalla, '.' + typ), os.path.join(mapp, 'MOM-filer', 'Inkommande'))
+            return {'op': 'process_file', 'filer': filer,
+                    'korpus_mb': round(sum(os.path.getsize(p) for p in filer) / 1e6, 2)}
+        return f
+    fall = {f'process_file/{typ}': forbered(typ) for typ in _FILTYPER}
+
+    def backlog(mapp):
+        filer = _kopiera(_filer(kalla), os.path.join(mapp, 'MOM-filer', 'Inkommande'))
+        return {'op': 'backlog', 'filer': len(filer),
+                'korpus_mb': round(sum(os.path.getsize(p) for p in filer) / 1e6, 2)}
+    fall['backlog'] = backlog
+    return fall
+
+
+def _fall_mom_keep(korpus: _Korpus, snabb: bool) -> Dict[str, Callable]:
+    """Dagens timfiler från skördaren; n-1 av dem (med Behandlade-flyttens
+    krocksuffix när dagen inte räcker till) ligger redan i Behandlade/mom."""
+    import stanford_syntet
+    kalla = korpus.hamta('mom_dag', maskiner=[stanford_syntet.tolka_maskin(_SKORDARE)], dagar=1, mom='timme')
+    dagens = _filer(kalla, '.mom')
+
+    def forbered(n):
+        def f(mapp):
+            mom_mapp = os.path.join(mapp, 'MOM-filer', 'Behandlade', _SKORDARE, 'mom')
+            os.makedirs(mom_mapp, exist_ok=True)
+            tidigare = dagens[:-1]
+            for i in range(n - 1):
+                src = tidigare[i % len(tidigare)]
+                bas, ext = os.path.splitext(os.path.basename(src))
+                if i >= len(tidigare):
+                    stampel = datetime.fromtimestamp(os.path.getmtime(src)) + timedelta(seconds=i)
+                    bas = f'{bas}_{stampel:%Y%m%d_%H%M%S}'
+                shutil.copy2(src, os.path.join(mom_mapp, bas + ext))
+            filer = _kopiera(dagens[-1:], os.path.join(mapp, 'MOM-filer', 'Inkommande'))
+            return {'op': 'process_file', 'filer': filer}
+        return f
+    return {f'mom_keep/{n}': forbered(n) for n in (MOM_KEEP_ANTAL[:2] if snabb else MOM_KEEP_ANTAL)}
+
+
+def _fall_import_hpr(korpus: _Korpus, snabb: bool) -> Dict[str, Callable]:
+    """Ett enda objekt (orimligt många stammar per objekt) och så många dagar
+    att sista ögonblicksbilden blir ungefär mb stor — skalat från en provkörning."""
+    import stanford_syntet
+    skordare = [stanford_syntet.tolka_maskin(_SKORDARE)]
+    prov = korpus.hamta('hpr_prov', maskiner=skordare, dagar=3, stammar_per_objekt=10 ** 7, mom='dag')
+    mb_per_dag = max(os.path.getsize(f) for f in _filer(prov, '.hpr')) / 1e6 / 3
+
+    def forbered(mb):
+        def f(mapp):
+            dagar = max(1, round(mb / mb_per_dag))
+            kalla = korpus.hamta(f'hpr_{mb}', maskiner=skordare, dagar=dagar, stammar_per_objekt=10 ** 7,
+                                 mom='dag', layout='behandlade')
+            shutil.copytree(kalla, os.path.join(mapp, 'MOM-filer', 'Behandlade'))
+            return {'op': 'import_hpr',
+                    'korpus_mb': round(max(os.path.getsize(p) for p in _filer(kalla, '.hpr')) / 1e6, 1)}
+        return f
+    return {f'import_hpr/{mb}': forbered(mb) for mb in (HPR_MB[:1] if snabb else HPR_MB)}
+
+
+def _fall_gap_check(korpus: _Korpus, snabb: bool) -> Dict[str, Callable]:
+    """En månad fram till i dag (gap_checks fönster är relativt dagens datum),
+    en MOM per maskin och dag. Databasen fylls av samma filer i förberedelsen."""
+    dagar = 7 if snabb else GAP_DAGAR
+    kalla = korpus.hamta(f'gap_{dagar}', dagar=dagar, start=date.today() - timedelta(days=dagar - 1),
+                         mom='dag')
+
+    def forbered(mapp):
+        filer = _kopiera(_filer(kalla, '.mom'), os.path.join(mapp, 'MOM-filer', 'Inkommande'))
+        return {'op': 'gap_check', 'dagar': dagar, 'filer': len(filer),
+                'forberedelse': {'op': 'process_file', 'filer': filer}}
+    return {'gap_check': forbered}
+
+
+def _fall_importtid(korpus: _Korpus, snabb: bool) -> Dict[str, Callable]:
+    def forbered(modul):
+        return lambda mapp: {'op': 'importtid', 'modul': modul}
+    return {f'importtid/{m}': forbered(m) for m in IMPORT_MODULER}
+
+
+# fall -> funktionen som bygger det (backlog delar korpus med process_file)
+_BYGGARE = {
+    'process_file': _fall_process_file,
+    'backlog': _fall_process_file,
+    'mom_keep': _fall_mom_keep,
+    'import_hpr': _fall_import_hpr,
+    'gap_check': _fall_gap_check,
+    'importtid': _fall_importtid,
+}
+
+
+def _git() -> dict:
+    def git(*arg):
+        try:
+            return subprocess.run(['git', '-C', REPO, *arg], capture_output=True, text=True,
+                                  timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ''
+    return {'commit': git('rev-parse', '--short', 'HEAD') or 'unknown',
+            'smutsig': bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+
+def kor(fall: List[str], upprepa: int = 3, seed: str = '1', snabb: bool = False,
+        latens_ms: float = 0.0, ut: Optional[str] = None) -> str:
+    """Kör valda fall och skriv resultat-JSON. Returnerar sökvägen."""
+    git = _git()
+    resultat = {
+        'version': 1,
+        'tid': datetime.now().astimezone().isoformat(timespec='seconds'),
+        'git': git,
+        'python': platform.python_version(),
+        'plattform': platform.platform(),
+        'cpu_antal': os.cpu_count(),
+        'parametrar': {'fall': fall, 'upprepa': upprepa, 'seed': seed, 'snabb': snabb, 'latens_ms': latens_ms},
+        'fall': {},
+    }
+    server_param = {'latens_ms': latens_ms, 'seed': 1}
+    with tempfile.TemporaryDirectory(prefix='bench_korpus_') as rot:
+        korpus = _Korpus(rot, seed)
+        byggda = {}
+        for namn in fall:
+            byggare = _BYGGARE[namn]
+            if byggare not in byggda:
+                byggda[byggare] = byggare(korpus, snabb)
+        valda = {fallnamn: forbered for byggt in byggda.values() for fallnamn, forbered in byggt.items()
+                 if fallnamn.split('/')[0] in fall}
+        for fallnamn, forbered in valda.items():
+            resultat['fall'][fallnamn] = _kor_fall(fallnamn, forbered, upprepa, server_param)
+
+    if ut is None:
+        os.makedirs(RESULTAT_MAPP, exist_ok=True)
+        ut = os.path.join(RESULTAT_MAPP, f'{datetime.now():%Y%m%d_%H%M%S}_{git["commit"]}.json')
+    with open(ut, 'w', encoding='utf-8') as f:
+        json.dump(resultat, f, ensure_ascii=False, indent=1)
+    return ut
+
+
+# ── Jämförelse ───────────────────────────────────────────────────────────
+
+def jamfor(bas: dict, ny: dict, troskel: float = TROSKEL) -> List[dict]:
+    """Rader {fall, matt, bas, ny, andel, status} för alla gemensamma mått.
+    status: 'REGRESSION' | 'bättre' | '' | 'saknas' | 'fel'."""
+    rader = []
+    for fall in sorted(set(bas['fall']) | set(ny['fall'])):
+        b, n = bas['fall'].get(fall), ny['fall'].get(fall)
+        if b is None or n is None:
+            rader.append({'fall': fall, 'matt': '', 'bas': None, 'ny': None, 'andel': None, 'status': 'saknas'})
+            continue
+        if n.get('fel') or b.get('fel'):
+            rader.append({'fall': fall, 'matt': '', 'bas': None, 'ny': None, 'andel': None, 'status': 'fel'})
+            continue
+        for matt in JAMFORDA_MATT:
+            vb, vn = b.get(matt), n.get(matt)
+            if vb is None or vn is None:
+                continue
+            andel = (vn - vb) / vb if vb else (0.0 if vn == vb else float('inf'))
+            over_brus = abs(vn - vb) > BRUSGOLV.get(matt, 0)
+            status = ''
+            if over_brus and andel > troskel:
+                status = 'REGRESSION'
+            elif over_brus and andel < -troskel:
+                status = 'bättre'
+            rader.append({'fall': fall, 'matt': matt, 'bas': vb, 'ny': vn, 'andel': andel, 'status': status})
+    return rader
+
+
+def _las(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _skriv_jamforelse(bas: dict, ny: dict, rader: List[dict]) -> None:
+    print(f'bas: {bas["git"]["commit"]}{" (smutsig)" if bas["git"]["smutsig"] else ""}  {bas["tid"]}')
+    print(f'ny:  {ny["git"]["commit"]}{" (smutsig)" if ny["git"]["smutsig"] else ""}  {ny["tid"]}')
+    if bas.get('plattform') != ny.get('plattform') or bas.get('cpu_antal') != ny.get('cpu_antal'):
+        print('OBS: olika maskiner/plattformar — tiderna är inte jämförbara')
+    print(f'{"fall":<22} {"mått":<14} {"bas":>12} {"ny":>12} {"diff":>8}')
+    for r in rader:
+        if r['matt'] == '':
+            print(f'{r["fall"]:<22} {"":<14} {"":>12} {"":>12} {"":>8}  {r["status"]}')
+            continue
+        andel = f'{r["andel"] * 100:+7.1f}%' if r['andel'] != float('inf') else '    +inf'
+        print(f'{r["fall"]:<22} {r["matt"]:<14} {r["bas"]:>12,} {r["ny"]:>12,} {andel}  {r["status"]}'
+              .replace(',', ' '))
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['_arbetare']:
+        return _arbetare(argv[1])
+
+    ap = argparse.ArgumentParser(description='End-to-end-benchmark av importen mot syntetisk korpus och lokal PostgREST.')
+    sub = ap.add_subparsers(dest='kommando', required=True)
+    k = sub.add_parser('kor', help='kör benchmarken och spara JSON')
+    k.add_argument('--fall', default=','.join(FALL), help=f'kommaseparerat urval av {",".join(FALL)}')
+    k.add_argument('--upprepa', type=int, default=3)
+    k.add_argument('--seed', default='1')
+    k.add_argument('--snabb', action='store_true', help='mindre korpus (1 dag, mom_keep 1/10, HPR 10 MB, gap 7 dagar)')
+    k.add_argument('--latens-ms', type=float, default=0.0, help='injicerad latens per HTTP-anrop')
+    k.add_argument('--ut', help='resultatfil (standard: benchmark_resultat/<tid>_<commit>.json)')
+    j = sub.add_parser('jamfor', help='jämför två resultatfiler')
+    j.add_argument('bas')
+    j.add_argument('ny')
+    j.add_argument('--troskel', type=float, default=TROSKEL, help='andel försämring som flaggas (0.10 = 10 %%)')
+    a = ap.parse_args(argv)
+
+    if a.kommando == 'kor':
+        fall = [f.strip() for f in a.fall.split(',') if f.strip()]
+        okanda = set(fall) - set(FALL)
+        if okanda:
+            ap.error(f'okända fall: {", ".join(sorted(okanda))}')
+        print(f'benchmark: {", ".join(fall)} ({a.upprepa} upprepningar)', flush=True)
+        ut = kor(fall, a.upprepa, a.seed, a.snabb, a.latens_ms, a.ut)
+        print(f'-> {ut}')
+        return 0
+
+    bas, ny = _las(a.bas), _las(a.ny)
+    rader = jamfor(bas, ny, a.troskel)
+    _skriv_jamforelse(bas, ny, rader)
+    regressioner = [r for r in rader if r['status'] in ('REGRESSION', 'fel')]
+    print(f'\n{len(regressioner)} regression(er) över {a.troskel * 100:.0f} %' if regressioner
+          else f'\nInga regressioner över {a.troskel * 100:.0f} %')
+    return 1 if regressioner else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
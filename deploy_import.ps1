@@ -37,7 +37,12 @@ $ErrorActionPreference = 'Stop'
 # Filerna som utgor importkoden i drift -- verifieras byte for byte efter reset.
 # HALL I SYNK med DRIFT_FILER i gap_check.py.
 $ImportFiler = @('skogsmaskin_import_version_6.py', 'import_hpr.py',
-                 'auto_import_watch.py', 'gap_check.py')
+                 'auto_import_watch.py', 'gap_check.py', 'supabase_hamtning.py',
+                 'gps_forenkling.py', 'stanford_arkiv.py', 'import_matning.py', 'import_profil.py',
+                 'mom_timmar.py',
+                 'skogsimport/__init__.py', 'skogsimport/konfig.py', 'skogsimport/klient.py',
+                 'skogsimport/parsers.py', 'skogsimport/skrivning.py', 'skogsimport/intag.py',
+                 'skogsimport/bevakning.py')
 
 $script:WatchdogStoppad = $false
 
@@ -12,7 +12,7 @@ snäll "obs" i juni-loggarna utan att någon larmade):
 2) MOM-AVSTÄMNING senaste N dagar (fönster): fakt_tid-dagssumman (P+T)
    mot MOM-taket ur Behandlade.
    Taket byggs med SAMMA semantik som importern efter #115/#119
-   (HÅLL I SYNK med _keep i skogsmaskin_import_version_6.py):
+   (HÅLL I SYNK med _keep i skogsimport/skrivning.py):
    - identitet (MonitoringStartTime, maskin) — objekt/operator är attribut
    - BELOPP från varianten med störst vikt (total duration alla tidshinkar)
    - ATTRIBUTION från versionen med högst recency (filnamnssuffix, annars mtime)
@@ -27,14 +27,20 @@ snäll "obs" i juni-loggarna utan att någon larmade):
 Synk-fördröjning kan inte ge falsklarm: taket byggs från Behandlade, dit importern
 flyttar filer FÖRST efter import. En osynkad fil finns alltså i varken tak eller DB.
 
-READ-ONLY mot Supabase (bara GET fakt_tid). Skriver gap_logg.txt (append) och
-gap_LARM_senaste.txt (skrivs över varje körning — tom vid grönt).
+Invarianterna räknas i första hand i databasen (RPC:erna gap_inv_*, bara
+brotten överförs); saknas de faller kontrollen tillbaka på ett lokalt
+inkrementellt tillstånd per (maskin, dag) i gap_invarianter_tillstand.json.
+
+READ-ONLY mot Supabase (GET fakt_tid + läsande gap_inv_*-RPC:er). Skriver
+gap_logg.txt (append) och gap_LARM_senaste.txt (skrivs över varje körning —
+tom vid grönt).
 Exit-kod 1 om minst ett LARM, annars 0.
 
 Körning:
   python gap_check.py            # utskrift + logg
   python gap_check.py --quiet    # bara logg (för schemalagd körning)
   python gap_check.py --days 30  # annat fönster
+  python gap_check.py --invarianter full   # ladda ner hela fakt_tid, bygg om tillståndet
 """
 import os, sys, glob, json, argparse, datetime, urllib.request, urllib.error
 from collections import defaultdict
@@ -47,24 +53,33 @@ except Exception:
 REPO = os.path.dirname(os.path.abspath(__file__))   # skriptet bor i repo-roten
 os.chdir(REPO); sys.path.insert(0, REPO)
 import logging; logging.disable(logging.CRITICAL)
-import skogsmaskin_import_version_6 as imp
+import import_profil
+from skogsimport import klient, konfig, parsers
+from supabase_hamtning import hamta_sidor, hamta_rader_parallellt
+from stanford_arkiv import lista_stanford
 
 # ----------------- Konfiguration (justera fritt) -----------------
 DAYS_BACK = 14                 # fönster: senaste N dagar
 ABS_THRESHOLD_H = 0.5          # LARM om |tak − DB| > detta antal timmar
 REL_THRESHOLD = 0.10           # info-flagga om gap ≥ 10 % av taket (även under abs-tröskeln)
 MAX_ENGINE_H = 24.0            # invariant: motortid per (maskin, dag) kan aldrig överstiga detta
+HAMTA_DELAR = 4                # fakt_tid-skanningen delas i så många samtidiga nyckelintervall
 KANDA_TOMGANG_ARV = 0          # Arvet (41 rader från före #124) STÄDADES 2026-07-13 via omimport
                                # av 13 filer — baslinjen är nu NOLL. Varje inkonsistent rad efter
                                # detta är ett äkta larm (#124-fixen ska hålla fältet konsistent).
-GAP_LOG = os.path.join(getattr(imp, 'ONEDRIVE_BASE', REPO), 'gap_logg.txt')
-LARM_FIL = os.path.join(getattr(imp, 'ONEDRIVE_BASE', REPO), 'gap_LARM_senaste.txt')
+GAP_LOG = os.path.join(konfig.ONEDRIVE_BASE, 'gap_logg.txt')
+LARM_FIL = os.path.join(konfig.ONEDRIVE_BASE, 'gap_LARM_senaste.txt')
 
 # Deploy-drift-kontroll: katalogen där importkoden KÖR (deploy-klonen) jämförs
 # mot origin/main. HÅLL I SYNK med $ImportFiler i deploy_import.ps1.
 DEPLOY_DIR = r'C:\skogsystem-import'
 DRIFT_FILER = ['skogsmaskin_import_version_6.py', 'import_hpr.py',
-               'auto_import_watch.py', 'gap_check.py']
+               'auto_import_watch.py', 'gap_check.py', 'supabase_hamtning.py',
+               'gps_forenkling.py', 'stanford_arkiv.py', 'import_matning.py', 'import_profil.py',
+               'mom_timmar.py',
+               'skogsimport/__init__.py', 'skogsimport/konfig.py', 'skogsimport/klient.py',
+               'skogsimport/parsers.py', 'skogsimport/skrivning.py', 'skogsimport/intag.py',
+               'skogsimport/bevakning.py']
 
 # 13 tid-fält (samma som importern/reparationen)
 TID_FIELDS = ['processing_sek', 'terrain_sek', 'other_work_sek', 'maintenance_sek',
@@ -74,7 +89,7 @@ TID_FIELDS = ['processing_sek', 'terrain_sek', 'other_work_sek', 'maintenance_se
 
 
 def _ensure_creds():
-    if getattr(imp, 'SUPABASE_URL', '') and getattr(imp, 'SUPABASE_KEY', ''):
+    if konfig.SUPABASE_URL and konfig.SUPABASE_KEY:
         return
     env = {}
     with open(os.path.join(REPO, '.env.local'), encoding='utf-8') as fh:
@@ -83,12 +98,12 @@ def _ensure_creds():
             if '=' in line and not line.startswith('#'):
                 k, v = line.split('=', 1)
                 env[k.strip()] = v.strip().strip('"').strip("'")
-    imp.SUPABASE_URL = env['NEXT_PUBLIC_SUPABASE_URL']
-    imp.SUPABASE_KEY = env['SUPABASE_SERVICE_ROLE_KEY']
+    konfig.SUPABASE_URL = env['NEXT_PUBLIC_SUPABASE_URL']
+    konfig.SUPABASE_KEY = env['SUPABASE_SERVICE_ROLE_KEY']
 
 
 def _hdr():
-    return {'apikey': imp.SUPABASE_KEY, 'Authorization': 'Bearer ' + imp.SUPABASE_KEY}
+    return {'apikey': konfig.SUPABASE_KEY, 'Authorization': 'Bearer ' + konfig.SUPABASE_KEY}
 
 
 def window_days(n):
@@ -98,7 +113,7 @@ def window_days(n):
 
 def discover_machines():
     """Maskiner = undermappar i Behandlade som har en 'mom'-mapp."""
-    base = imp.BEHANDLADE
+    base = konfig.BEHANDLADE
     out = []
     for name in sorted(os.listdir(base)):
         if os.path.isdir(os.path.join(base, name, 'mom')):
@@ -107,10 +122,18 @@ def discover_machines():
 
 
 def _fil_recency(path):
-    """Kopia av importerns recency (HÅLL I SYNK med skogsmaskin_import_version_6):
-    sista _YYYYMMDD_HHMMSS-suffixet i filnamnet, annars mtime, annars 0."""
+    """Kopia av importerns recency (HÅLL I SYNK med skogsimport/skrivning.py):
+    maskinens _YYYYMMDDHHMMSS i filnamnet, annars sista _YYYYMMDD_HHMMSS-
+    suffixet (Behandlade-flyttens namnkrock), annars mtime, annars 0."""
     import re
-    m = re.findall(r'_(\d{8})_(\d{6})', os.path.basename(path))
+    bas = os.path.basename(path)
+    m14 = re.search(r'_(\d{14})(?=\.|_|$)', bas)
+    if m14:
+        try:
+            return datetime.datetime.strptime(m14.group(1), '%Y%m%d%H%M%S').timestamp()
+        except ValueError:
+            pass
+    m = re.findall(r'_(\d{8})_(\d{6})', bas)
     if m:
         try:
             return datetime.datetime.strptime(m[-1][0] + m[-1][1], '%Y%m%d%H%M%S').timestamp()
@@ -125,54 +148,165 @@ def _fil_recency(path):
 _VIKT_FALT = ('processing_sek', 'terrain_sek', 'other_work_sek',
               'maintenance_sek', 'disturbance_sek', 'rast_sek', 'avbrott_sek')
 
+# ── MOM-tak: datumfilter + processpool + cache per fil ──────────────────────
+# Taket behöver bara varje fils BIDRAG: per segment (start, objekt, operator,
+# datum, vikt, P, T, engine). Bidraget beror bara på filens innehåll och cachas
+# per fil (nyckel: namn + storlek + mtime) — en timvis körning parsar därmed
+# bara filer som tillkommit sedan sist. Filer som inte KAN innehålla dagar i
+# fönstret hoppas utan att öppnas: en export innehåller aldrig segment efter
+# sin egen tidsstämpel (filnamnets _YYYYMMDDHHMMSS, annars mtime), så en fil
+# stämplad före fönstrets första dag är irrelevant.
+TAK_CACHE_DIR = os.path.join(REPO, '.gap_cache')
+TAK_PROCESSER = max(1, min(8, (os.cpu_count() or 2) - 1))
+_TAK_CACHE_VERSION = 1
+
+
+def _fil_ovre_grans(path):
+    """Senaste möjliga segmentdatum i filen (YYYY-MM-DD) ur filnamnets
+    maskinstämpel, annars mtime. None = okänt (filen parsas)."""
+    import re
+    m = re.search(r'_(\d{8})\d{6}(?=\.|_|$)', os.path.basename(path))
+    if m:
+        d = m.group(1)
+        return f'{d[:4]}-{d[4:6]}-{d[6:]}'
+    try:
+        return datetime.date.fromtimestamp(os.path.getmtime(path)).isoformat()
+    except OSError:
+        return None
+
 
-def mom_ceiling(maskin, dayset):
-    """MOM-tak per dag — SAMMA två-vinnare-semantik som importern efter #115/#119
-    (HÅLL I SYNK med _keep): identitet (start, maskin); BELOPP från störst-vikt-
-    varianten; ATTRIBUTION (objekt, operator) från högst recency. -> {datum: pt_sek}."""
-    files = sorted(glob.glob(os.path.join(imp.BEHANDLADE, maskin, 'mom', '*.mom')))
-    entries, attrs, vmeta = {}, {}, {}
-    for f in files:
-        try:
-            d = imp.parse_mom_file(f)
-        except Exception:
+def _fil_bidrag(path, maskin):
+    """Parsa EN MOM-fil -> kompakta segmentbidrag för maskinen. Körs i
+    processpoolen (toppnivåfunktion — måste kunna picklas)."""
+    d = parsers.parse_mom_file(path)
+    ut = []
+    for ek, e in d.get('tid_entries', {}).items():
+        if len(ek) != 4 or ek[1] != maskin:
             continue
-        rec = _fil_recency(f)
-        for ek, e in d.get('tid_entries', {}).items():
-            if len(ek) != 4 or ek[1] != maskin:
-                continue
-            if str(e.get('datum') or '') not in dayset:
+        ut.append([ek[0], ek[2], ek[3], str(e.get('datum') or ''),
+                   sum((e.get(fn) or 0) for fn in _VIKT_FALT),
+                   e.get('processing_sek') or 0, e.get('terrain_sek') or 0,
+                   e.get('engine_time_sek') or 0])
+    return ut
+
+
+def _las_tak_cache(maskin):
+    try:
+        with open(os.path.join(TAK_CACHE_DIR, f'{maskin}.json'), encoding='utf-8') as fh:
+            c = json.load(fh)
+        if c.get('version') == _TAK_CACHE_VERSION:
+            return c['filer']
+    except (OSError, ValueError, KeyError):
+        pass
+    return {}
+
+
+def _spara_tak_cache(maskin, filer):
+    os.makedirs(TAK_CACHE_DIR, exist_ok=True)
+    ut = os.path.join(TAK_CACHE_DIR, f'{maskin}.json')
+    with open(ut + '.tmp', 'w', encoding='utf-8') as fh:
+        json.dump({'version': _TAK_CACHE_VERSION, 'filer': filer}, fh)
+    os.replace(ut + '.tmp', ut)
+
+
+def _tak_ur_bidrag(bidrag, dayset):
+    """Två-vinnare-semantiken (HÅLL I SYNK med _keep) över [(recency, rader)]."""
+    entries, attrs, vmeta = {}, {}, {}
+    for rec, rader in bidrag:
+        for start, objekt, operator, datum, vikt, P, T, E in rader:
+            if datum not in dayset:
                 continue
-            ident = (ek[0], ek[1])
-            vikt = sum((e.get(fn) or 0) for fn in _VIKT_FALT)
-            v = vmeta.get(ident)
+            v = vmeta.get(start)
             if v is None or vikt > v[0] or (vikt == v[0] and rec > v[1]):
-                entries[ident] = e
-                vmeta[ident] = (vikt, rec)
-            a = attrs.get(ident)
+                entries[start] = (datum, P, T, E)
+                vmeta[start] = (vikt, rec)
+            a = attrs.get(start)
             if a is None or rec > a[0] or (rec == a[0] and vikt > a[3]):
-                attrs[ident] = (rec, ek[2], ek[3], vikt)
+                attrs[start] = (rec, objekt, operator, vikt)
     # aggregera per (datum, objekt, operator), tillämpa fallback, summera P+T per datum
-    agg = defaultdict(lambda: {f: 0 for f in TID_FIELDS})
-    for ident, e in entries.items():
-        _, objekt, operator, _ = attrs[ident]
-        datum = str(e.get('datum') or '')
-        for f in TID_FIELDS:
-            agg[(datum, objekt, operator)][f] += (e.get(f) or 0)
+    agg = defaultdict(lambda: [0, 0, 0])
+    for start, (datum, P, T, E) in entries.items():
+        _, objekt, operator, _ = attrs[start]
+        a = agg[(datum, objekt, operator)]
+        a[0] += P; a[1] += T; a[2] += E
     day_pt = defaultdict(int)
-    for (datum, _o, _op), vals in agg.items():
-        P, T = vals['processing_sek'], vals['terrain_sek']
-        if P == 0 and T == 0 and vals['engine_time_sek'] > 0:
-            P = int(vals['engine_time_sek'] * 0.88)  # samma fallback som importern
+    for (datum, _o, _op), (P, T, E) in agg.items():
+        if P == 0 and T == 0 and E > 0:
+            P = int(E * 0.88)  # samma fallback som importern
         day_pt[datum] += P + T
     return dict(day_pt)
 
 
+def mom_ceilings(maskiner, dayset):
+    """MOM-tak per (maskin, dag) för ALLA maskiner i en svep — SAMMA två-vinnare-
+    semantik som importern efter #115/#119 (HÅLL I SYNK med _keep): identitet
+    (start, maskin); BELOPP från störst-vikt-varianten; ATTRIBUTION (objekt,
+    operator) från högst recency. -> {maskin: {datum: pt_sek}}.
+
+    Ocachade relevanta filer från samtliga maskiner parsas i EN processpool."""
+    from concurrent.futures import ProcessPoolExecutor
+    forsta = min(dayset)
+    caches, relevanta, att_parsa = {}, {}, []
+    for maskin in maskiner:
+        cache = _las_tak_cache(maskin)
+        filer = lista_stanford(os.path.join(konfig.BEHANDLADE, maskin, 'mom'), '.mom')
+        # Städa bort borttagna filer ur cachen
+        namn = {os.path.basename(f) for f in filer}
+        caches[maskin] = {k: v for k, v in cache.items() if k in namn}
+        relevanta[maskin] = []
+        for f in filer:
+            grans = _fil_ovre_grans(f)
+            if grans is not None and grans < forsta:
+                continue
+            relevanta[maskin].append(f)
+            try:
+                st = os.stat(f)
+            except OSError:
+                continue
+            post = caches[maskin].get(os.path.basename(f))
+            if post is None or post['storlek'] != st.st_size or post['mtime'] != st.st_mtime:
+                att_parsa.append((maskin, f, st.st_size, st.st_mtime))
+
+    if att_parsa:
+        with ProcessPoolExecutor(max_workers=min(TAK_PROCESSER, len(att_parsa))) as pool:
+            framtider = [(m, f, size, mt, pool.submit(_fil_bidrag, f, m))
+                         for m, f, size, mt in att_parsa]
+            for maskin, f, size, mt, fut in framtider:
+                try:
+                    rader = fut.result()
+                except Exception:
+                    continue  # parse-fel cachas INTE — kan vara en halvsynkad fil
+                caches[maskin][os.path.basename(f)] = {
+                    'storlek': size, 'mtime': mt, 'recency': _fil_recency(f), 'rader': rader}
+        for maskin in {m for m, *_ in att_parsa}:
+            _spara_tak_cache(maskin, caches[maskin])
+
+    ut = {}
+    for maskin in maskiner:
+        bidrag = []
+        for f in relevanta[maskin]:
+            post = caches[maskin].get(os.path.basename(f))
+            if post is not None:
+                bidrag.append((post['recency'], post['rader']))
+        ut[maskin] = _tak_ur_bidrag(bidrag, dayset)
+    return ut
+
+
+def mom_ceiling(maskin, dayset):
+    """MOM-tak per dag för EN maskin -> {datum: pt_sek}. Se mom_ceilings."""
+    return mom_ceilings([maskin], dayset)[maskin]
+
+
 # ── Fysik-invarianter: strukturerad registry ────────────────────────────────
 # Lägg till en ny invariant genom att skriva en funktion (rows) -> list[str] och
-# registrera den i FYSIK_INVARIANTER. Var och en är READ-ONLY och larmar BARA på
-# ÄKTA fysikbrott — aldrig på kända/ofarliga tomlägen. Där mätartefakter finns
-# (väggklocka vs motoraxel) måste checken ha tolerans, annars falsklarmar den.
+# registrera den i FYSIK_INVARIANTER. rows är rader ur fakt_tid — i full- och
+# inkrementellt läge en dags rader åt gången, i SQL-läge kandidaterna som
+# invariantens RPC returnerat — invarianten måste alltså vara radlokal. Har den
+# en server-side-motsvarighet (gap_inv_<namn>, se migration
+# 20261019_gap_check_invarianter_rpc.sql) anges RPC-namnet som tredje element.
+# Var och en är READ-ONLY och larmar BARA på ÄKTA fysikbrott — aldrig på
+# kända/ofarliga tomlägen. Där mätartefakter finns (väggklocka vs motoraxel)
+# måste checken ha tolerans, annars falsklarmar den.
 
 def _inv_other_work_kategorier(rows):
     """other_work_kategorier = {}  ELLER  SUM(värden) = other_work_sek.
@@ -206,81 +340,252 @@ def _inv_other_work_kategorier(rows):
 #   _inv_skotat_le_avverkat : skotad volym <= avverkad + marginal (fakt_lass-join).
 #   _inv_lassvolym_spann    : volym per lass inom rimligt spann (fakt_lass).
 FYSIK_INVARIANTER = [
-    ('other_work_kategorier', _inv_other_work_kategorier),
+    ('other_work_kategorier', _inv_other_work_kategorier, 'gap_inv_other_work_kategorier'),
 ]
 
 
-def check_invarianter():
-    """Invarianter över HELA fakt_tid (ren DB, ordnad hämtning).
-    -> (larmrader, antal_rader, tomgang_arv_kvar). READ-ONLY."""
-    url_bas = (imp.SUPABASE_URL +
-               '/rest/v1/fakt_tid?select=datum,maskin_id,objekt_id,operator_id,'
-               'processing_sek,terrain_sek,other_work_sek,other_work_kategorier,kort_stopp_sek,'
-               'tomgang_sek,engine_time_sek,bransle_liter'
-               '&order=id&limit=1000&offset=')
-    rows, offset = [], 0
-    while True:
-        chunk = json.load(urllib.request.urlopen(
-            urllib.request.Request(url_bas + str(offset), headers=_hdr()), timeout=120))
-        rows += chunk
-        if len(chunk) < 1000:
-            break
-        offset += 1000
-
-    larm = []
-    # (a) >24h motortid per (maskin, dag)
-    eng_dag = defaultdict(int)
-    for r in rows:
-        eng_dag[(r['maskin_id'], r['datum'])] += r.get('engine_time_sek') or 0
-    for (m, d), s in sorted(eng_dag.items()):
-        if s > MAX_ENGINE_H * 3600:
-            larm.append(f'  LARM  INVARIANT >24h motortid: {m} {d} = {s/3600:.1f} h — dubblering?')
-
-    # (b) dubblett-signaturen (operator-omattributionens fingeravtryck):
-    #     >=2 rader samma (datum, maskin, objekt) med identiska proc/terr/eng/fuel > 0
-    grupper = defaultdict(list)
-    for r in rows:
-        grupper[(r['datum'], r['maskin_id'], r['objekt_id'])].append(r)
-    for (d, m, o), g in sorted(grupper.items()):
-        if len(g) < 2:
-            continue
-        sedd = defaultdict(list)
-        for r in g:
-            fp = (r.get('processing_sek') or 0, r.get('terrain_sek') or 0,
-                  r.get('engine_time_sek') or 0, r.get('bransle_liter') or 0)
-            if sum(fp[:3]) > 0:
-                sedd[fp].append(r.get('operator_id'))
-        for fp, ops in sedd.items():
-            if len(ops) > 1:
-                larm.append(f'  LARM  INVARIANT dubblett-rad: {m} {d} objekt={o} — '
-                            f'{len(ops)} identiska rader ({", ".join(str(x) for x in ops)}), '
-                            f'eng={fp[2]/3600:.2f} h vardera')
-
+def check_invarianter(lage='auto', dagar_bakat=DAYS_BACK):
+    """Invarianter över HELA fakt_tid. READ-ONLY.
+    -> (larmrader, antal_rader, tomgang_arv_kvar).
+
+    lage:
+      'sql'          aggregaten räknas i databasen, bara brotten hämtas
+      'inkrementell' lokalt per-(maskin, datum)-tillstånd; fönstret
+                     (dagar_bakat) och äldre dagar med rader nyare än förra
+                     körningen hämtas om
+      'full'         hela fakt_tid strömmas (gamla beteendet, bygger om tillståndet)
+      'auto'         sql, och inkrementell om RPC:erna saknas (migration ej körd)
+                     eller någon registry-invariant saknar RPC."""
+    if lage in ('auto', 'sql'):
+        saknar_rpc = [post[0] for post in FYSIK_INVARIANTER if len(post) < 3]
+        if saknar_rpc:
+            if lage == 'sql':
+                raise RuntimeError(f'invariant utan RPC: {", ".join(saknar_rpc)}')
+        else:
+            try:
+                return _check_invarianter_sql()
+            except urllib.error.HTTPError as e:
+                if lage == 'sql' or e.code not in (400, 404):
+                    raise
+                # PGRST202 = funktionen finns inte — migrationen ej körd
+    return _check_invarianter_lokalt(full=(lage == 'full'), dagar_bakat=dagar_bakat)
+
+
+def _rpc(namn, args=None):
+    hdr = dict(_hdr())
+    hdr['Content-Type'] = 'application/json'
+    return json.load(urllib.request.urlopen(urllib.request.Request(
+        konfig.SUPABASE_URL + f'/rest/v1/rpc/{namn}',
+        data=json.dumps(args or {}).encode('utf-8'), headers=hdr, method='POST'), timeout=300))
+
+
+def _motortid_larm(m, d, s):
+    return f'  LARM  INVARIANT >24h motortid: {m} {d} = {s/3600:.1f} h — dubblering?'
+
+
+def _dubblett_larm(m, d, o, ops, eng):
+    return (f'  LARM  INVARIANT dubblett-rad: {m} {d} objekt={o} — '
+            f'{len(ops)} identiska rader ({", ".join(str(x) for x in ops)}), '
+            f'eng={eng/3600:.2f} h vardera')
+
+
+def _tomgang_larm(tomgang_arv):
     # (c) tomgångs-konsistens: lagrad tomgang_sek == max(0, eng − (P+T+OW − kort_stopp))?
     #     De kända arv-raderna (före #124) självläker vid omimport — räknaren visar
     #     läkningen. VÄXER antalet skapas nya inkonsistenta rader trots #124 => LARM.
-    tomgang_arv = 0
-    for r in rows:
-        g0 = ((r.get('processing_sek') or 0) + (r.get('terrain_sek') or 0)
-              + (r.get('other_work_sek') or 0) - (r.get('kort_stopp_sek') or 0))
-        forv = max(0, (r.get('engine_time_sek') or 0) - g0)
-        if abs((r.get('tomgang_sek') or 0) - forv) > 1:
-            tomgang_arv += 1
     if tomgang_arv > KANDA_TOMGANG_ARV:
-        larm.append(f'  LARM  INVARIANT tomgång-inkonsistens VÄXER: {tomgang_arv} rader '
-                    f'(känt arv: {KANDA_TOMGANG_ARV}) — skapas NYA trots #124-fixen?')
-
+        return [f'  LARM  INVARIANT tomgång-inkonsistens VÄXER: {tomgang_arv} rader '
+                f'(känt arv: {KANDA_TOMGANG_ARV}) — skapas NYA trots #124-fixen?']
+    return []
+
+
+def _check_invarianter_sql():
+    """Samma fyra kontroller som databasaggregat — bara brotten överförs."""
+    larm = [_motortid_larm(r['maskin_id'], r['datum'], r['engine_sek'] or 0)
+            for r in _rpc('gap_inv_motortid', {'p_max_sek': MAX_ENGINE_H * 3600})]
+    larm += [_dubblett_larm(r['maskin_id'], r['datum'], r['objekt_id'],
+                            r['operatorer'] or [], r['engine_sek'] or 0)
+             for r in _rpc('gap_inv_dubbletter')]
+    t = (_rpc('gap_inv_tomgang') or [{}])[0]
+    n_rows, tomgang_arv = t.get('rader') or 0, t.get('inkonsistenta') or 0
+    larm += _tomgang_larm(tomgang_arv)
+    for _namn, _fn, _rpc_namn in FYSIK_INVARIANTER:
+        larm += _fn(_rpc(_rpc_namn))
+    return larm, n_rows, tomgang_arv
+
+
+# ── Lokalt läge: per-(maskin, datum)-aggregat ───────────────────────────────
+# Tillståndet håller för varje dag det som behövs för att återskapa larmen:
+# motortidssumma, antal inkonsistenta tomgångsrader, färdiga dubblett- och
+# registry-larm. Inkrementellt:
+#   - fönstret (DAYS_BACK / --days) hämtas om i sin helhet varje körning.
+#     Raderingar och ändringar på plats (PATCH, upsert mot befintlig nyckel)
+#     ger inga nya id:n, och det är i fönstret de sker (en dubblett rättad
+#     genom radering ska släppa larmet direkt). Dagar i fönstret som inte
+#     längre har rader tas bort ur tillståndet.
+#   - äldre dagar: rader med id > senaste_id pekar ut BERÖRDA dagar, och de
+#     hämtas om i sin helhet (omimport gör delete+insert => nya id:n).
+# Det som INTE syns är raderingar/ändringar på plats i dagar äldre än fönstret
+# — därför en full skanning var INKR_FULL_DAGAR:e dag.
+INVARIANT_TILLSTAND = os.path.join(konfig.ONEDRIVE_BASE, 'gap_invarianter_tillstand.json')
+INKR_FULL_DAGAR = 28
+_TILLSTAND_VERSION = 1
+
+
+def _aggregera_dagar(sidor):
+    """Sidor av fakt_tid -> ({'maskin|datum': aggregat}, max_id).
+    Raderna släpps sida för sida; kvar blir bara aggregaten."""
+    dagar = {}
+    sedd = defaultdict(list)   # (dagnyckel, objekt, fp) -> [operator]
+    max_id = 0
+    for sida in sidor:
+        per_dag = defaultdict(list)
+        for r in sida:
+            k = f"{r['maskin_id']}|{r['datum']}"
+            d = dagar.setdefault(k, {'rader': 0, 'eng': 0, 'tomgang': 0,
+                                     'dubbletter': [], 'register': []})
+            d['rader'] += 1
+            d['eng'] += r.get('engine_time_sek') or 0
+            fp = (r.get('processing_sek') or 0, r.get('terrain_sek') or 0,
+                  r.get('engine_time_sek') or 0, r.get('bransle_liter') or 0)
+            if sum(fp[:3]) > 0:
+                sedd[(k, r['objekt_id'], fp)].append(r.get('operator_id'))
+            if _tomgang_inkonsistent(r):
+                d['tomgang'] += 1
+            if isinstance(r.get('id'), int) and r['id'] > max_id:
+                max_id = r['id']
+            per_dag[k].append(r)
+        for k, rader in per_dag.items():
+            for post in FYSIK_INVARIANTER:
+                dagar[k]['register'] += post[1](rader)
+    for (k, o, fp), ops in sorted(sedd.items(), key=lambda kv: (kv[0][0], str(kv[0][1]))):
+        if len(ops) > 1:
+            m, d = k.split('|', 1)
+            dagar[k]['dubbletter'].append(_dubblett_larm(m, d, o, ops, fp[2]))
+    return dagar, max_id
+
+
+def _larm_ur_dagar(dagar):
+    larm = []
+    # (a) >24h motortid per (maskin, dag)
+    for k in sorted(dagar):
+        if dagar[k]['eng'] > MAX_ENGINE_H * 3600:
+            m, d = k.split('|', 1)
+            larm.append(_motortid_larm(m, d, dagar[k]['eng']))
+    # (b) dubblett-signaturen (operator-omattributionens fingeravtryck)
+    for k in sorted(dagar):
+        larm += dagar[k]['dubbletter']
+    # (c) tomgång
+    tomgang_arv = sum(d['tomgang'] for d in dagar.values())
+    larm += _tomgang_larm(tomgang_arv)
     # (d) Fysik-invarianter — strukturerad registry (se FYSIK_INVARIANTER ovan).
-    for _namn, _fn in FYSIK_INVARIANTER:
-        larm += _fn(rows)
+    for k in sorted(dagar):
+        larm += dagar[k]['register']
+    return larm, sum(d['rader'] for d in dagar.values()), tomgang_arv
+
 
-    return larm, len(rows), tomgang_arv
+def _las_tillstand():
+    try:
+        with open(INVARIANT_TILLSTAND, encoding='utf-8') as fh:
+            t = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if t.get('version') != _TILLSTAND_VERSION:
+        return None
+    # Ändrad registry => sparade register-larm är inaktuella
+    if t.get('register') != [post[0] for post in FYSIK_INVARIANTER]:
+        return None
+    try:
+        full = datetime.datetime.fromisoformat(t['senaste_full'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if (datetime.datetime.now() - full).days >= INKR_FULL_DAGAR:
+        return None
+    return t
+
+
+def _spara_tillstand(dagar, max_id, senaste_full):
+    tmp = INVARIANT_TILLSTAND + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump({'version': _TILLSTAND_VERSION,
+                   'register': [post[0] for post in FYSIK_INVARIANTER],
+                   'senaste_full': senaste_full, 'senaste_id': max_id,
+                   'dagar': dagar}, fh, ensure_ascii=False)
+    os.replace(tmp, INVARIANT_TILLSTAND)
+
+
+def _check_invarianter_lokalt(full=False, dagar_bakat=DAYS_BACK):
+    t = None if full else _las_tillstand()
+    if t is None:
+        dagar, max_id = _aggregera_dagar(hamta_sidor_tid())
+        _spara_tillstand(dagar, max_id, datetime.datetime.now().isoformat(timespec='seconds'))
+        return _larm_ur_dagar(dagar)
+
+    dagar, senaste_id = t['dagar'], t['senaste_id']
+    lo = min(window_days(dagar_bakat))
+    # 1) Vilka äldre dagar har nya rader sedan förra körningen?
+    berorda = defaultdict(set)   # maskin -> {datum}
+    max_id = senaste_id
+    for sida in hamta_sidor(konfig.SUPABASE_URL, 'fakt_tid', _hdr(),
+                            select='id,maskin_id,datum', fran=senaste_id):
+        for r in sida:
+            if r['datum'] < lo:
+                berorda[r['maskin_id']].add(r['datum'])
+            max_id = max(max_id, r['id'])
+    # 2) Fönstret i sin helhet — ersätter fönstrets dagar, även de som försvunnit
+    fonster, fonster_max = _aggregera_dagar(hamta_sidor_tid({'datum': f'gte.{lo}'}))
+    for k in [k for k in dagar if k.split('|', 1)[1] >= lo]:
+        del dagar[k]
+    dagar.update(fonster)
+    max_id = max(max_id, fonster_max)
+    # 3) Hämta om de berörda äldre dagarna i sin helhet och ersätt deras aggregat
+    for maskin, datumset in sorted(berorda.items()):
+        datumlista = sorted(datumset)
+        for i in range(0, len(datumlista), 50):
+            bit = datumlista[i:i + 50]
+            filt = {'maskin_id': f'eq.{maskin}', 'datum': f'in.({",".join(bit)})'}
+            nya, _ = _aggregera_dagar(hamta_sidor_tid(filt))
+            for d in bit:
+                dagar.pop(f'{maskin}|{d}', None)
+            dagar.update(nya)
+    _spara_tillstand(dagar, max_id, t['senaste_full'])
+    return _larm_ur_dagar(dagar)
+
+
+def _tomgang_inkonsistent(r):
+    g0 = ((r.get('processing_sek') or 0) + (r.get('terrain_sek') or 0)
+          + (r.get('other_work_sek') or 0) - (r.get('kort_stopp_sek') or 0))
+    forv = max(0, (r.get('engine_time_sek') or 0) - g0)
+    return abs((r.get('tomgang_sek') or 0) - forv) > 1
+
+
+_TID_SELECT = ('id,datum,maskin_id,objekt_id,operator_id,'
+               'processing_sek,terrain_sek,other_work_sek,other_work_kategorier,kort_stopp_sek,'
+               'tomgang_sek,engine_time_sek,bransle_liter')
+
+
+def hamta_sidor_tid(filter=None):
+    """fakt_tid sida för sida (keyset på id). Utan filter = hela tabellen,
+    delad i HAMTA_DELAR nyckelintervall som hämtas samtidigt."""
+    if filter is None and HAMTA_DELAR > 1:
+        sida = []
+        for r in hamta_rader_parallellt(konfig.SUPABASE_URL, 'fakt_tid', _hdr(),
+                                        delar=HAMTA_DELAR, select=_TID_SELECT):
+            sida.append(r)
+            if len(sida) >= 1000:
+                yield sida
+                sida = []
+        if sida:
+            yield sida
+        return
+    yield from hamta_sidor(konfig.SUPABASE_URL, 'fakt_tid', _hdr(),
+                           select=_TID_SELECT, filter=filter)
 
 
 def db_day_pt(maskin, dayset):
     """DB: SUM(P+T) per dag ur fakt_tid för maskinen, inom fönstret. READ-ONLY GET."""
     lo, hi = min(dayset), max(dayset)
-    url = (imp.SUPABASE_URL +
+    url = (konfig.SUPABASE_URL +
            f'/rest/v1/fakt_tid?select=datum,processing_sek,terrain_sek'
            f'&maskin_id=eq.{maskin}&datum=gte.{lo}&datum=lte.{hi}')
     out = defaultdict(int)
@@ -359,7 +664,7 @@ def check_import_fel():
         sedan = (datetime.datetime.now(datetime.timezone.utc)
                  - datetime.timedelta(days=8)).isoformat()
         req = urllib.request.Request(
-            imp.SUPABASE_URL + '/rest/v1/import_fel'
+            konfig.SUPABASE_URL + '/rest/v1/import_fel'
             + '?tid=gte.' + sedan.replace('+', '%2B')
             + '&select=tid,tabell,filnamn,felkod,feltext&order=tid.desc&limit=100',
             headers=_hdr())
@@ -386,9 +691,13 @@ def main():
     ap = argparse.ArgumentParser()
     ap.add_argument('--quiet', action='store_true', help='Bara logg, ingen utskrift (schemalagd körning).')
     ap.add_argument('--days', type=int, default=DAYS_BACK, help=f'Fönster i dagar (default {DAYS_BACK}).')
+    ap.add_argument('--invarianter', choices=('auto', 'sql', 'inkrementell', 'full'), default='auto',
+                    help='Var invarianterna räknas (default auto: sql, annars inkrementellt).')
+    import_profil.lagg_till_flagga(ap)
     args = ap.parse_args()
+    import_profil.aktivera(args.profile, 'gap_check')
 
-    imp.init_supabase()
+    klient.init_supabase()
     _ensure_creds()
     dayset = window_days(args.days)
     lo, hi = min(dayset), max(dayset)
@@ -398,7 +707,8 @@ def main():
     L.append(f'    trösklar: |tak − DB| > {ABS_THRESHOLD_H:.2f} h ; motortid/dag > {MAX_ENGINE_H:.0f} h ; info ≥ {int(REL_THRESHOLD*100)} %')
 
     # ── Del 1: invarianter över HELA historiken ──
-    inv_larm, n_rader, tomgang_arv = check_invarianter()
+    with import_profil.profil('gap_check', 'invarianter'):
+        inv_larm, n_rader, tomgang_arv = check_invarianter(args.invarianter, args.days)
     L.append(f'    invarianter: {n_rader} fakt_tid-rader kontrollerade — '
              f'{len(inv_larm) if inv_larm else "inga"} larm')
     L.append(f'    tomgång-arv (före #124, självläker vid omimport): {tomgang_arv} rader kvar'
@@ -407,8 +717,11 @@ def main():
 
     # ── Del 2: MOM-avstämning i fönstret ──
     alarms, infos = list(inv_larm), []
-    for maskin in discover_machines():
-        ceil = mom_ceiling(maskin, dayset)
+    maskiner = discover_machines()
+    with import_profil.profil('gap_check', 'mom_tak'):
+        tak = mom_ceilings(maskiner, dayset)
+    for maskin in maskiner:
+        ceil = tak[maskin]
         db = db_day_pt(maskin, dayset)
         for d in sorted(set(ceil) | set(db)):
             c, v = ceil.get(d, 0), db.get(d, 0)
@@ -483,7 +796,7 @@ def main():
                     'Prefer': 'resolution=merge-duplicates,return=minimal'})
         for rad in statusrader:
             urllib.request.urlopen(urllib.request.Request(
-                imp.SUPABASE_URL + '/rest/v1/meta_datahalsa_status?on_conflict=id',
+                konfig.SUPABASE_URL + '/rest/v1/meta_datahalsa_status?on_conflict=id',
                 data=json.dumps(rad).encode('utf-8'), headers=hdr, method='POST'), timeout=30)
         L_status = f'{len(statusrader)} statusrader skrivna till meta_datahalsa_status'
     except Exception as e:
@@ -0,0 +1,202 @@
+"""gps_forenkling.py — förenkling och kompakt lagring av körspår (TrackCoordinates).
+
+parse_mom_file/parse_hpr_file gör en rad per GPS-punkt. En maskin loggar en
+punkt med några sekunders mellanrum, och eftersom MOM/HPR är KUMULATIVA laddas
+samma spår upp igen vid varje omimport — med maskin_id/objekt_id/filnamn
+upprepade på varje rad. På kartan syns ingen skillnad mellan det och ett spår
+med en tiondel av punkterna.
+
+Steg:
+  1. segmentera     per (maskin, objekt, fil), sorterat på tid, delat vid
+                    glapp > GPS_MAX_GLAPP_S (spåret ska inte "hoppa" över en
+                    flytt eller en natt)
+  2. forenkla       Douglas–Peucker med TIDSSYNKRONISERAT avstånd (SED): en
+                    punkt tas bort bara om den ligger inom tolerans från där
+                    maskinen skulle varit vid samma tidpunkt på den raka
+                    linjen. Bevarar både form OCH fart/stillastående —
+                    vanlig DP skulle slänga en timmes stillastående i en kurva.
+  3. till_segment   (valfritt) en rad per segment med polyline-kodade
+                    koordinater och tider, i stället för en rad per punkt.
+
+Råpunkterna finns kvar i den arkiverade filen (Behandlade/) och kan alltid
+läsas om därifrån.
+
+Ren Python (inga beroenden) — körs i importern per fil, några tusen punkter.
+"""
+import math
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+GPS_TOLERANS_M = 5.0      # max avvikelse förenklat spår ↔ rått (meter, tidssynkroniserat)
+GPS_MAX_GLAPP_S = 600     # längre glapp än så bryter segmentet
+
+_M_PER_GRAD = 111_320.0
+
+
+def _tid(p: dict) -> Optional[datetime]:
+    t = p.get('tidpunkt')
+    if isinstance(t, str):
+        try:
+            return datetime.fromisoformat(t)
+        except ValueError:
+            return None
+    return t
+
+
+def segmentera(punkter: List[dict], max_glapp_s: float = GPS_MAX_GLAPP_S) -> List[List[dict]]:
+    """Dela punkter i segment per (maskin_id, objekt_id, filnamn), tidsordnade,
+    brutna vid glapp. Punkter utan tid behåller filens ordning i ett eget segment."""
+    grupper: Dict[Tuple, List[dict]] = {}
+    for p in punkter:
+        nyckel = (p.get('maskin_id'), p.get('objekt_id'), p.get('filnamn'), _tid(p) is None)
+        grupper.setdefault(nyckel, []).append(p)
+
+    segment = []
+    for (_, _, _, utan_tid), grupp in grupper.items():
+        if utan_tid:
+            segment.append(grupp)
+            continue
+        grupp.sort(key=_tid)
+        aktuellt = [grupp[0]]
+        for foreg, p in zip(grupp, grupp[1:]):
+            if (_tid(p) - _tid(foreg)).total_seconds() > max_glapp_s:
+                segment.append(aktuellt)
+                aktuellt = []
+            aktuellt.append(p)
+        segment.append(aktuellt)
+    return segment
+
+
+def _xy(p: dict, lat0: float) -> Tuple[float, float]:
+    """Lokal plan projektion i meter (segmenten är km-stora — ekvirektangulärt räcker)."""
+    return (p['longitude'] * _M_PER_GRAD * math.cos(math.radians(lat0)),
+            p['latitude'] * _M_PER_GRAD)
+
+
+def forenkla(segment: List[dict], tolerans_m: float = GPS_TOLERANS_M) -> List[dict]:
+    """Douglas–Peucker på ETT segment. Med tider: tidssynkroniserat avstånd
+    (punkten jämförs med den tidsinterpolerade positionen på kordan), annars
+    vanligt vinkelrätt avstånd. Första och sista punkten behålls alltid.
+    Iterativ (ingen rekursion — långa spår spränger inte stacken)."""
+    n = len(segment)
+    if n <= 2 or tolerans_m <= 0:
+        return list(segment)
+    lat0 = segment[0]['latitude']
+    xy = [_xy(p, lat0) for p in segment]
+    tider = [_tid(p) for p in segment]
+    med_tid = all(t is not None for t in tider)
+    if med_tid:
+        t0 = tider[0]
+        ts = [(t - t0).total_seconds() for t in tider]
+
+    behall = [False] * n
+    behall[0] = behall[-1] = True
+    stack = [(0, n - 1)]
+    tol2 = tolerans_m * tolerans_m
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        ax, ay = xy[a]
+        bx, by = xy[b]
+        dx, dy = bx - ax, by - ay
+        langd2 = dx * dx + dy * dy
+        storst, idx = -1.0, -1
+        for i in range(a + 1, b):
+            px, py = xy[i]
+            if med_tid and ts[b] > ts[a]:
+                f = (ts[i] - ts[a]) / (ts[b] - ts[a])
+            elif langd2 > 0:
+                f = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / langd2))
+            else:
+                f = 0.0
+            ex, ey = px - (ax + f * dx), py - (ay + f * dy)
+            d2 = ex * ex + ey * ey
+            if d2 > storst:
+                storst, idx = d2, i
+        if storst > tol2:
+            behall[idx] = True
+            stack.append((a, idx))
+            stack.append((idx, b))
+    return [p for p, k in zip(segment, behall) if k]
+
+
+def forenkla_spar(punkter: List[dict], tolerans_m: float = GPS_TOLERANS_M) -> List[dict]:
+    """Hela filens punkter → förenklade punkter (samma radformat, samma dicts)."""
+    ut = []
+    for seg in segmentera(punkter):
+        ut.extend(forenkla(seg, tolerans_m))
+    return ut
+
+
+# ── Polyline (Googles algoritm, zigzag + 5-bitarsgrupper) ────────────────
+
+def _koda_tal(v: int, ut: List[str]) -> None:
+    v = ~(v << 1) if v < 0 else v << 1
+    while v >= 0x20:
+        ut.append(chr((0x20 | (v & 0x1f)) + 63))
+        v >>= 5
+    ut.append(chr(v + 63))
+
+
+def koda_polyline(rader: List[Tuple[float, ...]], precision: int = 5) -> str:
+    """Delta-koda tupler (t.ex. (lat, lng)) med `precision` decimaler.
+    precision=5 ≈ 1 m — samma som Google/OSRM, läses av @mapbox/polyline."""
+    faktor = 10 ** precision
+    ut: List[str] = []
+    foreg = None
+    for rad in rader:
+        heltal = [int(round(v * faktor)) for v in rad]
+        for i, v in enumerate(heltal):
+            _koda_tal(v - (foreg[i] if foreg else 0), ut)
+        foreg = heltal
+    return ''.join(ut)
+
+
+def avkoda_polyline(s: str, dim: int = 2, precision: int = 5) -> List[Tuple[float, ...]]:
+    faktor = 10 ** precision
+    rader, aktuell, i = [], [0] * dim, 0
+    while i < len(s):
+        for d in range(dim):
+            v, skift = 0, 0
+            while True:
+                b = ord(s[i]) - 63
+                i += 1
+                v |= (b & 0x1f) << skift
+                skift += 5
+                if b < 0x20:
+                    break
+            aktuell[d] += ~(v >> 1) if v & 1 else v >> 1
+        rader.append(tuple(c / faktor for c in aktuell))
+    return rader
+
+
+def till_segment(punkter: List[dict], tolerans_m: float = GPS_TOLERANS_M) -> List[dict]:
+    """Rader för detalj_gps_segment: ett förenklat segment per rad.
+
+    polyline = (lat, lng) med 5 decimaler; tider = sekunder från start_tid,
+    polyline-kodade som 1-dim heltal (tom sträng om punkterna saknar tid)."""
+    rader = []
+    nr_per_fil: Dict[Tuple, int] = {}
+    for seg in segmentera(punkter):
+        enkla = forenkla(seg, tolerans_m)
+        forst = enkla[0]
+        fil_nyckel = (forst.get('maskin_id'), forst.get('filnamn'))
+        nr = nr_per_fil.get(fil_nyckel, 0)
+        nr_per_fil[fil_nyckel] = nr + 1
+        tider = [_tid(p) for p in enkla]
+        har_tid = all(t is not None for t in tider)
+        rader.append({
+            'maskin_id': forst.get('maskin_id'),
+            'objekt_id': forst.get('objekt_id'),
+            'filnamn': forst.get('filnamn'),
+            'segment_nr': nr,
+            'start_tid': tider[0] if har_tid else None,
+            'slut_tid': tider[-1] if har_tid else None,
+            'antal_punkter': len(enkla),
+            'antal_raa': len(seg),
+            'polyline': koda_polyline([(p['latitude'], p['longitude']) for p in enkla]),
+            'tider': koda_polyline([((t - tider[0]).total_seconds(),) for t in tider], 0)
+                     if har_tid else '',
+        })
+    return rader
@@ -19,9 +19,10 @@ import os
 import re
 import sys
 from datetime import datetime, timedelta
-from glob import glob
 from xml.etree import ElementTree as ET
 
+from stanford_arkiv import lista_stanford, open_stanford, stanford_namn
+
 try:
     import requests
 except ImportError:
@@ -68,7 +69,7 @@ def hpr_filer(maskin: str, datum: str) -> list[str]:
     mapp = os.path.join(ONEDRIVE_BASE, "Behandlade", maskin, "HPR")
     if not os.path.isdir(mapp):
         return []
-    return sorted(glob(os.path.join(mapp, f"*{datum}*.hpr")))
+    return [f for f in lista_stanford(mapp, ".hpr") if datum in stanford_namn(f)]
 
 
 def coordinate_dates(hpr_path: str, datum: str) -> list[datetime]:
@@ -79,16 +80,17 @@ def coordinate_dates(hpr_path: str, datum: str) -> list[datetime]:
     träffar: list[datetime] = []
     target = datum  # "2026-04-25"
     try:
-        for _, elem in ET.iterparse(hpr_path, events=("end",)):
-            if elem.tag.endswith("}CoordinateDate") and elem.text and elem.text.startswith(target):
-                try:
-                    träffar.append(datetime.fromisoformat(elem.text))
-                except Exception:
-                    pass
-            # Frigör minne — vi kan inte clear()a allt utan att bryta XML, men
-            # CoordinateDate-element är safe to clear after read
-            if elem.tag.endswith("}TrackCoordinates"):
-                elem.clear()
+        with open_stanford(hpr_path) as fh:
+            for _, elem in ET.iterparse(fh, events=("end",)):
+                if elem.tag.endswith("}CoordinateDate") and elem.text and elem.text.startswith(target):
+                    try:
+                        träffar.append(datetime.fromisoformat(elem.text))
+                    except Exception:
+                        pass
+                # Frigör minne — vi kan inte clear()a allt utan att bryta XML, men
+                # CoordinateDate-element är safe to clear after read
+                if elem.tag.endswith("}TrackCoordinates"):
+                    elem.clear()
     except ET.ParseError as e:
         print(f"  Parse-fel i {os.path.basename(hpr_path)}: {e}")
     return träffar
@@ -20,6 +20,10 @@ except ImportError:
     print("Saknat bibliotek. Kör: py -m pip install requests")
     sys.exit(1)
 
+import import_profil
+from supabase_hamtning import hamta_rader
+from stanford_arkiv import hitta_stanford, open_stanford, originalstorlek, stanford_namn
+
 # ============================================================
 # KONFIGURATION
 # ============================================================
@@ -49,12 +53,17 @@ SUPABASE_URL = os.environ.get("NEXT_PUBLIC_SUPABASE_URL",
 SUPABASE_KEY = (os.environ.get("SUPABASE_SERVICE_ROLE_KEY")            # service-role: kringgår RLS (samma namn som importern + .env.local)
                 or os.environ.get("SUPABASE_SERVICE_KEY")             # legacy-namn (om någon satt det)
                 or os.environ.get("NEXT_PUBLIC_SUPABASE_ANON_KEY", ""))  # sista utväg: anon (RLS blockerar skrivning -> 42501)
+# Lokal stand-in (lokal_postgrest.py) vinner, som i importern — en benchmark
+# får aldrig nå den riktiga databasen.
+if os.environ.get("LOKAL_POSTGREST_URL"):
+    SUPABASE_URL, SUPABASE_KEY = os.environ["LOKAL_POSTGREST_URL"].rstrip('/'), 'lokal'
 
-ONEDRIVE_BASE = r"C:\Users\lindq\Kompersmåla Skog\Maskindata - Dokument\MOM-filer"
+ONEDRIVE_BASE = os.environ.get("MOM_FILER_MAPP") or r"C:\Users\lindq\Kompersmåla Skog\Maskindata - Dokument\MOM-filer"
 BEHANDLADE = os.path.join(ONEDRIVE_BASE, "Behandlade")
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-LOG_FILE = os.path.join(SCRIPT_DIR, "hpr_import_logg.txt")  # repo-mappen, EJ OneDrive (OneDrive-synk gav [Errno 22] på flush)
+LOG_FILE = (os.environ.get("HPR_IMPORT_LOGG")   # benchmark_import: loggen i arbetsmappen, inte i repot
+            or os.path.join(SCRIPT_DIR, "hpr_import_logg.txt"))  # repo-mappen, EJ OneDrive (OneDrive-synk gav [Errno 22] på flush)
 
 # Robust loggning: en logg-hicka (flush mot synkande fil / stängd konsol) får ALDRIG
 # spamma eller stoppa importen. Svälj OSError i emit/flush + stäng av logging-propagering.
@@ -210,10 +219,11 @@ def parse_datetime(dt_str) -> Optional[datetime]:
 
 def parse_hpr_for_import(filepath: str) -> Dict[str, Any]:
     """Parsa HPR-fil och returnera data för hpr_filer + hpr_stammar."""
-    tree = ET.parse(filepath)
+    with open_stanford(filepath) as f:
+        tree = ET.parse(f)
     root = tree.getroot()
     ns = get_namespace(root)
-    filnamn = os.path.basename(filepath)
+    filnamn = stanford_namn(filepath)
 
     result = {
         'filnamn': filnamn,
@@ -387,6 +397,8 @@ def delete_existing_by_nyckel(objekt_nyckel: str) -> int:
         return 0
     fil_ids = [r['id'] for r in resp.json()]
     for fid in fil_ids:
+        requests.delete(f"{SUPABASE_URL}/rest/v1/hpr_stam_kluster?hpr_fil_id=eq.{fid}",
+                        headers=HEADERS, timeout=60)
         requests.delete(f"{SUPABASE_URL}/rest/v1/hpr_stammar?hpr_fil_id=eq.{fid}",
                         headers=HEADERS, timeout=60)
     requests.delete(f"{SUPABASE_URL}/rest/v1/hpr_filer?objekt_nyckel=eq.{q}",
@@ -394,26 +406,15 @@ def delete_existing_by_nyckel(objekt_nyckel: str) -> int:
     return len(fil_ids)
 
 def fetch_existing_filnamn() -> set:
-    """Hämta redan importerade filnamn från hpr_filer."""
-    url = f"{SUPABASE_URL}/rest/v1/hpr_filer?select=filnamn"
+    """Hämta redan importerade filnamn från hpr_filer.
+    Keyset på filnamn (unik — on_conflict=filnamn) i stället för offset."""
     all_names = set()
-    offset = 0
-    page_size = 1000
-    while True:
-        resp = requests.get(
-            f"{url}&offset={offset}&limit={page_size}",
-            headers=HEADERS, timeout=30
-        )
-        if resp.status_code != 200:
-            break
-        rows = resp.json()
-        if not rows:
-            break
-        for r in rows:
+    try:
+        for r in hamta_rader(SUPABASE_URL, 'hpr_filer', HEADERS,
+                             select='filnamn', nyckel='filnamn', timeout=30):
             all_names.add(r['filnamn'])
-        if len(rows) < page_size:
-            break
-        offset += page_size
+    except Exception as e:
+        logger.warning(f"Kunde inte hämta befintliga filnamn: {e}")
     return all_names
 
 def delete_existing_for_objekt(objekt_id: str) -> int:
@@ -428,8 +429,10 @@ def delete_existing_for_objekt(objekt_id: str) -> int:
 
     fil_ids = [r['id'] for r in resp.json()]
 
-    # Radera hpr_stammar per fil (FK-beroende)
+    # Radera hpr_stam_kluster + hpr_stammar per fil (FK-beroende)
     for fid in fil_ids:
+        requests.delete(f"{SUPABASE_URL}/rest/v1/hpr_stam_kluster?hpr_fil_id=eq.{fid}",
+                        headers=HEADERS, timeout=60)
         resp = requests.delete(
             f"{SUPABASE_URL}/rest/v1/hpr_stammar?hpr_fil_id=eq.{fid}",
             headers=HEADERS, timeout=60
@@ -547,8 +550,21 @@ def upload_hpr(parsed: Dict[str, Any], objekt_map: Dict[str, str]) -> bool:
             logger.error(f"  Fel vid insert av stammar batch {i}: {resp.status_code} {resp.text}")
             return False
 
+    rebuild_hpr_stam_kluster(hpr_fil_id)
     return True
 
+
+def rebuild_hpr_stam_kluster(hpr_fil_id: str) -> None:
+    """Bygg om kartans klusterpyramid för filen (samma RPC som huvudimporten).
+    Ej kritiskt — kartan faller tillbaka på hpr_stammar om cellerna saknas."""
+    try:
+        resp = requests.post(f"{SUPABASE_URL}/rest/v1/rpc/rebuild_hpr_stam_kluster",
+                             json={'p_hpr_fil_id': hpr_fil_id}, headers=HEADERS, timeout=60)
+        if resp.status_code not in (200, 201):
+            logger.warning(f"  rebuild_hpr_stam_kluster: {resp.status_code} {resp.text[:200]}")
+    except Exception as e:
+        logger.warning(f"  rebuild_hpr_stam_kluster: {e}")
+
 # ============================================================
 # HUVUDPROGRAM
 # ============================================================
@@ -564,19 +580,14 @@ def _object_key(filename: str) -> str:
 
 
 def find_hpr_files() -> List[str]:
-    """Hitta alla HPR-filer i Behandlade-mappen."""
-    files = []
-    for root, dirs, filenames in os.walk(BEHANDLADE):
-        for f in filenames:
-            if f.upper().endswith('.HPR'):
-                files.append(os.path.join(root, f))
-    files.sort()
-    return files
+    """Hitta alla HPR-filer i Behandlade-mappen (även komprimerade)."""
+    return hitta_stanford(BEHANDLADE, '.hpr')
 
 def main():
     logger.info("=" * 60)
     logger.info("HPR Import — Startar")
     logger.info("=" * 60)
+    import_profil.fran_argv('import_hpr')
 
     # Testa Supabase-anslutning
     try:
@@ -611,19 +622,19 @@ def main():
     # à ~145 MB, var och en full parse + delete + reinsert.)
     groups = defaultdict(list)
     for f in hpr_files:
-        groups[_object_key(os.path.basename(f))].append(f)
+        groups[_object_key(stanford_namn(f))].append(f)
     selected = []
     for key, group in sorted(groups.items()):
-        chosen = max(group, key=os.path.getsize)
+        chosen = max(group, key=originalstorlek)
         selected.append(chosen)
         if len(group) > 1:
-            logger.info(f"  {key}: valde {os.path.basename(chosen)} "
-                        f"({os.path.getsize(chosen) // (1024 * 1024)} MB), "
+            logger.info(f"  {key}: valde {stanford_namn(chosen)} "
+                        f"({originalstorlek(chosen) // (1024 * 1024)} MB), "
                         f"hoppade {len(group) - 1} äldre snapshot(s)")
     logger.info(f"Senaste-per-objekt: {len(selected)} filer (av {len(hpr_files)} totalt, {len(groups)} objekt)")
 
     # Filtrera bort redan importerade (på filnamn)
-    to_import = [f for f in selected if os.path.basename(f) not in existing]
+    to_import = [f for f in selected if stanford_namn(f) not in existing]
     logger.info(f"Att importera: {len(to_import)} nya filer")
 
     if not to_import:
@@ -636,14 +647,17 @@ def main():
     total_stammar = 0
 
     for i, filepath in enumerate(to_import, 1):
-        filnamn = os.path.basename(filepath)
+        filnamn = stanford_namn(filepath)
         logger.info(f"[{i}/{len(to_import)}] {filnamn}")
 
         try:
-            parsed = parse_hpr_for_import(filepath)
+            with import_profil.profil(filnamn, 'parse'):
+                parsed = parse_hpr_for_import(filepath)
             n_stammar = len(parsed['stammar'])
 
-            if upload_hpr(parsed, objekt_map):
+            with import_profil.profil(filnamn, 'upload'):
+                uppladdad = upload_hpr(parsed, objekt_map)
+            if uppladdad:
                 success += 1
                 total_stammar += n_stammar
                 logger.info(f"  ✓ {n_stammar} stammar importerade")
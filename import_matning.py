@@ -0,0 +1,249 @@
+"""import_matning.py — mätning per importerad fil: faser, HTTP-anrop, räknare.
+
+process_file loggade bara "Processar"/"KLAR". En långsam import gick inte att
+härleda: var tiden i XML-parsningen, _keep-omscanningen av Behandlade,
+upsert_dim_objekt:s radvisa anrop, detalj_stock-batcherna,
+rebuild_fakt_sortiment, _create_arbetsdag eller OneDrive-flyttens omförsök?
+
+Importern startar en mätning per fil och avslutar den med EN JSON-rad i loggen:
+
+  IMPORT_MATNING {"filnamn": ..., "status": "OK", "total_s": 4.21,
+                  "faser":    {"parse": {"s": 0.8, "n": 1}, "spara.tid_arkiv": ...},
+                  "http":     {"anrop": 412, "rader": 9120, "bytes_ut": ..., ...},
+                  "tabeller": {"POST fakt_tid": {"anrop": 2, "rader": 840, ...}, ...},
+                  "raknare":  {"arkivfiler_skannade": 49, "flytt_forsok": 1}}
+
+  fas(namn)      tidtagning runt ett block (eller @matt(namn) runt en funktion).
+                 Faser kan ligga i varandra — "spara" innehåller "dim_objekt" —
+                 så summan av faserna är INTE total_s.
+  etapp(namn)    varvtid inne i en fas: avslutar föregående etapp och startar
+                 "<fas>.<namn>". save_*_to_supabase är långa raka funktioner;
+                 en etapp-markör per avsnitt ger uppdelningen utan att allt
+                 behöver dras in ett steg. Fasens slut avslutar sista etappen.
+  rakna(namn)    fria räknare (arkivfiler, flyttförsök).
+  matad()        requests-modulen (laddas vid första anropet) med varje anrop
+                 bokfört per "METOD tabell": anrop, rader (i JSON-kroppen),
+                 bytes ut/in, fel (>= 400 eller undantag) och tid. Tabellen
+                 tas ur /rest/v1/<tabell> resp. /rest/v1/rpc/<namn>.
+
+Utan aktiv mätning (t.ex. när backfill-skript anropar importerns funktioner
+direkt) är allt no-op. Importen är serialiserad — en fil i taget — så det finns
+EN aktiv mätning; batchtrådarna (kor_batcher_parallellt) bokför på den under
+lås. Fas-/etappstacken följer bara tråden som startade mätningen.
+
+Ren Python (inga beroenden).
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+_aktiv: Optional[Dict] = None
+_las = threading.Lock()
+
+
+def starta(filnamn: str) -> Dict:
+    """Starta mätningen för en fil (ersätter en ev. kvarglömd)."""
+    global _aktiv
+    m = {
+        'filnamn': filnamn,
+        'filtyp': None,
+        'maskin_id': None,
+        'status': None,
+        'start': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        '_t0': time.perf_counter(),
+        '_trad': threading.get_ident(),
+        '_stack': [],          # öppna faser: [namn, etapp, etapp_t0]
+        'faser': {},
+        'tabeller': {},
+        'raknare': {},
+    }
+    with _las:
+        _aktiv = m
+    return m
+
+
+def avsluta(status: str) -> Optional[Dict]:
+    """Avsluta aktiv mätning. status gäller om inte notera(status=...) redan
+    satt ett mer precist utfall (hoppad, dubblett). Returnerar JSON-bar dict."""
+    global _aktiv
+    with _las:
+        m, _aktiv = _aktiv, None
+    if m is None:
+        return None
+    total = time.perf_counter() - m['_t0']
+    http = {'anrop': 0, 'rader': 0, 'bytes_ut': 0, 'bytes_in': 0, 'fel': 0, 's': 0.0}
+    for t in m['tabeller'].values():
+        for k in http:
+            http[k] += t[k]
+    return {
+        'filnamn': m['filnamn'],
+        'filtyp': m['filtyp'],
+        'maskin_id': m['maskin_id'],
+        'status': m['status'] or status,
+        'start': m['start'],
+        'total_s': round(total, 3),
+        'faser': {k: {'s': round(v['s'], 3), 'n': v['n']} for k, v in m['faser'].items()},
+        'http': {**http, 's': round(http['s'], 3)},
+        'tabeller': {k: {**v, 's': round(v['s'], 3)}
+                     for k, v in sorted(m['tabeller'].items(), key=lambda kv: -kv[1]['s'])},
+        'raknare': dict(m['raknare']),
+    }
+
+
+def notera(**falt) -> None:
+    """Sätt filtyp/maskin_id/status på aktiv mätning (None-värden ignoreras)."""
+    m = _aktiv
+    if m is None:
+        return
+    for k, v in falt.items():
+        if k in ('filtyp', 'maskin_id', 'status') and v is not None:
+            m[k] = v
+
+
+def rakna(namn: str, n: int = 1) -> None:
+    m = _aktiv
+    if m is None:
+        return
+    with _las:
+        m['raknare'][namn] = m['raknare'].get(namn, 0) + n
+
+
+def _bokfor_fas(m: Dict, namn: str, sekunder: float) -> None:
+    with _las:
+        f = m['faser'].setdefault(namn, {'s': 0.0, 'n': 0})
+        f['s'] += sekunder
+        f['n'] += 1
+
+
+def _stang_etapp(m: Dict, ram: list) -> None:
+    if ram[1] is not None:
+        _bokfor_fas(m, f"{ram[0]}.{ram[1]}", time.perf_counter() - ram[2])
+        ram[1] = None
+
+
+@contextmanager
+def fas(namn: str):
+    """Tidtagning runt ett block. Summeras per namn (s, antal)."""
+    m = _aktiv
+    if m is None:
+        yield
+        return
+    egen = threading.get_ident() == m['_trad']
+    ram = [namn, None, 0.0]
+    if egen:
+        m['_stack'].append(ram)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        if egen:
+            _stang_etapp(m, ram)
+            if m['_stack'] and m['_stack'][-1] is ram:
+                m['_stack'].pop()
+        _bokfor_fas(m, namn, time.perf_counter() - t0)
+
+
+def matt(namn: str):
+    """Dekoratör: hela funktionsanropet som fasen namn."""
+    def dekorera(funk):
+        @functools.wraps(funk)
+        def omslag(*args, **kwargs):
+            with fas(namn):
+                return funk(*args, **kwargs)
+        return omslag
+    return dekorera
+
+
+def etapp(namn: str) -> None:
+    """Varvtid i innersta öppna fasen: stäng föregående etapp, starta namn."""
+    m = _aktiv
+    if m is None or threading.get_ident() != m['_trad'] or not m['_stack']:
+        return
+    ram = m['_stack'][-1]
+    _stang_etapp(m, ram)
+    ram[1], ram[2] = namn, time.perf_counter()
+
+
+# ── HTTP ──────────────────────────────────────────────────────────────────
+
+def _tabell(url: str) -> str:
+    vag = urlsplit(url).path
+    i = vag.find('/rest/v1/')
+    return vag[i + len('/rest/v1/'):] if i >= 0 else vag
+
+
+def _bokfor_http(metod: str, url: str, kwargs: Dict, resp, sekunder: float) -> None:
+    m = _aktiv
+    if m is None:
+        return
+    kropp = kwargs.get('json')
+    rader = len(kropp) if isinstance(kropp, list) else (1 if kropp is not None else 0)
+    bytes_ut = bytes_in = 0
+    if resp is not None:
+        body = resp.request.body if resp.request is not None else None
+        bytes_ut = len(body) if body else 0
+        if not kwargs.get('stream'):
+            bytes_in = len(resp.content or b'')
+    fel = resp is None or resp.status_code >= 400
+    nyckel = f"{metod.upper()} {_tabell(url)}"
+    with _las:
+        t = m['tabeller'].setdefault(
+            nyckel, {'anrop': 0, 'rader': 0, 'bytes_ut': 0, 'bytes_in': 0, 'fel': 0, 's': 0.0})
+        t['anrop'] += 1
+        t['rader'] += rader
+        t['bytes_ut'] += bytes_ut
+        t['bytes_in'] += bytes_in
+        t['fel'] += int(fel)
+        t['s'] += sekunder
+
+
+class _MatadeRequests:
+    """requests-modulen med get/post/patch/put/delete bokförda. Allt annat
+    (exceptions, Session, ...) går rakt igenom till modulen. Utan modul
+    importeras requests vid första användningen."""
+
+    def __init__(self, modul=None):
+        self._modul = modul
+
+    def _requests(self):
+        if self._modul is None:
+            import requests
+            self._modul = requests
+        return self._modul
+
+    def __getattr__(self, namn):
+        return getattr(self._requests(), namn)
+
+    def request(self, metod, url, **kwargs):
+        t0 = time.perf_counter()
+        resp = None
+        try:
+            resp = self._requests().request(metod, url, **kwargs)
+            return resp
+        finally:
+            _bokfor_http(metod, url, kwargs, resp, time.perf_counter() - t0)
+
+    def get(self, url, params=None, **kwargs):
+        return self.request('GET', url, params=params, **kwargs)
+
+    def post(self, url, data=None, json=None, **kwargs):
+        return self.request('POST', url, data=data, json=json, **kwargs)
+
+    def patch(self, url, data=None, **kwargs):
+        return self.request('PATCH', url, data=data, **kwargs)
+
+    def put(self, url, data=None, **kwargs):
+        return self.request('PUT', url, data=data, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+
+def matad(requests_modul=None):
+    """Omslag runt requests-modulen; importern använder det i stället för
+    modulen. Utan argument laddas requests först vid första anropet."""
+    return _MatadeRequests(requests_modul)
@@ -0,0 +1,261 @@
+"""import_profil.py — profilering per fil och fas (cProfile / tracemalloc), vald per körning.
+
+När en viss maskins filer blir långsamma (en Rottne-MOM med syntetiska skift,
+en jätte-HPR) räcker IMPORT_MATNING-raden inte: den säger VILKEN fas som tar
+tiden, inte vilka funktioner i den. I stället för att hacka in cProfile i
+skripten slås profilering på per körning:
+
+  IMPORT_PROFIL=cpu|minne|alla       miljövariabel (ärvs av auto_import_watch:s
+                                     importprocesser), eller
+  --profile[=cpu|minne|alla]         på kommandoraden (utan värde: cpu)
+  IMPORT_PROFIL_MAPP=<mapp>          standard profil_resultat/ i repot (git-ignorerad)
+
+Stöds av importprogrammet (skogsmaskin_import_version_6.py), import_hpr.py,
+gap_check.py, backfill_mom_tider.py och backfill_fakt_tid_mom_tider.py.
+Varje körning får en egen mapp <tid>_<program>/ med, per fil och fas:
+
+  <fil>.<fas>.prof          cProfile-statistik (pstats, snakeviz, ...)   [cpu]
+  <fil>.<fas>.minne.json    tracemalloc: toppallokeringarna under fasen
+                            (nettotillväxt per källrad) och toppminnet  [minne]
+  index.jsonl               en rad per fas: fil, fas, sekunder, filer
+
+  python import_profil.py sammanfatta [körmapp] [--topp 25] [--sortera tottime|cumulative]
+                                      [--fas parse]
+
+summerar en körning (standard: den senaste): tid per fas, långsammaste filerna,
+de hetaste funktionerna över ALLA filer och de källrader som allokerat mest.
+
+Begränsningar: cProfile ser bara tråden som öppnade fasen (batchtrådarna i
+kor_batcher_parallellt och gap_checks processpool syns som väntan);
+tracemalloc ser alla trådar i processen. Faser i faser profileras som den
+yttre. tracemalloc kostar — 'minne' gör importen flera gånger långsammare.
+Utan aktiv profilering är profil() no-op.
+
+Ren Python (inga beroenden).
+"""
+import argparse
+import cProfile
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+LAGEN = ('cpu', 'minne', 'alla')
+STANDARD_MAPP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profil_resultat')
+MINNE_TOPP = 25
+
+logger = logging.getLogger('import_profil')
+
+_korning: Optional[Dict] = None     # {'mapp', 'lage', 'namn': set()}
+_oppen = False                      # en profil() är öppen — inre faser profileras inte
+
+
+def aktivera(lage: Optional[str], program: str, mapp: Optional[str] = None) -> Optional[str]:
+    """Slå på profilering för resten av processen. lage None/'' = av.
+    Returnerar körmappen."""
+    global _korning
+    if not lage:
+        return None
+    if lage not in LAGEN:
+        raise ValueError(f"okänt profileringsläge {lage!r} (välj {', '.join(LAGEN)})")
+    rot = mapp or os.getenv('IMPORT_PROFIL_MAPP') or STANDARD_MAPP
+    korning = os.path.join(rot, f"{datetime.now():%Y%m%d_%H%M%S}_{program}_{os.getpid()}")
+    os.makedirs(korning, exist_ok=True)
+    _korning = {'mapp': korning, 'lage': lage, 'namn': set()}
+    logger.info(f"Profilering ({lage}) → {korning}  "
+                f"(sammanfatta: python import_profil.py sammanfatta \"{korning}\")")
+    return korning
+
+
+def fran_argv(program: str, argv: Optional[List[str]] = None) -> Optional[str]:
+    """För program utan argparse: plocka bort --profile[=läge] ur argv
+    (sys.argv) och aktivera; annars IMPORT_PROFIL från miljön."""
+    argv = sys.argv if argv is None else argv
+    lage = os.getenv('IMPORT_PROFIL') or None
+    for a in list(argv[1:]):
+        if a == '--profile' or a.startswith('--profile='):
+            argv.remove(a)
+            lage = a.partition('=')[2] or 'cpu'
+    return aktivera(lage, program)
+
+
+def lagg_till_flagga(ap: argparse.ArgumentParser) -> None:
+    """--profile för program med argparse; standardvärde från IMPORT_PROFIL."""
+    ap.add_argument('--profile', nargs='?', const='cpu', default=os.getenv('IMPORT_PROFIL') or None,
+                    choices=LAGEN, metavar='LÄGE',
+                    help='profilera per fil/fas: cpu (cProfile, standard), minne (tracemalloc) '
+                         'eller alla — se import_profil.py')
+
+
+def _filnamn(fil: str, fas: str) -> str:
+    """Unikt, filsystemsäkert <fil>.<fas> inom körningen."""
+    bas = re.sub(r'[^\w.-]+', '_', f"{os.path.basename(fil)}.{fas}")
+    namn, n = bas, 1
+    while namn in _korning['namn']:
+        n += 1
+        namn = f"{bas}_{n}"
+    _korning['namn'].add(namn)
+    return namn
+
+
+def _minne_topp(fore, efter) -> List[Dict]:
+    filter_ = [tracemalloc.Filter(False, tracemalloc.__file__),
+               tracemalloc.Filter(False, cProfile.__file__),     # läget 'alla': profilerarens egna
+               tracemalloc.Filter(False, __file__),
+               tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')]
+    diff = efter.filter_traces(filter_).compare_to(fore.filter_traces(filter_), 'lineno')
+    diff = sorted((d for d in diff if d.size_diff > 0), key=lambda d: -d.size_diff)
+    return [{'plats': f"{d.traceback[0].filename}:{d.traceback[0].lineno}",
+             'kb': round(d.size_diff / 1024, 1), 'antal': d.count_diff}
+            for d in diff[:MINNE_TOPP]]
+
+
+@contextmanager
+def profil(fil: str, fas: str):
+    """Profilera blocket som (fil, fas) enligt körningens läge."""
+    global _oppen
+    k = _korning
+    if k is None or _oppen:
+        yield
+        return
+    _oppen = True
+    namn = _filnamn(fil, fas)
+    cpu = k['lage'] in ('cpu', 'alla')
+    minne = k['lage'] in ('minne', 'alla')
+    prof = fore = None
+    if minne:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        fore = tracemalloc.take_snapshot()
+    if cpu:
+        prof = cProfile.Profile()
+        prof.enable()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        sekunder = time.perf_counter() - t0
+        rad = {'fil': os.path.basename(fil), 'fas': fas, 's': round(sekunder, 3)}
+        try:
+            if prof is not None:
+                prof.disable()
+                rad['prof'] = namn + '.prof'
+                prof.dump_stats(os.path.join(k['mapp'], rad['prof']))
+            if fore is not None:
+                topp_kb = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+                rad['minne'] = namn + '.minne.json'
+                with open(os.path.join(k['mapp'], rad['minne']), 'w', encoding='utf-8') as f:
+                    json.dump({'fil': rad['fil'], 'fas': fas, 'toppminne_kb': topp_kb,
+                               'topp': _minne_topp(fore, tracemalloc.take_snapshot())},
+                              f, ensure_ascii=False, indent=1)
+                rad['toppminne_kb'] = topp_kb
+            with open(os.path.join(k['mapp'], 'index.jsonl'), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(rad, ensure_ascii=False) + '\n')
+        except OSError as e:
+            logger.warning(f"Kunde inte skriva profil för {namn}: {e}")
+        finally:
+            _oppen = False
+
+
+# ── Sammanfattning ────────────────────────────────────────────────────────
+
+def _senaste_korning(rot: str) -> Optional[str]:
+    if not os.path.isdir(rot):
+        return None
+    mappar = [os.path.join(rot, m) for m in os.listdir(rot)
+              if os.path.isfile(os.path.join(rot, m, 'index.jsonl'))]
+    return max(mappar, key=os.path.getmtime) if mappar else None
+
+
+def _funktion(nyckel) -> str:
+    fil, rad, namn = nyckel
+    if fil == '~':                      # inbyggd: ('~', 0, "<method 'sort' ...>")
+        return namn
+    return f"{namn}  ({os.path.basename(fil)}:{rad})"
+
+
+def sammanfatta(korning: str, topp: int = 25, sortera: str = 'tottime',
+                fas: Optional[str] = None, ut=None) -> None:
+    """Skriv en sammanfattning av körmappen till ut (stdout)."""
+    ut = ut or sys.stdout
+    with open(os.path.join(korning, 'index.jsonl'), encoding='utf-8') as f:
+        rader = [json.loads(r) for r in f if r.strip()]
+    if fas:
+        rader = [r for r in rader if r['fas'] == fas]
+    print(f"Körning: {korning}", file=ut)
+    print(f"{len(rader)} profilerade faser i {len({r['fil'] for r in rader})} filer\n", file=ut)
+
+    per_fas = defaultdict(list)
+    for r in rader:
+        per_fas[r['fas']].append(r)
+    print(f"{'fas':<24} {'antal':>6} {'summa s':>9} {'max s':>8}  långsammast", file=ut)
+    for namn, rr in sorted(per_fas.items(), key=lambda kv: -sum(r['s'] for r in kv[1])):
+        varst = max(rr, key=lambda r: r['s'])
+        print(f"{namn:<24} {len(rr):>6} {sum(r['s'] for r in rr):>9.2f} {varst['s']:>8.2f}  {varst['fil']}",
+              file=ut)
+
+    print("\nLångsammaste filerna:", file=ut)
+    for r in sorted(rader, key=lambda r: -r['s'])[:min(topp, 10)]:
+        print(f"  {r['s']:8.2f} s  {r['fil']}  [{r['fas']}]", file=ut)
+
+    proffar = [os.path.join(korning, r['prof']) for r in rader if r.get('prof')]
+    if proffar:
+        stats = pstats.Stats(proffar[0], stream=ut)
+        for p in proffar[1:]:
+            stats.add(p)
+        index = 3 if sortera == 'cumulative' else 2     # (cc, nc, tt, ct, callers)
+        hetast = sorted(stats.stats.items(), key=lambda kv: -kv[1][index])[:topp]
+        print(f"\nHetaste funktionerna över {len(proffar)} profiler (sorterat på {sortera}):", file=ut)
+        print(f"{'tottime':>9} {'cumtime':>9} {'anrop':>10}  funktion", file=ut)
+        for nyckel, (cc, nc, tt, ct, _) in hetast:
+            anrop = f"{nc}/{cc}" if nc != cc else str(nc)
+            print(f"{tt:>9.3f} {ct:>9.3f} {anrop:>10}  {_funktion(nyckel)}", file=ut)
+
+    minnen = [os.path.join(korning, r['minne']) for r in rader if r.get('minne')]
+    if minnen:
+        per_plats = defaultdict(lambda: [0.0, 0])
+        toppminne = []
+        for p in minnen:
+            with open(p, encoding='utf-8') as f:
+                m = json.load(f)
+            toppminne.append((m['toppminne_kb'], m['fil'], m['fas']))
+            for a in m['topp']:
+                per_plats[a['plats']][0] += a['kb']
+                per_plats[a['plats']][1] += a['antal']
+        print("\nHögsta toppminne:", file=ut)
+        for kb, fil, f_fas in sorted(toppminne, reverse=True)[:min(topp, 10)]:
+            print(f"  {kb / 1024:8.1f} MB  {fil}  [{f_fas}]", file=ut)
+        print(f"\nStörst nettoallokering per källrad (summa över {len(minnen)} faser):", file=ut)
+        for plats, (kb, antal) in sorted(per_plats.items(), key=lambda kv: -kv[1][0])[:topp]:
+            print(f"  {kb / 1024:8.1f} MB {antal:>9} block  {plats}", file=ut)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description='Profilering per fil och fas — sammanfattning av en körning.')
+    sub = ap.add_subparsers(dest='kommando', required=True)
+    s = sub.add_parser('sammanfatta', help='summera en profileringskörning')
+    s.add_argument('korning', nargs='?', help='körmapp (standard: senaste i IMPORT_PROFIL_MAPP/profil_resultat)')
+    s.add_argument('--topp', type=int, default=25)
+    s.add_argument('--sortera', choices=('tottime', 'cumulative'), default='tottime')
+    s.add_argument('--fas', help='bara denna fas (t.ex. parse)')
+    a = ap.parse_args(argv)
+
+    korning = a.korning or _senaste_korning(os.getenv('IMPORT_PROFIL_MAPP') or STANDARD_MAPP)
+    if not korning or not os.path.isfile(os.path.join(korning, 'index.jsonl')):
+        print(f"Ingen profileringskörning hittades ({korning or 'profil_resultat/ är tom'})", file=sys.stderr)
+        return 1
+    sammanfatta(korning, a.topp, a.sortera, a.fas)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1028 @@
+"""lokal_postgrest.py — lokal PostgREST-ersättare för benchmark och regressionstest.
+
+Varje skrivväg i importern går mot SUPABASE_URL, så den går inte att mäta eller
+köra om utan nätverk och en riktig databas. Den här servern svarar på den
+delmängd av PostgREST som importen och skripten faktiskt använder, backad av
+SQLite (i minnet eller en fil):
+
+  GET/POST/PATCH/DELETE /rest/v1/<tabell>
+    filter   kol=eq|neq|gt|gte|lt|lte.<v>, in.(a,b), is.null|true|false,
+             like/ilike (* = jokertecken), not.<op>
+    läsning  select=a,b,alias:kol (::cast ignoreras), order=kol.asc|desc
+             [.nullsfirst|.nullslast], limit/offset och Range-huvudet
+             (Content-Range i svaret). Högst --max-rader rader per svar,
+             som Supabase (1000).
+    POST     on_conflict=<kol,...> + Prefer: resolution=merge-duplicates |
+             ignore-duplicates (utan on_conflict: primärnyckeln). Krock utan
+             resolution → 409 / 23505, som Postgres. Hela anropet är en
+             transaktion.
+    Prefer   return=representation|minimal, count=exact
+    Accept   application/vnd.pgrst.object+json → ett objekt, annars 406
+    PATCH/DELETE utan filter → 400, som Supabase (safeupdate)
+  POST /rest/v1/rpc/<namn>
+    rebuild_fakt_sortiment    samma härledning som migrationen, i SQLite
+    rebuild_hpr_stam_kluster  samma klusterpyramid som migrationen
+    fakt_lass_satt_hash       sätter innehalls_hash per lassnyckel, som migrationen
+    exec_sql                  no-op
+    övriga                    404 PGRST202, som när migrationen inte körts
+  GET /_stat  anrop, rader, bytes (in = anropens kroppar, ut = svaren) och tid
+              per (metod, tabell); ?nollstall=1 nollar
+
+Schema: tabellerna i supabase/migrations (CREATE TABLE, ALTER TABLE ... ADD
+COLUMN / ADD CONSTRAINT, CREATE UNIQUE INDEX) skapas vid start med nycklar,
+unika index och standardvärden (gen_random_uuid(), now(), konstanter).
+Kärntabellerna (dim_*, fakt_*, detalj_*, meta_importerade_filer) skapades en
+gång i Supabase-UI:t och finns INTE i migrationerna — de skapas när de först
+skrivs, med radernas kolumner och ett uuid-id (som övriga tabeller), och ett on_conflict som
+saknar unikt index får ett. Okända kolumner läggs till i stället för att ge
+fel, och läsning av en tabell som inte finns ger []. Servern mäter alltså
+genomströmning och beteende, den validerar inte schemat.
+
+Störningar (för att se hur importen klarar ett segt eller opålitligt nät):
+  --latens-ms / --latens-spridning-ms  fördröjning per anrop (normalfördelad)
+  --felfrekvens                        andel anrop som får 503 innan något
+                                       skrivs
+Slumpen är seedad (--seed): samma anropsordning ger samma fel.
+
+Kör:
+  python lokal_postgrest.py [--port 54321] [--db :memory:|fil.sqlite]
+  LOKAL_POSTGREST_URL=http://127.0.0.1:54321 python skogsmaskin_import_version_6.py
+
+LOKAL_POSTGREST_URL vinner över .env.local i importern, så en testkörning kan
+aldrig skriva till den riktiga databasen av misstag. starta() kör servern i
+en tråd i samma process (för benchmark).
+
+Ren Python (http.server + sqlite3), inga beroenden.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+MIGRATIONER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'supabase', 'migrations')
+STANDARD_PORT = 54321
+MAX_RADER = 1000          # Supabase max-rows
+
+_HELTAL = {'smallint', 'integer', 'int', 'int2', 'int4', 'int8', 'bigint',
+           'serial', 'bigserial', 'smallserial'}
+_DECIMAL = {'numeric', 'decimal', 'real', 'float', 'float4', 'float8', 'double'}
+# SQLite-affinitet per typklass. bool lagras 0/1, json som text.
+_AFFINITET = {'int': 'INTEGER', 'real': 'REAL', 'bool': 'INTEGER', 'json': 'TEXT', 'text': 'TEXT'}
+_KOLUMNREGLER = ('NOT', 'NULL', 'DEFAULT', 'PRIMARY', 'UNIQUE', 'REFERENCES', 'CHECK',
+                 'GENERATED', 'CONSTRAINT', 'COLLATE')
+_IDENT = re.compile(r'^[^\W\d]\w*$')
+_RESERVERADE = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns'}
+_OPERATORER = {'eq': '=', 'neq': '<>', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<='}
+
+
+class PostgrestFel(Exception):
+    """Fel som ska bli ett PostgREST-formaterat svar."""
+
+    def __init__(self, status: int, kod: str, meddelande: str, detaljer: Optional[str] = None):
+        super().__init__(meddelande)
+        self.status, self.kod, self.detaljer = status, kod, detaljer
+
+    def som_json(self) -> dict:
+        return {'code': self.kod, 'message': str(self), 'details': self.detaljer, 'hint': None}
+
+
+def _integritetsfel(tabell: str, e: sqlite3.IntegrityError) -> PostgrestFel:
+    if 'UNIQUE' in str(e):
+        return PostgrestFel(409, '23505', f'duplicate key value violates unique constraint "{tabell}_unik"', str(e))
+    return PostgrestFel(400, '22P02', f'invalid input for {tabell}', str(e))
+
+
+def _pg_typ(typ: str) -> str:
+    """Postgres-typ → typklass: int / real / bool / json / text."""
+    t = typ.lower().strip()
+    if t.endswith('[]') or t.startswith('json'):
+        return 'json'
+    if t.startswith('bool'):
+        return 'bool'
+    bas = re.split(r'[\s(]', t, 1)[0]
+    if bas in _HELTAL:
+        return 'int'
+    if bas in _DECIMAL:
+        return 'real'
+    return 'text'
+
+
+def _typ_for_varde(v) -> str:
+    if isinstance(v, bool):
+        return 'bool'
+    if isinstance(v, int):
+        return 'int'
+    if isinstance(v, float):
+        return 'real'
+    if isinstance(v, (dict, list)):
+        return 'json'
+    return 'text'
+
+
+def _q(namn: str) -> str:
+    """Citerat SQL-namn. Bara identifierare släpps igenom (namnen kommer från URL:en)."""
+    if not _IDENT.match(namn or ''):
+        raise PostgrestFel(400, 'PGRST100', f'ogiltigt namn: {namn!r}')
+    return f'"{namn}"'
+
+
+def _kol(t: dict, kol: str) -> str:
+    """Kolumn i läsning/filter. En kolumn som inte skrivits än är NULL på
+    alla rader (den läggs till först när något skrivs i den)."""
+    citerad = _q(kol)
+    return citerad if kol in t['kolumner'] else 'NULL'
+
+
+# ── Migrationer → schema ─────────────────────────────────────────────────
+
+def _dela_toppniva(s: str, sep: str = ',') -> List[str]:
+    """Dela på sep utanför parenteser och citat."""
+    delar, djup, citat, start = [], 0, False, 0
+    for i, c in enumerate(s):
+        if c == "'":
+            citat = not citat
+        elif citat:
+            continue
+        elif c == '(':
+            djup += 1
+        elif c == ')':
+            djup -= 1
+        elif c == sep and djup == 0:
+            delar.append(s[start:i])
+            start = i + 1
+    delar.append(s[start:])
+    return [d.strip() for d in delar if d.strip()]
+
+
+def _standardvarde(uttryck: str, typ: str):
+    """DEFAULT-uttryck → ('uuid'|'nu'|'idag'|'varde', värde). None = stöds inte."""
+    u = uttryck.strip()
+    ul = u.lower()
+    if 'gen_random_uuid' in ul or 'uuid_generate' in ul:
+        return ('uuid', None)
+    if 'now()' in ul or 'current_timestamp' in ul:
+        return ('nu', None)
+    if 'current_date' in ul:
+        return ('idag', None)
+    m = re.match(r"^'((?:[^']|'')*)'(?:::[\w\s\[\]]+)?$", u)
+    if m:
+        s = m.group(1).replace("''", "'")
+        if typ == 'json':
+            try:
+                return ('varde', json.loads(s))
+            except ValueError:
+                return None
+        return ('varde', s)
+    if ul in ('true', 'false'):
+        return ('varde', ul == 'true')
+    if re.match(r'^-?\d+$', u):
+        return ('varde', int(u))
+    if re.match(r'^-?\d*\.\d+$', u):
+        return ('varde', float(u))
+    return None
+
+
+def _kolumn(definition: str) -> Optional[dict]:
+    """En kolumndefinition ('namn typ [regler]') → dict, None om det inte går."""
+    m = re.match(r'^"?([^\W\d]\w*)"?\s+(.*)$', definition, re.S)
+    if not m:
+        return None
+    namn, rest = m.group(1), m.group(2)
+    ord_ = rest.split()
+    typ_ord = []
+    for o in ord_:
+        if o.upper().rstrip(',') in _KOLUMNREGLER:
+            break
+        typ_ord.append(o)
+    typ_text = ' '.join(typ_ord)
+    typ = _pg_typ(typ_text)
+    regler = rest[len(typ_text):] if rest.startswith(typ_text) else rest
+    ru = regler.upper()
+    kol = {'namn': namn, 'typ': typ, 'pk': 'PRIMARY KEY' in ru, 'unik': bool(re.search(r'\bUNIQUE\b', ru)),
+           'serie': typ_text.lower().endswith('serial') or 'AS IDENTITY' in ru, 'standard': None}
+    md = re.search(r'\bDEFAULT\s+(.+?)(?=\s+(?:NOT\s+NULL|NULL|PRIMARY|UNIQUE|REFERENCES|CHECK|'
+                   r'CONSTRAINT|GENERATED)\b|$)', regler, re.I | re.S)
+    if md:
+        kol['standard'] = _standardvarde(md.group(1), typ)
+    return kol
+
+
+def _kolumnlista(s: str) -> Tuple[str, ...]:
+    return tuple(c.strip().strip('"') for c in s.split(','))
+
+
+def _rensa_sql(text: str) -> str:
+    text = re.sub(r'\$(\w*)\$.*?\$\1\$', "''", text, flags=re.S)     # funktionskroppar
+    text = re.sub(r'/\*.*?\*/', ' ', text, flags=re.S)
+    return re.sub(r'--[^\n]*', ' ', text)
+
+
+def las_migrationer(katalog: str = MIGRATIONER) -> Dict[str, dict]:
+    """Tabellschema ur migrationerna, i filordning (namnen börjar med datum).
+
+    {tabell: {'kolumner': {namn: typ}, 'pk': (kol,...)|None, 'unika': [(kol,...)],
+              'standard': {kol: spec}, 'serie': kol|None}}
+    Satser som inte känns igen hoppas över — det här är ingen SQL-tolk."""
+    schema: Dict[str, dict] = {}
+    if not os.path.isdir(katalog):
+        return schema
+
+    def tabell(namn: str) -> dict:
+        return schema.setdefault(namn, {'kolumner': {}, 'pk': None, 'unika': [], 'standard': {}, 'serie': None})
+
+    def lagg_till_kolumn(t: dict, kol: dict) -> None:
+        t['kolumner'].setdefault(kol['namn'], kol['typ'])
+        if kol['standard'] is not None:
+            t['standard'][kol['namn']] = kol['standard']
+        if kol['pk']:
+            t['pk'] = (kol['namn'],)
+            if kol['serie'] and kol['typ'] == 'int':
+                t['serie'] = kol['namn']
+        elif kol['unik']:
+            t['unika'].append((kol['namn'],))
+
+    def nyckel(t: dict, typ: str, kolumner: str) -> None:
+        cols = _kolumnlista(kolumner)
+        if typ.upper().startswith('PRIMARY'):
+            t['pk'] = cols
+        elif cols not in t['unika']:
+            t['unika'].append(cols)
+
+    namn_re = r'(?:IF\s+(?:NOT\s+)?EXISTS\s+)?(?:ONLY\s+)?(?:public\.)?"?([^\W\d]\w*)"?'
+    for fil in sorted(f for f in os.listdir(katalog) if f.endswith('.sql')):
+        with open(os.path.join(katalog, fil), encoding='utf-8', errors='replace') as f:
+            text = _rensa_sql(f.read())
+        for sats in text.split(';'):
+            sats = ' '.join(sats.split())
+            m = re.match(r'^CREATE\s+TABLE\s+' + namn_re + r'\s*\((.*)\)[^)]*$', sats, re.I)
+            if m:
+                t = tabell(m.group(1))
+                for del_ in _dela_toppniva(m.group(2)):
+                    mk = re.match(r'^(?:CONSTRAINT\s+\S+\s+)?(PRIMARY\s+KEY|UNIQUE)\s*\(([^)]*)\)', del_, re.I)
+                    if mk:
+                        nyckel(t, mk.group(1), mk.group(2))
+                    elif not re.match(r'^(CONSTRAINT|FOREIGN|CHECK|EXCLUDE|LIKE)\b', del_, re.I):
+                        kol = _kolumn(del_)
+                        if kol:
+                            lagg_till_kolumn(t, kol)
+                continue
+            m = re.match(r'^ALTER\s+TABLE\s+' + namn_re + r'\s+(.*)$', sats, re.I)
+            if m:
+                if m.group(1) not in schema:
+                    continue
+                t = schema[m.group(1)]
+                for del_ in _dela_toppniva(m.group(2)):
+                    mk = re.match(r'^ADD\s+(?:CONSTRAINT\s+\S+\s+)?(PRIMARY\s+KEY|UNIQUE)\s*\(([^)]*)\)', del_, re.I)
+                    if mk:
+                        nyckel(t, mk.group(1), mk.group(2))
+                        continue
+                    mk = re.match(r'^ADD\s+(?:COLUMN\s+)?(?:IF\s+NOT\s+EXISTS\s+)?(.*)$', del_, re.I)
+                    if mk and not re.match(r'^(CONSTRAINT|FOREIGN|CHECK)\b', mk.group(1), re.I):
+                        kol = _kolumn(mk.group(1))
+                        if kol:
+                            lagg_till_kolumn(t, kol)
+                continue
+            m = re.match(r'^CREATE\s+UNIQUE\s+INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?\S+\s+ON\s+'
+                         + namn_re + r'\s*(?:USING\s+\w+\s*)?\(([\w\s,"]+)\)\s*$', sats, re.I)
+            if m and m.group(1) in schema:
+                nyckel(schema[m.group(1)], 'UNIQUE', m.group(2))
+                continue
+            m = re.match(r'^DROP\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:public\.)?"?(\w+)"?', sats, re.I)
+            if m:
+                schema.pop(m.group(1), None)
+    return schema
+
+
+# ── Databasen ────────────────────────────────────────────────────────────
+
+class LokalDatabas:
+    """SQLite bakom ett lås, plus typinformation per kolumn (SQLite har ingen
+    bool/json, och PostgREST-svaren ska se ut som Postgres)."""
+
+    def __init__(self, db: str = ':memory:', migrationer: Optional[str] = MIGRATIONER,
+                 max_rader: int = MAX_RADER):
+        self.con = sqlite3.connect(db, check_same_thread=False, isolation_level=None)
+        self.con.execute('PRAGMA journal_mode=WAL' if db != ':memory:' else 'PRAGMA journal_mode=MEMORY')
+        self.con.execute('PRAGMA synchronous=OFF')
+        self.lock = threading.Lock()
+        self.max_rader = max_rader
+        self.schema: Dict[str, dict] = {}
+        if migrationer:
+            for namn, t in las_migrationer(migrationer).items():
+                self._skapa(namn, t)
+
+    # Schema
+
+    def _skapa(self, namn: str, t: dict) -> None:
+        kolumner = dict(t['kolumner'])
+        if t['pk'] and not all(k in kolumner for k in t['pk']):
+            t['pk'] = None
+        if not kolumner:
+            return
+        defs = []
+        for k, typ in kolumner.items():
+            if t['serie'] == k:
+                defs.append(f'{_q(k)} INTEGER PRIMARY KEY AUTOINCREMENT')
+            else:
+                defs.append(f'{_q(k)} {_AFFINITET[typ]}')
+        self.con.execute(f'CREATE TABLE IF NOT EXISTS {_q(namn)} ({", ".join(defs)})')
+        self.schema[namn] = {'kolumner': kolumner, 'pk': t['pk'], 'unika': [],
+                             'standard': dict(t['standard']), 'serie': t['serie']}
+        for cols in ([t['pk']] if t['pk'] and not t['serie'] else []) + list(t['unika']):
+            if all(k in kolumner for k in cols):
+                self._unikt_index(namn, cols)
+
+    def _unikt_index(self, tabell: str, cols: Tuple[str, ...]) -> None:
+        t = self.schema[tabell]
+        if cols in t['unika'] or (t['serie'] and cols == (t['serie'],)):
+            return
+        index = f'{tabell}__{"_".join(cols)}__unik'
+        try:
+            self.con.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {_q(index)} ON {_q(tabell)} '
+                             f'({", ".join(_q(c) for c in cols)})')
+        except sqlite3.IntegrityError as e:
+            raise PostgrestFel(400, '42P10', 'there is no unique or exclusion constraint matching '
+                               'the ON CONFLICT specification', str(e))
+        t['unika'].append(cols)
+
+    def _sakerstall(self, tabell: str, rader: List[dict]) -> dict:
+        """Skapa tabell/kolumner som raderna kräver men schemat saknar."""
+        _q(tabell)
+        if tabell not in self.schema:
+            self._skapa(tabell, {'kolumner': {'id': 'text'}, 'pk': ('id',), 'unika': [],
+                                 'standard': {'id': ('uuid', None)}, 'serie': None})
+        t = self.schema[tabell]
+        for rad in rader:
+            for k, v in rad.items():
+                if k not in t['kolumner'] and v is not None:
+                    typ = _typ_for_varde(v)
+                    self.con.execute(f'ALTER TABLE {_q(tabell)} ADD COLUMN {_q(k)} {_AFFINITET[typ]}')
+                    t['kolumner'][k] = typ
+        for rad in rader:
+            for k in rad:
+                if k not in t['kolumner']:          # bara None-värden hittills
+                    self.con.execute(f'ALTER TABLE {_q(tabell)} ADD COLUMN {_q(k)} TEXT')
+                    t['kolumner'][k] = 'text'
+        return t
+
+    # Värden
+
+    @staticmethod
+    def _koda(v, typ: str):
+        if v is None:
+            return None
+        if typ == 'json':
+            return json.dumps(v, ensure_ascii=False)
+        if isinstance(v, bool):
+            return int(v) if typ in ('bool', 'int', 'real') else ('true' if v else 'false')
+        if typ == 'bool' and isinstance(v, str):
+            return 1 if v.lower() in ('true', 't', '1') else 0
+        if isinstance(v, (dict, list)):
+            return json.dumps(v, ensure_ascii=False)
+        return v
+
+    @staticmethod
+    def _avkoda(v, typ: str):
+        if v is None:
+            return None
+        if typ == 'bool':
+            return bool(v)
+        if typ == 'json' and isinstance(v, str):
+            try:
+                return json.loads(v)
+            except ValueError:
+                return v
+        return v
+
+    def _standard(self, spec):
+        slag, varde = spec
+        if slag == 'uuid':
+            return str(uuid.uuid4())
+        if slag == 'nu':
+            return datetime.now(timezone.utc).isoformat()
+        if slag == 'idag':
+            return datetime.now(timezone.utc).date().isoformat()
+        return varde
+
+    def _rad_ut(self, t: dict, namn: List[str], rad: tuple) -> dict:
+        return {k: self._avkoda(v, t['kolumner'].get(k, 'text')) for k, v in zip(namn, rad)}
+
+    # Filter
+
+    def _villkor(self, t: dict, filter_: List[Tuple[str, str]]) -> Tuple[str, list]:
+        delar, params = [], []
+        for kol, uttryck in filter_:
+            if kol in ('or', 'and'):
+                raise PostgrestFel(400, 'PGRST100', f'{kol}=(...) stöds inte av lokal_postgrest')
+            typ = t['kolumner'].get(kol, 'text')
+            kol_sql = _kol(t, kol)
+            inte = uttryck.startswith('not.')
+            if inte:
+                uttryck = uttryck[4:]
+            op, _, v = uttryck.partition('.')
+            if op == 'is':
+                sql = {'null': f'{kol_sql} IS NULL', 'true': f'{kol_sql} = 1',
+                       'false': f'{kol_sql} = 0'}.get(v.lower())
+                if not sql:
+                    raise PostgrestFel(400, 'PGRST100', f'ogiltigt is-värde: {v}')
+            elif op == 'in':
+                varden = self._in_lista(v)
+                if not varden:
+                    sql = '0'
+                else:
+                    sql = f'{kol_sql} IN ({", ".join("?" * len(varden))})'
+                    params.extend(self._koda(x, typ) for x in varden)
+            elif op in _OPERATORER:
+                sql = f'{kol_sql} {_OPERATORER[op]} ?'
+                params.append(self._koda(v, typ))
+            elif op == 'like':
+                sql = f'{kol_sql} GLOB ?'
+                params.append(v.replace('%', '*'))
+            elif op == 'ilike':
+                sql = f'{kol_sql} LIKE ?'
+                params.append(v.replace('*', '%'))
+            else:
+                raise PostgrestFel(400, 'PGRST100', f'operatorn {op!r} stöds inte av lokal_postgrest')
+            delar.append(f'NOT ({sql})' if inte else sql)
+        return (' WHERE ' + ' AND '.join(delar)) if delar else '', params
+
+    @staticmethod
+    def _in_lista(v: str) -> List[str]:
+        if not (v.startswith('(') and v.endswith(')')):
+            raise PostgrestFel(400, 'PGRST100', f'ogiltig in-lista: {v}')
+        ut, aktuell, citat = [], '', False
+        for c in v[1:-1]:
+            if c == '"':
+                citat = not citat
+            elif c == ',' and not citat:
+                ut.append(aktuell)
+                aktuell = ''
+            else:
+                aktuell += c
+        if aktuell or ut:
+            ut.append(aktuell)
+        return ut
+
+    def _select(self, t: dict, select: Optional[str]) -> Tuple[str, Dict[str, str]]:
+        """select= → (SQL-kolumnlista, {svarsnamn: typ})."""
+        if not select or select.strip() == '*':
+            return ', '.join(_q(k) for k in t['kolumner']), dict(t['kolumner'])
+        delar, namn = [], {}
+        for del_ in _dela_toppniva(select):
+            if '(' in del_:
+                raise PostgrestFel(400, 'PGRST100', f'inbäddning stöds inte av lokal_postgrest: {del_}')
+            alias, _, kol = del_.rpartition(':') if ':' in del_.split('::')[0] else ('', '', del_)
+            kol = kol.split('::')[0].strip()
+            if kol == '*':
+                delar.extend(_q(k) for k in t['kolumner'])
+                namn.update(t['kolumner'])
+                continue
+            delar.append(f'{_kol(t, kol)} AS {_q(alias or kol)}')
+            namn[alias or kol] = t['kolumner'].get(kol, 'text')
+        return ', '.join(delar), namn
+
+    @staticmethod
+    def _order(t: dict, order: Optional[str]) -> str:
+        if not order:
+            return ''
+        delar = []
+        for del_ in order.split(','):
+            kol, *modifierare = del_.strip().split('.')
+            if kol not in t['kolumner']:
+                continue
+            riktning = 'DESC' if 'desc' in modifierare else 'ASC'
+            nulls = 'NULLS FIRST' if 'nullsfirst' in modifierare else \
+                    'NULLS LAST' if 'nullslast' in modifierare or riktning == 'ASC' else 'NULLS FIRST'
+            delar.append(f'{_q(kol)} {riktning} {nulls}')
+        return (' ORDER BY ' + ', '.join(delar)) if delar else ''
+
+    # Verb
+
+    def hamta(self, tabell: str, params: List[Tuple[str, str]], spann: Optional[Tuple[int, Optional[int]]],
+            rakna: bool) -> Tuple[List[dict], int, Optional[int]]:
+        """GET → (rader, första radens index, totalt antal om rakna)."""
+        _q(tabell)
+        p = dict(params)
+        filter_ = [(k, v) for k, v in params if k not in _RESERVERADE]
+        with self.lock:
+            t = self.schema.get(tabell)
+            if t is None:
+                return [], 0, 0 if rakna else None
+            kolumner, namn = self._select(t, p.get('select'))
+            where, args = self._villkor(t, filter_)
+            offset = int(p.get('offset', 0) or 0)
+            limit = int(p['limit']) if p.get('limit') else None
+            if spann:
+                offset += spann[0]
+                if spann[1] is not None:
+                    n = spann[1] - spann[0] + 1
+                    limit = n if limit is None else min(limit, n)
+            if self.max_rader:
+                limit = self.max_rader if limit is None else min(limit, self.max_rader)
+            sql = f'SELECT {kolumner} FROM {_q(tabell)}{where}{self._order(t, p.get("order"))}'
+            sql += f' LIMIT {limit if limit is not None else -1} OFFSET {offset}'
+            svar = {'kolumner': namn}
+            rader = [self._rad_ut(svar, list(namn), r) for r in self.con.execute(sql, args)]
+            totalt = self.con.execute(f'SELECT COUNT(*) FROM {_q(tabell)}{where}', args).fetchone()[0] \
+                if rakna else None
+        return rader, offset, totalt
+
+    def skriv(self, tabell: str, rader: List[dict], on_conflict: Optional[str],
+              resolution: Optional[str], representation: bool) -> List[dict]:
+        """POST (insert/upsert). Hela anropet i en transaktion, som PostgREST."""
+        if not rader:
+            return []
+        with self.lock:
+            self.con.execute('BEGIN')
+            try:
+                ut = self._skriv(tabell, rader, on_conflict, resolution, representation)
+                self.con.execute('COMMIT')
+                return ut
+            except Exception:
+                self.con.execute('ROLLBACK')
+                t = self.schema.get(tabell)
+                if t is not None:               # DDL rullas tillbaka med transaktionen
+                    self._synka_schema(tabell)
+                raise
+
+    def _synka_schema(self, tabell: str) -> None:
+        finns = {r[1] for r in self.con.execute(f'PRAGMA table_info({_q(tabell)})')}
+        if not finns:
+            del self.schema[tabell]
+            return
+        t = self.schema[tabell]
+        t['kolumner'] = {k: v for k, v in t['kolumner'].items() if k in finns}
+        index = {r[1] for r in self.con.execute(f'PRAGMA index_list({_q(tabell)})')}
+        t['unika'] = [c for c in t['unika'] if f'{tabell}__{"_".join(c)}__unik' in index]
+
+    def _skriv(self, tabell, rader, on_conflict, resolution, representation) -> List[dict]:
+        t = self._sakerstall(tabell, rader)
+        kolumner: List[str] = []
+        for rad in rader:
+            for k in rad:
+                if k not in kolumner:
+                    kolumner.append(k)
+        # Saknade kolumner får standardvärdet (i Python — SQLite kan inte gen_random_uuid())
+        standard = [k for k in t['standard'] if k not in kolumner]
+        alla = kolumner + standard
+        mal = None
+        if on_conflict:
+            mal = _kolumnlista(on_conflict)
+            for k in mal:
+                if k not in t['kolumner']:
+                    raise PostgrestFel(400, '42703', f'column {k} does not exist')
+        elif resolution:
+            mal = t['pk'] or None
+        sql = f'INSERT INTO {_q(tabell)} ({", ".join(_q(k) for k in alla)}) VALUES ({", ".join("?" * len(alla))})'
+        if mal and resolution:
+            self._unikt_index(tabell, mal)
+            uppdatera = [k for k in kolumner if k not in mal]
+            if resolution == 'merge-duplicates' and uppdatera:
+                sql += f' ON CONFLICT ({", ".join(_q(k) for k in mal)}) DO UPDATE SET ' + \
+                       ', '.join(f'{_q(k)} = excluded.{_q(k)}' for k in uppdatera)
+            else:
+                sql += f' ON CONFLICT ({", ".join(_q(k) for k in mal)}) DO NOTHING'
+        typer = [t['kolumner'][k] for k in alla]
+        varden = [[self._koda(rad.get(k), typ) for k, typ in zip(kolumner, typer)]
+                  + [self._koda(self._standard(t['standard'][k]), t['kolumner'][k]) for k in standard]
+                  for rad in rader]
+        try:
+            if not representation:
+                self.con.executemany(sql, varden)
+                return []
+            sql += ' RETURNING *'
+            ut = []
+            for v in varden:
+                cur = self.con.execute(sql, v)
+                namn = [d[0] for d in cur.description]
+                ut.extend(self._rad_ut(t, namn, r) for r in cur.fetchall())
+            return ut
+        except sqlite3.IntegrityError as e:
+            raise _integritetsfel(tabell, e)
+
+    def uppdatera(self, tabell: str, andring: dict, params: List[Tuple[str, str]],
+                  representation: bool) -> List[dict]:
+        filter_ = [(k, v) for k, v in params if k not in _RESERVERADE]
+        if not filter_:
+            raise PostgrestFel(400, '21000', 'UPDATE requires a WHERE clause')
+        with self.lock:
+            if tabell not in self.schema or not andring:
+                return []
+            self.con.execute('BEGIN')
+            try:
+                t = self._sakerstall(tabell, [andring])
+                where, args = self._villkor(t, filter_)
+                satt = ', '.join(f'{_q(k)} = ?' for k in andring)
+                varden = [self._koda(v, t['kolumner'][k]) for k, v in andring.items()]
+                cur = self.con.execute(f'UPDATE {_q(tabell)} SET {satt}{where} RETURNING *', varden + args)
+                namn = [d[0] for d in cur.description]
+                ut = [self._rad_ut(t, namn, r) for r in cur.fetchall()]
+                self.con.execute('COMMIT')
+            except sqlite3.IntegrityError as e:
+                self.con.execute('ROLLBACK')
+                raise _integritetsfel(tabell, e)
+            except Exception:
+                self.con.execute('ROLLBACK')
+                raise
+        return ut if representation else []
+
+    def radera(self, tabell: str, params: List[Tuple[str, str]], representation: bool) -> List[dict]:
+        filter_ = [(k, v) for k, v in params if k not in _RESERVERADE]
+        if not filter_:
+            raise PostgrestFel(400, '21000', 'DELETE requires a WHERE clause')
+        with self.lock:
+            t = self.schema.get(tabell)
+            if t is None:
+                return []
+            where, args = self._villkor(t, filter_)
+            cur = self.con.execute(f'DELETE FROM {_q(tabell)}{where} RETURNING *', args)
+            namn = [d[0] for d in cur.description]
+            ut = [self._rad_ut(t, namn, r) for r in cur.fetchall()]
+        return ut if representation else []
+
+    # RPC
+
+    def rpc(self, namn: str, arg: dict):
+        funktion = RPC.get(namn)
+        if funktion is None:
+            raise PostgrestFel(404, 'PGRST202', f'Could not find the function public.{namn} in the schema cache')
+        with self.lock:
+            self.con.execute('BEGIN')
+            try:
+                ut = funktion(self, arg)
+                self.con.execute('COMMIT')
+                return ut
+            except Exception:
+                self.con.execute('ROLLBACK')
+                raise
+
+
+def _rpc_exec_sql(db: LokalDatabas, arg: dict):
+    """exec_sql kör godtycklig SQL i Postgres — här en no-op."""
+    return None
+
+
+def _rpc_rebuild_fakt_sortiment(db: LokalDatabas, arg: dict) -> dict:
+    """Samma härledning som 20260822_rebuild_fakt_sortiment.sql: detalj_stock ⋈
+    detalj_stam per (dag, maskin, objekt, sortiment). Tom härledning → 'hoppad'
+    och befintliga rader lämnas orörda."""
+    maskin, objekt = arg.get('p_maskin_id'), arg.get('p_objekt_id')
+    harledd = []
+    stock, stam = db.schema.get('detalj_stock'), db.schema.get('detalj_stam')
+    if stock and stam and {'stem_key', 'log_key', 'sortiment_id', 'volym_m3sob', 'volym_m3sub'} <= set(stock['kolumner']) \
+            and {'stam_key', 'tidpunkt'} <= set(stam['kolumner']):
+        harledd = db.con.execute(
+            """SELECT substr(sm.tidpunkt, 1, 10), st.maskin_id, st.objekt_id, st.sortiment_id,
+                      COUNT(*), SUM(st.volym_m3sob), SUM(st.volym_m3sub)
+               FROM detalj_stock st
+               JOIN detalj_stam sm ON sm.maskin_id = st.maskin_id AND sm.stam_key = st.stem_key
+                                  AND sm.objekt_id = st.objekt_id
+               WHERE st.maskin_id = ? AND st.objekt_id = ? AND st.stem_key IS NOT NULL
+                 AND st.log_key IS NOT NULL AND sm.tidpunkt IS NOT NULL
+               GROUP BY 1, 2, 3, 4""", (maskin, objekt)).fetchall()
+    if not harledd:
+        return {'status': 'hoppad', 'orsak': 'ingen stock med stam_key/log_key/tidpunkt'}
+    rader = [{'datum': r[0], 'maskin_id': r[1], 'objekt_id': r[2], 'sortiment_id': r[3], 'antal_stockar': r[4],
+              'volym_m3sob': r[5], 'volym_m3sub': r[6], 'filnamn': None} for r in harledd]
+    t = db._sakerstall('fakt_sortiment', rader)
+    fore = db.con.execute('SELECT COUNT(*), COALESCE(SUM(volym_m3sub), 0) FROM fakt_sortiment '
+                          'WHERE maskin_id = ? AND objekt_id = ?', (maskin, objekt)).fetchone()
+    db.con.execute('DELETE FROM fakt_sortiment WHERE maskin_id = ? AND objekt_id = ?', (maskin, objekt))
+    kolumner = list(rader[0])
+    standard = [k for k in t['standard'] if k not in kolumner]
+    db.con.executemany(
+        f'INSERT INTO fakt_sortiment ({", ".join(_q(k) for k in kolumner + standard)}) '
+        f'VALUES ({", ".join("?" * (len(kolumner) + len(standard)))})',
+        [[r[k] for k in kolumner] + [db._standard(t['standard'][k]) for k in standard] for r in rader])
+    return {'status': 'ombyggd', 'rader_fore': fore[0], 'rader_efter': len(rader),
+            'volym_fore': fore[1], 'volym_efter': sum(r['volym_m3sub'] or 0 for r in rader)}
+
+
+def _rpc_rebuild_hpr_stam_kluster(db: LokalDatabas, arg: dict) -> int:
+    """Samma pyramid som 20261022_hpr_stam_kluster.sql, beräknad i Python."""
+    fil_id = arg.get('p_hpr_fil_id')
+    min_zoom, max_zoom = int(arg.get('p_min_zoom', 19)), int(arg.get('p_max_zoom', 19))
+    if 'hpr_stam_kluster' in db.schema:
+        db.con.execute('DELETE FROM hpr_stam_kluster WHERE hpr_fil_id = ?', (fil_id,))
+    stammar = db.schema.get('hpr_stammar')
+    if not stammar or not {'lat', 'lng'} <= set(stammar['kolumner']):
+        return 0
+    vald = [k if k in stammar['kolumner'] else 'NULL' for k in ('total_volym', 'dbh', 'tradslag')]
+    celler: Dict[Tuple[int, int, int], dict] = {}
+    for lat, lng, volym, dbh, tradslag in db.con.execute(
+            f'SELECT lat, lng, {", ".join(vald)} FROM hpr_stammar '
+            f'WHERE hpr_fil_id = ? AND lat IS NOT NULL AND lng IS NOT NULL', (fil_id,)):
+        mx = (lng + 180.0) / 360.0
+        my = (1.0 - math.log(math.tan(math.radians(lat)) + 1.0 / math.cos(math.radians(lat))) / math.pi) / 2.0
+        for zoom in range(min_zoom, max_zoom + 1):
+            n = 2 ** (zoom + 2)
+            c = celler.setdefault((zoom, math.floor(mx * n), math.floor(my * n)),
+                                  {'antal': 0, 'volym': None, 'dbh': [], 'lat': 0.0, 'lng': 0.0, 'tradslag': {}})
+            c['antal'] += 1
+            if volym is not None:
+                c['volym'] = (c['volym'] or 0) + volym
+            if dbh is not None:
+                c['dbh'].append(dbh)
+            c['lat'] += lat
+            c['lng'] += lng
+            c['tradslag'][tradslag or '?'] = c['tradslag'].get(tradslag or '?', 0) + 1
+    rader = [{'hpr_fil_id': fil_id, 'zoom': z, 'cx': cx, 'cy': cy, 'antal': c['antal'], 'volym': c['volym'],
+              'dbh_medel': sum(c['dbh']) / len(c['dbh']) if c['dbh'] else None,
+              'lat': c['lat'] / c['antal'], 'lng': c['lng'] / c['antal'], 'tradslag': c['tradslag']}
+             for (z, cx, cy), c in celler.items()]
+    if rader:
+        t = db._sakerstall('hpr_stam_kluster', rader)
+        kolumner = list(rader[0])
+        db.con.executemany(
+            f'INSERT INTO hpr_stam_kluster ({", ".join(_q(k) for k in kolumner)}) '
+            f'VALUES ({", ".join("?" * len(kolumner))})',
+            [[db._koda(r[k], t['kolumner'][k]) for k in kolumner] for r in rader])
+    return len(rader)
+
+
+def _rpc_fakt_lass_satt_hash(db: LokalDatabas, arg: dict) -> int:
+    """Samma UPDATE som 20261025_fakt_lass_innehalls_hash.sql."""
+    t = db.schema.get('fakt_lass')
+    if not t or 'innehalls_hash' not in t['kolumner']:
+        return 0
+    n = 0
+    for r in arg.get('p_rader') or []:
+        n += db.con.execute(
+            'UPDATE fakt_lass SET innehalls_hash = ? WHERE maskin_id = ? AND objekt_id = ? '
+            'AND lass_nummer = ? AND datum = ?',
+            [db._koda(r.get(k), t['kolumner'][k]) for k in
+             ('innehalls_hash', 'maskin_id', 'objekt_id', 'lass_nummer', 'datum')]).rowcount
+    return n
+
+
+RPC = {
+    'exec_sql': _rpc_exec_sql,
+    'rebuild_fakt_sortiment': _rpc_rebuild_fakt_sortiment,
+    'rebuild_hpr_stam_kluster': _rpc_rebuild_hpr_stam_kluster,
+    'fakt_lass_satt_hash': _rpc_fakt_lass_satt_hash,
+}
+
+
+# ── HTTP ─────────────────────────────────────────────────────────────────
+
+class _Statistik:
+    def __init__(self):
+        self.las = threading.Lock()
+        self.nollstall()
+
+    def nollstall(self) -> None:
+        with self.las:
+            self.start = time.time()
+            self.per_nyckel: Dict[str, dict] = {}
+
+    def registrera(self, nyckel: str, rader: int, bytes_in: int, bytes_ut: int, sekunder: float,
+                   status: int, latens: float) -> None:
+        with self.las:
+            s = self.per_nyckel.setdefault(nyckel, {'anrop': 0, 'rader': 0, 'bytes_in': 0, 'bytes_ut': 0,
+                                                   'sekunder': 0.0, 'fel': 0, 'injicerad_latens_s': 0.0})
+            s['anrop'] += 1
+            s['rader'] += rader
+            s['bytes_in'] += bytes_in
+            s['bytes_ut'] += bytes_ut
+            s['sekunder'] += sekunder
+            s['injicerad_latens_s'] += latens
+            if status >= 400:
+                s['fel'] += 1
+
+    def som_json(self) -> dict:
+        with self.las:
+            per = {k: dict(v, sekunder=round(v['sekunder'], 4), injicerad_latens_s=round(v['injicerad_latens_s'], 4))
+                   for k, v in sorted(self.per_nyckel.items())}
+            return {'sedan_s': round(time.time() - self.start, 3),
+                    'anrop': sum(v['anrop'] for v in per.values()),
+                    'rader': sum(v['rader'] for v in per.values()),
+                    'bytes_in': sum(v['bytes_in'] for v in per.values()),
+                    'bytes_ut': sum(v['bytes_ut'] for v in per.values()),
+                    'fel': sum(v['fel'] for v in per.values()),
+                    'per_anrop': per}
+
+
+def _prefer(huvud: str) -> Dict[str, str]:
+    ut = {}
+    for del_ in (huvud or '').split(','):
+        k, _, v = del_.strip().partition('=')
+        if k:
+            ut[k.strip()] = v.strip()
+    return ut
+
+
+def _spann(huvud: Optional[str]) -> Optional[Tuple[int, Optional[int]]]:
+    m = re.match(r'^\s*(\d+)-(\d*)\s*$', huvud or '')
+    if not m:
+        return None
+    return int(m.group(1)), int(m.group(2)) if m.group(2) else None
+
+
+class LokalPostgrestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'lokal_postgrest'
+
+    # Sätts av starta()
+    db: LokalDatabas = None
+    stat: _Statistik = None
+    latens_ms = 0.0
+    latens_spridning_ms = 0.0
+    felfrekvens = 0.0
+    slump: random.Random = None
+    slump_las = threading.Lock()
+    tyst = True
+
+    def log_message(self, format, *args):
+        if not self.tyst:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._hantera('GET')
+
+    def do_POST(self):
+        self._hantera('POST')
+
+    def do_PATCH(self):
+        self._hantera('PATCH')
+
+    def do_DELETE(self):
+        self._hantera('DELETE')
+
+    def _svara(self, status: int, kropp=None, huvuden: Optional[Dict[str, str]] = None) -> None:
+        data = b'' if kropp is None and status in (201, 204) else \
+            json.dumps(kropp, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        if data:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        for k, v in (huvuden or {}).items():
+            self.send_header(k, v)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+        self.svarsbytes = len(data)
+
+    def _storning(self) -> Tuple[float, bool]:
+        """(latens i s, injicerat fel?) — dras under lås så att seedad slump räcker."""
+        with self.slump_las:
+            latens = max(0.0, self.slump.gauss(self.latens_ms, self.latens_spridning_ms)) / 1000.0 \
+                if self.latens_ms or self.latens_spridning_ms else 0.0
+            fel = self.felfrekvens > 0 and self.slump.random() < self.felfrekvens
+        return latens, fel
+
+    def _hantera(self, metod: str) -> None:
+        t0 = time.perf_counter()
+        url = urlsplit(self.path)
+        params = parse_qsl(url.query, keep_blank_values=True)
+        langd = int(self.headers.get('Content-Length') or 0)
+        kropp = self.rfile.read(langd) if langd else b''
+
+        if url.path.rstrip('/') == '/_stat':
+            if dict(params).get('nollstall'):
+                self.stat.nollstall()
+            self._svara(200, self.stat.som_json())
+            return
+
+        delar = [d for d in url.path.split('/') if d]
+        if len(delar) >= 3 and delar[:2] == ['rest', 'v1']:
+            delar = delar[2:]
+        rpc = len(delar) == 2 and delar[0] == 'rpc'
+        if not (len(delar) == 1 or rpc):
+            self._svara(404, {'code': 'PGRST125', 'message': f'Invalid path: {url.path}',
+                              'details': None, 'hint': None})
+            return
+        nyckel = f'{metod} {"rpc/" + delar[1] if rpc else delar[0]}'
+
+        latens, fel = self._storning()
+        if latens:
+            time.sleep(latens)
+        status, rader = 500, 0
+        self.svarsbytes = 0
+        try:
+            if fel:
+                raise PostgrestFel(503, 'PGRST000', 'injicerat fel (lokal_postgrest --felfrekvens)')
+            status, rader = self._utfor(metod, delar, params, kropp, rpc)
+        except PostgrestFel as e:
+            status = e.status
+            self._svara(e.status, e.som_json())
+        except (ValueError, TypeError, sqlite3.Error) as e:
+            status = 400
+            self._svara(400, {'code': 'PGRST100', 'message': str(e), 'details': type(e).__name__, 'hint': None})
+        finally:
+            self.stat.registrera(nyckel, rader, len(kropp), self.svarsbytes, time.perf_counter() - t0,
+                                 status, latens)
+
+    def _utfor(self, metod: str, delar: List[str], params, kropp: bytes, rpc: bool) -> Tuple[int, int]:
+        prefer = _prefer(self.headers.get('Prefer'))
+        representation = prefer.get('return') == 'representation'
+        data = json.loads(kropp.decode('utf-8')) if kropp.strip() else None
+
+        if rpc:
+            if metod not in ('POST', 'GET'):
+                raise PostgrestFel(405, 'PGRST101', 'RPC anropas med POST eller GET')
+            arg = data if isinstance(data, dict) else dict(params)
+            self._svara(200, self.db.rpc(delar[1], arg))
+            return 200, 0
+
+        tabell = delar[0]
+        if metod == 'GET':
+            rakna = prefer.get('count') == 'exact'
+            rader, start, totalt = self.db.hamta(tabell, params, _spann(self.headers.get('Range')), rakna)
+            total_text = str(totalt) if totalt is not None else '*'
+            omfang = f'{start}-{start + len(rader) - 1}/{total_text}' if rader else f'*/{total_text}'
+            status = 206 if totalt is not None and len(rader) < totalt else 200
+            if 'vnd.pgrst.object' in (self.headers.get('Accept') or ''):
+                if len(rader) != 1:
+                    raise PostgrestFel(406, 'PGRST116', 'JSON object requested, multiple (or no) rows returned',
+                                       f'The result contains {len(rader)} rows')
+                self._svara(200, rader[0], {'Content-Range': omfang})
+                return 200, 1
+            self._svara(status, rader, {'Content-Range': omfang})
+            return status, len(rader)
+
+        if metod == 'POST':
+            rader = data if isinstance(data, list) else [data] if isinstance(data, dict) else None
+            if rader is None or not all(isinstance(r, dict) for r in rader):
+                raise PostgrestFel(400, 'PGRST102', 'kroppen ska vara ett objekt eller en lista av objekt')
+            p = dict(params)
+            ut = self.db.skriv(tabell, rader, p.get('on_conflict'), prefer.get('resolution'), representation)
+            self._svara(201, ut if representation else None)
+            return 201, len(rader)
+
+        if metod == 'PATCH':
+            if not isinstance(data, dict):
+                raise PostgrestFel(400, 'PGRST102', 'kroppen ska vara ett objekt')
+            ut = self.db.uppdatera(tabell, data, params, representation)
+        else:
+            ut = self.db.radera(tabell, params, representation)
+        if representation:
+            self._svara(200, ut)
+            return 200, len(ut)
+        self._svara(204)
+        return 204, 0
+
+
+def starta(port: int = 0, db: str = ':memory:', migrationer: Optional[str] = MIGRATIONER,
+           latens_ms: float = 0.0, latens_spridning_ms: float = 0.0, felfrekvens: float = 0.0,
+           max_rader: int = MAX_RADER, seed: int = 1, tyst: bool = True,
+           i_trad: bool = True) -> ThreadingHTTPServer:
+    """Starta servern (port 0 = ledig port; se server.server_address). Med
+    i_trad körs den i en daemon-tråd och funktionen returnerar direkt —
+    stoppa med server.shutdown(). URL: f'http://127.0.0.1:{server.server_address[1]}'."""
+    handler = type('Handler', (LokalPostgrestHandler,), {
+        'db': LokalDatabas(db, migrationer, max_rader),
+        'stat': _Statistik(),
+        'latens_ms': latens_ms,
+        'latens_spridning_ms': latens_spridning_ms,
+        'felfrekvens': felfrekvens,
+        'slump': random.Random(seed),
+        'slump_las': threading.Lock(),
+        'tyst': tyst,
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    server.handler = handler
+    if i_trad:
+        threading.Thread(target=server.serve_forever, name='lokal_postgrest', daemon=True).start()
+    return server
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description='Lokal PostgREST-ersättare (SQLite) för benchmark och regressionstest.')
+    ap.add_argument('--port', type=int, default=STANDARD_PORT)
+    ap.add_argument('--db', default=':memory:', help='SQLite-fil, eller :memory: (standard)')
+    ap.add_argument('--migrationer', default=MIGRATIONER, help='katalog med *.sql att seeda schemat från')
+    ap.add_argument('--latens-ms', type=float, default=0.0)
+    ap.add_argument('--latens-spridning-ms', type=float, default=0.0)
+    ap.add_argument('--felfrekvens', type=float, default=0.0, help='andel anrop som får 503 (0–1)')
+    ap.add_argument('--max-rader', type=int, default=MAX_RADER, help='högst så många rader per GET (0 = obegränsat)')
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('--logga', action='store_true', help='logga varje anrop')
+    args = ap.parse_args(argv)
+
+    server = starta(args.port, args.db, args.migrationer, args.latens_ms, args.latens_spridning_ms,
+                    args.felfrekvens, args.max_rader, args.seed, tyst=not args.logga, i_trad=False)
+    print(f'lokal_postgrest: http://127.0.0.1:{server.server_address[1]}  '
+          f'({len(server.handler.db.schema)} tabeller ur migrationerna, db={args.db})', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
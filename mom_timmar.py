@@ -0,0 +1,308 @@
+"""mom_timmar.py — MOM-segment → mom_tider: timhinkar och diff-skrivning.
+
+Timdelningen fanns i tre kopior (save_mom_to_supabase, backfill_mom_tider.
+bucket_segs, backfill_fakt_tid_mom_tider.rebygg_dag). Alla stegade varje
+segment timme för timme i segmentets egen klocktid och skrev sedan om varje
+berörd (maskin, timme) med delete i bitar om 20 + INSERT — också timmar som
+inte ändrats, vilket för kumulativa filer är nästan alla.
+
+Ett kontrakt:
+
+  segment_ur_tid_entries(tid_entries)
+                 parse_mom_file:s tid_entries → segment (se nedan). Samma
+                 (maskin, starttid, typ) från flera operatörer är OM-ATTRIBUERING,
+                 inte extra tid — sista entry vinner (A110148-buggen).
+  timhinkar(segment, fran=None, till=None)
+                 {(maskin_id, starttid, typ): (operator_id, sekunder)}
+                 → {(maskin_id, operator_id, timme_utc, typ): sekunder}
+                 timme_utc = 'YYYY-MM-DDTHH:00:00Z'. Segment delas
+                 proportionellt per timme: 06:52+01:00 i 99 min → 8 min i
+                 timmen 05Z, 60 i 06Z, 31 i 07Z. fran/till (date) filtrerar
+                 på timmens datum i segmentets egen klocktid.
+  till_rader(hinkar)
+                 → mom_tider-rader (minuter = round(sekunder / 60)).
+  skriv_timmar(rader, bas_url, headers, http)
+                 läser de lagrade raderna för radernas (maskin, timme) och
+                 raderar + skriver om BARA de timmar vars innehåll skiljer sig.
+                 Timmar som bara finns i databasen rörs inte (som förr).
+
+Tiden räknas i UTC-epoksekunder, så timgränserna är UTC-timmar. Svensk tid
+har heltimsoffset, så det är samma hinkar som den gamla stegningen gav för
+starttider med offset (+01:00/+02:00) — men rätt också över sommartidsbytet:
+en starttid UTAN offset tolkas i datorns tidszon (som förr) men stegas inte
+längre i väggklocka, där natten till sista söndagen i mars saknar 02-timmen
+och oktobernatten har den två gånger.
+
+Stora mängder (backfill över hela Behandlade) räknas med NumPy om det finns;
+importerns några hundra segment per fil räknas i ren Python, som inte betalar
+för att ladda NumPy. Båda vägarna ger samma hinkar.
+"""
+from collections import Counter, defaultdict
+from functools import lru_cache
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TYP_FIELDS = [
+    ('processing_sek',  'processing'),
+    ('terrain_sek',     'terrain'),
+    ('kort_stopp_sek',  'kort_stopp'),
+    ('other_work_sek',  'other'),
+    ('disturbance_sek', 'disturbance'),
+]
+TYP_MAP = {f: t for f, t in TYP_FIELDS}
+
+NUMPY_FRAN = 5000          # segment; färre än så räknas i ren Python
+RADERA_PER_ANROP = 50      # timmar per delete/läsning (URL-längd)
+RADER_PER_INSERT = 500
+_SIDA = 1000
+_TIMME = 3600
+_DYGN = 86400
+_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+_numpy = None
+
+
+def _np():
+    """NumPy, eller False om det inte finns (laddas först vid behov)."""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy
+
+
+def segment_ur_tid_entries(tid_entries: Dict, datum: Optional[str] = None) -> Dict[Tuple, Tuple]:
+    """tid_entries (parse_mom_file) → {(maskin, starttid, typ): (operator, sek)}.
+    Med datum tas bara entries vars datum-fält är det datumet."""
+    segment = {}
+    for entry_key, entry in tid_entries.items():
+        if datum is not None and str(entry.get('datum') or '') != datum:
+            continue
+        if len(entry_key) == 4:
+            start_str, maskin, _, operator = entry_key
+        else:
+            start_str, maskin, _ = entry_key
+            operator = entry.get('operator_id')
+        if not start_str:
+            continue
+        for field, typ in TYP_FIELDS:
+            sek = entry.get(field) or 0
+            if sek > 0:
+                segment[(maskin, start_str, typ)] = (operator, sek)
+    return segment
+
+
+def _epok(start) -> Optional[Tuple[float, int]]:
+    """(UTC-epoksekunder, offset i sekunder) för en starttid, None om oläslig.
+    Utan offset gäller datorns tidszon (datetime.timestamp/astimezone)."""
+    try:
+        dt = start if isinstance(start, datetime) else datetime.fromisoformat(start)
+        offset = (dt.utcoffset() if dt.tzinfo else dt.astimezone().utcoffset()).total_seconds()
+        return dt.timestamp(), int(offset)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+@lru_cache(maxsize=65536)
+def _timme_text(timme: int) -> str:
+    return datetime.fromtimestamp(timme * _TIMME, timezone.utc).strftime(_FORMAT)
+
+
+def _dagnummer(d: Optional[date]) -> Optional[int]:
+    return d.toordinal() - date(1970, 1, 1).toordinal() if d else None
+
+
+def timhinkar(segment: Dict[Tuple, Tuple], fran: Optional[date] = None,
+              till: Optional[date] = None) -> Dict[Tuple, float]:
+    """Sekunder per (maskin_id, operator_id, timme_utc, typ) — se modulens docstring."""
+    nycklar = []      # (maskin, operator, typ) per läsbart segment
+    starter, slut, offsets = [], [], []
+    for (maskin, start_str, typ), (operator, sek) in segment.items():
+        if not sek or sek <= 0:
+            continue
+        e = _epok(start_str)
+        if e is None:
+            continue
+        nycklar.append((maskin, operator, typ))
+        starter.append(e[0])
+        slut.append(e[0] + sek)
+        offsets.append(e[1])
+    if not nycklar:
+        return {}
+    dag_fran, dag_till = _dagnummer(fran), _dagnummer(till)
+    np = _np() if len(nycklar) >= NUMPY_FRAN else False
+    if np:
+        return _timhinkar_numpy(np, nycklar, starter, slut, offsets, dag_fran, dag_till)
+
+    hinkar: Dict[Tuple, float] = {}
+    for (maskin, operator, typ), s, e, off in zip(nycklar, starter, slut, offsets):
+        timme = int(s // _TIMME)
+        while timme * _TIMME < e:
+            sekunder = min(e, (timme + 1) * _TIMME) - max(s, timme * _TIMME)
+            dag = (timme * _TIMME + off) // _DYGN
+            if sekunder > 0 and (dag_fran is None or dag >= dag_fran) \
+                    and (dag_till is None or dag <= dag_till):
+                k = (maskin, operator, _timme_text(timme), typ)
+                hinkar[k] = hinkar.get(k, 0) + sekunder
+            timme += 1
+    return hinkar
+
+
+def _timhinkar_numpy(np, nycklar, starter, slut, offsets, dag_fran, dag_till) -> Dict[Tuple, float]:
+    s = np.asarray(starter, dtype=np.float64)
+    e = np.asarray(slut, dtype=np.float64)
+    off = np.asarray(offsets, dtype=np.int64)
+    forsta = np.floor(s / _TIMME).astype(np.int64)
+    antal = np.ceil(e / _TIMME).astype(np.int64) - forsta       # timmar per segment (>= 1)
+
+    # En rad per (segment, timme): segmentindex upprepat, timmen räknas upp
+    seg = np.repeat(np.arange(len(nycklar)), antal)
+    timme = forsta[seg] + (np.arange(seg.size) - np.repeat(np.cumsum(antal) - antal, antal))
+    sekunder = (np.minimum(e[seg], (timme + 1) * _TIMME)
+                - np.maximum(s[seg], timme * _TIMME))
+    behall = sekunder > 0
+    if dag_fran is not None or dag_till is not None:
+        dag = (timme * _TIMME + off[seg]) // _DYGN
+        if dag_fran is not None:
+            behall &= dag >= dag_fran
+        if dag_till is not None:
+            behall &= dag <= dag_till
+    seg, timme, sekunder = seg[behall], timme[behall], sekunder[behall]
+    if not seg.size:
+        return {}
+
+    # Summera per (nyckel, timme): nyckel-id × timspann + timme → en heltalsnyckel
+    unika = {}
+    nyckel_id = np.fromiter((unika.setdefault(k, len(unika)) for k in nycklar),
+                            dtype=np.int64, count=len(nycklar))
+    lagsta = int(timme.min())
+    spann = int(timme.max() - lagsta) + 1
+    kombinerad = nyckel_id[seg] * spann + (timme - lagsta)
+    grupper, index = np.unique(kombinerad, return_inverse=True)
+    summor = np.bincount(index, weights=sekunder)
+
+    id_till_nyckel = list(unika)
+    hinkar = {}
+    for grupp, summa in zip(grupper.tolist(), summor.tolist()):
+        maskin, operator, typ = id_till_nyckel[grupp // spann]
+        hinkar[(maskin, operator, _timme_text(lagsta + grupp % spann), typ)] = summa
+    return hinkar
+
+
+def till_rader(hinkar: Dict[Tuple, float]) -> List[Dict]:
+    return [
+        {
+            'maskin_id': k[0],
+            'operator_id': k[1],
+            'timme': k[2],
+            'typ': k[3],
+            'minuter': round(v / 60),
+        }
+        for k, v in hinkar.items()
+    ]
+
+
+def _normalisera_timme(timme: str) -> str:
+    # PostgREST svarar '2026-05-04T06:00:00+00:00'; raderna skrivs med 'Z'
+    try:
+        dt = datetime.fromisoformat(timme.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return timme
+    return dt.astimezone(timezone.utc).strftime(_FORMAT)
+
+
+def _innehall(rader: Iterable[Dict]) -> Counter:
+    return Counter((r.get('operator_id'), r.get('typ'), r.get('minuter')) for r in rader)
+
+
+def _lagrade_timmar(timmar_per_maskin, bas_url, headers, http) -> Dict[Tuple, Counter]:
+    lagrade = defaultdict(Counter)
+    for maskin_id, timmar in timmar_per_maskin.items():
+        for i in range(0, len(timmar), RADERA_PER_ANROP):
+            lista = ','.join(f'"{t}"' for t in timmar[i:i + RADERA_PER_ANROP])
+            offset = 0
+            while True:
+                resp = http.get(
+                    f"{bas_url}/rest/v1/mom_tider",
+                    params={'maskin_id': f'eq.{maskin_id}', 'timme': f'in.({lista})',
+                            'select': 'operator_id,timme,typ,minuter',
+                            'order': 'timme,typ,operator_id', 'limit': _SIDA, 'offset': offset},
+                    headers=headers, timeout=60)
+                resp.raise_for_status()
+                sida = resp.json() or []
+                for r in sida:
+                    lagrade[(maskin_id, _normalisera_timme(r['timme']))] += _innehall([r])
+                if len(sida) < _SIDA:
+                    break
+                offset += _SIDA
+    return lagrade
+
+
+def skriv_timmar(rader: List[Dict], bas_url: str, headers: Dict[str, str], http) -> Dict:
+    """Diff-skrivning av mom_tider-rader. http är requests (eller importerns
+    mätade omslag). Returnerar {'timmar', 'andrade', 'rader', 'varningar',
+    'ok'}; ok är False om en radering eller INSERT misslyckades. En timme vars
+    radering föll skrivs inte (plain INSERT skulle dubblera den). Går de
+    lagrade raderna inte att läsa skrivs alla timmar om, som förr."""
+    per_timme = defaultdict(list)
+    for r in rader:
+        per_timme[(r['maskin_id'], r['timme'])].append(r)
+    resultat = {'timmar': len(per_timme), 'andrade': 0, 'rader': 0, 'varningar': [], 'ok': True}
+    if not per_timme:
+        return resultat
+
+    timmar_per_maskin = defaultdict(list)
+    for maskin_id, timme in sorted(per_timme):
+        timmar_per_maskin[maskin_id].append(timme)
+    try:
+        lagrade = _lagrade_timmar(timmar_per_maskin, bas_url, headers, http)
+    except Exception as e:
+        resultat['varningar'].append(f"kunde inte läsa lagrade timmar ({e}) — alla skrivs om")
+        lagrade = {}
+    andrade = sorted(k for k, grupp in per_timme.items() if lagrade.get(k) != _innehall(grupp))
+    resultat['andrade'] = len(andrade)
+    if not andrade:
+        return resultat
+
+    # Radera de ändrade timmarna (alla operatörer/typer) — plain INSERT efteråt;
+    # ON CONFLICT matchar inte mom_tiders COALESCE-index
+    radera = defaultdict(list)
+    for maskin_id, timme in andrade:
+        radera[maskin_id].append(timme)
+    ej_raderade = set()
+    for maskin_id, timmar in radera.items():
+        for i in range(0, len(timmar), RADERA_PER_ANROP):
+            bit = timmar[i:i + RADERA_PER_ANROP]
+            lista = ','.join(f'"{t}"' for t in bit)
+            try:
+                resp = http.delete(
+                    f"{bas_url}/rest/v1/mom_tider",
+                    params={'maskin_id': f'eq.{maskin_id}', 'timme': f'in.({lista})'},
+                    headers=headers, timeout=60)
+                fel = None if resp.status_code < 400 else f"{resp.status_code}: {resp.text[:300]}"
+            except Exception as e:
+                fel = str(e)
+            if fel:
+                ej_raderade.update((maskin_id, t) for t in bit)
+                resultat['varningar'].append(
+                    f"kunde inte städa mom_tider för {maskin_id} ({fel}) — {len(bit)} timmar skrivs inte")
+                resultat['ok'] = False
+
+    nya = [r for k in andrade if k not in ej_raderade for r in per_timme[k]]
+    for i in range(0, len(nya), RADER_PER_INSERT):
+        batch = nya[i:i + RADER_PER_INSERT]
+        try:
+            resp = http.post(f"{bas_url}/rest/v1/mom_tider", json=batch, headers=headers, timeout=60)
+            if resp.status_code not in (200, 201):
+                resultat['varningar'].append(f"insert-fel {resp.status_code}: {resp.text[:300]}")
+                resultat['ok'] = False
+                continue
+        except Exception as e:
+            resultat['varningar'].append(f"insert-fel: {e}")
+            resultat['ok'] = False
+            continue
+        resultat['rader'] += len(batch)
+    return resultat
@@ -14,6 +14,7 @@ from skogsmaskin_import_version_6 import (
     _GLOBAL_TID_ENTRIES, _GLOBAL_TID_OPERATORS
 )
 import skogsmaskin_import_version_6 as imp
+from stanford_arkiv import hitta_stanford, stanford_ext, stanford_namn
 
 HEADERS_DELETE = {
     "apikey": SUPABASE_KEY,
@@ -55,7 +56,7 @@ def main():
         'fakt_lass', 'fakt_lass_sortiment', 'fakt_skotning_status',
         'fakt_maskin_statistik',
         'detalj_stam', 'detalj_kontroll_stock', 'detalj_gps_spar',
-        'meta_importerade_filer'
+        'meta_importerade_filer', 'meta_mom_dag'
     ]
     for t in tables_to_clear:
         clear_table(t)
@@ -69,12 +70,9 @@ def main():
     print("STEG 2: Samlar filer")
     print("=" * 60)
 
-    behandlade_files = sorted(
-        glob.glob(os.path.join(BEHANDLADE, "**", "*.mom"), recursive=True) +
-        glob.glob(os.path.join(BEHANDLADE, "**", "*.hpr"), recursive=True) +
-        glob.glob(os.path.join(BEHANDLADE, "**", "*.hqc"), recursive=True) +
-        glob.glob(os.path.join(BEHANDLADE, "**", "*.fpr"), recursive=True)
-    )
+    # Behandlade kan vara komprimerat (ARKIV_KOMPRIMERING) — parsrarna läser
+    # via open_stanford, så .mom.gz/.hpr.zst m.fl. tas med här.
+    behandlade_files = hitta_stanford(BEHANDLADE)
 
     inkommande_files = sorted(
         glob.glob(os.path.join(INKOMMANDE, "**", "*.mom"), recursive=True) +
@@ -85,7 +83,7 @@ def main():
 
     ext_count = {}
     for f in behandlade_files:
-        ext = os.path.splitext(f)[1].lower()
+        ext = stanford_ext(f)
         ext_count[ext] = ext_count.get(ext, 0) + 1
     for ext, cnt in sorted(ext_count.items()):
         print(f"  Behandlade {ext}: {cnt} filer")
@@ -115,8 +113,8 @@ def main():
     ok = 0
     fel = 0
     for i, filepath in enumerate(behandlade_files):
-        filnamn = os.path.basename(filepath)
-        ext = os.path.splitext(filnamn)[1].lower()
+        filnamn = stanford_namn(filepath)
+        ext = stanford_ext(filnamn)
         parse_fn, save_fn, filtyp = parsers[ext]
 
         try:
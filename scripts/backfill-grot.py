@@ -20,6 +20,10 @@ except ImportError:
     print("Saknat bibliotek. Koer: py -m pip install requests")
     sys.exit(1)
 
+# Arkivlaesning (.hpr, .hpr.gz, .hpr.zst) fran repo-roten (en katalog upp)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stanford_arkiv import hitta_stanford, open_stanford, stanford_namn
+
 # ============================================================
 # KONFIGURATION
 # ============================================================
@@ -93,7 +97,8 @@ def extract_grot_flags(filepath: str) -> dict:
     """Return {stam_nummer: bio_energy_adaption} for stems with BioEnergyAdaption."""
     result = {}
     try:
-        tree = ET.parse(filepath)
+        with open_stanford(filepath) as fh:
+            tree = ET.parse(fh)
         root = tree.getroot()
         ns = get_namespace(root)
 
@@ -128,11 +133,7 @@ def main():
     log.info("=" * 60)
 
     # Find HPR files on disk (Ponsse only = StanForD 3.6)
-    disk_files = {}
-    for root_dir, dirs, files in os.walk(BEHANDLADE):
-        for f in files:
-            if f.upper().endswith('.HPR'):
-                disk_files[f] = os.path.join(root_dir, f)
+    disk_files = {stanford_namn(p): p for p in hitta_stanford(BEHANDLADE, '.hpr')}
     log.info(f"HPR-filer pa disk: {len(disk_files)}")
 
     # Fetch all hpr_filer from DB
@@ -5,10 +5,24 @@ and convert to a GeoJSON grid of polygons with height attributes.
 
 Usage:
     python scripts/build-forest-height.py
+    python scripts/build-forest-height.py --cell-size 25 --oversample 2
+    python scripts/build-forest-height.py --format merged --offline
+
+Large rasters are fetched as pieces of at most PIECE_PX per side, concurrently,
+and cached in data/forest-height-cache/ (see raster_fetch.py), so re-running
+with another --format or styling costs no downloads. --offline builds from
+the cache only.
 
 Requires: pip install rasterio numpy pyproj
 Reads SKS_WMS_USER / SKS_WMS_PASS from .env.local in project root.
-Output: public/forest-height.geojson
+
+Output formats (--format):
+    geojson  one square polygon per cell      -> public/forest-height.geojson
+    merged   height classes, adjacent equal-class cells merged into polygons
+                                              -> public/forest-height-merged.geojson
+    tiles    height classes as a zoom pyramid of packed uint8 grid tiles plus
+             index.json, so a map only fetches the visible tiles
+                                              -> public/forest-height/
 """
 
 import json
@@ -16,11 +30,11 @@ import os
 import struct
 import sys
 import tempfile
-import urllib.request
-import urllib.parse
-import base64
+import shutil
 from pathlib import Path
 
+import raster_fetch
+
 # ---------------------------------------------------------------------------
 # Config
 # ---------------------------------------------------------------------------
@@ -28,9 +42,15 @@ from pathlib import Path
 # Bbox in EPSG:4326 (lon/lat) covering Kompersmala area
 BBOX_4326 = [15.76, 56.59, 15.94, 56.71]
 
-# Target cell size in meters (50m ideal but GeoJSON > 15MB, 65m = ~14MB)
+# Target cell size in meters (50m ideal but GeoJSON > 15MB, 65m = ~14MB).
+# Build time is no longer the limit (block reduction is vectorized) — file
+# size of the one-polygon-per-cell GeoJSON is.
 CELL_SIZE_M = 65
 
+# Source pixels per cell edge. 1 = one pixel per cell (server-side
+# resampling); >1 downloads a finer raster and averages each block locally.
+OVERSAMPLE = 1
+
 # Minimum tree height to keep (filters open land / clear-cuts)
 MIN_HEIGHT_M = 2.0
 
@@ -52,8 +72,23 @@ UA = (
     "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 )
 
+# Height classes (lower edges, meters) for the merged and tiled outputs.
+# Class 0 = no data / below MIN_HEIGHT_M, class i = [edge[i-1], edge[i]).
+HEIGHT_CLASSES_M = [2, 5, 10, 15, 20, 25, 30]
+
+# Cells per tile edge in the tiled output (tile = TILE_CELLS^2 bytes raw)
+TILE_CELLS = 128
+
+# exportImage requests are split into pieces of at most this many pixels per
+# side and fetched FETCH_WORKERS at a time
+PIECE_PX = 2048
+FETCH_WORKERS = 4
+
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CACHE_DIR = PROJECT_ROOT / "data" / "forest-height-cache"
 OUTPUT_PATH = PROJECT_ROOT / "public" / "forest-height.geojson"
+MERGED_OUTPUT_PATH = PROJECT_ROOT / "public" / "forest-height-merged.geojson"
+TILES_OUTPUT_DIR = PROJECT_ROOT / "public" / "forest-height"
 
 
 # ---------------------------------------------------------------------------
@@ -88,6 +123,24 @@ def bbox_4326_to_3857(bbox):
     return [x_min, y_min, x_max, y_max]
 
 
+def _export_image(service_url, params, user, password, label, validate):
+    """One exportImage call through the cache. Returns bytes or None."""
+    url = f"{service_url}/exportImage"
+    headers = {"User-Agent": UA, **raster_fetch.basic_auth(user, password)}
+    cached = (CACHE_DIR / f"{raster_fetch.cache_key(url, params)}.bin").exists()
+    try:
+        data = raster_fetch.fetch(url, params, headers=headers, cache_dir=CACHE_DIR,
+                                  validate=validate, timeout=120)
+    except raster_fetch.OfflineMiss:
+        print(f"  [offline] {label} {params['size']} not in cache")
+        return None
+    except Exception as e:
+        print(f"  Download failed ({label} {params['size']}): {e}")
+        return None
+    print(f"  {'[cache]' if cached else 'Response:'} {label} {params['size']}: {len(data)} bytes")
+    return data
+
+
 def download_tiff(service_url, bbox_3857, width, height, user, password, band_ids=None):
     """Download raw raster as TIFF from ArcGIS ImageServer exportImage."""
     params = {
@@ -105,27 +158,10 @@ def download_tiff(service_url, bbox_3857, width, height, user, password, band_id
     if band_ids:
         params["bandIds"] = band_ids
 
-    url = f"{service_url}/exportImage?{urllib.parse.urlencode(params)}"
-    print(f"Downloading TIFF from:\n  {url[:120]}...")
+    def valid(data, content_type):
+        return not (b"error" in data[:200].lower() or content_type.startswith("application/json"))
 
-    credentials = base64.b64encode(f"{user}:{password}".encode()).decode()
-    req = urllib.request.Request(url, headers={
-        "User-Agent": UA,
-        "Authorization": f"Basic {credentials}",
-    })
-
-    try:
-        with urllib.request.urlopen(req, timeout=120) as resp:
-            data = resp.read()
-            content_type = resp.headers.get("Content-Type", "")
-            print(f"  Response: {len(data)} bytes, Content-Type: {content_type}")
-            if b"error" in data[:200].lower() or content_type.startswith("application/json"):
-                print(f"  ERROR response: {data[:500].decode('utf-8', errors='replace')}")
-                return None
-            return data
-    except Exception as e:
-        print(f"  Download failed: {e}")
-        return None
+    return _export_image(service_url, params, user, password, "TIFF", valid)
 
 
 def download_png_raw(service_url, bbox_3857, width, height, user, password, band_ids=None):
@@ -143,27 +179,42 @@ def download_png_raw(service_url, bbox_3857, width, height, user, password, band
     if band_ids:
         params["bandIds"] = band_ids
 
-    url = f"{service_url}/exportImage?{urllib.parse.urlencode(params)}"
-    print(f"Downloading PNG from:\n  {url[:120]}...")
+    def valid(data, content_type):
+        return not content_type.startswith("application/json")
 
-    credentials = base64.b64encode(f"{user}:{password}".encode()).decode()
-    req = urllib.request.Request(url, headers={
-        "User-Agent": UA,
-        "Authorization": f"Basic {credentials}",
-    })
+    return _export_image(service_url, params, user, password, "PNG", valid)
+
+
+def fetch_raster(service_url, bbox_3857, width, height, user, password, fmt="tiff", band_ids=None):
+    """Download bbox as a mosaic of PIECE_PX pieces (concurrent, cached) and
+    decode it. Returns (data, nodata), or None if any piece failed."""
+    import numpy as np
+
+    download = download_tiff if fmt == "tiff" else download_png_raw
+    n_pieces = len(list(raster_fetch.split_bbox(bbox_3857, width, height, PIECE_PX)))
+    print(f"Fetching {fmt.upper()} {width}x{height} px as {n_pieces} piece(s) from:\n  {service_url}")
+
+    def fetch_piece(piece_bbox, w, h):
+        data = download(service_url, piece_bbox, w, h, user, password, band_ids=band_ids)
+        if not data or len(data) <= 100:
+            raise raster_fetch.InvalidResponse("empty response")
+        return data
+
+    def decode(data):
+        if fmt == "tiff":
+            arr, nodata, _ = tiff_to_array(data)
+            return arr, nodata
+        return png_to_array(data), 0
 
     try:
-        with urllib.request.urlopen(req, timeout=120) as resp:
-            data = resp.read()
-            content_type = resp.headers.get("Content-Type", "")
-            print(f"  Response: {len(data)} bytes, Content-Type: {content_type}")
-            if content_type.startswith("application/json"):
-                print(f"  ERROR response: {data[:500].decode('utf-8', errors='replace')}")
-                return None
-            return data
+        data, nodata = raster_fetch.fetch_mosaic(fetch_piece, decode, bbox_3857, width, height,
+                                                 max_px=PIECE_PX, workers=FETCH_WORKERS)
     except Exception as e:
-        print(f"  Download failed: {e}")
+        print(f"  Failed: {e}")
         return None
+    if fmt != "tiff":
+        data = data.astype(np.float32)
+    return data, nodata
 
 
 def tiff_to_array(tiff_data):
@@ -211,11 +262,59 @@ def png_to_array(png_data):
             os.unlink(tmp_path)
 
 
-def build_geojson(data, nodata, bbox_3857, cell_w, cell_h, is_decimeters=False):
-    """Convert raster grid to GeoJSON polygons in EPSG:4326."""
+def mercator_to_4326(x, y):
+    """Vectorized EPSG:3857 -> EPSG:4326. Accepts scalars or numpy arrays."""
     import numpy as np
-    import math
+    lon = np.asarray(x, dtype=np.float64) * 180.0 / 20037508.34
+    lat = np.degrees(2.0 * np.arctan(np.exp(np.asarray(y, dtype=np.float64) * np.pi / 20037508.34))) - 90.0
+    return lon, lat
+
+
+def block_heights(data, nodata, px_per_cell_x, px_per_cell_y, is_decimeters=False):
+    """Reduce the raster to one mean height per cell in a single vectorized step.
+
+    The raster is cropped to whole cells, reshaped to
+    (cells_y, px_per_cell_y, cells_x, px_per_cell_x) and averaged over the
+    pixel axes, ignoring nodata/non-finite pixels. Returns a float array of
+    shape (cells_y, cells_x) in meters, rounded to 1 decimal; cells without a
+    single valid pixel are NaN.
+    """
+    import numpy as np
+
+    rows, cols = data.shape
+    n_cells_y = rows // px_per_cell_y
+    n_cells_x = cols // px_per_cell_x
+    d = np.asarray(data[:n_cells_y * px_per_cell_y, :n_cells_x * px_per_cell_x], dtype=np.float64)
+
+    valid = np.isfinite(d)
+    if nodata is not None:
+        valid &= d != nodata
+    blocks = np.where(valid, d, 0.0).reshape(n_cells_y, px_per_cell_y, n_cells_x, px_per_cell_x)
+    counts = valid.reshape(n_cells_y, px_per_cell_y, n_cells_x, px_per_cell_x).sum(axis=(1, 3))
+    sums = blocks.sum(axis=(1, 3))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        heights = np.where(counts > 0, sums / counts, np.nan)
+    if is_decimeters:
+        heights = heights / 10.0
+    return np.round(heights, 1)
 
+
+def cell_edges_4326(bbox_3857, n_cells_x, n_cells_y, cell_w, cell_h):
+    """Lon of every vertical cell edge and lat of every horizontal cell edge
+    (row 0 = top of the image = y_max), converted in one call, rounded to 4 dp."""
+    import numpy as np
+    x_min, _, _, y_max = bbox_3857
+    xs = x_min + np.arange(n_cells_x + 1) * cell_w
+    ys = y_max - np.arange(n_cells_y + 1) * cell_h
+    lons, _ = mercator_to_4326(xs, np.zeros_like(xs))
+    _, lats = mercator_to_4326(np.zeros_like(ys), ys)
+    return np.round(lons, 4), np.round(lats, 4)
+
+
+def raster_to_cells(data, nodata, bbox_3857, cell_w, cell_h, is_decimeters=False):
+    """Block-average the raster into cells. Returns (heights, cell_w, cell_h)
+    with the actual cell size in EPSG:3857 meters."""
     rows, cols = data.shape
     x_min, y_min, x_max, y_max = bbox_3857
 
@@ -230,87 +329,190 @@ def build_geojson(data, nodata, bbox_3857, cell_w, cell_h, is_decimeters=False):
     print(f"  Pixel size: {px_w:.1f} x {px_h:.1f} m")
     print(f"  Pixels per cell: {px_per_cell_x} x {px_per_cell_y}")
 
-    def to_4326(x, y):
-        lon = x * 180.0 / 20037508.34
-        lat = math.atan(math.exp(y * math.pi / 20037508.34)) * 360.0 / math.pi - 90.0
-        return round(lon, 4), round(lat, 4)
+    heights = block_heights(data, nodata, px_per_cell_x, px_per_cell_y, is_decimeters)
+    n_cells_y, n_cells_x = heights.shape
+    print(f"  Grid: {n_cells_x} x {n_cells_y} = {n_cells_x * n_cells_y} cells")
+    return heights, px_per_cell_x * px_w, px_per_cell_y * px_h
 
-    features = []
-    n_cells_x = cols // px_per_cell_x
-    n_cells_y = rows // px_per_cell_y
 
-    print(f"  Grid: {n_cells_x} x {n_cells_y} = {n_cells_x * n_cells_y} cells")
+def build_geojson(data, nodata, bbox_3857, cell_w, cell_h, is_decimeters=False):
+    """Convert raster grid to GeoJSON polygons in EPSG:4326."""
+    import numpy as np
 
-    for cy in range(n_cells_y):
-        for cx in range(n_cells_x):
-            # Extract cell block
-            r0 = cy * px_per_cell_y
-            r1 = r0 + px_per_cell_y
-            c0 = cx * px_per_cell_x
-            c1 = c0 + px_per_cell_x
-            block = data[r0:r1, c0:c1]
-
-            # Skip if all nodata
-            if nodata is not None:
-                valid = block[block != nodata]
-            else:
-                valid = block[np.isfinite(block)]
-
-            if len(valid) == 0:
-                continue
-
-            height = float(np.mean(valid))
-
-            if is_decimeters:
-                height = height / 10.0
-
-            # Round to 1 decimal
-            height = round(height, 1)
-
-            if height < MIN_HEIGHT_M:
-                continue
-
-            # Cell bounds in EPSG:3857
-            cx_min = x_min + cx * px_per_cell_x * px_w
-            cx_max = cx_min + px_per_cell_x * px_w
-            # Note: raster row 0 = top of image = y_max
-            cy_max = y_max - cy * px_per_cell_y * px_h
-            cy_min = cy_max - px_per_cell_y * px_h
-
-            # Convert corners to WGS84
-            sw = to_4326(cx_min, cy_min)
-            ne = to_4326(cx_max, cy_max)
-
-            coords = [[
-                [sw[0], sw[1]],
-                [ne[0], sw[1]],
-                [ne[0], ne[1]],
-                [sw[0], ne[1]],
-                [sw[0], sw[1]],
-            ]]
-
-            features.append({
-                "type": "Feature",
-                "properties": {"height": height},
-                "geometry": {"type": "Polygon", "coordinates": coords},
-            })
+    heights, cell_w, cell_h = raster_to_cells(data, nodata, bbox_3857, cell_w, cell_h, is_decimeters)
+    n_cells_y, n_cells_x = heights.shape
+    lons, lats = cell_edges_4326(bbox_3857, n_cells_x, n_cells_y, cell_w, cell_h)
+
+    # NaN compares False, so empty cells drop out here as well
+    keep_y, keep_x = np.nonzero(heights >= MIN_HEIGHT_M)
+    features = []
+    for cy, cx, h in zip(keep_y.tolist(), keep_x.tolist(), heights[keep_y, keep_x].tolist()):
+        w, e = float(lons[cx]), float(lons[cx + 1])
+        n, s = float(lats[cy]), float(lats[cy + 1])
+        features.append({
+            "type": "Feature",
+            "properties": {"height": h},
+            "geometry": {"type": "Polygon", "coordinates": [[
+                [w, s], [e, s], [e, n], [w, n], [w, s],
+            ]]},
+        })
 
     return {"type": "FeatureCollection", "features": features}
 
 
+def quantize_heights(heights):
+    """Heights (m, NaN = empty) -> uint8 class grid (0 = empty/below min)."""
+    import numpy as np
+    classes = np.digitize(np.nan_to_num(heights, nan=-1.0), HEIGHT_CLASSES_M)
+    classes[~(heights >= MIN_HEIGHT_M)] = 0
+    return classes.astype(np.uint8)
+
+
+def class_range(k):
+    """(min, max) height in meters for class k; max is None for the top class."""
+    lo = HEIGHT_CLASSES_M[k - 1]
+    hi = HEIGHT_CLASSES_M[k] if k < len(HEIGHT_CLASSES_M) else None
+    return lo, hi
+
+
+def _drop_collinear(ring):
+    """Remove vertices on straight runs of an axis-aligned closed ring."""
+    import numpy as np
+    pts = np.asarray(ring, dtype=np.float64)[:-1]
+    if len(pts) < 4:
+        return np.asarray(ring, dtype=np.float64)
+    prev = np.roll(pts, 1, axis=0)
+    nxt = np.roll(pts, -1, axis=0)
+    cross = (pts[:, 0] - prev[:, 0]) * (nxt[:, 1] - pts[:, 1]) - (pts[:, 1] - prev[:, 1]) * (nxt[:, 0] - pts[:, 0])
+    kept = pts[np.abs(cross) > 1e-6]
+    return np.vstack([kept, kept[:1]])
+
+
+def build_merged_geojson(heights, bbox_3857, cell_w, cell_h):
+    """Quantize to HEIGHT_CLASSES_M and merge 4-connected cells of equal class
+    into polygons (rasterio.features.shapes), with interior edges and
+    straight-run vertices removed. Coordinates in EPSG:4326."""
+    import numpy as np
+    from rasterio import features
+    from rasterio.transform import Affine
+
+    classes = quantize_heights(heights)
+    transform = Affine(cell_w, 0.0, bbox_3857[0], 0.0, -cell_h, bbox_3857[3])
+    out = []
+    for geom, value in features.shapes(classes, mask=classes > 0, transform=transform, connectivity=4):
+        rings = []
+        for ring in geom["coordinates"]:
+            pts = _drop_collinear(ring)
+            lon, lat = mercator_to_4326(pts[:, 0], pts[:, 1])
+            rings.append(np.round(np.column_stack([lon, lat]), 5).tolist())
+        k = int(value)
+        lo, hi = class_range(k)
+        out.append({
+            "type": "Feature",
+            "properties": {"class": k, "height_min": lo, "height_max": hi},
+            "geometry": {"type": "Polygon", "coordinates": rings},
+        })
+    return {"type": "FeatureCollection", "features": out}
+
+
+def write_grid_tiles(heights, bbox_3857, cell_w, cell_h, out_dir):
+    """Write the class grid as a pyramid of packed tiles.
+
+    Level 0 is the full-resolution grid; each next level halves the resolution
+    (2x2 mean of heights, then re-quantized) until the grid fits in one tile.
+    A tile is TILE_CELLS x TILE_CELLS raw uint8 class values, row-major, row 0
+    to the north, padded with 0 at the grid edge. Tiles that are all 0 are not
+    written. index.json describes the grid, the levels, the classes and which
+    tiles exist, so a client computes the visible tiles from its viewport.
+    Returns (tiles written, bytes written)."""
+    import numpy as np
+
+    out_dir = Path(out_dir)
+    if (out_dir / "index.json").exists():
+        shutil.rmtree(out_dir)  # stale tiles from an earlier build must not linger
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    levels = []
+    n_tiles = n_bytes = 0
+    level, h, cw, ch = 0, heights, cell_w, cell_h
+    while True:
+        classes = quantize_heights(h)
+        rows, cols = classes.shape
+        tiles = []
+        for ty in range(-(-rows // TILE_CELLS)):
+            for tx in range(-(-cols // TILE_CELLS)):
+                chunk = classes[ty * TILE_CELLS:(ty + 1) * TILE_CELLS, tx * TILE_CELLS:(tx + 1) * TILE_CELLS]
+                if not chunk.any():
+                    continue
+                tile = np.zeros((TILE_CELLS, TILE_CELLS), dtype=np.uint8)
+                tile[:chunk.shape[0], :chunk.shape[1]] = chunk
+                path = out_dir / str(level) / f"{tx}_{ty}.bin"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(tile.tobytes())
+                tiles.append([tx, ty])
+                n_tiles += 1
+                n_bytes += tile.nbytes
+        levels.append({
+            "level": level,
+            "cell_w": round(cw, 3),
+            "cell_h": round(ch, 3),
+            "cols": cols,
+            "rows": rows,
+            "tiles": tiles,
+        })
+        if max(rows, cols) <= TILE_CELLS:
+            break
+        # Pad to even dimensions with NaN, then 2x2 mean (empty cells ignored)
+        padded = np.full((rows + rows % 2, cols + cols % 2), np.nan)
+        padded[:rows, :cols] = h
+        h = block_heights(padded, None, 2, 2)
+        level, cw, ch = level + 1, cw * 2, ch * 2
+
+    lon_min, lat_max = mercator_to_4326(bbox_3857[0], bbox_3857[3])
+    index = {
+        "format": "uint8-class-grid",
+        "tile_cells": TILE_CELLS,
+        "crs": "EPSG:3857",
+        "origin": [bbox_3857[0], bbox_3857[3]],  # top-left corner of cell (0, 0)
+        "origin_4326": [round(float(lon_min), 6), round(float(lat_max), 6)],
+        "classes": [{"class": k, "height_min": class_range(k)[0], "height_max": class_range(k)[1]}
+                    for k in range(1, len(HEIGHT_CLASSES_M) + 1)],
+        "levels": levels,
+    }
+    raw = json.dumps(index, separators=(",", ":"))
+    (out_dir / "index.json").write_text(raw, encoding="utf-8")
+    return n_tiles, n_bytes + len(raw)
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
 def main():
-    env = load_env()
-    user = env.get("SKS_WMS_USER")
-    password = env.get("SKS_WMS_PASS")
-    if not user or not password:
+    import argparse
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--cell-size", type=float, default=CELL_SIZE_M, help=f"cell size in meters (default {CELL_SIZE_M})")
+    ap.add_argument("--oversample", type=int, default=OVERSAMPLE, help="source pixels per cell edge (default 1)")
+    ap.add_argument("--format", choices=("geojson", "merged", "tiles"), default="geojson",
+                    help="output format (default geojson, see module docstring)")
+    ap.add_argument("--offline", action="store_true", help="build from data/forest-height-cache only")
+    args = ap.parse_args()
+    if args.offline:
+        os.environ["RASTER_FETCH_OFFLINE"] = "1"
+    cell_size = args.cell_size
+    oversample = max(1, args.oversample)
+
+    env = {} if args.offline else load_env()
+    user = env.get("SKS_WMS_USER", "")
+    password = env.get("SKS_WMS_PASS", "")
+    if (not user or not password) and not args.offline:
         print("ERROR: SKS_WMS_USER and SKS_WMS_PASS must be set in .env.local")
         sys.exit(1)
 
-    print(f"Credentials: {user} / {'*' * len(password)}")
+    if args.offline:
+        print(f"Offline: building from {CACHE_DIR}")
+    else:
+        print(f"Credentials: {user} / {'*' * len(password)}")
 
     bbox_3857 = bbox_4326_to_3857(BBOX_4326)
     print(f"Bbox EPSG:4326: {BBOX_4326}")
@@ -319,64 +521,47 @@ def main():
     # Calculate raster size for target resolution
     extent_x = bbox_3857[2] - bbox_3857[0]
     extent_y = bbox_3857[3] - bbox_3857[1]
-    width = int(extent_x / CELL_SIZE_M)
-    height = int(extent_y / CELL_SIZE_M)
+    width = int(extent_x / cell_size) * oversample
+    height = int(extent_y / cell_size) * oversample
     print(f"Extent: {extent_x:.0f} x {extent_y:.0f} m")
-    print(f"Raster size: {width} x {height} px (one pixel per cell)")
+    print(f"Raster size: {width} x {height} px ({oversample}x{oversample} px per {cell_size:g} m cell)")
 
     # --- Strategy 1: Tradhojd_3_1 as TIFF ---
     print("\n=== Strategy 1: Tradhojd_3_1 (TIFF, float32) ===")
-    tiff_data = download_tiff(TRADHOJD_SERVICE, bbox_3857, width, height, user, password)
-
     data = None
     nodata = None
     is_dm = False
 
-    if tiff_data and len(tiff_data) > 100:
-        try:
-            data, nodata, _ = tiff_to_array(tiff_data)
-        except Exception as e:
-            print(f"  Failed to read TIFF: {e}")
+    got = fetch_raster(TRADHOJD_SERVICE, bbox_3857, width, height, user, password, fmt="tiff")
+    if got is not None:
+        data, nodata = got
 
     # --- Strategy 2: Tradhojd_3_1 as PNG ---
     if data is None:
         print("\n=== Strategy 2: Tradhojd_3_1 (PNG, 8-bit) ===")
-        png_data = download_png_raw(TRADHOJD_SERVICE, bbox_3857, width, height, user, password)
-        if png_data and len(png_data) > 100:
-            try:
-                data = png_to_array(png_data)
-                nodata = 0
-                is_dm = True  # PNG values likely in decimeters
-                print(f"  Treating as decimeters (will divide by 10)")
-            except Exception as e:
-                print(f"  Failed to read PNG: {e}")
+        got = fetch_raster(TRADHOJD_SERVICE, bbox_3857, width, height, user, password, fmt="png")
+        if got is not None:
+            data, nodata = got
+            is_dm = True  # PNG values likely in decimeters
+            print(f"  Treating as decimeters (will divide by 10)")
 
     # --- Strategy 3: SkogligaGrunddata band 1 ---
     if data is None:
         print("\n=== Strategy 3: SkogligaGrunddata_3_1 band 1 (tree height dm) ===")
-        tiff_data = download_tiff(
-            SKOGLIGA_SERVICE, bbox_3857, width, height, user, password, band_ids="1"
-        )
-        if tiff_data and len(tiff_data) > 100:
-            try:
-                data, nodata, _ = tiff_to_array(tiff_data)
-                is_dm = True
-                print(f"  SkogligaGrunddata band 1 = tree height in decimeters")
-            except Exception as e:
-                print(f"  Failed to read TIFF: {e}")
+        got = fetch_raster(SKOGLIGA_SERVICE, bbox_3857, width, height, user, password,
+                           fmt="tiff", band_ids="1")
+        if got is not None:
+            data, nodata = got
+            is_dm = True
+            print(f"  SkogligaGrunddata band 1 = tree height in decimeters")
 
         if data is None:
             # Try PNG fallback
-            png_data = download_png_raw(
-                SKOGLIGA_SERVICE, bbox_3857, width, height, user, password, band_ids="1"
-            )
-            if png_data and len(png_data) > 100:
-                try:
-                    data = png_to_array(png_data)
-                    nodata = 0
-                    is_dm = True
-                except Exception as e:
-                    print(f"  Failed to read PNG: {e}")
+            got = fetch_raster(SKOGLIGA_SERVICE, bbox_3857, width, height, user, password,
+                               fmt="png", band_ids="1")
+            if got is not None:
+                data, nodata = got
+                is_dm = True
 
     if data is None:
         print("\nERROR: All download strategies failed.")
@@ -393,8 +578,25 @@ def main():
     if is_dm:
         print(f"  (values in decimeters, will convert to meters)")
 
-    # Build GeoJSON (one polygon per pixel since we requested 1px = 1 cell)
-    geojson = build_geojson(data, nodata, bbox_3857, CELL_SIZE_M, CELL_SIZE_M, is_decimeters=is_dm)
+    if args.format == "tiles":
+        heights, cw, ch = raster_to_cells(data, nodata, bbox_3857, cell_size, cell_size, is_decimeters=is_dm)
+        n_tiles, n_bytes = write_grid_tiles(heights, bbox_3857, cw, ch, TILES_OUTPUT_DIR)
+        if n_tiles == 0:
+            print("WARNING: No tiles generated. Check data values and MIN_HEIGHT_M threshold.")
+            sys.exit(1)
+        print(f"\nWritten: {TILES_OUTPUT_DIR} ({n_tiles} tiles, {n_bytes / 1024 / 1024:.1f} MB total, "
+              f"{TILE_CELLS * TILE_CELLS / 1024:.0f} KB per tile)")
+        print("\nDone!")
+        return
+
+    if args.format == "merged":
+        heights, cw, ch = raster_to_cells(data, nodata, bbox_3857, cell_size, cell_size, is_decimeters=is_dm)
+        geojson = build_merged_geojson(heights, bbox_3857, cw, ch)
+        output_path = MERGED_OUTPUT_PATH
+    else:
+        # Build GeoJSON (one polygon per cell, each cell the mean of its pixel block)
+        geojson = build_geojson(data, nodata, bbox_3857, cell_size, cell_size, is_decimeters=is_dm)
+        output_path = OUTPUT_PATH
 
     n_features = len(geojson["features"])
     print(f"\nFeatures: {n_features}")
@@ -404,16 +606,16 @@ def main():
         sys.exit(1)
 
     # Write output
-    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
     raw = json.dumps(geojson, separators=(",", ":"))
-    OUTPUT_PATH.write_text(raw, encoding="utf-8")
+    output_path.write_text(raw, encoding="utf-8")
     size_mb = len(raw) / 1024 / 1024
-    print(f"Written: {OUTPUT_PATH}")
+    print(f"Written: {output_path}")
     print(f"Size: {size_mb:.1f} MB")
 
     if size_mb > 10:
         print(f"\nWARNING: File is {size_mb:.1f} MB (> 10 MB target).")
-        print("Consider increasing CELL_SIZE_M to 100 and re-running.")
+        print("Consider --format merged/tiles, or increasing --cell-size, and re-running.")
 
     print("\nDone!")
 
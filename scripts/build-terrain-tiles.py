@@ -6,21 +6,45 @@ and create Terrarium-encoded terrain tiles for MapLibre GL JS.
 Terrarium encoding: height = (R * 256 + G + B / 256) - 32768
 
 Reads LM_SYSTEM_USER and LM_SYSTEM_PASS from .env.local or environment variables.
+
+Tiles render in a process pool (--workers) and incrementally: manifest.json in
+the output dir remembers the DEM and every tile's hash, so a rebuild against an
+unchanged DEM is a no-op and a changed DEM only rewrites tiles whose bytes
+changed. --force re-renders everything.
+
+A no-op rebuild is decided before any network: if the downloaded input tiles
+and the merged DEM still have the size and mtime_ns recorded at the last
+build, the STAC search, download, merge and DEM hashing are all skipped. New
+tiles published upstream are therefore only picked up with --force (or after
+removing the manifest).
+
+DEM tiles are downloaded concurrently and resumably into data/terrain-tmp/,
+and the STAC search is cached there (see raster_fetch.py); --offline builds
+from that cache without credentials or network.
+
+--format mbtiles writes one SQLite archive (ARCHIVE_PATH) instead of the
+{z}/{x}/{y}.png tree, with identical tiles stored once. Serve it with
+scripts/tile_archive.py.
 """
 
 import base64
+import hashlib
 import json
 import math
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import numpy as np
-import requests
 import rasterio
 from rasterio.merge import merge
 from rasterio.warp import calculate_default_transform, reproject, Resampling
 from rasterio.transform import from_bounds
+import rasterio.windows
+
+import raster_fetch
+from tile_archive import MBTilesWriter, read_metadata, update_metadata
 
 # === CONFIG ===
 CENTER_LON = 15.85
@@ -30,10 +54,20 @@ MIN_ZOOM = 10
 MAX_ZOOM = 15
 TILE_SIZE = 256
 
+# Tile rendering fans out over this many processes (one DEM handle each)
+WORKERS = max(1, (os.cpu_count() or 2) - 1)
+# DEM pixels per cell of the coverage grid used to detect empty tiles before
+# paying for the full reprojection
+COVERAGE_BLOCK = 64
+MANIFEST_NAME = "manifest.json"
+# Concurrent DEM downloads
+DOWNLOAD_WORKERS = 4
+
 SCRIPT_DIR = Path(__file__).parent
 PROJECT_DIR = SCRIPT_DIR.parent
 OUTPUT_DIR = PROJECT_DIR / "public" / "terrain-tiles"
 TEMP_DIR = PROJECT_DIR / "data" / "terrain-tmp"
+ARCHIVE_PATH = PROJECT_DIR / "data" / "terrain-tiles.mbtiles"
 STAC_SEARCH_URL = "https://api.lantmateriet.se/stac-hojd/v1/search"
 
 
@@ -57,13 +91,12 @@ def load_env():
 
 
 def search_stac_tiles():
-    """Search STAC API for DEM tiles covering the area."""
+    """Search STAC API for DEM tiles covering the area (cached for --offline)."""
     bbox_str = ",".join(str(x) for x in SEARCH_BBOX)
-    url = f"{STAC_SEARCH_URL}?collections=mhm-62_5&bbox={bbox_str}&limit=50"
-    print(f"[STAC] Searching: {url}")
-    resp = requests.get(url, timeout=30)
-    resp.raise_for_status()
-    features = resp.json().get("features", [])
+    params = {"collections": "mhm-62_5", "bbox": bbox_str, "limit": "50"}
+    print(f"[STAC] Searching: {raster_fetch.build_url(STAC_SEARCH_URL, params)}")
+    features = raster_fetch.fetch_json(STAC_SEARCH_URL, params, cache_dir=TEMP_DIR / "stac",
+                                       refresh=True, timeout=30).get("features", [])
     print(f"[STAC] Found {len(features)} tiles")
     for f in features:
         bb = f["bbox"]
@@ -73,19 +106,26 @@ def search_stac_tiles():
 
 
 def download_tile(url, dest_path, auth):
-    """Download a single GeoTIFF tile with Basic Auth."""
-    if dest_path.exists() and dest_path.stat().st_size > 1000:
-        sz = dest_path.stat().st_size / 1024 / 1024
-        print(f"  [skip] {dest_path.name} ({sz:.1f} MB)")
-        return
-    print(f"  [download] {dest_path.name} ...", end="", flush=True)
-    resp = requests.get(url, auth=auth, timeout=120, stream=True)
-    resp.raise_for_status()
-    with open(str(dest_path), "wb") as f:
-        for chunk in resp.iter_content(chunk_size=1024 * 1024):
-            f.write(chunk)
+    """Download a single GeoTIFF tile with Basic Auth (resumes a .part file)."""
+    headers = raster_fetch.basic_auth(*auth) if auth else None
+    _, got = raster_fetch.fetch_to_file(url, dest_path, headers=headers, timeout=120)
     sz = dest_path.stat().st_size / 1024 / 1024
-    print(f" {sz:.1f} MB")
+    print(f"  [{'download' if got else 'skip'}] {dest_path.name} ({sz:.1f} MB)")
+
+
+def download_tiles(features, auth, workers=DOWNLOAD_WORKERS):
+    """Download all STAC tiles into TEMP_DIR, `workers` at a time."""
+    dests = [TEMP_DIR / f["assets"]["data"]["href"].split("/")[-1] for f in features]
+    results = raster_fetch.fetch_many(
+        [lambda f=f, d=d: download_tile(f["assets"]["data"]["href"], d, auth)
+         for f, d in zip(features, dests)], workers)
+    failed = [(d, r) for d, r in zip(dests, results) if isinstance(r, Exception)]
+    for d, err in failed:
+        print(f"  [error] {d.name}: {err}")
+    if failed:
+        print(f"ERROR: {len(failed)} of {len(dests)} tiles missing")
+        sys.exit(1)
+    return dests
 
 
 def merge_and_reproject(tif_paths, output_path):
@@ -174,23 +214,19 @@ def encode_terrarium(height_array):
     return np.stack([r, g, b], axis=0)
 
 
-def write_png(path, rgb_array):
-    """Write a 3-band uint8 array as PNG without Pillow."""
+def encode_png(rgb_array):
+    """Encode a 3-band uint8 array as PNG bytes without Pillow."""
     import struct
     import zlib
 
     channels, height, width = rgb_array.shape
     assert channels == 3
 
-    raw_data = bytearray()
-    for y in range(height):
-        raw_data.append(0)  # filter byte
-        for x in range(width):
-            raw_data.append(int(rgb_array[0, y, x]))
-            raw_data.append(int(rgb_array[1, y, x]))
-            raw_data.append(int(rgb_array[2, y, x]))
+    # Scanlines: filter byte 0 followed by interleaved RGB
+    rows = np.ascontiguousarray(np.transpose(rgb_array, (1, 2, 0))).reshape(height, width * 3)
+    raw_data = np.hstack([np.zeros((height, 1), dtype=np.uint8), rows]).tobytes()
 
-    compressed = zlib.compress(bytes(raw_data), 9)
+    compressed = zlib.compress(raw_data, 9)
 
     def chunk(chunk_type, data):
         c = chunk_type + data
@@ -201,13 +237,223 @@ def write_png(path, rgb_array):
     png += chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
     png += chunk(b"IDAT", compressed)
     png += chunk(b"IEND", b"")
+    return png
 
+
+def write_png(path, rgb_array):
+    """Write a 3-band uint8 array as PNG without Pillow."""
     with open(str(path), "wb") as f:
-        f.write(png)
+        f.write(encode_png(rgb_array))
+
+
+def tile_candidates(dem_bounds, min_zoom, max_zoom):
+    """All (z, x, y) whose 3857 bounds intersect the DEM, per zoom."""
+    from rasterio.warp import transform as warp_transform
+    corners_3857_x = [dem_bounds.left, dem_bounds.right]
+    corners_3857_y = [dem_bounds.bottom, dem_bounds.top]
+    corners_4326 = warp_transform("EPSG:3857", "EPSG:4326", corners_3857_x, corners_3857_y)
+    lon_min, lon_max = corners_4326[0][0], corners_4326[0][1]
+    lat_min, lat_max = corners_4326[1][0], corners_4326[1][1]
+
+    per_zoom = {}
+    for zoom in range(min_zoom, max_zoom + 1):
+        tx_min, ty_max = lat_lon_to_tile(lat_min, lon_min, zoom)
+        tx_max, ty_min = lat_lon_to_tile(lat_max, lon_max, zoom)
+        if tx_min > tx_max: tx_min, tx_max = tx_max, tx_min
+        if ty_min > ty_max: ty_min, ty_max = ty_max, ty_min
+
+        tiles = []
+        for tx in range(tx_min, tx_max + 1):
+            for ty in range(ty_min, ty_max + 1):
+                t_minx, t_miny, t_maxx, t_maxy = tile_bounds_3857(tx, ty, zoom)
+                if (t_maxx < dem_bounds.left or t_minx > dem_bounds.right or
+                        t_maxy < dem_bounds.bottom or t_miny > dem_bounds.top):
+                    continue
+                tiles.append((zoom, tx, ty))
+        per_zoom[zoom] = tiles
+    return per_zoom
+
+
+def coverage_grid(src, block=COVERAGE_BLOCK):
+    """Boolean grid, one cell per block x block DEM pixels: does the block
+    hold any real height (non-zero, finite, not nodata)? One pass over the
+    DEM, read in row strips, so memory stays at one strip."""
+    rows = -(-src.height // block)
+    cols = -(-src.width // block)
+    grid = np.zeros((rows, cols), dtype=bool)
+    for r in range(rows):
+        win = rasterio.windows.Window(0, r * block, src.width, min(block, src.height - r * block))
+        strip = src.read(1, window=win)
+        real = np.isfinite(strip) & (strip != 0)
+        if src.nodata is not None:
+            real &= strip != src.nodata
+        pad = cols * block - src.width
+        if pad:
+            real = np.pad(real, ((0, 0), (0, pad)))
+        grid[r] = real.reshape(real.shape[0], cols, block).any(axis=(0, 2))
+    return grid
+
+
+def tile_is_empty(src, coverage, bounds, block=COVERAGE_BLOCK):
+    """Cheap pre-check: the tile is empty if no coverage cell under its
+    bounds (plus one cell of margin for bilinear edges) holds real data."""
+    inv = ~src.transform
+    c0, r0 = inv * (bounds[0], bounds[3])
+    c1, r1 = inv * (bounds[2], bounds[1])
+    r_lo = max(0, int(math.floor(min(r0, r1) / block)) - 1)
+    r_hi = min(coverage.shape[0], int(math.floor(max(r0, r1) / block)) + 2)
+    c_lo = max(0, int(math.floor(min(c0, c1) / block)) - 1)
+    c_hi = min(coverage.shape[1], int(math.floor(max(c0, c1) / block)) + 2)
+    if r_lo >= r_hi or c_lo >= c_hi:
+        return True
+    return not coverage[r_lo:r_hi, c_lo:c_hi].any()
+
+
+# One open DEM (and its coverage grid) per worker process, set by _init_worker
+_DEM = None
+_COVERAGE = None
+
+
+def _init_worker(dem_path, coverage):
+    global _DEM, _COVERAGE
+    _DEM = rasterio.open(str(dem_path))
+    _COVERAGE = coverage
+
+
+def render_tile(src, coverage, zoom, tx, ty):
+    """Reproject + Terrarium-encode one tile. Returns PNG bytes, or None if empty."""
+    bounds = tile_bounds_3857(tx, ty, zoom)
+    if tile_is_empty(src, coverage, bounds):
+        return None
+
+    tile_transform = from_bounds(*bounds, TILE_SIZE, TILE_SIZE)
+    tile_data = np.zeros((1, TILE_SIZE, TILE_SIZE), dtype=np.float32)
+    reproject(
+        source=rasterio.band(src, 1),
+        destination=tile_data[0],
+        src_transform=src.transform,
+        src_crs=src.crs,
+        dst_transform=tile_transform,
+        dst_crs="EPSG:3857",
+        resampling=Resampling.bilinear,
+    )
+
+    valid = tile_data[0][tile_data[0] != 0]
+    if len(valid) == 0:
+        return None
+
+    if src.nodata is not None:
+        tile_data[0][tile_data[0] == src.nodata] = 0
+
+    return encode_png(encode_terrarium(tile_data[0]))
+
+
+def _render_in_worker(zxy):
+    return zxy, render_tile(_DEM, _COVERAGE, *zxy)
+
+
+def dem_fingerprint(dem_path):
+    """Content hash of the DEM plus render parameters. Tiles only depend on these."""
+    h = hashlib.sha256()
+    with open(str(dem_path), "rb") as f:
+        for block in iter(lambda: f.read(4 * 1024 * 1024), b""):
+            h.update(block)
+    h.update(json.dumps({"tile_size": TILE_SIZE, "encoding": "terrarium"}).encode())
+    return h.hexdigest()
+
+
+def load_manifest(output_dir):
+    try:
+        return json.loads((Path(output_dir) / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_dir, manifest):
+    path = Path(output_dir) / MANIFEST_NAME
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def stat_of(path):
+    st = os.stat(str(path))
+    return [st.st_size, st.st_mtime_ns]
 
 
-def generate_terrain_tiles(dem_path, output_dir, min_zoom, max_zoom):
-    """Generate Terrarium-encoded PNG tiles from the reprojected DEM."""
+def input_stats(tif_paths):
+    """{file name in TEMP_DIR: [size, mtime_ns]} of the downloaded DEM tiles."""
+    return {Path(p).name: stat_of(p) for p in tif_paths}
+
+
+def inputs_unchanged(previous, dem_path, zooms):
+    """True if `previous` (manifest/archive build info) was built from input
+    tiles and a merged DEM that still have the recorded size + mtime_ns, for
+    the same zoom range. Stat calls only — no network, no hashing."""
+    if previous.get("zooms") != zooms or not previous.get("inputs"):
+        return False
+    try:
+        return (previous.get("dem_stat") == stat_of(dem_path)
+                and all(stat_of(TEMP_DIR / name) == st for name, st in previous["inputs"].items()))
+    except OSError:
+        return False
+
+
+def build_up_to_date(fmt, dem_path, zooms):
+    """The pre-network no-op check in main (see the module docstring)."""
+    if fmt == "mbtiles":
+        return inputs_unchanged(json.loads(read_metadata(ARCHIVE_PATH).get("build", "{}")),
+                                dem_path, zooms)
+    manifest = load_manifest(OUTPUT_DIR)
+    return (inputs_unchanged(manifest, dem_path, zooms)
+            and all((OUTPUT_DIR / f"{k}.png").exists() for k in manifest.get("tiles", {})))
+
+
+def dem_unchanged(previous, dem_path, zooms):
+    """True if `previous` (manifest/archive build info) was rendered from the
+    same DEM and zoom range. Size+mtime is the fast path; a touched but
+    byte-identical DEM is caught by the content hash."""
+    if previous.get("zooms") != zooms:
+        return False
+    if previous.get("dem_stat") == stat_of(dem_path):
+        return True
+    return bool(previous.get("dem_hash")) and previous["dem_hash"] == dem_fingerprint(dem_path)
+
+
+def _candidate_list(dem_bounds, min_zoom, max_zoom, workers):
+    per_zoom = tile_candidates(dem_bounds, min_zoom, max_zoom)
+    for zoom, tiles in per_zoom.items():
+        print(f"[tiles] Zoom {zoom}: {len(tiles)} candidates")
+    all_tiles = [zxy for zoom in sorted(per_zoom) for zxy in per_zoom[zoom]]
+    print(f"[tiles] Rendering {len(all_tiles)} candidates on {workers} worker(s)")
+    return all_tiles
+
+
+def render_all_tiles(dem_path, tiles, workers=WORKERS):
+    """Yield (zxy, png bytes or None) for every candidate, rendered in a
+    process pool with one DEM handle per worker (serial when workers == 1)."""
+    with rasterio.open(str(dem_path)) as src:
+        coverage = coverage_grid(src)
+        print(f"[tiles] Coverage: {coverage.mean():.0%} of DEM blocks hold data")
+        if workers <= 1 or len(tiles) < 2:
+            for zxy in tiles:
+                yield zxy, render_tile(src, coverage, *zxy)
+            return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(str(dem_path), coverage)) as pool:
+        yield from pool.map(_render_in_worker, tiles, chunksize=16)
+
+
+def generate_terrain_tiles(dem_path, output_dir, min_zoom, max_zoom, workers=WORKERS, force=False,
+                           inputs=None):
+    """Generate Terrarium-encoded PNG tiles from the reprojected DEM.
+
+    Incremental: manifest.json in output_dir records the DEM's stat + content
+    hash and the hash of every tile written. If the DEM is unchanged (same
+    size/mtime, or same content hash) and every tile is still on disk, nothing
+    is rendered. Otherwise all tiles are rendered, but only tiles whose bytes
+    changed are rewritten and tiles that no longer exist are removed.
+    `inputs` (input_stats of the DEM tiles) is recorded for build_up_to_date."""
     output_dir = Path(output_dir)
 
     with rasterio.open(str(dem_path)) as src:
@@ -215,80 +461,144 @@ def generate_terrain_tiles(dem_path, output_dir, min_zoom, max_zoom):
         print(f"\n[tiles] DEM bounds (3857): {dem_bounds}")
         print(f"[tiles] DEM shape: {src.width}x{src.height}")
 
-    total_tiles = 0
+    dem_stat = stat_of(dem_path)
+    zooms = [min_zoom, max_zoom]
+    manifest = load_manifest(output_dir)
+    old_tiles = manifest.get("tiles", {})
+
+    if not force and dem_unchanged(manifest, dem_path, zooms):
+        if all((output_dir / f"{k}.png").exists() for k in old_tiles):
+            if manifest.get("dem_stat") != dem_stat or manifest.get("inputs") != inputs:
+                manifest["dem_stat"] = dem_stat
+                manifest["inputs"] = inputs
+                save_manifest(output_dir, manifest)
+            print(f"[tiles] DEM unchanged — {len(old_tiles)} tiles up to date, nothing to do")
+            return len(old_tiles)
+
+    all_tiles = _candidate_list(dem_bounds, min_zoom, max_zoom, workers)
+    new_tiles = {}
+    written = unchanged = 0
+    zoom_count = {z: 0 for z in range(min_zoom, max_zoom + 1)}
+    for (zoom, tx, ty), png in render_all_tiles(dem_path, all_tiles, workers):
+        if png is None:
+            continue
+        key = f"{zoom}/{tx}/{ty}"
+        digest = hashlib.sha1(png).hexdigest()
+        new_tiles[key] = digest
+        zoom_count[zoom] += 1
+        tile_path = output_dir / f"{key}.png"
+        if old_tiles.get(key) == digest and tile_path.exists():
+            unchanged += 1
+            continue
+        tile_path.parent.mkdir(parents=True, exist_ok=True)
+        tile_path.write_bytes(png)
+        written += 1
+
+    removed = 0
+    for key in set(old_tiles) - set(new_tiles):
+        try:
+            (output_dir / f"{key}.png").unlink()
+            removed += 1
+        except OSError:
+            pass
+
+    for zoom in sorted(zoom_count):
+        print(f"[tiles] Zoom {zoom}: {zoom_count[zoom]} tiles")
+    total_tiles = len(new_tiles)
+    print(f"\n[tiles] Total: {total_tiles} tiles ({written} written, {unchanged} unchanged, {removed} removed)")
+
+    save_manifest(output_dir, {
+        "zooms": zooms,
+        "dem_stat": dem_stat,
+        "dem_hash": dem_fingerprint(dem_path),
+        "inputs": inputs,
+        "tiles": new_tiles,
+    })
+    return total_tiles
 
-    for zoom in range(min_zoom, max_zoom + 1):
-        from rasterio.warp import transform as warp_transform
-        corners_3857_x = [dem_bounds.left, dem_bounds.right]
-        corners_3857_y = [dem_bounds.bottom, dem_bounds.top]
-        corners_4326 = warp_transform("EPSG:3857", "EPSG:4326", corners_3857_x, corners_3857_y)
-        lon_min, lon_max = corners_4326[0][0], corners_4326[0][1]
-        lat_min, lat_max = corners_4326[1][0], corners_4326[1][1]
 
-        tx_min, ty_max = lat_lon_to_tile(lat_min, lon_min, zoom)
-        tx_max, ty_min = lat_lon_to_tile(lat_max, lon_max, zoom)
-        if tx_min > tx_max: tx_min, tx_max = tx_max, tx_min
-        if ty_min > ty_max: ty_min, ty_max = ty_max, ty_min
+def generate_terrain_archive(dem_path, archive_path, min_zoom, max_zoom, bounds_data,
+                             workers=WORKERS, force=False, inputs=None):
+    """Like generate_terrain_tiles, but into one MBTiles archive. Identical
+    tiles (flat water, uniform plateaus) are stored once. The build info in
+    the archive's metadata makes an unchanged DEM a no-op."""
+    archive_path = Path(archive_path)
+    zooms = [min_zoom, max_zoom]
+    meta = read_metadata(archive_path)
+    previous = json.loads(meta.get("build", "{}"))
+    if not force and dem_unchanged(previous, dem_path, zooms):
+        dem_stat = stat_of(dem_path)
+        if previous.get("dem_stat") != dem_stat or previous.get("inputs") != inputs:
+            update_metadata(archive_path, {"build": {**previous, "dem_stat": dem_stat, "inputs": inputs}})
+        print(f"[archive] DEM unchanged — {archive_path.name} up to date, nothing to do")
+        return previous.get("tiles", 0)
 
-        n_tiles = (tx_max - tx_min + 1) * (ty_max - ty_min + 1)
-        print(f"\n[tiles] Zoom {zoom}: x={tx_min}-{tx_max}, y={ty_min}-{ty_max} ({n_tiles} candidates)")
-
-        zoom_count = 0
-        with rasterio.open(str(dem_path)) as src:
-            for tx in range(tx_min, tx_max + 1):
-                for ty in range(ty_min, ty_max + 1):
-                    t_minx, t_miny, t_maxx, t_maxy = tile_bounds_3857(tx, ty, zoom)
-
-                    if (t_maxx < dem_bounds.left or t_minx > dem_bounds.right or
-                            t_maxy < dem_bounds.bottom or t_miny > dem_bounds.top):
-                        continue
-
-                    tile_transform = from_bounds(t_minx, t_miny, t_maxx, t_maxy, TILE_SIZE, TILE_SIZE)
-                    tile_data = np.zeros((1, TILE_SIZE, TILE_SIZE), dtype=np.float32)
-                    reproject(
-                        source=rasterio.band(src, 1),
-                        destination=tile_data[0],
-                        src_transform=src.transform,
-                        src_crs=src.crs,
-                        dst_transform=tile_transform,
-                        dst_crs="EPSG:3857",
-                        resampling=Resampling.bilinear,
-                    )
-
-                    valid = tile_data[0][tile_data[0] != 0]
-                    if len(valid) == 0:
-                        continue
-
-                    if src.nodata is not None:
-                        tile_data[0][tile_data[0] == src.nodata] = 0
-
-                    rgb = encode_terrarium(tile_data[0])
-
-                    tile_dir = output_dir / str(zoom) / str(tx)
-                    tile_dir.mkdir(parents=True, exist_ok=True)
-                    tile_path = tile_dir / f"{ty}.png"
-                    write_png(tile_path, rgb)
-                    zoom_count += 1
-
-        total_tiles += zoom_count
-        print(f"[tiles] Zoom {zoom}: {zoom_count} tiles written")
-
-    print(f"\n[tiles] Total: {total_tiles} tiles")
-    return total_tiles
+    with rasterio.open(str(dem_path)) as src:
+        dem_bounds = src.bounds
+    all_tiles = _candidate_list(dem_bounds, min_zoom, max_zoom, workers)
+
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    w, s, e, n = bounds_data["bbox"]
+    writer = MBTilesWriter(archive_path, {
+        "name": "terrain",
+        "format": "png",
+        "type": "baselayer",
+        "encoding": "terrarium",
+        "minzoom": str(min_zoom),
+        "maxzoom": str(max_zoom),
+        "bounds": f"{w},{s},{e},{n}",
+        "center": f"{bounds_data['center'][0]},{bounds_data['center'][1]},{min_zoom}",
+    })
+    with writer:
+        for (zoom, tx, ty), png in render_all_tiles(dem_path, all_tiles, workers):
+            if png is not None:
+                writer.add(zoom, tx, ty, png)
+        writer.metadata["bounds_json"] = {**bounds_data, "tileCount": writer.tiles}
+        writer.metadata["build"] = {
+            "zooms": zooms,
+            "dem_stat": stat_of(dem_path),
+            "dem_hash": dem_fingerprint(dem_path),
+            "inputs": inputs,
+            "tiles": writer.tiles,
+        }
+    print(f"\n[archive] {writer.tiles} tiles, {writer.unique} unique -> {archive_path}")
+    return writer.tiles
 
 
 def main():
+    import argparse
+    ap = argparse.ArgumentParser(description="Lantmateriet DEM -> Terrarium terrain tiles")
+    ap.add_argument("--workers", type=int, default=WORKERS, help=f"render processes (default {WORKERS})")
+    ap.add_argument("--force", action="store_true", help="ignore the manifest and re-render every tile")
+    ap.add_argument("--offline", action="store_true",
+                    help=f"build from the download cache in {TEMP_DIR.name}/ only")
+    ap.add_argument("--format", choices=["dir", "mbtiles"], default="dir",
+                    help=f"dir: {{z}}/{{x}}/{{y}}.png tree in {OUTPUT_DIR.name}/ (default); "
+                         f"mbtiles: single archive {ARCHIVE_PATH.name}")
+    args = ap.parse_args()
+
     print("=" * 60)
     print("Lantmateriet 1m DEM -> Terrarium terrain tiles")
     print("=" * 60)
 
-    # Load credentials
-    user, passwd = load_env()
-    auth = (user, passwd)
-    print(f"[auth] Using LM_SYSTEM_USER={user}")
+    if args.offline:
+        os.environ["RASTER_FETCH_OFFLINE"] = "1"
+        auth = None
+        print(f"[offline] Building from {TEMP_DIR}")
+    else:
+        # Load credentials
+        user, passwd = load_env()
+        auth = (user, passwd)
+        print(f"[auth] Using LM_SYSTEM_USER={user}")
 
     TEMP_DIR.mkdir(parents=True, exist_ok=True)
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    merged_path = TEMP_DIR / "merged_3857.tif"
+
+    # Step 0: Nothing changed since the last build? Then no network at all
+    if not args.force and build_up_to_date(args.format, merged_path, [MIN_ZOOM, MAX_ZOOM]):
+        print("[build] Input tiles and merged DEM unchanged (size/mtime) — nothing to do")
+        return
 
     # Step 1: Search STAC for tiles
     features = search_stac_tiles()
@@ -299,32 +609,38 @@ def main():
     # Step 2: Download tiles
     total_size_est = sum(f["assets"]["data"].get("file:size", 10_000_000) for f in features)
     print(f"\n[download] {len(features)} tiles (~{total_size_est / 1024 / 1024:.0f} MB) -> {TEMP_DIR}")
-    tif_paths = []
-    for f in features:
-        asset = f["assets"]["data"]
-        url = asset["href"]
-        filename = url.split("/")[-1]
-        dest = TEMP_DIR / filename
-        download_tile(url, dest, auth)
-        tif_paths.append(dest)
+    tif_paths = download_tiles(features, auth)
 
     # Step 3: Merge and reproject
-    merged_path = TEMP_DIR / "merged_3857.tif"
     merge_and_reproject(tif_paths, merged_path)
 
-    # Step 4: Generate terrain tiles
-    total = generate_terrain_tiles(merged_path, OUTPUT_DIR, MIN_ZOOM, MAX_ZOOM)
-
-    # Step 5: Write bounds metadata
-    bounds_file = OUTPUT_DIR / "bounds.json"
     bounds_data = {
         "center": [CENTER_LON, CENTER_LAT],
         "bbox": SEARCH_BBOX,
         "minZoom": MIN_ZOOM,
         "maxZoom": MAX_ZOOM,
-        "tileCount": total,
         "encoding": "terrarium",
     }
+
+    # Step 4: Generate terrain tiles
+    if args.format == "mbtiles":
+        total = generate_terrain_archive(merged_path, ARCHIVE_PATH, MIN_ZOOM, MAX_ZOOM, bounds_data,
+                                         workers=args.workers, force=args.force,
+                                         inputs=input_stats(tif_paths))
+        print(f"\n{'=' * 60}")
+        print(f"DONE! {total} terrain tiles in {ARCHIVE_PATH}")
+        print(f"Archive size: {ARCHIVE_PATH.stat().st_size / 1024 / 1024:.1f} MB")
+        print(f"Serve: python scripts/tile_archive.py serve {ARCHIVE_PATH}")
+        print(f"{'=' * 60}")
+        return
+
+    total = generate_terrain_tiles(merged_path, OUTPUT_DIR, MIN_ZOOM, MAX_ZOOM,
+                                   workers=args.workers, force=args.force,
+                                   inputs=input_stats(tif_paths))
+
+    # Step 5: Write bounds metadata
+    bounds_file = OUTPUT_DIR / "bounds.json"
+    bounds_data = {**bounds_data, "tileCount": total}
     with open(str(bounds_file), "w") as f:
         json.dump(bounds_data, f, indent=2)
 
@@ -24,6 +24,9 @@ except ImportError:
     print("Saknat bibliotek. Kor: py -m pip install requests")
     sys.exit(1)
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from supabase_hamtning import hamta_rader
+
 # ============================================================
 # KONFIGURATION
 # ============================================================
@@ -267,34 +270,126 @@ def create_objekt_from_dim(dim_data: dict, hpr_name: str) -> Optional[str]:
 # STEG 3: Koordinat-matchning
 # ============================================================
 
-def match_objekt_by_coords(fil_id: str, objekt_coords: list) -> Optional[str]:
-    """Matcha namnlos HPR-fil mot narmaste objekt via stammarnas koordinater."""
-    resp = requests.get(
-        f"{SUPABASE_URL}/rest/v1/hpr_stammar?select=lat,lng&hpr_fil_id=eq.{fil_id}&lat=not.is.null&limit=1",
-        headers=HEADERS, timeout=15
-    )
-    if resp.status_code != 200:
-        return None
-    rows = resp.json()
-    if not rows or not rows[0].get('lat'):
+MAX_MATCH_KM = 2.0
+KM_PER_GRAD_LAT = 111.0
+LNG_FAKTOR = 0.55        # cos(56.6°) — km per grad lng relativt lat, kring Kompersmala
+CENTROID_CHUNK = 500     # fil-id per RPC-anrop (request-storlek)
+
+
+def _rpc(namn: str, args: dict):
+    """POST /rpc/<namn>. None om funktionen saknas (migrationen ej kord)."""
+    resp = requests.post(f"{SUPABASE_URL}/rest/v1/rpc/{namn}", json=args,
+                         headers=HEADERS, timeout=120)
+    if resp.status_code in (404, 400) and 'function' in resp.text.lower():
         return None
+    resp.raise_for_status()
+    return resp.json()
+
+
+def fetch_centroids(fil_ids: List[str]) -> Dict[str, dict]:
+    """Median-koordinat + bbox per HPR-fil: {fil_id: {lat, lng, lat_min, ..., stammar}}.
+
+    Ett RPC-anrop (hpr_fil_centroider) per CENTROID_CHUNK filer. Utan
+    migrationen: en GET per fil, men median over ALLA stammar i stallet for
+    den forsta — samma robusthet, gamla antalet rundresor."""
+    result = {}
+    fil_ids = [str(i) for i in fil_ids]
+    for i in range(0, len(fil_ids), CENTROID_CHUNK):
+        chunk = fil_ids[i:i + CENTROID_CHUNK]
+        rows = _rpc('hpr_fil_centroider', {'p_fil_ids': chunk})
+        if rows is None:
+            log.warning("  hpr_fil_centroider saknas (kor migration 20261020) - hamtar per fil")
+            return _fetch_centroids_per_fil(fil_ids)
+        for r in rows:
+            result[r['hpr_fil_id']] = r
+    return result
+
+
+def _median(v: List[float]) -> float:
+    v = sorted(v)
+    n = len(v)
+    return v[n // 2] if n % 2 else (v[n // 2 - 1] + v[n // 2]) / 2
+
+
+def _fetch_centroids_per_fil(fil_ids: List[str]) -> Dict[str, dict]:
+    result = {}
+    for fil_id in fil_ids:
+        resp = requests.get(
+            f"{SUPABASE_URL}/rest/v1/hpr_stammar?select=lat,lng&hpr_fil_id=eq.{fil_id}"
+            f"&lat=not.is.null&lng=not.is.null&limit=10000",
+            headers=HEADERS, timeout=30
+        )
+        if resp.status_code != 200 or not resp.json():
+            continue
+        lats = [r['lat'] for r in resp.json()]
+        lngs = [r['lng'] for r in resp.json()]
+        result[fil_id] = {'hpr_fil_id': fil_id, 'lat': _median(lats), 'lng': _median(lngs),
+                          'lat_min': min(lats), 'lat_max': max(lats),
+                          'lng_min': min(lngs), 'lng_max': max(lngs), 'stammar': len(lats)}
+    return result
+
+
+def _km_xy(lat: float, lng: float) -> Tuple[float, float]:
+    """Lokal plan projektion i km (samma ekvirektangular som forut)."""
+    return lng * LNG_FAKTOR * KM_PER_GRAD_LAT, lat * KM_PER_GRAD_LAT
 
-    stam_lat = rows[0]['lat']
-    stam_lng = rows[0]['lng']
 
-    best_dist = 2.0  # km
-    best_uuid = None
+def build_grid_index(objekt_coords: list, cell_km: float = MAX_MATCH_KM) -> Dict[Tuple[int, int], list]:
+    """Rutnatsindex over objektkoordinater: (cx, cy) -> [(x, y, uuid)].
+    Med cellstorlek = max avstand racker det att leta i 3x3 celler."""
+    grid = {}
     for obj in objekt_coords:
         if not obj.get('lat') or not obj.get('lng'):
             continue
-        dlat = stam_lat - obj['lat']
-        dlng = stam_lng - obj['lng']
-        dist_km = math.sqrt(dlat**2 + (dlng * 0.55)**2) * 111
-        if dist_km < best_dist:
-            best_dist = dist_km
-            best_uuid = obj['id']
-
-    return best_uuid
+        x, y = _km_xy(obj['lat'], obj['lng'])
+        grid.setdefault((int(x // cell_km), int(y // cell_km)), []).append((x, y, obj['id']))
+    return grid
+
+
+def nearest_objekt(grid: dict, lat: float, lng: float,
+                   max_km: float = MAX_MATCH_KM) -> Tuple[Optional[str], float]:
+    """Narmaste objekt inom max_km fran (lat, lng): (uuid, avstand_km) eller (None, inf)."""
+    x, y = _km_xy(lat, lng)
+    cx, cy = int(x // max_km), int(y // max_km)
+    best_uuid, best_dist = None, max_km
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            for ox, oy, uuid in grid.get((cx + dx, cy + dy), ()):
+                dist = math.hypot(x - ox, y - oy)
+                if dist < best_dist:
+                    best_uuid, best_dist = uuid, dist
+    return best_uuid, (best_dist if best_uuid else math.inf)
+
+
+def match_all_by_coords(fil_ids: List[str], objekt_coords: list) -> Dict[str, str]:
+    """Matcha namnlosa HPR-filer mot narmaste objekt i ett svep: {fil_id: objekt_uuid}.
+
+    Fran filens median-stamkoordinat. Ligger ingen objektpunkt inom
+    MAX_MATCH_KM (stora trakter dar objektets punkt sitter i kanten) tas
+    narmaste objekt vars punkt ligger INNE i filens stam-bbox."""
+    if not fil_ids or not objekt_coords:
+        return {}
+    grid = build_grid_index(objekt_coords)
+    centroids = fetch_centroids(fil_ids)
+    log.info(f"  {len(centroids)}/{len(fil_ids)} namnlosa filer har stamkoordinater")
+
+    matches = {}
+    for fil_id, c in centroids.items():
+        uuid, _ = nearest_objekt(grid, c['lat'], c['lng'])
+        if not uuid:
+            inne = [o for o in objekt_coords if o.get('lat') and o.get('lng')
+                    and c['lat_min'] <= o['lat'] <= c['lat_max']
+                    and c['lng_min'] <= o['lng'] <= c['lng_max']]
+            if inne:
+                cx, cy = _km_xy(c['lat'], c['lng'])
+
+                def _avstand(o):
+                    ox, oy = _km_xy(o['lat'], o['lng'])
+                    return math.hypot(cx - ox, cy - oy)
+                uuid = min(inne, key=_avstand)['id']
+        if uuid:
+            matches[fil_id] = uuid
+    return matches
 
 
 # ============================================================
@@ -302,41 +397,52 @@ def match_objekt_by_coords(fil_id: str, objekt_coords: list) -> Optional[str]:
 # ============================================================
 
 def fetch_all_hpr_filer():
-    """Hamta alla hpr_filer-rader."""
-    all_rows = []
-    offset = 0
-    page_size = 500
-    while True:
-        resp = requests.get(
-            f"{SUPABASE_URL}/rest/v1/hpr_filer?select=id,filnamn,maskin_id,objekt_id&order=filnamn&offset={offset}&limit={page_size}",
-            headers=HEADERS, timeout=30
-        )
-        if resp.status_code != 200:
-            break
-        rows = resp.json()
-        if not rows:
-            break
-        all_rows.extend(rows)
-        if len(rows) < page_size:
-            break
-        offset += page_size
-    return all_rows
-
-
-def update_hpr_fil(fil_id: str, maskin_uuid: Optional[str], objekt_uuid: Optional[str]) -> bool:
-    """Uppdatera en hpr_filer-rad."""
-    patch = {}
-    if maskin_uuid:
-        patch['maskin_id'] = maskin_uuid
-    if objekt_uuid:
-        patch['objekt_id'] = objekt_uuid
-    if not patch:
-        return True
-    resp = requests.patch(
-        f"{SUPABASE_URL}/rest/v1/hpr_filer?id=eq.{fil_id}",
-        json=patch, headers=HEADERS, timeout=30
-    )
-    return resp.status_code in [200, 204]
+    """Hamta alla hpr_filer-rader (keyset pa filnamn, samma ordning som forr)."""
+    try:
+        return list(hamta_rader(SUPABASE_URL, 'hpr_filer', HEADERS,
+                                select='id,filnamn,maskin_id,objekt_id',
+                                nyckel='filnamn', timeout=30))
+    except Exception as e:
+        log.warning(f"Kunde inte hamta hpr_filer: {e}")
+        return []
+
+
+def bulk_update_hpr_filer(uppdateringar: List[dict]) -> Tuple[int, int]:
+    """Skriv alla kopplingar: [{id, maskin_id?, objekt_id?}] -> (ok, misslyckade).
+
+    Ett anrop (hpr_filer_koppla). Utan migrationen: en PATCH per unik
+    (maskin, objekt)-kombination med id=in.(...) - fa anrop, inte ett per rad."""
+    if not uppdateringar:
+        return 0, 0
+    rader = [{'id': u['id'], 'maskin_id': u.get('maskin_id'), 'objekt_id': u.get('objekt_id')}
+             for u in uppdateringar]
+    try:
+        n = _rpc('hpr_filer_koppla', {'p_rader': rader})
+    except requests.RequestException as e:
+        log.error(f"  hpr_filer_koppla misslyckades: {e}")
+        return 0, len(rader)
+    if n is not None:
+        return n, len(rader) - n
+
+    log.warning("  hpr_filer_koppla saknas (kor migration 20261020) - PATCH per grupp")
+    grupper: Dict[Tuple[Optional[str], Optional[str]], List[str]] = {}
+    for r in rader:
+        grupper.setdefault((r['maskin_id'], r['objekt_id']), []).append(r['id'])
+    ok = fel = 0
+    for (maskin_uuid, objekt_uuid), ids in grupper.items():
+        patch = {k: v for k, v in (('maskin_id', maskin_uuid), ('objekt_id', objekt_uuid)) if v}
+        for i in range(0, len(ids), 100):
+            bit = ids[i:i + 100]
+            resp = requests.patch(
+                f"{SUPABASE_URL}/rest/v1/hpr_filer?id=in.({','.join(bit)})",
+                json=patch, headers=HEADERS, timeout=30
+            )
+            if resp.status_code in [200, 204]:
+                ok += len(bit)
+            else:
+                fel += len(bit)
+                log.error(f"  PATCH misslyckades ({len(bit)} rader): {resp.status_code} {resp.text[:200]}")
+    return ok, fel
 
 
 # ============================================================
@@ -440,18 +546,22 @@ def main():
     log.info(f"  Misslyckade:       {create_failed}")
 
     # Steg 4: Hamta objekt med koordinater (for geo-matchning av namnlosa filer)
-    resp = requests.get(
-        f"{SUPABASE_URL}/rest/v1/objekt?select=id,namn,lat,lng&lat=not.is.null&limit=200",
-        headers=HEADERS, timeout=30
-    )
-    objekt_coords = resp.json() if resp.status_code == 200 else []
+    try:
+        objekt_coords = list(hamta_rader(SUPABASE_URL, 'objekt', HEADERS, select='id,namn,lat,lng',
+                                         filter='lat=not.is.null', timeout=30))
+    except Exception as e:
+        log.warning(f"Kunde inte hamta objekt-koordinater: {e}")
+        objekt_coords = []
     log.info(f"\n  {len(objekt_coords)} objekt med koordinater for geo-matchning")
 
+    # Namnlosa filer matchas alla pa en gang (ett centroid-anrop, rutnatsindex)
+    namnlosa = [f['id'] for f in hpr_files if not extract_objekt_name(f['filnamn'])]
+    coord_matches = match_all_by_coords(namnlosa, objekt_coords)
+
     # Steg 5: Uppdatera alla HPR-filer
     log.info("\nSteg 4: Uppdatera HPR-filer...")
-    updated = 0
     skipped = 0
-    failed = 0
+    uppdateringar = []
     maskin_linked = 0
     objekt_linked = 0
     coord_linked = 0
@@ -470,8 +580,8 @@ def main():
         objekt_uuid = name_to_uuid.get(hpr_name) if hpr_name else None
 
         # Namnlosa: koordinat-matchning
-        if not objekt_uuid and not hpr_name and objekt_coords:
-            objekt_uuid = match_objekt_by_coords(fil_id, objekt_coords)
+        if not objekt_uuid and not hpr_name:
+            objekt_uuid = coord_matches.get(str(fil_id))
             if objekt_uuid:
                 coord_linked += 1
 
@@ -486,19 +596,20 @@ def main():
                 still_no_objekt.append('(namnlos)')
             continue
 
-        if update_hpr_fil(fil_id, maskin_uuid if needs_maskin else None, objekt_uuid if needs_objekt else None):
-            updated += 1
-            if needs_maskin:
-                maskin_linked += 1
-            if needs_objekt:
-                objekt_linked += 1
-        else:
-            failed += 1
-            log.error(f"  Misslyckades: {filnamn}")
+        uppdateringar.append({'id': fil_id,
+                              'maskin_id': maskin_uuid if needs_maskin else None,
+                              'objekt_id': objekt_uuid if needs_objekt else None})
+        if needs_maskin:
+            maskin_linked += 1
+        if needs_objekt:
+            objekt_linked += 1
 
         if not objekt_uuid:
             still_no_objekt.append(hpr_name or '(namnlos)')
 
+    # Alla kopplingar i en skrivning
+    updated, failed = bulk_update_hpr_filer(uppdateringar)
+
     # Rapport
     log.info("\n" + "=" * 60)
     log.info("RESULTAT")
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Cached, resumable, parallel HTTP fetch layer for the map build scripts.
+
+build-forest-height and build-terrain-tiles both pull hundreds of MB from
+remote raster services. Re-running a build after a styling tweak should not
+download any of it again, a dropped connection should not restart a 300 MB
+GeoTIFF from zero, and a build should be possible with no network at all.
+
+  fetch(url, params, ...)        GET -> bytes, cached on disk by URL + params
+  fetch_json(...)                same, decoded as JSON
+  fetch_to_file(url, dest, ...)  streamed GET into dest, resuming dest.part
+  fetch_many(calls, workers)     run fetch calls on a bounded thread pool
+  split_bbox(...)                pixel-aligned pieces of an image request
+  fetch_mosaic(...)              fetch pieces concurrently, decode, mosaic
+
+Cache keys are the URL plus sorted query params, never headers, so
+credentials do not end up in the key (or on disk). Only responses that pass
+the caller's `validate` are cached: error bodies from a flaky server are not
+kept.
+
+Offline mode (offline=True, or RASTER_FETCH_OFFLINE=1) serves everything
+from the cache and raises OfflineMiss for anything not in it.
+
+Stdlib only (urllib). numpy is imported lazily by fetch_mosaic. Tests can
+point any URL at a local http.server stand-in.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+TIMEOUT = 120
+RETRIES = 3
+WORKERS = 4
+CHUNK = 1024 * 1024
+
+
+class OfflineMiss(Exception):
+    """Offline mode and the request is not in the cache."""
+
+
+class InvalidResponse(Exception):
+    """The server answered, but validate() rejected the body."""
+
+
+def offline_default():
+    return os.environ.get("RASTER_FETCH_OFFLINE", "").lower() in ("1", "true", "yes")
+
+
+def basic_auth(user, password):
+    token = base64.b64encode(f"{user}:{password}".encode()).decode()
+    return {"Authorization": f"Basic {token}"}
+
+
+def build_url(url, params=None):
+    if not params:
+        return url
+    return f"{url}{'&' if '?' in url else '?'}{urllib.parse.urlencode(params)}"
+
+
+def cache_key(url, params=None):
+    canonical = json.dumps([url, sorted((params or {}).items())], separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:32]
+
+
+def _open(url, headers, timeout, offset=0):
+    hdr = dict(headers or {})
+    if offset:
+        hdr["Range"] = f"bytes={offset}-"
+    return urllib.request.urlopen(urllib.request.Request(url, headers=hdr), timeout=timeout)
+
+
+def _retrying(fn, retries):
+    """Call fn() with backoff on network errors and 5xx; 4xx is raised at once."""
+    last = None
+    for attempt in range(retries):
+        try:
+            return fn()
+        except urllib.error.HTTPError as e:
+            if e.code < 500:
+                raise
+            last = e
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            last = e
+        time.sleep(min(2 ** attempt, 10))
+    raise last
+
+
+def fetch(url, params=None, headers=None, cache_dir=None, offline=None, refresh=False,
+          validate=None, timeout=TIMEOUT, retries=RETRIES):
+    """GET url?params and return the body bytes.
+
+    With cache_dir, a cached body is returned without touching the network
+    (unless refresh=True, used for small, changing lookups such as searches —
+    those still fall back to the cache offline). validate(body, content_type)
+    returning False raises InvalidResponse and nothing is cached."""
+    offline = offline_default() if offline is None else offline
+    path = None
+    if cache_dir is not None:
+        cache_dir = Path(cache_dir)
+        path = cache_dir / f"{cache_key(url, params)}.bin"
+        if path.exists() and (offline or not refresh):
+            return path.read_bytes()
+    if offline:
+        raise OfflineMiss(build_url(url, params))
+
+    def _get():
+        with _open(build_url(url, params), headers, timeout) as resp:
+            return resp.read(), resp.headers.get("Content-Type", "")
+
+    try:
+        body, content_type = _retrying(_get, retries)
+    except (urllib.error.URLError, TimeoutError, ConnectionError):
+        if path is not None and path.exists():  # refresh failed — stale beats nothing
+            return path.read_bytes()
+        raise
+    if validate is not None and not validate(body, content_type):
+        raise InvalidResponse(f"{content_type} {body[:300]!r}")
+    if path is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(body)
+        os.replace(tmp, path)
+        path.with_suffix(".json").write_text(json.dumps(
+            {"url": url, "params": params or {}, "content_type": content_type,
+             "bytes": len(body)}), encoding="utf-8")
+    return body
+
+
+def fetch_json(url, params=None, **kw):
+    return json.loads(fetch(url, params, **kw))
+
+
+def fetch_to_file(url, dest, headers=None, offline=None, timeout=TIMEOUT, retries=RETRIES,
+                  min_size=1000):
+    """Stream url into dest. Bytes land in dest.part and are renamed on
+    completion, so an existing dest is always complete and is not fetched
+    again. An interrupted download resumes from dest.part with a Range
+    request (servers that ignore Range restart from zero).
+
+    Returns (dest, downloaded_bytes); downloaded_bytes == 0 means cache hit."""
+    offline = offline_default() if offline is None else offline
+    dest = Path(dest)
+    if dest.exists() and dest.stat().st_size > min_size:
+        return dest, 0
+    if offline:
+        raise OfflineMiss(url)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part = dest.with_name(dest.name + ".part")
+
+    def _stream():
+        offset = part.stat().st_size if part.exists() else 0
+        try:
+            resp = _open(url, headers, timeout, offset)
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset:  # part already holds the whole body
+                return 0
+            raise
+        with resp:
+            if offset and resp.status != 206:
+                offset = 0
+            got = 0
+            with open(part, "ab" if offset else "wb") as f:
+                while True:
+                    chunk = resp.read(CHUNK)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    got += len(chunk)
+            expected = resp.headers.get("Content-Length")
+            if expected is not None and got < int(expected):
+                raise ConnectionError(f"short read {got}/{expected} bytes: {url}")
+        return got
+
+    downloaded = _retrying(_stream, retries)
+    os.replace(part, dest)
+    return dest, downloaded
+
+
+def fetch_many(calls, workers=WORKERS):
+    """Run zero-argument callables on at most `workers` threads. Results
+    (or raised exceptions, as values) come back in input order."""
+    def _safe(fn):
+        try:
+            return fn()
+        except Exception as e:  # noqa: BLE001 - returned to the caller per call
+            return e
+    if workers <= 1 or len(calls) <= 1:
+        return [_safe(fn) for fn in calls]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_safe, calls))
+
+
+def split_bbox(bbox, width, height, max_px):
+    """Split an image request (bbox = [xmin, ymin, xmax, ymax], width x height
+    px) into pieces of at most max_px per side, aligned on the full request's
+    pixel grid so that the mosaic equals the single big image.
+
+    Yields (piece_bbox, piece_w, piece_h, col_off, row_off), row_off counted
+    from the top."""
+    px_w = (bbox[2] - bbox[0]) / width
+    px_h = (bbox[3] - bbox[1]) / height
+    for row_off in range(0, height, max_px):
+        h = min(max_px, height - row_off)
+        for col_off in range(0, width, max_px):
+            w = min(max_px, width - col_off)
+            piece = [bbox[0] + col_off * px_w, bbox[3] - (row_off + h) * px_h,
+                     bbox[0] + (col_off + w) * px_w, bbox[3] - row_off * px_h]
+            yield piece, w, h, col_off, row_off
+
+
+def fetch_mosaic(fetch_piece, decode, bbox, width, height, max_px=2048, workers=WORKERS,
+                 fill=None):
+    """Fetch an image in pieces and mosaic it locally.
+
+    fetch_piece(piece_bbox, w, h) -> bytes (normally a cached fetch()),
+    decode(bytes) -> (2-D array, nodata). Pieces are fetched concurrently.
+    Returns (array, nodata); raises the first piece's error if any failed."""
+    import numpy as np
+
+    pieces = list(split_bbox(bbox, width, height, max_px))
+    results = fetch_many([lambda p=p: decode(fetch_piece(p[0], p[1], p[2])) for p in pieces],
+                         workers)
+    for r in results:
+        if isinstance(r, Exception):
+            raise r
+
+    nodata = results[0][1]
+    if fill is None:
+        fill = nodata if nodata is not None else np.nan
+    dtype = np.result_type(*[arr.dtype for arr, _ in results], np.asarray(fill).dtype)
+    out = np.full((height, width), fill, dtype=dtype)
+    for (_, w, h, col_off, row_off), (arr, _) in zip(pieces, results):
+        if arr.shape != (h, w):
+            raise InvalidResponse(f"piece at {col_off},{row_off}: got {arr.shape}, expected {(h, w)}")
+        out[row_off:row_off + h, col_off:col_off + w] = arr
+    return out, nodata
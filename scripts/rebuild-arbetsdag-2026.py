@@ -30,6 +30,7 @@ from skogsmaskin_import_version_6 import (
     SUPABASE_URL, init_supabase,
     parse_datetime, upsert_data,
 )
+from supabase_hamtning import hamta_rader
 
 # SUPABASE_HEADERS sätts av init_supabase(). Vi importerar modulen och
 # refererar via imp.SUPABASE_HEADERS efter init så vi får den uppdaterade.
@@ -41,31 +42,15 @@ SUPABASE_HEADERS = imp.SUPABASE_HEADERS
 DRY_RUN = '--dry-run' in sys.argv
 START_DATE = '2026-01-01'
 
-# Postgrest har server-side limit (1000 default) som Range-header inte
-# överskrider. Vi paginerar via limit/offset tills vi får mindre än batch.
-BATCH_SIZE = 1000
-
-
-def fetch_all(url_base):
-    """Hämta alla rader via pagination (offset/limit)."""
-    all_data = []
-    offset = 0
-    while True:
-        sep = '&' if '?' in url_base else '?'
-        url = f"{url_base}{sep}limit={BATCH_SIZE}&offset={offset}"
-        resp = requests.get(url, headers=SUPABASE_HEADERS, timeout=60)
-        if resp.status_code != 200:
-            print(f"  FEL {resp.status_code}: {resp.text[:200]}")
-            break
-        batch = resp.json()
-        if not isinstance(batch, list):
-            print(f"  Oväntat svar: {batch}")
-            break
-        all_data.extend(batch)
-        if len(batch) < BATCH_SIZE:
-            break
-        offset += BATCH_SIZE
-    return all_data
+def fetch_all(tabell, select, filter):
+    """Hämta alla rader via keyset-paginering (id=gt.<senaste>, se
+    supabase_hamtning). offset/limit blev långsammare för varje sida."""
+    try:
+        return list(hamta_rader(SUPABASE_URL, tabell, SUPABASE_HEADERS,
+                                select=select, filter=filter, timeout=60))
+    except Exception as e:
+        print(f"  FEL vid hämtning av {tabell}: {e}")
+        return []
 
 
 def _tim(t1, t2):
@@ -104,17 +89,18 @@ def main():
     # 3. Hämta alla fakt_skift för 2026 (paginerad)
     print(f"Hämtar fakt_skift för 2026...")
     alla_skift = fetch_all(
-        f"{SUPABASE_URL}/rest/v1/fakt_skift?datum=gte.{START_DATE}"
-        f"&select=operator_id,maskin_id,datum,inloggning_tid,utloggning_tid,langd_sek"
-        f"&order=datum"
+        'fakt_skift',
+        'operator_id,maskin_id,datum,inloggning_tid,utloggning_tid,langd_sek',
+        f"datum=gte.{START_DATE}",
     )
     print(f"  {len(alla_skift)} fakt_skift-rader\n")
 
     # 4. Hämta alla fakt_tid för 2026 (för rast)
     print(f"Hämtar fakt_tid för 2026...")
     alla_tid = fetch_all(
-        f"{SUPABASE_URL}/rest/v1/fakt_tid?datum=gte.{START_DATE}"
-        f"&select=operator_id,datum,rast_sek,objekt_id"
+        'fakt_tid',
+        'operator_id,datum,rast_sek,objekt_id',
+        f"datum=gte.{START_DATE}",
     )
     print(f"  {len(alla_tid)} fakt_tid-rader\n")
 
@@ -203,8 +189,9 @@ def main():
     # 8. Hämta befintlig arbetsdag-data för före/efter-jämförelse
     print(f"Hämtar befintlig arbetsdag-data för jämförelse...")
     befintliga_rader = fetch_all(
-        f"{SUPABASE_URL}/rest/v1/arbetsdag?datum=gte.{START_DATE}"
-        f"&select=medarbetare_id,datum,start_tid,slut_tid,bekraftad,rast_min"
+        'arbetsdag',
+        'medarbetare_id,datum,start_tid,slut_tid,bekraftad,rast_min',
+        f"datum=gte.{START_DATE}",
     )
     befintliga = {(r['medarbetare_id'], r['datum']): r for r in befintliga_rader}
     print(f"  {len(befintliga)} befintliga arbetsdag-rader\n")
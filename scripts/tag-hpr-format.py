@@ -26,6 +26,10 @@ except ImportError:
     print("Saknat bibliotek. Kor: py -m pip install requests")
     sys.exit(1)
 
+# Arkivlasning (.hpr, .hpr.gz, .hpr.zst) fran repo-roten (en katalog upp)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stanford_arkiv import hitta_stanford, open_stanford, stanford_namn
+
 # ============================================================
 # KONFIGURATION
 # ============================================================
@@ -112,7 +116,8 @@ def analyze_hpr_file(filepath: str) -> dict:
     }
 
     try:
-        tree = ET.parse(filepath)
+        with open_stanford(filepath) as fh:
+            tree = ET.parse(fh)
         root = tree.getroot()
         ns = get_namespace(root)
 
@@ -172,13 +177,8 @@ def analyze_hpr_file(filepath: str) -> dict:
 # ============================================================
 
 def find_hpr_files() -> dict:
-    """Hitta alla HPR-filer, returnera filnamn -> filepath."""
-    files = {}
-    for root, dirs, filenames in os.walk(BEHANDLADE):
-        for f in filenames:
-            if f.upper().endswith('.HPR'):
-                files[f] = os.path.join(root, f)
-    return files
+    """Hitta alla HPR-filer (aven komprimerade), returnera originalfilnamn -> filepath."""
+    return {stanford_namn(p): p for p in hitta_stanford(BEHANDLADE, '.hpr')}
 
 
 def fetch_all_hpr_filer():
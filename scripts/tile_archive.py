@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Single-file tile archive (MBTiles / SQLite) for the map build scripts.
+
+Thousands of tiny {z}/{x}/{y}.png files are slow to write and slow to sync
+(OneDrive, Vercel). An MBTiles archive keeps every tile in one SQLite file
+and deduplicates identical tiles by content hash, using the common
+map/images layout:
+
+    images(tile_id TEXT PRIMARY KEY, tile_data BLOB)     -- one row per unique tile
+    map(zoom_level, tile_column, tile_row, tile_id)      -- one row per z/x/y
+    tiles                                                 -- view, MBTiles 1.3 spec
+
+tile_row is TMS (flipped y) as the spec requires; the reader/writer API takes
+XYZ like the rest of the map code. Any MBTiles server (martin, tileserver-gl,
+mbutil) can read the file; `serve` below is a small stdlib one that answers
+the same URLs the app uses for the directory layout:
+
+    python scripts/tile_archive.py info  data/terrain-tiles.mbtiles
+    python scripts/tile_archive.py serve data/terrain-tiles.mbtiles --port 8081
+      -> /terrain-tiles/{z}/{x}/{y}.png, /terrain-tiles/bounds.json
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+
+def _tms_row(z, y):
+    return (1 << z) - 1 - y
+
+
+class MBTilesWriter:
+    """Write tiles into a fresh MBTiles file.
+
+    Written to `<path>.tmp` and moved into place on close(), so a reader (or a
+    sync client) never sees a half-written archive."""
+
+    def __init__(self, path, metadata=None):
+        self.path = Path(path)
+        self.tmp = self.path.with_name(self.path.name + ".tmp")
+        if self.tmp.exists():
+            self.tmp.unlink()
+        self.db = sqlite3.connect(str(self.tmp))
+        self.db.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE metadata (name TEXT, value TEXT);
+            CREATE TABLE images (tile_id TEXT PRIMARY KEY, tile_data BLOB);
+            CREATE TABLE map (zoom_level INTEGER, tile_column INTEGER,
+                              tile_row INTEGER, tile_id TEXT);
+        """)
+        self.metadata = dict(metadata or {})
+        self.tiles = 0
+        self.unique = 0
+
+    def add(self, z, x, y, data):
+        tile_id = hashlib.sha1(data).hexdigest()
+        cur = self.db.execute(
+            "INSERT OR IGNORE INTO images (tile_id, tile_data) VALUES (?, ?)",
+            (tile_id, sqlite3.Binary(data)))
+        self.unique += cur.rowcount
+        self.db.execute("INSERT INTO map VALUES (?, ?, ?, ?)",
+                        (z, x, _tms_row(z, y), tile_id))
+        self.tiles += 1
+        return tile_id
+
+    def close(self):
+        self.db.executemany("INSERT INTO metadata VALUES (?, ?)",
+                            [(k, v if isinstance(v, str) else json.dumps(v))
+                             for k, v in self.metadata.items()])
+        self.db.executescript("""
+            CREATE UNIQUE INDEX map_index ON map (zoom_level, tile_column, tile_row);
+            CREATE VIEW tiles AS
+                SELECT map.zoom_level AS zoom_level, map.tile_column AS tile_column,
+                       map.tile_row AS tile_row, images.tile_data AS tile_data
+                FROM map JOIN images ON images.tile_id = map.tile_id;
+        """)
+        self.db.commit()
+        self.db.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        self.db.close()
+        try:
+            self.tmp.unlink()
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class MBTilesReader:
+    """Read tiles by XYZ z/x/y from an MBTiles file (read-only)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        # check_same_thread=False: the server reads from handler threads
+        self.db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True,
+                                  check_same_thread=False)
+
+    def get(self, z, x, y):
+        row = self.db.execute(
+            "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            (z, x, _tms_row(z, y))).fetchone()
+        return bytes(row[0]) if row else None
+
+    def metadata(self):
+        return dict(self.db.execute("SELECT name, value FROM metadata"))
+
+    def counts(self):
+        tiles = self.db.execute("SELECT COUNT(*) FROM map").fetchone()[0]
+        unique = self.db.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+        return tiles, unique
+
+    def close(self):
+        self.db.close()
+
+
+def read_metadata(path):
+    """Metadata dict of an existing archive, or {} if missing/unreadable."""
+    if not Path(path).exists():
+        return {}
+    try:
+        reader = MBTilesReader(path)
+        try:
+            return reader.metadata()
+        finally:
+            reader.close()
+    except sqlite3.Error:
+        return {}
+
+
+def update_metadata(path, values):
+    """Replace metadata entries of an existing archive in place; tiles are
+    left alone (no rewrite of the whole file for a build-info refresh)."""
+    db = sqlite3.connect(str(path))
+    try:
+        with db:
+            for k, v in values.items():
+                db.execute("DELETE FROM metadata WHERE name = ?", (k,))
+                db.execute("INSERT INTO metadata VALUES (?, ?)",
+                           (k, v if isinstance(v, str) else json.dumps(v)))
+    finally:
+        db.close()
+
+
+def bounds_json(metadata):
+    """The bounds.json the app reads, rebuilt from MBTiles metadata."""
+    if "bounds_json" in metadata:
+        return json.loads(metadata["bounds_json"])
+    w, s, e, n = (float(v) for v in metadata.get("bounds", "0,0,0,0").split(","))
+    center = metadata.get("center", f"{(w + e) / 2},{(s + n) / 2}").split(",")
+    return {
+        "center": [float(center[0]), float(center[1])],
+        "bbox": [w, s, e, n],
+        "minZoom": int(metadata.get("minzoom", 0)),
+        "maxZoom": int(metadata.get("maxzoom", 0)),
+    }
+
+
+def serve(path, host="127.0.0.1", port=8081):
+    """Serve .../{z}/{x}/{y}.<ext> and .../bounds.json from the archive."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    reader = MBTilesReader(path)
+    meta = reader.metadata()
+    content_type = {"png": "image/png", "jpg": "image/jpeg", "webp": "image/webp",
+                    "pbf": "application/x-protobuf"}.get(meta.get("format", "png"),
+                                                         "application/octet-stream")
+    bounds = json.dumps(bounds_json(meta)).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body=b"", ctype="text/plain", cache=True):
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            if cache and status == 200:
+                self.send_header("Cache-Control", "public, max-age=86400")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parts = self.path.split("?", 1)[0].strip("/").split("/")
+            if parts[-1] == "bounds.json":
+                return self._send(200, bounds, "application/json", cache=False)
+            try:
+                z, x = int(parts[-3]), int(parts[-2])
+                y = int(parts[-1].split(".", 1)[0])
+            except (IndexError, ValueError):
+                return self._send(404)
+            data = reader.get(z, x, y)
+            if data is None:
+                return self._send(204)
+            self._send(200, data, content_type)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    tiles, unique = reader.counts()
+    print(f"Serving {path} ({tiles} tiles, {unique} unique) on http://{host}:{port}/")
+    ThreadingHTTPServer((host, port), Handler).serve_forever()
+
+
+def main():
+    import argparse
+    ap = argparse.ArgumentParser(description="Inspect or serve an MBTiles tile archive")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_info = sub.add_parser("info", help="print metadata and tile counts")
+    p_info.add_argument("archive")
+    p_serve = sub.add_parser("serve", help="serve tiles over HTTP by z/x/y")
+    p_serve.add_argument("archive")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8081)
+    args = ap.parse_args()
+
+    if not Path(args.archive).exists():
+        print(f"ERROR: {args.archive} not found")
+        sys.exit(1)
+    if args.cmd == "info":
+        reader = MBTilesReader(args.archive)
+        tiles, unique = reader.counts()
+        for k, v in sorted(reader.metadata().items()):
+            print(f"{k}: {v if len(v) < 200 else v[:200] + '...'}")
+        size = Path(args.archive).stat().st_size
+        print(f"\n{tiles} tiles, {unique} unique, {size / 1024 / 1024:.1f} MB")
+    else:
+        serve(args.archive, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
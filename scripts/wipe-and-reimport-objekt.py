@@ -42,6 +42,7 @@ from skogsmaskin_import_version_6 import (
     parse_hpr_file, save_hpr_to_supabase,
     init_supabase, mark_file_imported,
 )
+from stanford_arkiv import hitta_stanford, stanford_namn
 
 HEADERS = {
     "apikey": SUPABASE_KEY,
@@ -114,11 +115,7 @@ def fetch_hpr_filer(objekt_uuid: str) -> List[Dict[str, Any]]:
 def find_local_hpr_files(filnamn_list: List[str]) -> List[str]:
     """Hitta motsvarande HPR-filer i Behandlade-mappen."""
     # Walka Behandlade en gang och bygg filnamn-karta
-    file_map = {}
-    for root, dirs, files in os.walk(BEHANDLADE):
-        for f in files:
-            if f.upper().endswith('.HPR'):
-                file_map[f] = os.path.join(root, f)
+    file_map = {stanford_namn(p): p for p in hitta_stanford(BEHANDLADE, '.hpr')}
 
     found = []
     missing = []
@@ -183,14 +180,14 @@ def wipe_per_objekt(objekt_id_text: str, objekt_uuid: Optional[str], filnamn_lis
 
 def reimport_files(filepaths: List[str]) -> Dict[str, int]:
     """Sortera ASC och kor parse + save for varje fil."""
-    filepaths_sorted = sorted(filepaths, key=lambda p: os.path.basename(p))
+    filepaths_sorted = sorted(filepaths, key=stanford_namn)
 
     print(f"\nReimport-fas: {len(filepaths_sorted)} filer (sorterat ASC pa filnamn)")
 
     ok = 0
     fel = 0
     for i, filepath in enumerate(filepaths_sorted, 1):
-        filnamn = os.path.basename(filepath)
+        filnamn = stanford_namn(filepath)
         print(f"  [{i}/{len(filepaths_sorted)}] {filnamn}")
         try:
             data = parse_hpr_file(filepath)
@@ -0,0 +1,39 @@
+"""skogsimport — Stanford2010-importen (MOM, HPR, HQC, FPR → Supabase) som paket.
+
+  konfig     .env.local/miljö, sökvägar, logger
+  klient     Supabase REST: init_supabase, upsert_data, parallella batcher
+  parsers    parse_mom_file / parse_hpr_file / parse_hqc_file / parse_fpr_file
+  skrivning  skrivpolicyer och save_*_to_supabase
+  intag      process_file: hash → parse → spara → Behandlade → meta
+  bevakning  importprogrammet (main) och watchdog-bevakningen
+
+Inga sidoeffekter vid import: ingen loggfil, inga nätanrop, inget sys.exit.
+requests laddas vid första REST-anropet och watchdog bara av bevakning, så
+`from skogsimport.parsers import parse_mom_file` är billigt.
+
+Attribut direkt på paketet (skogsimport.upsert_data) slås upp lättjefullt i
+modulerna i ordningen ovan — bara de moduler som behövs importeras.
+Modultillstånd (SUPABASE_URL, _GLOBAL_TID_ENTRIES, ...) ändras i modulen som
+äger det, t.ex. skogsimport.konfig — inte via paketet eller det gamla namnet.
+
+skogsmaskin_import_version_6.py är kvar som programmet och det gamla modulnamnet.
+"""
+import importlib
+
+MODULER = ('konfig', 'klient', 'parsers', 'skrivning', 'intag', 'bevakning')
+
+# bevakning kräver watchdog — den laddas bara för sina egna namn
+_BEVAKNING = ('FileHandler', 'start_watching', 'main')
+
+
+def __getattr__(namn):
+    if namn in MODULER:
+        return importlib.import_module(f'{__name__}.{namn}')
+    if not namn.startswith('__'):
+        for m in MODULER:
+            if m == 'bevakning' and namn not in _BEVAKNING:
+                continue
+            modul = importlib.import_module(f'{__name__}.{m}')
+            if hasattr(modul, namn):
+                return getattr(modul, namn)
+    raise AttributeError(f"module {__name__!r} has no attribute {namn!r}")
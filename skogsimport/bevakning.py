@@ -0,0 +1,143 @@
+"""skogsimport.bevakning — importprogrammet: befintliga filer i Inkommande,
+sedan (valfritt) watchdog-bevakning. Den enda modulen som behöver watchdog.
+"""
+import os
+import sys
+import time
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    print("Saknade bibliotek. Kör: py -m pip install requests watchdog")
+    sys.exit(1)
+
+import import_profil
+
+from .intag import process_existing_files, process_file
+from .klient import cleanup_avbrott_duplicates, init_supabase
+from .konfig import BEHANDLADE, INKOMMANDE, _git_commit_short, konfigurera_loggning, logger
+
+# ============================================================
+# FILÖVERVAKNING (WATCHDOG)
+# ============================================================
+
+class FileHandler(FileSystemEventHandler):
+    """Hanterar nya filer i Inkommande-mappen.
+    Lyssnar på on_created, on_modified och on_moved — OneDrive-sync triggar
+    inte alltid on_created vid SMB-style synk, så on_modified+on_moved är
+    skyddsnät. Dedupering sker via self.processed_files."""
+
+    def __init__(self):
+        self.processed_files = set()
+
+    def on_created(self, event):
+        self._dispatch(event, 'created')
+
+    def on_modified(self, event):
+        self._dispatch(event, 'modified')
+
+    def on_moved(self, event):
+        # on_moved har dest_path (var filen hamnade), inte src_path
+        if event.is_directory:
+            return
+        self._process(event.dest_path, 'moved')
+
+    def _dispatch(self, event, event_type: str):
+        if event.is_directory:
+            return
+        self._process(event.src_path, event_type)
+
+    def _process(self, filepath: str, event_type: str):
+        ext = os.path.splitext(filepath)[1].lower()
+
+        # Endast Stanford2010-filer
+        if ext not in ['.mom', '.hpr', '.hqc', '.fpr']:
+            return
+
+        # Undvik dubbel-processing
+        if filepath in self.processed_files:
+            return
+
+        self.processed_files.add(filepath)
+
+        logger.info(f"Watchdog [{event_type}]: {os.path.basename(filepath)}")
+
+        # Vänta så filen hinner kopieras klart
+        time.sleep(2)
+
+        # Processa filen
+        process_file(filepath)
+
+        # Rensa processed_files efter ett tag
+        if len(self.processed_files) > 100:
+            self.processed_files.clear()
+
+def start_watching():
+    """Starta övervakning av Inkommande-mappen"""
+    logger.info(f"\n{'='*60}")
+    logger.info("SKOGSMASKIN IMPORT - ÖVERVAKNING STARTAD")
+    logger.info(f"{'='*60}")
+    logger.info(f"Övervakar: {INKOMMANDE}")
+    logger.info(f"Behandlade: {BEHANDLADE}")
+    logger.info("Tryck Ctrl+C för att avsluta")
+    logger.info(f"{'='*60}\n")
+    
+    event_handler = FileHandler()
+    observer = Observer()
+    observer.schedule(event_handler, INKOMMANDE, recursive=False)
+    observer.start()
+    
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        observer.stop()
+        logger.info("\nÖvervakning avslutad.")
+    
+    observer.join()
+
+def main():
+    """Huvudprogram"""
+    konfigurera_loggning()
+    print("""
+    ╔═══════════════════════════════════════════════════════════╗
+    ║         SKOGSMASKIN IMPORT v1.0                           ║
+    ║         Stanford2010 → Supabase                           ║
+    ╠═══════════════════════════════════════════════════════════╣
+    ║  Stödjer: MOM, HPR, HQC, FPR                             ║
+    ║  Maskiner: Ponsse, Rottne                                 ║
+    ╚═══════════════════════════════════════════════════════════╝
+    """)
+    
+    logger.info(f"=== START skogsmaskin_import | git={_git_commit_short()} "
+                f"| script={os.path.abspath(sys.argv[0])} | py={sys.version.split()[0]} ===")
+    import_profil.fran_argv('skogsmaskin_import')
+
+    # Skapa mappar om de inte finns
+    os.makedirs(INKOMMANDE, exist_ok=True)
+    os.makedirs(BEHANDLADE, exist_ok=True)
+    
+    # Anslut till Supabase
+    if not init_supabase():
+        input("\nTryck Enter för att avsluta...")
+        return
+
+    # Rensa eventuella dubletter i fakt_avbrott
+    cleanup_avbrott_duplicates()
+
+    # Processa befintliga filer först
+    process_existing_files()
+    
+    # Starta övervakning
+    print("\n" + "="*50)
+    print("Vill du starta automatisk övervakning?")
+    print("(Nya filer i Inkommande processas automatiskt)")
+    print("="*50)
+    
+    svar = input("\nStarta övervakning? (j/n): ").strip().lower()
+    
+    if svar == 'j':
+        start_watching()
+    else:
+        print("\nAvslutar. Kör programmet igen för att processa nya filer.")
@@ -0,0 +1,396 @@
+"""skogsimport.intag — en fil genom importen: innehålls-hash, parsning,
+skrivning, flytt till Behandlade och bokföring i meta_importerade_filer.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import quote
+
+import import_matning
+import import_profil
+from stanford_arkiv import arkiv_dest, arkiv_komprimering, arkivera
+
+from .klient import SUPABASE_HEADERS, requests
+from .konfig import (BEHANDLADE, IMPORT_MATNING_TABELL, INKOMMANDE, INTAG_VANTETID_S,
+                     ONEDRIVE_BASE, SUPABASE_URL, _env, logger)
+from .parsers import parse_fpr_file, parse_hpr_file, parse_hqc_file, parse_mom_file
+from .skrivning import (save_fpr_to_supabase, save_hpr_to_supabase, save_hqc_to_supabase,
+                        save_mom_to_supabase)
+
+# ── Innehålls-hash vid intag ──────────────────────────────────────────────
+# OneDrive levererar ofta OFÖRÄNDRAT innehåll under nytt namn (HQC-fallet
+# nedan är ett exempel). Filnamnskollen mot meta_importerade_filer släpper då
+# igenom filen och den parsas och skrivs om i sin helhet. Hashen räknas i
+# stället EN gång vid intag — en sekventiell läsning — och står i ledgern;
+# samma innehåll med status OK hoppas över före all parsning.
+#
+# xxh3-128 om xxhash finns (icke-kryptografisk, flera GB/s), annars
+# blake2b-128 ur stdlib. Algoritmen står som prefix i värdet så att hashar
+# från maskiner med olika bibliotek aldrig jämförs med varandra.
+# HASH_DEDUP=0 i .env.local stänger av innehållsdedupen (hashen lagras ändå).
+try:
+    import xxhash as _xxhash
+except ImportError:
+    _xxhash = None
+
+HASH_DEDUP = (_env.get('HASH_DEDUP') or os.getenv('HASH_DEDUP') or '1') != '0'
+_HASH_BUFFER = 8 * 1024 * 1024
+
+
+@import_matning.matt('hash')
+def get_file_hash(filepath: str) -> str:
+    """Innehålls-hash för en fil: 'xxh3:<hex>' eller 'b2:<hex>'.
+    mmap där det går (ingen kopiering), annars läsning i 8 MB-block."""
+    if _xxhash is not None:
+        h, prefix = _xxhash.xxh3_128(), 'xxh3'
+    else:
+        h, prefix = hashlib.blake2b(digest_size=16), 'b2'
+    with open(filepath, 'rb') as f:
+        try:
+            import mmap
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                h.update(m)
+        except (ValueError, OSError):
+            # Tom fil (mmap vägrar längd 0) eller låst/ej mappbar — läs i block
+            f.seek(0)
+            for chunk in iter(lambda: f.read(_HASH_BUFFER), b""):
+                h.update(chunk)
+    return f"{prefix}:{h.hexdigest()}"
+
+# ============================================================
+# FILHANTERING
+# ============================================================
+
+# Behandlade-arkivet: 'av' = filen flyttas orörd; 'gzip'/'zstd' = lagras
+# komprimerad (namn.mom.gz / .zst, katalog i mappen). Alla läsare går via
+# stanford_arkiv.open_stanford, så blandade arkiv fungerar. Se stanford_arkiv.py.
+ARKIV_KOMPRIMERING = arkiv_komprimering(_env.get('ARKIV_KOMPRIMERING') or os.getenv('ARKIV_KOMPRIMERING'))
+
+@import_matning.matt('flytt')
+def move_to_behandlade(filepath: str, maskin_id: str, filtyp: str) -> bool:
+    """Flytta fil till Behandlade/MaskinID/Filtyp/ (komprimerad om
+    ARKIV_KOMPRIMERING). Returnerar True om lyckad.
+    3 försök med exponentiell backoff (3s, 9s) för OneDrive-lås."""
+    try:
+        maskin_mapp = os.path.join(BEHANDLADE, maskin_id)
+        filtyp_mapp = os.path.join(maskin_mapp, filtyp)
+        os.makedirs(filtyp_mapp, exist_ok=True)
+
+        filnamn = os.path.basename(filepath)
+        dest_path = os.path.join(filtyp_mapp, filnamn)
+
+        # Namnkrock mot arkivfilen oavsett om den ligger komprimerad eller ej
+        if any(os.path.exists(arkiv_dest(dest_path, k)) for k in ('av', 'gzip', 'zstd')):
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            base, ext = os.path.splitext(filnamn)
+            dest_path = os.path.join(filtyp_mapp, f"{base}_{timestamp}{ext}")
+
+        for attempt in range(1, 4):
+            import_matning.rakna('flytt_forsok')
+            try:
+                dest_path = arkivera(filepath, dest_path, ARKIV_KOMPRIMERING)
+                logger.info(f"  ✓ Flyttad till {os.path.relpath(dest_path, ONEDRIVE_BASE)}")
+                return True
+            except (PermissionError, OSError) as e:
+                if attempt < 3:
+                    vantetid = 3 ** attempt  # 3s, 9s
+                    logger.warning(f"  ⚠ Flytt misslyckades (försök {attempt}/3), väntar {vantetid}s: {e}")
+                    time.sleep(vantetid)
+                else:
+                    logger.error(f"  ✗ Flytt misslyckades slutgiltigt efter 3 försök: {e}")
+    except Exception as e:
+        logger.error(f"  Fel vid flytt av fil: {e}")
+    return False
+
+def is_file_already_imported(filnamn: str) -> bool:
+    """Kolla om fil redan är importerad med status OK. FEL-filer tillåts omimporteras."""
+    try:
+        response = requests.get(
+            f"{SUPABASE_URL}/rest/v1/meta_importerade_filer?filnamn=eq.{filnamn}&status=eq.OK&select=id",
+            headers=SUPABASE_HEADERS,
+            timeout=30
+        )
+        if response.status_code == 200:
+            return len(response.json()) > 0
+        return False
+    except:
+        return False
+
+def get_import_time(filnamn: str) -> Optional[float]:
+    """Hämta importerad_tid som UNIX timestamp för en fil. Returnerar None om ej hittad."""
+    try:
+        response = requests.get(
+            f"{SUPABASE_URL}/rest/v1/meta_importerade_filer?filnamn=eq.{filnamn}&status=eq.OK&select=importerad_tid",
+            headers=SUPABASE_HEADERS,
+            timeout=30
+        )
+        if response.status_code == 200:
+            rows = response.json()
+            if rows and rows[0].get('importerad_tid'):
+                from datetime import timezone
+                dt = datetime.fromisoformat(rows[0]['importerad_tid'].replace('Z', '+00:00'))
+                return dt.timestamp()
+        return None
+    except:
+        return None
+
+def find_imported_by_hash(innehalls_hash: str) -> Optional[Dict]:
+    """Ledger-rad (status OK) med samma innehålls-hash, eller None."""
+    try:
+        response = requests.get(
+            f"{SUPABASE_URL}/rest/v1/meta_importerade_filer"
+            f"?innehalls_hash=eq.{quote(innehalls_hash, safe='')}&status=eq.OK"
+            f"&select=filnamn,filtyp,maskin_id&limit=1",
+            headers=SUPABASE_HEADERS,
+            timeout=30
+        )
+        if response.status_code == 200 and response.json():
+            return response.json()[0]
+        return None
+    except Exception:
+        return None
+
+def delete_meta_entry(filnamn: str):
+    """Ta bort alla meta-poster (OK och FEL) för en fil."""
+    try:
+        requests.delete(
+            f"{SUPABASE_URL}/rest/v1/meta_importerade_filer?filnamn=eq.{filnamn}",
+            headers=SUPABASE_HEADERS,
+            timeout=30
+        )
+    except:
+        pass
+
+@import_matning.matt('meta')
+def mark_file_imported(filnamn: str, filtyp: str, maskin_id: str, status: str = 'OK', felmeddelande: str = None,
+                       innehalls_hash: str = None):
+    """Markera fil som importerad. Tar bort gamla FEL-rader vid omimport."""
+    try:
+        # Ta bort alla gamla rader (OK + FEL) för denna fil så vi inte får dubletter
+        requests.delete(
+            f"{SUPABASE_URL}/rest/v1/meta_importerade_filer?filnamn=eq.{filnamn}",
+            headers=SUPABASE_HEADERS,
+            timeout=30
+        )
+
+        data = {
+            'filnamn': filnamn,
+            'filtyp': filtyp,
+            'maskin_id': maskin_id,
+            'status': status
+        }
+        if felmeddelande:
+            data['felmeddelande'] = felmeddelande
+        if innehalls_hash:
+            data['innehalls_hash'] = innehalls_hash
+
+        requests.post(
+            f"{SUPABASE_URL}/rest/v1/meta_importerade_filer",
+            json=data,
+            headers=SUPABASE_HEADERS,
+            timeout=30
+        )
+    except Exception as e:
+        logger.error(f"  Kunde inte logga import: {e}")
+
+# ============================================================
+# PROCESSERA FIL
+# ============================================================
+
+def _rapportera_matning(rad: Optional[Dict]):
+    """En IMPORT_MATNING-rad per fil i loggen; med IMPORT_MATNING_TABELL även
+    i meta_import_matning. Mätningen får aldrig fälla importen."""
+    if not rad:
+        return
+    logger.info(f"  IMPORT_MATNING {json.dumps(rad, ensure_ascii=False)}")
+    if not IMPORT_MATNING_TABELL:
+        return
+    try:
+        resp = requests.post(
+            f"{SUPABASE_URL}/rest/v1/meta_import_matning",
+            json={
+                'filnamn': rad['filnamn'],
+                'filtyp': rad['filtyp'],
+                'maskin_id': rad['maskin_id'],
+                'status': rad['status'],
+                'start_tid': rad['start'],
+                'total_s': rad['total_s'],
+                'http_anrop': rad['http']['anrop'],
+                'http_bytes_ut': rad['http']['bytes_ut'],
+                'faser': rad['faser'],
+                'tabeller': rad['tabeller'],
+                'raknare': rad['raknare'],
+            },
+            headers={**SUPABASE_HEADERS, 'Prefer': 'return=minimal'},
+            timeout=30
+        )
+        if resp.status_code >= 400:
+            logger.warning(f"  meta_import_matning: HTTP {resp.status_code} {resp.text[:200]}")
+    except Exception as e:
+        logger.warning(f"  Kunde inte skriva meta_import_matning: {e}")
+
+# filändelse -> (parser, skrivning)
+_PARSA_SPARA = {
+    '.mom': (parse_mom_file, save_mom_to_supabase),
+    '.hpr': (parse_hpr_file, save_hpr_to_supabase),
+    '.hqc': (parse_hqc_file, save_hqc_to_supabase),
+    '.fpr': (parse_fpr_file, save_fpr_to_supabase),
+}
+
+def process_file(filepath: str) -> bool:
+    """Processera en fil baserat på filtyp. Mäts per fas/tabell (import_matning)
+    och avslutas alltid med en IMPORT_MATNING-rad."""
+    import_matning.starta(os.path.basename(filepath))
+    ok = False
+    try:
+        ok = _process_file(filepath)
+        return ok
+    finally:
+        _rapportera_matning(import_matning.avsluta('OK' if ok else 'FEL'))
+
+def _process_file(filepath: str) -> bool:
+    filnamn = os.path.basename(filepath)
+    ext = os.path.splitext(filnamn)[1].lower()
+    import_matning.notera(filtyp=ext[1:].upper())
+    
+    logger.info(f"\n{'='*50}")
+    logger.info(f"Processar: {filnamn}")
+    logger.info(f"{'='*50}")
+    
+    # Startup-scan: om filen är markerad OK i meta men saknas i Behandlade har
+    # flytten misslyckats (t.ex. OneDrive-lås). Rensa meta så att importen körs om.
+    if is_file_already_imported(filnamn):
+        maskin_id_i_namn = None
+        m_maskin = re.search(r'_((?:PONS|R|A)\d+)_', filnamn)
+        if m_maskin:
+            maskin_id_i_namn = m_maskin.group(1)
+        if maskin_id_i_namn:
+            for sub in ('MOM', 'mom', 'HPR', 'hpr', 'HQC', 'hqc', 'FPR', 'fpr'):
+                dest_kand = os.path.join(BEHANDLADE, maskin_id_i_namn, sub, filnamn)
+                if any(os.path.exists(arkiv_dest(dest_kand, k)) for k in ('av', 'gzip', 'zstd')):
+                    break
+            else:
+                logger.warning(
+                    f"  ⚠ {filnamn}: meta=OK men saknas i Behandlade"
+                    f" — trolig flytt-miss. Rensar meta och re-importerar.")
+                delete_meta_entry(filnamn)
+
+    # Kolla om redan importerad
+    if is_file_already_imported(filnamn):
+        # Kumulativa filer (MOM/FPR) kan ha uppdaterats sedan import.
+        # Jämför filens mtime med importerad_tid — omimportera om nyare.
+        if ext in ('.mom', '.fpr'):
+            try:
+                file_mtime = os.path.getmtime(filepath)
+                import_time = get_import_time(filnamn)
+                if import_time and file_mtime > import_time + 60:  # 60s marginal
+                    logger.info(f"  Fil uppdaterad sedan import — omimporterar")
+                    delete_meta_entry(filnamn)
+                else:
+                    logger.info(f"  Redan importerad, hoppar över")
+                    import_matning.notera(status='hoppad')
+                    return False
+            except:
+                logger.info(f"  Redan importerad, hoppar över")
+                import_matning.notera(status='hoppad')
+                return False
+        else:
+            logger.info(f"  Redan importerad, hoppar över")
+            import_matning.notera(status='hoppad')
+            return False
+
+    # Vänta lite så filen hinner skrivas klart
+    time.sleep(INTAG_VANTETID_S)
+
+    # Innehålls-hash vid intag: samma innehåll redan importerat OK under
+    # annat namn → flytta till Behandlade och bokför, utan att parsa.
+    innehalls_hash = None
+    try:
+        innehalls_hash = get_file_hash(filepath)
+    except OSError as e:
+        logger.warning(f"  Kunde inte hasha filen: {e}")
+    if innehalls_hash and HASH_DEDUP and ext in ('.mom', '.hpr', '.hqc', '.fpr'):
+        tidigare = find_imported_by_hash(innehalls_hash)
+        if tidigare and tidigare.get('filnamn') != filnamn:
+            maskin_id = tidigare.get('maskin_id') or 'Okand'
+            filtyp = tidigare.get('filtyp') or ext[1:].upper()
+            logger.info(f"  Identiskt innehåll redan importerat som {tidigare['filnamn']} — hoppar parsning")
+            if move_to_behandlade(filepath, maskin_id, filtyp):
+                mark_file_imported(filnamn, filtyp, maskin_id, 'OK',
+                                   f"Innehåll identiskt med {tidigare['filnamn']} — ej omparsad",
+                                   innehalls_hash)
+                import_matning.notera(status='dubblett', maskin_id=maskin_id)
+                return True
+            logger.warning(f"  Kunde inte flytta innehållsdubbletten — importerar som vanligt")
+
+    try:
+        if ext not in _PARSA_SPARA:
+            logger.warning(f"  Okänd filtyp: {ext}")
+            return False
+        parsa, spara = _PARSA_SPARA[ext]
+        with import_matning.fas('parse'), import_profil.profil(filnamn, 'parse'):
+            data = parsa(filepath)
+        with import_profil.profil(filnamn, 'spara'):
+            success = spara(data)
+        
+        if success:
+            maskin_id = data.get('maskin', {}).get('maskin_id', 'Okand')
+            filtyp = data.get('filtyp', ext[1:].upper())
+            import_matning.notera(filtyp=filtyp, maskin_id=maskin_id)
+
+            moved = move_to_behandlade(filepath, maskin_id, filtyp)
+            if moved:
+                mark_file_imported(filnamn, filtyp, maskin_id, innehalls_hash=innehalls_hash)
+                logger.info(f"  ✓ KLAR!")
+            else:
+                mark_file_imported(filnamn, filtyp, maskin_id, 'FEL',
+                                   'Fil sparad till DB men flytt till Behandlade misslyckades')
+                logger.error(f"  ✗ Sparad till DB men kunde ej flytta — markerad FEL för omimport")
+            return moved
+        else:
+            mark_file_imported(filnamn, ext[1:].upper(), '', 'FEL', 'Kunde inte spara till databas')
+            return False
+            
+    except Exception as e:
+        logger.error(f"  ✗ FEL: {e}")
+        mark_file_imported(filnamn, ext[1:].upper(), '', 'FEL', str(e))
+        return False
+
+# ============================================================
+# BEFINTLIGA FILER
+# ============================================================
+
+def process_existing_files():
+    """Processa alla befintliga filer i Inkommande"""
+    logger.info(f"\nLetar efter befintliga filer i {INKOMMANDE}...")
+    
+    files = []
+    for ext in ['*.mom', '*.hpr', '*.hqc', '*.fpr']:
+        files.extend(Path(INKOMMANDE).glob(ext))
+    
+    if not files:
+        logger.info("Inga filer hittades.")
+        return
+    
+    logger.info(f"Hittade {len(files)} filer")
+    
+    processed = 0
+    errors = 0
+    
+    for filepath in sorted(files):
+        if process_file(str(filepath)):
+            processed += 1
+        else:
+            errors += 1
+    
+    logger.info(f"\n{'='*50}")
+    logger.info(f"SAMMANFATTNING")
+    logger.info(f"{'='*50}")
+    logger.info(f"Processade: {processed}")
+    logger.info(f"Fel/hoppade: {errors}")
+    logger.info(f"{'='*50}")
@@ -0,0 +1,433 @@
+"""skogsimport.klient — Supabase REST: anslutning, upsert, parallella batcher
+och operator-cachen.
+
+requests laddas vid första anropet (import_matning.matad), inte vid import —
+verktyg som bara parsar betalar aldrig för det.
+"""
+import json
+import os
+from datetime import datetime
+from typing import Dict, List
+
+import import_matning
+
+from .konfig import SUPABASE_KEY, SUPABASE_URL, _env, logger
+
+# Alla REST-anrop bokförs per tabell på aktiv filmätning (import_matning).
+# Utan aktiv mätning är omslaget genomskinligt.
+requests = import_matning.matad()
+
+# ============================================================
+# SUPABASE-ANSLUTNING (via REST API)
+# ============================================================
+
+# Fylls PÅ PLATS av init_supabase() — de andra modulerna har importerat samma
+# dict-objekt, så det får aldrig bytas ut.
+SUPABASE_HEADERS = {}
+
+# ── Operator email-cache ─────────────────────────────────────────────────────
+# Nyckel: (maskin_id, email_lowercase) → kanoniskt operator_id.
+# Laddas lättjefullt från dim_operator första gången resolve anropas.
+# Uppdateras in-session när ett nytt id skapas, så FPR-filer som
+# kommer efter MOM i samma körning redan hittar rätt id.
+_op_email_cache: Dict[tuple, str] = {}
+_op_cache_loaded: bool = False
+
+def _ensure_op_cache() -> None:
+    """Ladda dim_operator-emailar från Supabase en gång per skriptkörning."""
+    global _op_cache_loaded
+    if _op_cache_loaded:
+        return
+    _op_cache_loaded = True
+    try:
+        resp = requests.get(
+            f"{SUPABASE_URL}/rest/v1/dim_operator"
+            "?select=operator_id,maskin_id,email&email=not.is.null",
+            headers=SUPABASE_HEADERS, timeout=15
+        )
+        if resp.status_code == 200:
+            for row in resp.json():
+                mid = row.get('maskin_id') or ''
+                em  = (row.get('email') or '').strip().lower()
+                oid = row.get('operator_id') or ''
+                if mid and em and oid:
+                    _op_email_cache[(mid, em)] = oid
+            logger.debug(f"Operator-cache laddad: {len(_op_email_cache)} poster")
+    except Exception as e:
+        logger.warning(f"Kunde inte ladda operator email-cache: {e}")
+
+
+def resolve_operator_id(maskin_id: str, op_key: str, email: str, namn: str = '') -> str:
+    """
+    Returnera kanoniskt operator_id.
+
+    Fallback-ordning:
+      1. email finns + träff i dim_operator → återanvänd befintligt id
+      2. annars → f"{maskin_id}_{op_key}"  (= nuvarande beteende, säker separat rad)
+
+    Loggar WARNING om föraren har ett riktigt namn men saknar e-post —
+    det är ett maskin-konfigurationsproblem. Rottne (inget namn, inget e-post)
+    loggas bara på DEBUG-nivå.
+    """
+    if email:
+        _ensure_op_cache()
+        em_key = (maskin_id, email.strip().lower())
+        if em_key in _op_email_cache:
+            logger.debug(
+                f"  Operator normaliserad: {maskin_id}_{op_key} -> "
+                f"{_op_email_cache[em_key]} (email: {email})"
+            )
+            return _op_email_cache[em_key]
+    else:
+        har_riktigt_namn = namn and not namn.startswith('Operator ')
+        if har_riktigt_namn:
+            logger.warning(
+                f"  OPERATOR SAKNAR E-POST: '{namn}' pa {maskin_id} "
+                f"(key={op_key}) -- skapar {maskin_id}_{op_key}. "
+                f"Lagg in e-post i maskinen for automatisk normalisering."
+            )
+        else:
+            logger.debug(
+                f"  Operator {maskin_id}_{op_key} har inget namn/e-post "
+                f"(forvanta for Rottne)"
+            )
+
+    op_id = f"{maskin_id}_{op_key}"
+    if email:
+        # Registrera i session-cache: efterföljande filer i samma körning
+        # normaliserar direkt mot detta id utan att behöva träffa DB.
+        _op_email_cache[(maskin_id, email.strip().lower())] = op_id
+    return op_id
+
+# ─────────────────────────────────────────────────────────────────────────────
+
+def init_supabase():
+    """Initierar headers för Supabase REST API"""
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        logger.error("FEL: SUPABASE_URL och SUPABASE_SERVICE_ROLE_KEY måste finnas i .env.local")
+        return False
+    try:
+        SUPABASE_HEADERS.clear()
+        SUPABASE_HEADERS.update({
+            "apikey": SUPABASE_KEY,
+            "Authorization": f"Bearer {SUPABASE_KEY}",
+            "Content-Type": "application/json",
+            "Prefer": "return=minimal"
+        })
+        # Testa anslutning
+        response = requests.get(
+            f"{SUPABASE_URL}/rest/v1/dim_maskin?select=maskin_id&limit=1",
+            headers=SUPABASE_HEADERS,
+            timeout=30
+        )
+        if response.status_code in [200, 406]:  # 406 = tom tabell, OK
+            logger.info("✓ Ansluten till Supabase")
+            return True
+        else:
+            logger.error(f"✗ Supabase svarade med: {response.status_code}")
+            return False
+    except Exception as e:
+        logger.error(f"✗ Kunde inte ansluta till Supabase: {e}")
+        return False
+
+# ============================================================
+# SKRIVNING (REST)
+# ============================================================
+
+def insert_if_not_exists(table: str, data: List[Dict], filnamn_key: str = 'filnamn'):
+    """Insert rader om filnamnet inte redan finns i tabellen"""
+    if not data:
+        return 0
+    
+    try:
+        # Hämta filnamn från första raden
+        filnamn = data[0].get(filnamn_key)
+        if not filnamn:
+            return upsert_data(table, data)
+        
+        # Kolla om filnamnet redan finns
+        check_response = requests.get(
+            f"{SUPABASE_URL}/rest/v1/{table}?{filnamn_key}=eq.{filnamn}&select={filnamn_key}&limit=1",
+            headers=SUPABASE_HEADERS,
+            timeout=10
+        )
+        if check_response.status_code == 200 and check_response.json():
+            logger.info(f"  {table}: filnamn redan finns, hoppar över")
+            return len(data)  # Räknas som OK
+        
+        # Gör vanlig insert utan on_conflict
+        return upsert_data(table, data)
+    except Exception as e:
+        logger.error(f"  Fel vid insert_if_not_exists för {table}: {e}")
+        return 0
+
+
+def _rapportera_import_fel(tabell: str, filnamn, antal: int, felkod, feltext):
+    """Skriv ett tabellskrivfel till import_fel — så datatapp SYNS i
+    datahälsan och gap_check i stället för att dö i en oläst logg
+    (Wisent-läxan 21/7: felet loggades men ingen såg det).
+    Fail-soft: fel-rapportering får ALDRIG fälla importen, och aldrig
+    rekursera på sig själv."""
+    if tabell == 'import_fel':
+        return
+    try:
+        requests.post(
+            f"{SUPABASE_URL}/rest/v1/import_fel",
+            headers=SUPABASE_HEADERS,
+            json={'tabell': tabell,
+                  'filnamn': filnamn,
+                  'antal_rader': antal,
+                  'felkod': str(felkod)[:50],
+                  'feltext': str(feltext)[:500]},
+            timeout=15)
+    except Exception:
+        pass
+
+
+def upsert_data(table: str, data: List[Dict], unique_columns: List[str] = None, on_conflict: str = 'merge'):
+    """Upsert data till Supabase via REST API. on_conflict: 'merge' or 'ignore'"""
+    if not data:
+        return 0
+    
+    try:
+        # Konvertera datetime till ISO-format och ersätt None med null-kompatibelt
+        for row in data:
+            for key, value in list(row.items()):
+                if isinstance(value, datetime):
+                    row[key] = value.isoformat()
+                elif hasattr(value, 'isoformat'):
+                    row[key] = str(value)
+
+        # Normalisera alla rader till samma kolumner (Supabase kräver detta)
+        # Samla alla unika nycklar från alla rader
+        all_keys = set()
+        for row in data:
+            all_keys.update(row.keys())
+        
+        # Se till att alla rader har samma nycklar, sätt None för saknade
+        normalized = []
+        for row in data:
+            normalized_row = {k: row.get(k, None) for k in all_keys}
+            # Behåll alla nycklar - ta INTE bort None, Supabase kräver identiska nycklar per batch
+            normalized.append(normalized_row)
+        
+        # Kontrollera att alla rader nu har samma nycklar
+        if normalized:
+            first_keys = set(normalized[0].keys())
+            for i, row in enumerate(normalized):
+                if set(row.keys()) != first_keys:
+                    # Fyll på med None för saknade nycklar
+                    for k in first_keys:
+                        if k not in row:
+                            row[k] = None
+
+        headers = dict(SUPABASE_HEADERS)
+        
+        if unique_columns:
+            url = f"{SUPABASE_URL}/rest/v1/{table}?on_conflict={','.join(unique_columns)}"
+            headers["Prefer"] = f"resolution={'ignore-duplicates' if on_conflict == 'ignore' else 'merge-duplicates'}"
+        else:
+            url = f"{SUPABASE_URL}/rest/v1/{table}"
+        
+        response = requests.post(
+            url,
+            json=normalized,
+            headers=headers,
+            timeout=30
+        )
+        
+        if response.status_code in [200, 201, 204]:
+            return len(normalized)
+        else:
+            logger.error(f"  Fel vid sparande till {table}: {response.status_code} - {response.text[:200]}")
+            _rapportera_import_fel(
+                table,
+                normalized[0].get('filnamn') if normalized else None,
+                len(normalized), response.status_code, response.text)
+            return 0
+    except Exception as e:
+        logger.error(f"  Fel vid sparande till {table}: {e}")
+        fil = None
+        try:
+            fil = data[0].get('filnamn') if data and isinstance(data[0], dict) else None
+        except Exception:
+            pass
+        _rapportera_import_fel(table, fil, len(data), type(e).__name__, e)
+        return 0
+
+# ── Parallell batchskrivning ──────────────────────────────────────────────
+# detalj-tabellerna (stam/stock/gps) är OBEROENDE av varandra — olika
+# tabeller, disjunkta konfliktnycklar — men postades strikt i följd. För en
+# stor HPR (50k stockar = 100 batcher) var väntan på nätet nästan hela
+# importtiden. Här skickas batcherna samtidigt, med tak PER TABELL så att
+# en enda tabell inte kan äta upp PostgREST-poolen.
+#
+# BEROENDEN hålls av anroparen, inte här: allt som skickas i ett anrop får
+# köras i valfri ordning. Det som måste vänta (hpr_filer före hpr_stammar,
+# detalj_stock före rebuild_fakt_sortiment) körs FÖRE/EFTER anropet — det
+# returnerar först när samtliga batcher är klara.
+BATCH_STORLEK = 500
+# Bytetak per batch (JSON-kroppen). 500 rader räcker för smala tabeller men
+# inte för breda rader (lass, polylines) — en för stor kropp riskerar 30 s-
+# timeouten och då faller hela batchen. Se _rader_per_batch.
+BATCH_MAX_BYTES = int(_env.get('IMPORT_BATCH_BYTES') or os.getenv('IMPORT_BATCH_BYTES') or 1_000_000)
+PARALLELL_PER_TABELL = {
+    'detalj_stock': 4,
+    'detalj_stam': 3,
+    'detalj_gps_spar': 2,
+    'detalj_gps_segment': 2,
+    'hpr_stammar': 3,
+}
+PARALLELL_STANDARD = 2
+# IMPORT_PARALLELL=1 i .env.local ger gamla seriella beteendet (felsökning).
+PARALLELL_TAK = int(_env.get('IMPORT_PARALLELL') or os.getenv('IMPORT_PARALLELL') or 8)
+
+
+def kor_batcher_parallellt(uppgifter: List[tuple]) -> Dict[str, Dict[str, int]]:
+    """Kör oberoende skrivbatcher samtidigt.
+
+    uppgifter: lista av (tabell, antal_rader, anropbar) där anropbar() gör
+    skrivningen och returnerar antal sparade rader (0 = fel, som upsert_data).
+
+    Rapporteringen sker i INSKICKAD ordning (tabell för tabell), inte i den
+    ordning trådarna blir klara — loggen ser likadan ut från körning till
+    körning. Returnerar {tabell: {'batcher', 'fel', 'rader', 'sparade'}}.
+    """
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    import threading
+
+    if not uppgifter:
+        return {}
+
+    tabeller = list(dict.fromkeys(t for t, _, _ in uppgifter))
+    grans = {t: max(1, min(PARALLELL_PER_TABELL.get(t, PARALLELL_STANDARD), PARALLELL_TAK))
+             for t in tabeller}
+    tradar = max(1, min(PARALLELL_TAK, sum(grans.values())))
+
+    # Utdelning i anropande tråd: en batch lämnas till poolen först när både
+    # dess tabell och poolen har en ledig plats, och tabellerna turas om.
+    # Ingen pooltråd står alltså och väntar på en tabellgräns medan en annan
+    # tabells batcher köar (uppgifterna kommer tabell för tabell).
+    koer = {t: deque() for t in tabeller}
+    for i, (t, _, f) in enumerate(uppgifter):
+        koer[t].append((i, f))
+    aktiva = dict.fromkeys(tabeller, 0)
+    lediga = [tradar]
+    andrad = threading.Condition()
+
+    def _kor(tabell, anropbar):
+        try:
+            return anropbar() or 0
+        except Exception as e:
+            logger.error(f"  Fel vid parallell skrivning till {tabell}: {e}")
+            return 0
+        finally:
+            with andrad:
+                aktiva[tabell] -= 1
+                lediga[0] += 1
+                andrad.notify()
+
+    framtider = [None] * len(uppgifter)
+    with ThreadPoolExecutor(max_workers=tradar, thread_name_prefix='batch') as pool:
+        with andrad:
+            kvar, nasta = len(uppgifter), 0
+            while kvar:
+                delade = 0
+                for k in range(len(tabeller)):
+                    t = tabeller[(nasta + k) % len(tabeller)]
+                    if koer[t] and aktiva[t] < grans[t] and lediga[0]:
+                        i, f = koer[t].popleft()
+                        aktiva[t] += 1
+                        lediga[0] -= 1
+                        framtider[i] = pool.submit(_kor, t, f)
+                        delade += 1
+                        nasta = (nasta + k + 1) % len(tabeller)   # nästa varv börjar efter den här
+                kvar -= delade
+                if kvar and not delade:
+                    andrad.wait()
+
+    resultat = {t: {'batcher': 0, 'fel': 0, 'rader': 0, 'sparade': 0} for t in tabeller}
+    for (tabell, antal, _), fut in zip(uppgifter, framtider):
+        sparade = fut.result()
+        r = resultat[tabell]
+        r['batcher'] += 1
+        r['rader'] += antal
+        r['sparade'] += sparade
+        if antal and not sparade:
+            r['fel'] += 1
+
+    for tabell in tabeller:
+        r = resultat[tabell]
+        if r['fel']:
+            logger.warning(f"  {tabell}: {r['sparade']}/{r['rader']} rader sparade, "
+                           f"{r['fel']} av {r['batcher']} batcher misslyckades")
+        else:
+            logger.info(f"  {tabell}: {r['sparade']} rader i {r['batcher']} batcher "
+                        f"(max {grans[tabell]} samtidiga)")
+    return resultat
+
+
+def _rader_per_batch(rader: List[Dict]) -> int:
+    """Rader per batch: BATCH_STORLEK, eller färre om BATCH_MAX_BYTES annars
+    skulle överskridas. Radstorleken skattas från den största av upp till 32
+    jämnt spridda rader (att serialisera alla vore dubbelt arbete) — taket är
+    alltså en riktlinje, inte en garanti, när raderna varierar mycket."""
+    if not rader:
+        return BATCH_STORLEK
+    steg = max(1, len(rader) // 32)
+    storst = max(len(json.dumps(r, default=str)) for r in rader[::steg])
+    return max(1, min(BATCH_STORLEK, BATCH_MAX_BYTES // (storst + 1)))
+
+
+@import_matning.matt('batcher')
+def upsert_batcher_parallellt(jobb: List[tuple]) -> Dict[str, Dict[str, int]]:
+    """Dela upp (tabell, rader, unique_columns[, on_conflict]) i batcher om
+    BATCH_STORLEK rader / BATCH_MAX_BYTES och upserta alla samtidigt via
+    kor_batcher_parallellt."""
+    uppgifter = []
+    for j in jobb:
+        tabell, rader, unika = j[0], j[1], j[2]
+        on_conflict = j[3] if len(j) > 3 else 'merge'
+        per_batch = _rader_per_batch(rader)
+        for i in range(0, len(rader or []), per_batch):
+            batch = rader[i:i + per_batch]
+            uppgifter.append((
+                tabell, len(batch),
+                lambda t=tabell, b=batch, u=unika, oc=on_conflict: upsert_data(t, b, u, oc)))
+    return kor_batcher_parallellt(uppgifter)
+
+def cleanup_avbrott_duplicates():
+    """Rensa dubletter i fakt_avbrott och skapa UNIQUE constraint"""
+    logger.info("Rensar dubletter i fakt_avbrott och skapar UNIQUE constraint...")
+    cleanup_sql = """
+    DELETE FROM fakt_avbrott a
+    USING fakt_avbrott b
+    WHERE a.id > b.id
+      AND a.maskin_id = b.maskin_id
+      AND a.datum = b.datum
+      AND COALESCE(a.kategori_kod, '') = COALESCE(b.kategori_kod, '')
+      AND COALESCE(a.klockslag::text, '') = COALESCE(b.klockslag::text, '');
+    """
+    constraint_sql = """
+    ALTER TABLE fakt_avbrott
+    ADD CONSTRAINT unique_avbrott
+    UNIQUE (maskin_id, datum, klockslag, kategori_kod);
+    """
+    full_sql = cleanup_sql + constraint_sql
+    try:
+        resp = requests.post(
+            f"{SUPABASE_URL}/rest/v1/rpc/exec_sql",
+            json={"query": full_sql},
+            headers=SUPABASE_HEADERS,
+            timeout=30
+        )
+        if resp.status_code in [200, 204]:
+            logger.info("  Dubletter rensade och UNIQUE constraint skapad.")
+        else:
+            logger.warning(f"  Kunde inte köra via RPC: {resp.status_code}")
+            logger.info("  Kör följande SQL manuellt i Supabase SQL Editor:")
+            logger.info(cleanup_sql.strip())
+            logger.info(constraint_sql.strip())
+    except Exception as e:
+        logger.warning(f"  Kunde inte rensa dubletter: {e}")
@@ -0,0 +1,100 @@
+"""skogsimport.konfig — inställningar ur .env.local/miljön, sökvägar och loggning.
+
+Inga sidoeffekter vid import: saknade credentials upptäcks av
+klient.init_supabase(), och loggfilen öppnas först av konfigurera_loggning()
+(som importprogrammet anropar i main()).
+"""
+import logging
+import os
+
+# ============================================================
+# KONFIGURATION
+# ============================================================
+
+# Repo-/deploykatalogen — där .env.local och skogsmaskin_import_version_6.py ligger
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Läs Supabase-credentials från .env.local
+def _load_env_local():
+    env = {}
+    env_path = os.path.join(REPO_DIR, '.env.local')
+    if not os.path.exists(env_path):
+        return env
+    with open(env_path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            k, v = line.split('=', 1)
+            env[k.strip()] = v.strip()
+    return env
+
+_env = _load_env_local()
+SUPABASE_URL = _env.get('NEXT_PUBLIC_SUPABASE_URL') or os.getenv('SUPABASE_URL', '')
+SUPABASE_KEY = _env.get('SUPABASE_SERVICE_ROLE_KEY') or os.getenv('SUPABASE_SERVICE_ROLE_KEY', '')
+# Lokal stand-in (lokal_postgrest.py) för benchmark/regressionstest. Vinner över
+# .env.local — annars skulle en testkörning på en driftmaskin skriva till
+# den riktiga databasen.
+_LOKAL_POSTGREST = os.getenv('LOKAL_POSTGREST_URL', '')
+if _LOKAL_POSTGREST:
+    SUPABASE_URL, SUPABASE_KEY = _LOKAL_POSTGREST.rstrip('/'), 'lokal'
+
+# Nedre gräns för arbetsdag-bygget — SAMMA sanning som Vercel-routens
+# SYNK_FRAN i app/api/mom-import/route.ts. Två runtimes kan inte dela en
+# konstant, så de delar env-nyckel (MOM_SYNK_FRAN) och default — flyttas
+# gränsen görs det ALLTID i par (rutten + här).
+# Bakgrund: fakt_skift-rader före gränsen bär pre-#145-felattribution
+# (OperatorKey), och historiska arbetsdagar är redan manuellt rättade.
+# Utan gränsen återskapade omimporten av Lärk-filen (2026-07-22) 30h
+# arbetsdagar för 7–9 juli på FEL person — exakt det Vercel-routens
+# gräns fanns för att hindra, fast via den här andra skrivvägen.
+MOM_SYNK_FRAN = _env.get('MOM_SYNK_FRAN') or os.getenv('MOM_SYNK_FRAN') or '2026-07-14'
+
+# OneDrive-mappar. MOM_FILER_MAPP pekar om hela trädet (Inkommande, Behandlade,
+# loggen) — för benchmark/regressionstest mot en syntetisk korpus.
+ONEDRIVE_BASE = os.getenv('MOM_FILER_MAPP') or r"C:\Users\lindq\Kompersmåla Skog\Maskindata - Dokument\MOM-filer"
+INKOMMANDE = os.path.join(ONEDRIVE_BASE, "Inkommande")
+BEHANDLADE = os.path.join(ONEDRIVE_BASE, "Behandlade")
+
+# Väntetid innan en inkommande fil läses (hinner skrivas klart). 0 i benchmark,
+# där filerna redan ligger färdiga — annars är sömnen det enda som mäts.
+INTAG_VANTETID_S = float(os.getenv('INTAG_VANTETID_S', '1'))
+
+# Mätning per fil (import_matning): alltid en IMPORT_MATNING-rad i loggen.
+# IMPORT_MATNING_TABELL=1 skriver dessutom raden till meta_import_matning.
+IMPORT_MATNING_TABELL = (_env.get('IMPORT_MATNING_TABELL') or os.getenv('IMPORT_MATNING_TABELL') or '0') != '0'
+
+# Loggning
+LOG_FILE = os.path.join(ONEDRIVE_BASE, "import_logg.txt")
+
+# ============================================================
+# LOGGNING
+# ============================================================
+
+logger = logging.getLogger('skogsimport')
+
+
+def konfigurera_loggning():
+    """Logg till LOG_FILE + konsolen (som importen alltid loggat). Anropas av
+    programmet, inte vid import. Saknas OneDrive-mappen (utvecklingsdator)
+    loggas bara till konsolen i stället för att krascha."""
+    handlers = [logging.StreamHandler()]
+    if os.path.isdir(ONEDRIVE_BASE):
+        handlers.insert(0, logging.FileHandler(LOG_FILE, encoding='utf-8'))
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=handlers
+    )
+
+
+def _git_commit_short():
+    """Kort git-hash för katalogen skriptet ligger i. 'unknown' om ej git-repo
+    (t.ex. en lös kopia utanför repot — avslöjar att fel skript kört)."""
+    try:
+        import subprocess
+        out = subprocess.run(['git', '-C', REPO_DIR, 'rev-parse', '--short', 'HEAD'],
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or 'unknown'
+    except Exception:
+        return 'unknown'
@@ -0,0 +1,2462 @@
+"""skogsimport.parsers — Stanford2010-parsers (MOM, HPR, HQC, FPR) och deras
+hjälpfunktioner. Ren XML → dict; det enda nätanropet är operator-cachen
+(klient.resolve_operator_id), som laddas först när en fil med e-post parsas.
+"""
+import hashlib
+import os
+import re
+import uuid
+import xml.etree.ElementTree as ET
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from stanford_arkiv import open_stanford, stanford_namn
+
+from .klient import resolve_operator_id
+from .konfig import logger
+
+# UUID pattern — Rottne machines sometimes put UUIDs instead of operator names
+_UUID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
+
+# UUID-namespace för deterministisk mom_event_id (uuid5).
+# Får ALDRIG ändras — gör vi det krockar inte uppslag, men varje
+# omimporterat repair-event blir en NY rad istället för en dedup.
+NS_SKOGSYSTEM_MOM = uuid.UUID('5e08e95e-4b6a-5e8b-9e07-d0e7e0e7e0e7')
+
+def _strip_ns(tag: str) -> str:
+    """Strippa '{namespace}'-prefix från ett ElementTree-taggnamn."""
+    if tag and tag.startswith('{'):
+        return tag.split('}', 1)[1]
+    return tag
+
+def _compute_mom_event_id(maskin_id: str, monitoring_start_iso: str) -> str:
+    """Deterministisk uuid5 för ett repair-event. Samma input = samma uuid."""
+    return str(uuid.uuid5(NS_SKOGSYSTEM_MOM, f"{maskin_id}|{monitoring_start_iso}"))
+
+def _map_repair_to_kategori(delsystem: str, underorsak: Optional[str]) -> str:
+    """Mappa Stanford repair-orsakskategori till maskin_service.kategori
+    (CHECK: service|hydraulik|slang|punktering|motor|kran|aggregat|elektrisk|ovrigt)."""
+    if delsystem == 'LoaderLinkage' and underorsak == 'Hydraulics':
+        return 'hydraulik'
+    if delsystem == 'LoaderLinkage':
+        return 'kran'
+    if delsystem == 'Engine':
+        return 'motor'
+    if delsystem == 'Electrical':
+        return 'elektrisk'
+    if delsystem in ('Assortment', 'Sawing', 'Measuring', 'Feeding', 'Cutting'):
+        return 'aggregat'
+    return 'ovrigt'
+
+# ============================================================
+# HJÄLPFUNKTIONER
+# ============================================================
+
+def get_namespace(root) -> str:
+    """Extrahera namespace från root-elementet"""
+    if root.tag.startswith('{'):
+        return root.tag.split('}')[0] + '}'
+    return ''
+
+def find_element(parent, tag, ns=''):
+    """Hitta element med eller utan namespace"""
+    if ns:
+        elem = parent.find(f'{ns}{tag}')
+        if elem is not None:
+            return elem
+    return parent.find(tag)
+
+def find_all_elements(parent, tag, ns=''):
+    """Hitta alla element med eller utan namespace"""
+    if ns:
+        elems = parent.findall(f'{ns}{tag}')
+        if elems:
+            return elems
+    return parent.findall(tag)
+
+def get_text(parent, tag, ns='', default='') -> str:
+    """Hämta text från ett child-element"""
+    elem = find_element(parent, tag, ns)
+    if elem is not None and elem.text:
+        return elem.text.strip()
+    return default
+
+def get_attr(elem, attr, default='') -> str:
+    """Hämta attribut från element"""
+    if elem is not None:
+        return elem.get(attr, default)
+    return default
+
+def safe_float(val, default=0.0) -> float:
+    try:
+        return float(val) if val else default
+    except:
+        return default
+
+def safe_int(val, default=0) -> int:
+    try:
+        return int(float(val)) if val else default
+    except:
+        return default
+
+def nullif_empty(s):
+    """Konvertera tom eller whitespace-sträng till None. Behåller andra värden oförändrade."""
+    if s is None:
+        return None
+    if isinstance(s, str) and s.strip() == '':
+        return None
+    return s
+
+def normalize_bolag(b):
+    """Kanoniskt bolagsnamn ur XML:ns BusinessName. Speglar frontendens normalizeBolag
+    (app/helikopter-v2): trimmar och slår ihop kända skiftlägesvarianter så att
+    dim_objekt.bolag matchar bestallningar.bolag och helikoptervyerna (som joinar
+    bolag skiftlägeskänsligt). Utan detta blir 'VIDA' och 'Vida' skilda bolag och
+    beställd produktion räknas fel. Tom sträng lämnas tom — 'Okänt' är en
+    visningsetikett i frontend, aldrig ett DB-värde."""
+    t = (b or '').strip()
+    low = t.lower()
+    if low == 'vida':
+        return 'Vida'
+    if low == 'ata':
+        return 'ATA'
+    return t
+
+# ── Historiska vo-byten ───────────────────────────
+# En trakt kan få ett NYTT vo efter en dags körning; gamla vo:t ligger kvar i de äldre
+# filernas innehåll. Utan remap återskapar en re-import av de gamla filerna produktionen
+# under gamla vo:t = ett dubbelräknat spöke i uppföljningen (nya kumulativa filer bär redan
+# nya vo:t, så dedup slår ihop det som ska finnas). MÅSTE hållas identisk i båda importörerna.
+VO_REMAP = {
+    '11077137': '11240372',  # Rössmåla Ga 2026 — vo-byte efter 2026-08-05 (utrett + migrerat 2026-08-18)
+}
+
+
+def remap_vo(vo_nummer):
+    """Mappa historiskt utbytt vo → gällande vo (annars oförändrat)."""
+    return VO_REMAP.get((vo_nummer or '').strip(), (vo_nummer or '').strip())
+
+
+def make_objekt_id(vo_nummer: str, maskin_id: str, obj_key: str) -> str:
+    """Bygg objekt_id: använd vo_nummer om det är numeriskt, annars maskin_id_obj_key"""
+    vo = remap_vo(vo_nummer)
+    if vo.isdigit():
+        return vo
+    return f"{maskin_id}_{obj_key}"
+
+def ar_tidsstampelnamn(namn) -> bool:
+    """True om 'namnet' bara är siffror/datumskiljetecken — ett autogenererat
+    klockslag ('260325091142', '20250731', '2026-04-30 0753') eller tomt.
+    Sådana värden är ALDRIG riktiga objektnamn."""
+    if namn is None:
+        return True
+    s = str(namn).strip()
+    if not s:
+        return True
+    return re.fullmatch(r'[\d\s\-_:.]+', s) is not None
+
+# Suffixmönster i maskinernas filnamn, strippas iterativt bakifrån:
+#   _YYYYMMDD_HHMMSS        ominläst kopia (kan vara staplade)
+#   _MASKINID_YYYYMMDDHHMMSS  Ponsse skördare (HPR/MOM)
+#   -DDMMYY-HHMMSS          Ponsse skotare (FPR/MOM), även _DDMMYY-HHMMSS
+#   " YYYY-MM-DD[ HHMM]"    Rottne (MOM/HPR)
+_FILNAMN_SUFFIX = [
+    re.compile(r'_20\d{6}_\d{6}$'),
+    re.compile(r'_[A-Za-z0-9]+_20\d{12}$'),
+    re.compile(r'[-_]\d{6}-\d{6}$'),
+    re.compile(r'\s+\d{4}-\d{2}-\d{2}(\s+\d{4})?$'),
+]
+
+def harled_objektnamn(filnamn: str, object_name_xml: str = '') -> Optional[str]:
+    """ENDA namnhärledningen för dim_objekt — används av alla parsrar.
+
+    Maskinen stoppar förarens objektnamn i FILNAMNET vid export, medan
+    XML:ens <ObjectName> för självstartade objekt bara är en tidsstämpel
+    (verifierat: 'Rödby_2_6_S_P_RP__25-250326-091255.fpr' har
+    ObjectName=260325091142). Därför:
+      1) filnamnet utan ändelse och suffixmönster
+      2) tidsstämpel/tomt -> ObjectName om det inte också är tidsstämpel
+      3) annars None — hellre ärligt namnlöst än ett datum som låtsas
+         vara ett namn (vyer får visa 'namnlöst', aldrig ett klockslag).
+    """
+    base = os.path.basename(filnamn or '').rsplit('.', 1)[0]
+    andrat = True
+    while andrat:
+        andrat = False
+        for pat in _FILNAMN_SUFFIX:
+            nytt = pat.sub('', base)
+            if nytt != base:
+                base = nytt
+                andrat = True
+    namn = ' '.join(base.replace('_', ' ').split())
+    if not ar_tidsstampelnamn(namn):
+        return namn
+    if not ar_tidsstampelnamn(object_name_xml):
+        return str(object_name_xml).strip()
+    return None
+
+def normalize_maskin_id(maskin_id: str, tillverkare: str = '') -> str:
+    """Normalisera maskin-ID för konsekvent format"""
+    if not maskin_id:
+        return maskin_id
+    
+    # Om Rottne och ID är bara siffror, lägg till R
+    if tillverkare and 'rottne' in tillverkare.lower():
+        if maskin_id.isdigit():
+            return f"R{maskin_id}"
+    
+    # Om ID är bara siffror och 5 tecken (Rottne-format), lägg till R
+    if maskin_id.isdigit() and len(maskin_id) == 5:
+        return f"R{maskin_id}"
+    
+    return maskin_id
+
+def parse_datetime(dt_str) -> Optional[datetime]:
+    """Parsa datetime-sträng"""
+    if not dt_str:
+        return None
+    try:
+        dt_str = re.sub(r'[+-]\d{2}:\d{2}$', '', dt_str)
+        return datetime.fromisoformat(dt_str)
+    except:
+        return None
+
+
+# ============================================================
+# INNEHÅLLS-HASH för kalibreringskontroller
+# ------------------------------------------------------------
+# Samma HQC-mätning exporteras som flera filer med olika tidsstämpel i
+# namnet. Unikhet får därför avgöras på INNEHÅLL, inte filnamn. Hashen
+# beräknas över maskin- OCH operatörsvärden per stock (så en omklavning av
+# samma maskinmätta stam räknas som en ny kontroll).
+#
+# Måste bli IDENTISK oavsett om den räknas ur parserns dict (naiv datetime,
+# heltal) eller ur DB-rader (aware ISO-sträng, JSON-tal). Därför normaliseras:
+#   • datum → UTC-epoch-sekunder (parsern strippar tz → naiv = UTC).
+#   • tal   → kanonisk form ("442" == "442.0").
+def _hash_epoch(v):
+    """Datum/tidsvärde → UTC-epoch-sekunder som str (eller '' för tomt)."""
+    if v is None or v == '':
+        return ''
+    if isinstance(v, str):
+        try:
+            v = datetime.fromisoformat(v)
+        except Exception:
+            return v
+    if isinstance(v, datetime):
+        if v.tzinfo is None:
+            v = v.replace(tzinfo=timezone.utc)  # naiv (parsern) tolkas som UTC
+        return str(int(v.astimezone(timezone.utc).timestamp()))
+    return str(v)
+
+
+def _hash_num(v):
+    """Tal → kanonisk sträng (heltal utan decimal, '' för None)."""
+    if v is None:
+        return ''
+    try:
+        f = float(v)
+        return str(int(f)) if f == int(f) else repr(f)
+    except (TypeError, ValueError):
+        return str(v)
+
+
+def kontroll_innehalls_hash(stockar):
+    """sha1 över sorterade per-stock-tuplar. None om inga stockar (tom kontroll)."""
+    rows = sorted(
+        '|'.join([
+            _hash_num(s.get('stam_nummer')), _hash_num(s.get('stock_nummer')),
+            _hash_epoch(s.get('machine_measurement_date')),
+            _hash_epoch(s.get('operator_measurement_date')),
+            _hash_num(s.get('maskin_langd_cm')), _hash_num(s.get('maskin_toppdia_mm')),
+            _hash_num(s.get('operator_langd_cm')), _hash_num(s.get('operator_toppdia_mm')),
+            _hash_num(s.get('stem_dbh_mm')),
+        ])
+        for s in stockar
+    )
+    if not rows:
+        return None
+    return hashlib.sha1('\n'.join(rows).encode()).hexdigest()
+
+# ============================================================
+# MOM-PARSER
+# ============================================================
+
+def parse_mom_file(filepath: str) -> Dict[str, Any]:
+    """Parsa MOM-fil (Machine Operational Monitoring)"""
+    
+    with open_stanford(filepath) as f:
+        tree = ET.parse(f)
+    root = tree.getroot()
+    ns = get_namespace(root)
+    filnamn = stanford_namn(filepath)
+    
+    data = {
+        'maskin': {},
+        'operatorer': [],
+        'objekt': [],
+        'tradslag': [],
+        'tid': [],
+        'produktion': [],
+        'skift': [],
+        'avbrott': [],
+        'maskin_service': [],
+        'gps_spar': [],
+        'filnamn': filnamn,
+        'filtyp': 'MOM'
+    }
+    obj_key_map = {}  # {obj_key: objekt_id} för uppslaging i WorkTime-sektioner
+    
+    machine = find_element(root, 'Machine', ns)
+    if machine is None:
+        logger.warning(f"  Kunde inte hitta Machine-element i {filnamn}")
+        return data
+    
+    # === MASKINDATA ===
+    maskin_id = get_text(machine, 'BaseMachineManufacturerID', ns)
+    if not maskin_id:
+        maskin_id = get_text(machine, 'MachineKey', ns)
+    
+    model_elem = find_element(machine, 'MachineBaseModel', ns)
+    head_elem = find_element(machine, 'MachineHeadModel', ns)
+    
+    # Ägare
+    owner = find_element(machine, 'MachineOwner', ns)
+    agare = ''
+    if owner is not None:
+        agare = get_text(owner, 'BusinessName', ns)
+    
+    # maskin_typ för MOM: läs från XML-metadata (machineCategory-attribut)
+    mom_maskin_typ = get_attr(machine, 'machineCategory')
+    if not mom_maskin_typ:
+        mom_maskin_typ = 'Okänd'
+        logger.warning(f"  ⚠ Kunde inte avgöra maskin_typ för {maskin_id} — sätts till 'Okänd', uppdatera manuellt i dim_maskin")
+    data['maskin'] = {
+        'maskin_id': maskin_id,
+        'tillverkare': get_text(machine, 'MachineBaseManufacturer', ns),
+        'modell': get_text(machine, 'MachineBaseModel', ns),
+        'modell_ar': get_attr(model_elem, 'baseModelYear'),
+        'aggregat_tillverkare': get_text(machine, 'MachineHeadManufacturer', ns),
+        'aggregat': get_text(machine, 'MachineHeadModel', ns),
+        'aggregat_ar': get_attr(head_elem, 'headModelYear'),
+        'maskin_typ': mom_maskin_typ,
+        'chassi': maskin_id,
+        'agare': agare
+    }
+    
+    # Normalisera maskin-ID (Rottne får R framför)
+    maskin_id = normalize_maskin_id(maskin_id, data['maskin']['tillverkare'])
+    data['maskin']['maskin_id'] = maskin_id
+    data['maskin']['chassi'] = maskin_id
+    
+    logger.info(f"  Maskin: {maskin_id} ({data['maskin']['tillverkare']} {data['maskin']['modell']})")
+    
+    # === OPERATÖRER ===
+    for op_def in find_all_elements(machine, 'OperatorDefinition', ns):
+        op_key = get_text(op_def, 'OperatorKey', ns)
+        contact = find_element(op_def, 'ContactInformation', ns)
+
+        namn = ''
+        email = ''
+        if contact is not None:
+            fname = get_text(contact, 'FirstName', ns)
+            lname = get_text(contact, 'LastName', ns)
+            candidate = f"{fname} {lname}".strip()
+            # Skip UUID-like names (Rottne sometimes puts UUIDs instead of real names)
+            if candidate and not _UUID_RE.match(candidate):
+                namn = candidate
+            email = (get_text(contact, 'Email', ns) or '').strip()
+        if not namn:
+            candidate = get_text(op_def, 'OperatorUserID', ns)
+            if candidate and not _UUID_RE.match(candidate):
+                namn = candidate
+        if not namn:
+            namn = f"Operatör {op_key}"
+
+        if op_key:
+            op_id = resolve_operator_id(maskin_id, op_key, email, namn)
+            entry = {
+                'operator_id': op_id,
+                'operator_key': op_key,
+                'operator_namn': namn,
+                'maskin_id': maskin_id,
+            }
+            if email:
+                entry['email'] = email
+            data['operatorer'].append(entry)
+
+    # === PER-FIL OPERATORKEY-KARTA ===
+    # OperatorKey är FIL-LOKAL: maskinen skapar ny MOM-fil vid objektbyte och
+    # numrerar om — första föraren i den nya filen får key 1, oavsett vem det är.
+    # Identiteten ligger i ContactInformation (e-post) som resolve_operator_id
+    # normaliserar till kanoniskt operator_id. ALLA radtyper måste gå via denna
+    # karta — rå f"{maskin_id}_{op_key}" som identitet var rotorsaken till att
+    # ~92h attribuerades på fel förare (jun/jul 2026).
+    op_id_by_key = {o['operator_key']: o['operator_id'] for o in data['operatorer']}
+
+    def op_id_for_key(op_key: str, kontext: str):
+        """Kanoniskt operator_id för en fil-lokal OperatorKey.
+
+        INGEN tyst rå-fallback: saknas OperatorDefinition för nyckeln loggas
+        VARNING och raden lämnas oattribuerad (None) — hellre oattribuerad än
+        bokförd på fel förare. Tyst gissning var det som skapade felet.
+        """
+        if not op_key:
+            return None
+        oid = op_id_by_key.get(op_key)
+        if oid is None:
+            logger.warning(
+                f"  OPERATORKEY {op_key} SAKNAR OperatorDefinition i {filnamn} "
+                f"({kontext}) -- raden lamnas oattribuerad (operator_id=None)"
+            )
+        return oid
+
+    # === OBJEKT ===
+    for obj_def in find_all_elements(machine, 'ObjectDefinition', ns):
+        obj_key = get_text(obj_def, 'ObjectKey', ns)
+        contract_number = get_text(obj_def, 'ContractNumber', ns)
+        vo_nummer = contract_number if contract_number else get_text(obj_def, 'ObjectUserID', ns)
+        # Namn: gemensam härledning (filnamn primärt — XML:ens ObjectName är
+        # en tidsstämpel för självstartade objekt). Kan bli None = namnlöst.
+        obj_name = harled_objektnamn(filnamn, get_text(obj_def, 'ObjectName', ns))
+
+        # Skogsägare
+        forest_owner = find_element(obj_def, 'ForestOwner', ns)
+        skogsagare = ''
+        if forest_owner is not None:
+            skogsagare = get_text(forest_owner, 'LastName', ns)
+
+        # Bolag fran LoggingOrganisation
+        logging_org = find_element(obj_def, 'LoggingOrganisation', ns)
+        bolag = ''
+        if logging_org is not None:
+            contact = find_element(logging_org, 'ContactInformation', ns)
+            if contact is not None:
+                bolag = get_text(contact, 'BusinessName', ns)
+        
+        # Avverkningsform
+        logging_form = find_element(obj_def, 'LoggingForm', ns)
+        avverkningsform = ''
+        avverkningsform_kod = ''
+        if logging_form is not None:
+            avverkningsform_kod = get_text(logging_form, 'LoggingFormCode', ns)
+            avverkningsform = get_text(logging_form, 'LoggingFormDescription', ns)
+        
+        # Certifiering
+        certifiering = get_text(obj_def, 'ForestCertification', ns)
+        
+        # Avverkningsmetod (Ponsse-extension)
+        cutting_method = ''
+        ext = find_element(obj_def, 'Extension', ns)
+        if ext is not None:
+            ponsse = find_element(ext, 'Ponsse', ns)
+            if ponsse is None:
+                # Testa utan namespace
+                for child in ext:
+                    if 'Ponsse' in child.tag:
+                        ponsse = child
+                        break
+            if ponsse is not None:
+                cutting_method = get_text(ponsse, 'CuttingMethod', ns) or ponsse.findtext('.//{http://www.ponsse.com}CuttingMethod') or ''
+        
+        # Start- och slutdatum for objektet
+        start_date = parse_datetime(get_text(obj_def, 'StartDate', ns))
+        end_date = parse_datetime(get_text(obj_def, 'EndDate', ns))
+        
+        objekt_id = make_objekt_id(vo_nummer, maskin_id, obj_key)
+        obj_key_map[obj_key] = objekt_id
+        objektnr = get_text(obj_def, 'ObjectUserID', ns)
+
+        data['objekt'].append({
+            'objekt_id': objekt_id,
+            'object_key': obj_key,
+            'object_name': obj_name,
+            'vo_nummer': vo_nummer,
+            'objektnr': objektnr,
+            'bolag': normalize_bolag(bolag),
+            'areal_ha': safe_float(get_text(obj_def, 'ObjectArea', ns)),
+            'maskin_id': maskin_id,
+            'skogsagare': skogsagare,
+            'avverkningsform': avverkningsform,
+            'certifiering': certifiering,
+            'cutting_method': cutting_method,
+            'start_date': start_date,
+            'end_date': end_date
+        })
+    
+    # === TRÄDSLAG ===
+    for sp_def in find_all_elements(machine, 'SpeciesGroupDefinition', ns):
+        sp_key = get_text(sp_def, 'SpeciesGroupKey', ns)
+        if sp_key:
+            data['tradslag'].append({
+                'tradslag_id': f"{maskin_id}_{sp_key}",
+                'species_key': sp_key,
+                'namn': get_text(sp_def, 'SpeciesGroupName', ns),
+                'maskin_id': maskin_id
+            })
+    
+    # === GPS-SPÅR (alla positioner) ===
+    for track in find_all_elements(machine, 'Tracking', ns):
+        for coords in find_all_elements(track, 'TrackCoordinates', ns):
+            lat = safe_float(get_text(coords, 'Latitude', ns))
+            lon = safe_float(get_text(coords, 'Longitude', ns))
+            
+            if lat and lon:
+                coord_date = get_text(coords, 'CoordinateDate', ns)
+                obj_key = get_text(coords, 'ObjectKey', ns)
+                
+                data['gps_spar'].append({
+                    'maskin_id': maskin_id,
+                    'objekt_id': obj_key_map.get(obj_key, f"{maskin_id}_{obj_key}") if obj_key else None,
+                    'tidpunkt': parse_datetime(coord_date),
+                    'latitude': lat,
+                    'longitude': lon,
+                    'altitude': safe_float(get_text(coords, 'Altitude', ns)),
+                    'tracking_key': get_text(coords, 'TrackingKey', ns),
+                    'filnamn': filnamn
+                })
+    
+    logger.info(f"  GPS-punkter: {len(data['gps_spar'])}")
+
+    # === MASKININLOGGNING (OperatorLoginTime) ===
+    # Maskinens EGEN login-registrering, vid sidan av skiftets angivna start.
+    # Läses in som eget fält (maskin_inloggning_tid) och ändrar ALDRIG
+    # inloggning_tid (som styr arbetsdag/lön). Tidigaste login per (operator,
+    # datum) = dagens maskinstart. Gör synligt när en förare angav en TIDIGARE
+    # start än maskinen registrerade — uppföljning, inte korrigering.
+    maskin_login = {}  # (operator_id, date) -> tidigaste login-datetime
+    for login_time in find_all_elements(machine, 'OperatorLoginTime', ns):
+        _lk = get_text(login_time, 'OperatorKey', ns)
+        _ldt = parse_datetime(get_text(login_time, 'MonitoringStartTime', ns))
+        if not _ldt:
+            continue
+        _loid = op_id_for_key(_lk, 'maskin_login')
+        if not _loid:
+            continue
+        _mk = (_loid, _ldt.date())
+        if _mk not in maskin_login or _ldt < maskin_login[_mk]:
+            maskin_login[_mk] = _ldt
+
+    # === SKIFT (inloggning + utloggning) ===
+    for shift_def in find_all_elements(machine, 'OperatorShiftDefinition', ns):
+        op_key = get_text(shift_def, 'OperatorKey', ns)
+        start_time = get_text(shift_def, 'ShiftStartTime', ns)
+        end_time = get_text(shift_def, 'ShiftEndTime', ns)
+        # ShifKey (StanForD:s stavning) = maskinens EGET skift-id, stabilt
+        # genom skiftets hela livscykel. Timvisa MOM-filer rapporterar samma
+        # skift som växande ögonblicksbilder där BÅDE start och slut glider
+        # (07:00 -> 07:57 -> 13:18 -> 06:00 för samma skift observerat) —
+        # ShifKey är enda stabila identiteten. Verifierat 2026-07-21 över
+        # 1031 keys/3 maskiner: en key = ett skift = ett startdatum, alltid.
+        shift_key = get_text(shift_def, 'ShifKey', ns)
+        
+        start_dt = parse_datetime(start_time)
+        end_dt = parse_datetime(end_time)
+        
+        langd_sek = 0
+        if start_dt and end_dt:
+            langd_sek = int((end_dt - start_dt).total_seconds())
+        
+        # GPS vid inloggning
+        login_lat = None
+        login_lon = None
+        login_coords = find_element(shift_def, 'OperatorLogInCoordinates', ns)
+        if login_coords is not None:
+            login_lat = safe_float(get_text(login_coords, 'Latitude', ns))
+            login_lon = safe_float(get_text(login_coords, 'Longitude', ns))
+        
+        # GPS vid utloggning
+        logout_lat = None
+        logout_lon = None
+        logout_coords = find_element(shift_def, 'OperatorLogOutCoordinates', ns)
+        if logout_coords is not None:
+            logout_lat = safe_float(get_text(logout_coords, 'Latitude', ns))
+            logout_lon = safe_float(get_text(logout_coords, 'Longitude', ns))
+        
+        # Fallback: första GPS-punkt om login-coords saknas
+        if not login_lat and data['gps_spar']:
+            login_lat = data['gps_spar'][0]['latitude']
+            login_lon = data['gps_spar'][0]['longitude']
+        
+        skift_op_id = op_id_for_key(op_key, 'skift')
+        data['skift'].append({
+            'datum': start_dt.date() if start_dt else None,
+            'maskin_id': maskin_id,
+            'operator_id': skift_op_id,
+            'inloggning_tid': start_dt,
+            'maskin_inloggning_tid': maskin_login.get((op_id_for_key(op_key, 'skift'), start_dt.date())) if start_dt else None,
+            'utloggning_tid': end_dt,
+            'langd_sek': langd_sek,
+            'gps_lat': login_lat,
+            'gps_long': login_lon,
+            'logout_lat': logout_lat,
+            'logout_lon': logout_lon,
+            'filnamn': filnamn,
+            # Fallback om ShifKey mot förmodan saknas (alla kända maskiner med
+            # ShiftDefinitions HAR ShifKey — Ponsse Scorpion/Wisent/Elephant
+            # verifierade 2026-07-22): deterministisk nyckel som inkluderar
+            # STARTTIDEN, annars slår två äkta skift samma dag (Wisent 20/7:
+            # 11:33–17:01 + 17:02–18:53) ihop till en rad — eller värre,
+            # krockar i samma upsert-batch så HELA filens skift tappas.
+            # KÄND BEGRÄNSNING: skulle en framtida maskin BÅDE sakna ShifKey
+            # OCH skicka timvisa ögonblicksbilder med glidande start håller
+            # ingen tidsbaserad nyckel — då krävs överlappsmerge vid upsert.
+            # (Verifierat: Wisent-stil-filer bär FÄRDIGA skift med stabila
+            # tider mellan filer, så starttiden är säker som nyckel där.)
+            'shift_key': shift_key if shift_key else
+                f"SYN_{start_dt.date() if start_dt else 'okand'}_{skift_op_id or op_key or 'okand'}_{start_dt.strftime('%H%M') if start_dt else 'x'}"
+        })
+    
+    # === ARBETSTID & PRODUKTION ===
+    # Nyckla per individuell entry (MonitoringStartTime) så att överlappande entries
+    # mellan sessioner/filer dedupliceras korrekt. Entries som förekommer i flera
+    # filer (med uppdaterad duration) skrivs över med senaste filens värde.
+    raw_tid_entries = {}  # (start_time_str, maskin_id, objekt_id) -> {category_field: duration, ...}
+    tid_operator = {}  # (datum, maskin_id, objekt_id) -> senaste operator_id
+    
+    raw_produktion = defaultdict(lambda: {
+        'stammar': 0, 'volym_m3sob': 0, 'volym_m3sub': 0
+    })
+    
+    for work_time in find_all_elements(machine, 'IndividualMachineWorkTime', ns):
+        op_key = get_text(work_time, 'OperatorKey', ns)
+        obj_key = get_text(work_time, 'ObjectKey', ns)
+        start_time = get_text(work_time, 'MonitoringStartTime', ns)
+        duration = safe_int(get_text(work_time, 'MonitoringTimeLength', ns))
+
+        start_dt = parse_datetime(start_time)
+        datum = start_dt.date() if start_dt else None
+
+        objekt_id_wt = obj_key_map.get(obj_key, f"{maskin_id}_{obj_key}")
+        dag_key = (datum, maskin_id, objekt_id_wt)
+
+        # Nyckla per unik entry (MonitoringStartTime + operator) för dedup.
+        # Om samma entry (t.ex. en pågående arbetsperiod) förekommer i
+        # flera filer, SKRIVS den över med senaste filens värde.
+        # Operator-ID i nyckeln krävs för att per-förare rast/tid ska
+        # bevaras när samma maskin körs av två förare samma dag/objekt.
+        entry_operator = op_id_for_key(op_key, 'arbetstid')
+        if entry_operator:
+            tid_operator[dag_key] = entry_operator
+        entry_key = (start_time, maskin_id, objekt_id_wt, entry_operator)
+        entry = {
+            'datum': datum,
+            'operator_id': entry_operator,
+            'processing_sek': 0, 'terrain_sek': 0, 'other_work_sek': 0,
+            'maintenance_sek': 0, 'disturbance_sek': 0, 'rast_sek': 0,
+            'avbrott_sek': 0, 'kort_stopp_sek': 0, 'bransle_liter': 0,
+            'engine_time_sek': 0, 'korstracka_m': 0,
+            'terrain_korstracka_m': 0, 'terrain_bransle_liter': 0.0
+        }
+
+        other_data = find_element(work_time, 'OtherMachineData', ns)
+
+        if other_data is not None:
+            fuel = safe_float(get_text(other_data, 'FuelConsumption', ns))
+            if fuel < 10000:  # Rimlighetskontroll
+                entry['bransle_liter'] = fuel
+
+            engine_time = safe_int(get_text(other_data, 'EngineTime', ns))
+            entry['engine_time_sek'] = engine_time
+
+            distance = safe_int(get_text(other_data, 'DrivenDistance', ns))
+            entry['korstracka_m'] = distance
+
+            # Produktionsdata (skördare)
+            for harvester_data in find_all_elements(other_data, 'HarvesterData', ns):
+                sp_key = get_text(harvester_data, 'SpeciesGroupKey', ns)
+                stems = safe_int(get_text(harvester_data, 'NumberOfHarvestedStems', ns))
+                proc_cat = get_text(harvester_data, 'ProcessingCategory', ns)
+
+                # Normalisera processtyp
+                processtyp = 'Single'
+                if proc_cat and 'Multi' in proc_cat:
+                    processtyp = 'MTH'
+
+                volym_sob = 0.0
+                volym_sub = 0.0
+
+                for vol_elem in find_all_elements(harvester_data, 'TotalVolumeOfHarvestedLogs', ns):
+                    cat = get_attr(vol_elem, 'harvestedLogsVolumeCategory')
+                    val = safe_float(vol_elem.text)
+
+                    # MTH rapporterar uppskattad volym - ta med den, hoppa bara over estimated for Single
+                    if 'estimated' in cat.lower() and processtyp == 'Single':
+                        continue
+                    if 'sob' in cat.lower():
+                        if volym_sob == 0.0:  # Ta forsta sob-volymen, inte skriv over
+                            volym_sob = val
+                    elif 'sub' in cat.lower():
+                        if volym_sub == 0.0:
+                            volym_sub = val
+
+                if stems > 0 or volym_sub > 0:
+                    prod_key = (start_dt, maskin_id, entry_operator,
+                               objekt_id_wt, f"{maskin_id}_{sp_key}", processtyp)
+                    raw_produktion[prod_key]['stammar'] += stems
+                    raw_produktion[prod_key]['volym_m3sob'] += volym_sob
+                    raw_produktion[prod_key]['volym_m3sub'] += volym_sub
+
+        # Tidskategorier
+        run_cat = find_element(work_time, 'IndividualMachineRunTimeCategory', ns)
+        down_time = find_element(work_time, 'IndividualMachineDownTime', ns)
+        unutilized = find_element(work_time, 'IndividualUnutilizedTimeCategory', ns)
+
+        if run_cat is not None and run_cat.text:
+            cat = run_cat.text
+            if cat == 'Processing':
+                entry['processing_sek'] = duration
+            elif cat == 'Terrain travel':
+                entry['terrain_sek'] = duration
+                # Körsträcka och bränsle specifikt för terrängkörning
+                if other_data is not None:
+                    t_dist = safe_int(get_text(other_data, 'DrivenDistance', ns))
+                    t_fuel = safe_float(get_text(other_data, 'FuelConsumption', ns))
+                    entry['terrain_korstracka_m'] = t_dist
+                    if t_fuel < 10000:
+                        entry['terrain_bransle_liter'] = t_fuel
+            else:
+                entry['other_work_sek'] = duration
+                # StanForD lägger under-kategorin i attributet otherWorkCategory
+                # när run-time-värdet är "Other work" (Road travel / Preparing
+                # strip roads / Towing other machine / Roadside loading of truck /
+                # Unspecified). Fånga sekunder per kategori.
+                if cat == 'Other work':
+                    owc = get_attr(run_cat, 'otherWorkCategory') or 'Unspecified'
+                else:
+                    # Genuint okänt run-time-VÄRDE — bokförs i other_work men LOGGA;
+                    # en catch-all som tiger döljer nya StanForD-kategorier.
+                    logger.warning(f"  Okänd IndividualMachineRunTimeCategory '{cat}' i {filnamn} — bokförd som other_work")
+                    owc = f'OKÄND:{cat}'
+                entry['other_work_kategorier'] = {owc: duration}
+        elif down_time is not None:
+            maint = find_element(down_time, 'Maintenance', ns)
+            dist = find_element(down_time, 'Disturbance', ns)
+            repair = find_element(down_time, 'Repair', ns)
+            other = find_element(down_time, 'OtherMachineDownTimeCategory', ns)
+
+            if maint is not None:
+                entry['maintenance_sek'] = duration
+                maint_code = get_text(maint, 'MaintenanceStandardCode', ns)
+                data['avbrott'].append({
+                    'datum': datum,
+                    'klockslag': start_dt.time() if start_dt else None,
+                    'maskin_id': maskin_id,
+                    'operator_id': entry_operator,
+                    'objekt_id': objekt_id_wt,
+                    'typ': 'Underhåll',
+                    'kategori_kod': maint_code,
+                    'langd_sek': duration,
+                    'filnamn': filnamn
+                })
+            elif dist is not None:
+                entry['disturbance_sek'] = duration
+                dist_code = get_text(dist, 'DisturbanceStandardCode', ns)
+                data['avbrott'].append({
+                    'datum': datum,
+                    'klockslag': start_dt.time() if start_dt else None,
+                    'maskin_id': maskin_id,
+                    'operator_id': entry_operator,
+                    'objekt_id': objekt_id_wt,
+                    'typ': 'Störning',
+                    'kategori_kod': dist_code,
+                    'langd_sek': duration,
+                    'filnamn': filnamn
+                })
+            elif other is not None:
+                # Stanford v3.6 enum: "Waiting for repair", "Trailer transportation",
+                # "Unproductive terrain work", "Waiting for other machine production",
+                # "Other", "Default". Tid bokförs i avbrott_sek (regel A — konsekvent
+                # med Repair). Ingen maskin_service-rad — operativt avbrott, ej service.
+                entry['avbrott_sek'] = duration
+                other_code = get_text(other, 'OtherMachineDownTimeStandardCode', ns) or None
+                mfg = find_element(other, 'OtherMachineDownTimeManufacturerCode', ns)
+                mfg_desc = get_text(mfg, 'CodeDescription', ns) if mfg is not None else None
+                data['avbrott'].append({
+                    'datum': datum,
+                    'klockslag': start_dt.time() if start_dt else None,
+                    'maskin_id': maskin_id,
+                    'operator_id': entry_operator,
+                    'objekt_id': objekt_id_wt,
+                    'typ': 'Övrigt',
+                    'kategori_kod': other_code,
+                    'delsystem': None,
+                    'underorsak': None,
+                    'detalj': mfg_desc or None,
+                    'langd_sek': duration,
+                    'filnamn': filnamn
+                })
+            else:
+                # Tid landar i avbrott_sek oavsett om Repair-element finns.
+                # Uppföljningsvyns "Avbrott Xh" räknas från fakt_tid.avbrott_sek
+                # (regel A) — strukturerade rader till fakt_avbrott + maskin_service
+                # är ADDITION, inte ERSÄTTNING.
+                entry['avbrott_sek'] = duration
+
+                if repair is not None:
+                    repair_children = list(repair)
+                    if repair_children:
+                        # <Repair> har exakt ett barn = orsakskategori (LoaderLinkageRepairReason etc).
+                        orsakskategori_elem = repair_children[0]
+                        kat_tag = _strip_ns(orsakskategori_elem.tag)
+                        delsystem = kat_tag[:-len('RepairReason')] if kat_tag.endswith('RepairReason') else kat_tag
+
+                        # Underorsak = första barn till orsakskategorin (taggnamnet),
+                        # detalj = textinnehållet.
+                        underorsak = None
+                        detalj = None
+                        underorsak_children = list(orsakskategori_elem)
+                        if underorsak_children:
+                            uo_elem = underorsak_children[0]
+                            underorsak = _strip_ns(uo_elem.tag)
+                            detalj = (uo_elem.text or '').strip() or None
+
+                        # SpareParts kan finnas i 0..N block (alt c: konkatenera + summera).
+                        sp_namn_list, sp_beskr_list, sp_antal_total = [], [], 0
+                        for sp in find_all_elements(down_time, 'SpareParts', ns):
+                            sp_id = get_text(sp, 'SparePartIdentity', ns)
+                            sp_desc = get_text(sp, 'SparePartDescription', ns)
+                            sp_n = safe_int(get_text(sp, 'SparePartsNoOfItems', ns))
+                            if sp_id: sp_namn_list.append(sp_id)
+                            if sp_desc: sp_beskr_list.append(sp_desc)
+                            if sp_n: sp_antal_total += sp_n
+                        reservdel_namn = '; '.join(sp_namn_list) or None
+                        reservdel_beskrivning = '; '.join(sp_beskr_list) or None
+                        reservdel_antal = sp_antal_total or None
+
+                        mom_event_id = _compute_mom_event_id(maskin_id, start_time)
+
+                        kategori_kod_parts = ['REPAIR', delsystem.upper()]
+                        if underorsak:
+                            kategori_kod_parts.append(underorsak.upper())
+                        kategori_kod = '_'.join(kategori_kod_parts)
+
+                        ms_kategori = _map_repair_to_kategori(delsystem, underorsak)
+                        ms_del = reservdel_namn or ms_kategori
+                        if reservdel_beskrivning:
+                            ms_beskrivning = reservdel_beskrivning
+                        elif delsystem and detalj:
+                            ms_beskrivning = f"{delsystem}: {detalj}"
+                        else:
+                            ms_beskrivning = None
+
+                        data['avbrott'].append({
+                            'datum': datum,
+                            'klockslag': start_dt.time() if start_dt else None,
+                            'maskin_id': maskin_id,
+                            'operator_id': entry_operator,
+                            'objekt_id': objekt_id_wt,
+                            'typ': 'Reparation',
+                            'kategori_kod': kategori_kod,
+                            'langd_sek': duration,
+                            'mom_event_id': mom_event_id,
+                            'delsystem': delsystem,
+                            'underorsak': underorsak,
+                            'detalj': detalj,
+                            'filnamn': filnamn
+                        })
+
+                        data['maskin_service'].append({
+                            'mom_event_id': mom_event_id,
+                            'maskin_stanford_id': maskin_id,
+                            'operator_key': op_key,
+                            'kategori': ms_kategori,
+                            'del': ms_del,
+                            'beskrivning': ms_beskrivning,
+                            'datum': datum,
+                            'kalla': 'mom',
+                            'delsystem': delsystem,
+                            'underorsak': underorsak,
+                            'detalj': detalj,
+                            'reservdel_namn': reservdel_namn,
+                            'reservdel_beskrivning': reservdel_beskrivning,
+                            'reservdel_antal': reservdel_antal,
+                            'langd_sek': duration,
+                        })
+        elif unutilized is not None:
+            entry['rast_sek'] = duration
+
+        # Spara/skriv över entryn — senaste filens version vinner
+        raw_tid_entries[entry_key] = entry
+
+    # Korta stopp (IndividualShortDownTime) – nyckling per entry (MonitoringStartTime + operator).
+    # SEMANTIK: dessa är annoteringar av pauser INUTI G15-runtime (processing/terrain/other work)
+    # — INTE additiva segment; kort_stopp_sek får aldrig summeras med P/T/OW som "total tid".
+    # G15-gränsen (15 min = 900 s) tillämpas av MASKINEN när MOM skrivs. DownTime-segment
+    # UNDER gränsen (hamnar i fakt_avbrott) är maskingenererade övergångsglapp — appen räknar
+    # dem till "Korta pauser" ihop med kort_stopp_sek via lib/g15.ts (G15_GRANS_SEK = 900);
+    # väggklocke-separata mot ShortDownTime → adderbara. Ändras gränsen: uppdatera båda ställena.
+    for short_down in find_all_elements(machine, 'IndividualShortDownTime', ns):
+        duration = safe_int(get_text(short_down, 'MonitoringTimeLength', ns))
+        start_time = get_text(short_down, 'MonitoringStartTime', ns)
+        start_dt = parse_datetime(start_time)
+        op_key = get_text(short_down, 'OperatorKey', ns)
+        obj_key = get_text(short_down, 'ObjectKey', ns)
+
+        datum = start_dt.date() if start_dt else None
+        short_objekt_id = obj_key_map.get(obj_key, f"{maskin_id}_{obj_key}")
+        dag_key = (datum, maskin_id, short_objekt_id)
+
+        short_operator = op_id_for_key(op_key, 'kort stopp')
+        if short_operator:
+            tid_operator[dag_key] = short_operator
+        entry_key = (start_time, maskin_id, short_objekt_id, short_operator)
+        entry = raw_tid_entries.get(entry_key, {
+            'datum': datum,
+            'operator_id': short_operator,
+            'processing_sek': 0, 'terrain_sek': 0, 'other_work_sek': 0,
+            'maintenance_sek': 0, 'disturbance_sek': 0, 'rast_sek': 0,
+            'avbrott_sek': 0, 'kort_stopp_sek': 0, 'bransle_liter': 0,
+            'engine_time_sek': 0, 'korstracka_m': 0,
+            'terrain_korstracka_m': 0, 'terrain_bransle_liter': 0.0
+        })
+        entry['kort_stopp_sek'] = duration
+        raw_tid_entries[entry_key] = entry
+
+    # Aggregera dedupade entries per (datum, maskin_id, objekt_id, operator_id)
+    # — operator i nyckeln så att rast/tid stannar per förare när samma maskin
+    # delas av flera. Tidigare slogs allt ihop och "senaste operator" fick hela
+    # summan.
+    raw_tid_agg = defaultdict(lambda: {
+        'processing_sek': 0, 'terrain_sek': 0, 'other_work_sek': 0,
+        'maintenance_sek': 0, 'disturbance_sek': 0, 'rast_sek': 0,
+        'avbrott_sek': 0, 'kort_stopp_sek': 0, 'bransle_liter': 0,
+        'engine_time_sek': 0, 'korstracka_m': 0,
+        'terrain_korstracka_m': 0, 'terrain_bransle_liter': 0.0
+    })
+    for entry_key, entry in raw_tid_entries.items():
+        # entry_key kan vara (start_time, maskin, objekt, operator) eller
+        # gammal form (start_time, maskin, objekt) — tolerant mot båda.
+        if len(entry_key) == 4:
+            start_time_str, maskin, objekt, operator = entry_key
+        else:
+            start_time_str, maskin, objekt = entry_key
+            operator = entry.get('operator_id') or tid_operator.get((entry['datum'], maskin, objekt))
+        datum = entry['datum']
+        dag_key = (datum, maskin, objekt, operator)
+        for field in raw_tid_agg[dag_key]:
+            raw_tid_agg[dag_key][field] += entry.get(field, 0) or 0
+
+    # Konvertera till listor
+    for key, values in raw_tid_agg.items():
+        datum, maskin, objekt, operator = key
+
+        # Beräkna tomgång: G0 = runtime - kort_stopp (MOM runtime är G15-inklusiv)
+        runtime = values['processing_sek'] + values['terrain_sek'] + values['other_work_sek']
+        g0 = runtime - values['kort_stopp_sek']
+        tomgang = max(0, values['engine_time_sek'] - g0)
+
+        data['tid'].append({
+            'datum': datum,
+            'maskin_id': maskin,
+            'operator_id': operator,
+            'objekt_id': objekt,
+            **values,
+            'tomgang_sek': tomgang,
+            'filnamn': filnamn
+        })
+    
+    # Spara entry-level data för korrekt deduplicering över filer
+    data['tid_entries'] = raw_tid_entries
+    data['tid_operator'] = tid_operator
+
+    for key, values in raw_produktion.items():
+        start_dt_key, maskin, operator, objekt, tradslag, processtyp = key
+        datum_key = start_dt_key.date() if start_dt_key else None
+        data['produktion'].append({
+            'datum': datum_key,
+            'maskin_id': maskin,
+            'operator_id': operator,
+            'objekt_id': objekt,
+            'tradslag_id': tradslag,
+            'processtyp': processtyp,
+            'monitoring_start': start_dt_key,
+            **values,
+            'filnamn': filnamn
+        })
+    
+    # === MASKINSTATISTIK (totaler per fil) ===
+    op_mon = find_element(machine, 'OperationalMonitoring', ns)
+    if op_mon is not None:
+        total_engine = safe_int(get_text(op_mon, 'MachineEngineTime', ns))
+        total_fuel = safe_float(get_text(op_mon, 'MachineFuelConsumption', ns))
+        total_distance = safe_float(get_text(op_mon, 'MachineDrivenDistance', ns))
+        if total_engine or total_fuel or total_distance:
+            data['maskin_statistik'] = {
+                'maskin_id': maskin_id,
+                'filnamn': filnamn,
+                'total_engine_time_sek': total_engine,
+                'total_bransle_liter': total_fuel if total_fuel < 100000 else 0,
+                'total_korstracka_m': total_distance
+            }
+
+    logger.info(f"  Tid: {len(data['tid'])} poster, Produktion: {len(data['produktion'])} poster")
+    ovrigt_count = sum(1 for a in data['avbrott'] if a.get('typ') == 'Övrigt')
+    logger.info(f"  Avbrott: {len(data['avbrott'])}, Skift: {len(data['skift'])}, Repair-events: {len(data['maskin_service'])}, Övrigt: {ovrigt_count}")
+
+    # === SYNTETISKA SKIFT för maskiner utan OperatorShiftDefinition (t.ex. Rottne) ===
+    # Beräkna min/max MonitoringStartTime per (operator, datum) från WorkTime-entries
+    if not data['skift'] and raw_tid_entries:
+        op_dag_times = defaultdict(list)  # (operator_id, datum) -> [datetime, ...]
+        for ek, entry in raw_tid_entries.items():
+            if len(ek) == 4:
+                start_time_str, mid, oid, op_from_key = ek
+            else:
+                start_time_str, mid, oid = ek
+                op_from_key = None
+            dt = parse_datetime(start_time_str)
+            if not dt:
+                continue
+            op_id = op_from_key or entry.get('operator_id') or tid_operator.get((dt.date(), mid, oid))
+            if op_id:
+                duration_sek = 0
+                for f in ['processing_sek', 'terrain_sek', 'other_work_sek',
+                           'maintenance_sek', 'disturbance_sek', 'rast_sek', 'avbrott_sek']:
+                    duration_sek += entry.get(f, 0)
+                op_dag_times[(op_id, dt.date())].append((dt, duration_sek))
+
+        # ReportEndTime = rapportens sanna slut = förarens utloggning.
+        # Rottne saknar OperatorShiftDefinition, så syntetiska skift byggs av
+        # WorkTime-slut — vilket missar efterarbete efter sista stocken (körning,
+        # service, tomgång utan bucket). ReportEndTime fyller ut det.
+        # OBS: ReportStartTime används ALDRIG — den är KUMULATIV (arkivets
+        # början, t.ex. 29 juli i en 3-aug-fil), inte dagens start. ReportEndTime
+        # gäller filens SISTA dag; tidigare dagar i en kumulativ fil fick sin
+        # egen ReportEndTime när deras egen fil kom in.
+        report_end_dt = None
+        report_interval = find_element(machine, 'ReportInterval', ns)
+        if report_interval is not None:
+            report_end_dt = parse_datetime(get_text(report_interval, 'ReportEndTime', ns))
+
+        for (op_id, datum), entries in op_dag_times.items():
+            if not entries:
+                continue
+            earliest = min(e[0] for e in entries)
+            # Sluttid = senaste start + dess duration
+            latest_entry = max(entries, key=lambda e: e[0])
+            latest_end = latest_entry[0] + __import__('datetime').timedelta(seconds=latest_entry[1])
+            total_sek = sum(e[1] for e in entries)
+
+            # Fyll ut till förarens sanna utloggning BARA för filens sista dag
+            # (report_end_dt.date() == datum). max()-semantiken: förläng aldrig
+            # bakåt, korta aldrig — bara ut till utloggningen. Saknas
+            # ReportEndTime eller är den <= sista aktiviteten -> oförändrat
+            # (ingen regression). Idempotent: kuvert-merget vid upsert gör
+            # GREATEST(utloggning) och report_end är stabilt per fil, så
+            # omimport av samma fil ger samma resultat.
+            utloggning = latest_end
+            if report_end_dt and report_end_dt.date() == datum and report_end_dt > latest_end:
+                utloggning = report_end_dt
+
+            data['skift'].append({
+                'datum': datum,
+                'maskin_id': maskin_id,
+                'operator_id': op_id,
+                'inloggning_tid': earliest,
+                'maskin_inloggning_tid': maskin_login.get((op_id, datum)),
+                'utloggning_tid': utloggning,
+                'langd_sek': total_sek,
+                'gps_lat': None,
+                'gps_long': None,
+                'logout_lat': None,
+                'logout_lon': None,
+                'filnamn': filnamn,
+                # Rottne saknar ShifKey — deterministisk nyckel per (dag,
+                # operator) så timvisa snapshot-filer upsert:ar samma rad
+                # i stället för att stapla dubbletter
+                'shift_key': f"SYN_{datum}_{op_id}"
+            })
+
+        if data['skift']:
+            logger.info(f"  Syntetiska skift: {len(data['skift'])} (från WorkTime)")
+
+    return data
+
+# ============================================================
+# HPR-PARSER
+# ============================================================
+
+def parse_hpr_file(filepath: str) -> Dict[str, Any]:
+    """Parsa HPR-fil (Harvested Production Report)"""
+    
+    with open_stanford(filepath) as f:
+        tree = ET.parse(f)
+    root = tree.getroot()
+    ns = get_namespace(root)
+    filnamn = stanford_namn(filepath)
+    
+    data = {
+        'maskin': {},
+        'objekt': [],
+        'sortiment': [],
+        'sortiment_pris': [],
+        'tradslag': [],
+        'stammar': [],
+        'stockar': [],
+        'sortiment_summering': [],
+        'gps_spar': [],
+        'objekt_cert_updates': [],   # [(objekt_id, cert)]
+        'filnamn': filnamn,
+        'filtyp': 'HPR'
+    }
+    obj_key_map = {}  # {obj_key: objekt_id}
+    
+    machine = find_element(root, 'Machine', ns)
+    if machine is None:
+        logger.warning(f"  Kunde inte hitta Machine-element i {filnamn}")
+        return data
+    
+    # === MASKINDATA ===
+    maskin_id = get_text(machine, 'BaseMachineManufacturerID', ns)
+    if not maskin_id:
+        maskin_id = get_text(machine, 'MachineKey', ns)
+    
+    tillverkare = get_text(machine, 'MachineBaseManufacturer', ns)
+    maskin_id = normalize_maskin_id(maskin_id, tillverkare)
+    
+    # HPR = Harvester
+    data['maskin'] = {
+        'maskin_id': maskin_id,
+        'tillverkare': tillverkare,
+        'modell': get_text(machine, 'MachineBaseModel', ns),
+        'maskin_typ': 'Harvester',
+    }
+
+    logger.info(f"  Maskin: {maskin_id}")
+    
+    # === OBJEKT ===
+    for obj_def in find_all_elements(machine, 'ObjectDefinition', ns):
+        obj_key = get_text(obj_def, 'ObjectKey', ns)
+        contract_number = get_text(obj_def, 'ContractNumber', ns)
+        vo_nummer = contract_number if contract_number else get_text(obj_def, 'ObjectUserID', ns)
+        
+        # Avverkningsform
+        logging_form = find_element(obj_def, 'LoggingForm', ns)
+        avverkningsform = ''
+        avverkningsform_kod = ''
+        if logging_form is not None:
+            avverkningsform_kod = get_text(logging_form, 'LoggingFormCode', ns)
+            avverkningsform = get_text(logging_form, 'LoggingFormDescription', ns)
+        
+        certifiering = get_text(obj_def, 'ForestCertification', ns)
+        
+        # Skogsagare
+        forest_owner = find_element(obj_def, 'ForestOwner', ns)
+        skogsagare = ''
+        if forest_owner is not None:
+            skogsagare = get_text(forest_owner, 'LastName', ns)
+        
+        # Bolag
+        logging_org = find_element(obj_def, 'LoggingOrganisation', ns)
+        bolag = ''
+        if logging_org is not None:
+            contact = find_element(logging_org, 'ContactInformation', ns)
+            if contact is not None:
+                bolag = get_text(contact, 'BusinessName', ns)
+        
+        # Fastighetsnummer
+        # fastighet_id kolumn finns ej i dim_objekt – utelämnad
+        
+        # Start- och slutdatum för objektet
+        start_date = parse_datetime(get_text(obj_def, 'StartDate', ns))
+        end_date = parse_datetime(get_text(obj_def, 'EndDate', ns))
+        
+        objekt_id = make_objekt_id(vo_nummer, maskin_id, obj_key)
+        obj_key_map[obj_key] = objekt_id
+
+        data['objekt'].append({
+            'objekt_id': objekt_id,
+            'object_key': obj_key,
+            # Gemensam härledning — HPR-filnamn bär namnet ("Göljahult RP
+            # 2025_PONS..._20260310150612.hpr"), rå ObjectName gjorde det inte.
+            'object_name': harled_objektnamn(filnamn, get_text(obj_def, 'ObjectName', ns)),
+            'vo_nummer': vo_nummer,
+            'maskin_id': maskin_id,
+            'skogsagare': skogsagare,
+            'bolag': normalize_bolag(bolag),
+            'avverkningsform': avverkningsform,
+            'certifiering': certifiering,
+            'start_date': start_date,
+            'end_date': end_date
+        })
+
+        # För UPDATE objekt SET cert = ... WHERE dim_objekt_id = obj_key
+        if certifiering:
+            data['objekt_cert_updates'].append((objekt_id, certifiering))
+    
+    # === SORTIMENT/PRODUKTER ===
+    product_names = {}
+    for prod_def in find_all_elements(machine, 'ProductDefinition', ns):
+        prod_key = get_text(prod_def, 'ProductKey', ns)
+        prod_name = get_text(prod_def, 'ProductName', ns)
+        # Rottne/Ponsse: ProductName kan ligga i ClassifiedProductDefinition
+        if not prod_name:
+            for sub_tag in ['ClassifiedProductDefinition', 'UnclassifiedProductDefinition']:
+                sub = find_element(prod_def, sub_tag, ns)
+                if sub is not None:
+                    prod_name = get_text(sub, 'ProductName', ns)
+                    prod_group = get_text(sub, 'ProductGroupName', ns)
+                    if prod_name and prod_group and prod_group not in prod_name:
+                        prod_name = f"{prod_group}: {prod_name}"
+                    break
+        product_names[prod_key] = prod_name
+
+        # Color1 (färgmärkning) från ClassifiedProductDefinition.
+        # Pris hanteras separat per dimensionsklass via ProductMatrixItem nedan.
+        fargmarkning = None
+        for sub_tag in ['ClassifiedProductDefinition', 'UnclassifiedProductDefinition']:
+            sub = find_element(prod_def, sub_tag, ns)
+            if sub is not None:
+                color_txt = (get_text(sub, 'Color1', ns) or '').strip().lower()
+                if color_txt in ('true', 'false'):
+                    fargmarkning = color_txt == 'true'
+                break
+
+        sort_row = {
+            'sortiment_id': f"{maskin_id}_{prod_key}",
+            'product_key': prod_key,
+            'namn': prod_name,
+            'maskin_id': maskin_id,
+        }
+        if fargmarkning is not None:
+            sort_row['fargmarkning'] = fargmarkning
+        data['sortiment'].append(sort_row)
+
+        # === PRIS-MATRIS (ProductMatrixItem) ===
+        # Verifierat StanForD-2010-nesting:
+        #   ClassifiedProductDefinition
+        #     └── ProductMatrixes (container)
+        #          └── ProductMatrixItem (en per [lengthClass, diameterClass]-tröskel)
+        #               @lengthClassLowerLimit, @diameterClassLowerLimit (attribut)
+        #               <Price>...</Price> (sub-element)
+        # Inga upper-limits — övre gränser är implicita (nästa rads lower-limit).
+        # Lookup görs som "find largest threshold not exceeding stockens dim".
+        classified = find_element(prod_def, 'ClassifiedProductDefinition', ns) \
+                     or find_element(prod_def, 'UnclassifiedProductDefinition', ns)
+        if classified is not None:
+            sortiment_id = f"{maskin_id}_{prod_key}"
+            matrixes = find_element(classified, 'ProductMatrixes', ns)
+            if matrixes is not None:
+                for matrix_item in find_all_elements(matrixes, 'ProductMatrixItem', ns):
+                    lc_lower = safe_int(matrix_item.get('lengthClassLowerLimit'))
+                    dc_lower = safe_int(matrix_item.get('diameterClassLowerLimit'))
+                    pris_txt = get_text(matrix_item, 'Price', ns)
+                    pris = safe_float(pris_txt) if pris_txt else None
+                    # pris > 0 — många matrix-items har Price=0 för otillåtna kombinationer
+                    if pris is not None and pris > 0 and lc_lower and dc_lower:
+                        data['sortiment_pris'].append({
+                            'sortiment_id': sortiment_id,
+                            'langd_min_cm': lc_lower,
+                            'dia_min_mm': dc_lower,
+                            'pris_per_m3': pris,
+                        })
+    
+    # === TRÄDSLAG ===
+    species_names = {}
+    for sp_def in find_all_elements(machine, 'SpeciesGroupDefinition', ns):
+        sp_key = get_text(sp_def, 'SpeciesGroupKey', ns)
+        sp_name = get_text(sp_def, 'SpeciesGroupName', ns)
+        species_names[sp_key] = sp_name
+        
+        data['tradslag'].append({
+            'tradslag_id': f"{maskin_id}_{sp_key}",
+            'species_key': sp_key,
+            'namn': sp_name,
+            'maskin_id': maskin_id
+        })
+    
+    # === KÖRSPÅR (TrackCoordinates) ===
+    for track in find_all_elements(machine, 'Tracking', ns):
+        for coords in find_all_elements(track, 'TrackCoordinates', ns):
+            lat = safe_float(get_text(coords, 'Latitude', ns))
+            lon = safe_float(get_text(coords, 'Longitude', ns))
+            if lat and lon:
+                coord_date = get_text(coords, 'CoordinateDate', ns)
+                obj_key = get_text(coords, 'ObjectKey', ns)
+                data['gps_spar'].append({
+                    'maskin_id': maskin_id,
+                    'objekt_id': obj_key_map.get(obj_key, f"{maskin_id}_{obj_key}") if obj_key else None,
+                    'tidpunkt': parse_datetime(coord_date),
+                    'latitude': lat,
+                    'longitude': lon,
+                    'altitude': safe_float(get_text(coords, 'Altitude', ns)),
+                    'tracking_key': get_text(coords, 'TrackingKey', ns),
+                    'filnamn': filnamn,
+                })
+
+    # === STAMMAR OCH STOCKAR ===
+    sortiment_volymer = defaultdict(lambda: {'stockar': 0, 'volym_m3sob': 0, 'volym_m3sub': 0,
+                                              'total_langd': 0, 'total_dia': 0})
+    hpr_stam_nummer = 0
+
+    for stem in find_all_elements(machine, 'Stem', ns):
+        single_tree = find_element(stem, 'SingleTreeProcessedStem', ns)
+        if single_tree is None:
+            continue
+
+        hpr_stam_nummer += 1
+
+        # BioEnergyAdaption (GROT)
+        bio_energy = get_text(stem, 'BioEnergyAdaption', ns)
+
+        # StemKey och ObjectKey ligger på Stem-nivå i Ponsse-filer
+        stem_key = get_text(stem, 'StemKey', ns)
+        if not stem_key:
+            stem_key = get_text(single_tree, 'StemKey', ns)
+        sp_key = get_text(stem, 'SpeciesGroupKey', ns) or get_text(single_tree, 'SpeciesGroupKey', ns)
+        obj_key = get_text(stem, 'ObjectKey', ns) or get_text(single_tree, 'ObjectKey', ns)
+        
+        # Generera stam-nyckel om StemKey saknas
+        if not stem_key:
+            stem_key = f"auto_{len(data['stammar'])+1}"  
+        
+        # DBH
+        dbh = safe_int(get_text(single_tree, 'DBH', ns))
+        
+        # GPS för stam - Rottne: StemCoordinates på Stem-nivå, Ponsse: Coordinates i SingleTree
+        stem_lat = None
+        stem_lon = None
+        stem_alt = None
+        stem_coords = find_element(stem, 'StemCoordinates', ns)
+        if stem_coords is None:
+            stem_coords = find_element(single_tree, 'Coordinates', ns)
+        if stem_coords is None:
+            stem_coords = find_element(single_tree, 'StemCoordinates', ns)
+        if stem_coords is not None:
+            stem_lat = safe_float(get_text(stem_coords, 'Latitude', ns))
+            stem_lon = safe_float(get_text(stem_coords, 'Longitude', ns))
+            stem_alt = safe_float(get_text(stem_coords, 'Altitude', ns))
+
+        # StemGrade (1-4)
+        stem_grade = None
+        grade_elem = find_element(stem, 'StemGrade', ns) or find_element(single_tree, 'StemGrade', ns)
+        if grade_elem is not None:
+            stem_grade = safe_int(get_text(grade_elem, 'GradeValue', ns))
+
+        # StumpTreatment (boolean)
+        stump_treat_txt = (get_text(stem, 'StumpTreatment', ns) or
+                           get_text(single_tree, 'StumpTreatment', ns) or '').strip().lower()
+        stubbbehandling = True if stump_treat_txt == 'true' else (False if stump_treat_txt == 'false' else None)
+
+        # ManualFreeBuck (boolean) — manuell frikap
+        free_buck_txt = (get_text(stem, 'ManualFreeBuck', ns) or
+                         get_text(single_tree, 'ManualFreeBuck', ns) or '').strip().lower()
+        manuell_frikap = True if free_buck_txt == 'true' else (False if free_buck_txt == 'false' else None)
+        
+        # Tidpunkt - Rottne: HarvestDate på Stem-nivå, Ponsse: ProcessingDate i SingleTree
+        processing_date = get_text(single_tree, 'ProcessingDate', ns) or get_text(stem, 'HarvestDate', ns)
+        tidpunkt = parse_datetime(processing_date)
+        datum = tidpunkt.date() if tidpunkt else None
+        if datum is None:
+            # Försök hämta datum från filnamnet (format YYYYMMDD)
+            import re
+            date_match = re.search(r'(\d{8})', filnamn)
+            if date_match:
+                try:
+                    from datetime import date
+                    ds = date_match.group(1)
+                    datum = date(int(ds[:4]), int(ds[4:6]), int(ds[6:8]))
+                except:
+                    pass
+        
+        stam_data = {
+            'stam_key': stem_key,
+            'maskin_id': maskin_id,
+            'objekt_id': obj_key_map.get(obj_key, f"{maskin_id}_{obj_key}") if obj_key else None,
+            'tradslag_id': f"{maskin_id}_{sp_key}" if sp_key else None,
+            'dbh_mm': dbh,
+            'latitude': stem_lat,
+            'longitude': stem_lon,
+            'altitude': stem_alt,
+            'stem_grade': stem_grade,
+            'stubbbehandling': stubbbehandling,
+            'manuell_frikap': manuell_frikap,
+            'tidpunkt': tidpunkt,
+            'filnamn': filnamn
+        }
+        data['stammar'].append(stam_data)
+
+        # Per-stam aggregat för hpr_stammar
+        hpr_antal_stockar = 0
+        hpr_total_volym = 0.0
+        hpr_sortiment_list = []
+
+        # Stockar från denna stam
+        for log in find_all_elements(single_tree, 'Log', ns):
+            log_key = get_text(log, 'LogKey', ns)
+            prod_key = get_text(log, 'ProductKey', ns)
+            
+            # Längd och diameter (ob = on bark, ub = under bark)
+            log_meas = find_element(log, 'LogMeasurement', ns)
+            langd = 0
+            toppdia_ob = 0
+            toppdia_ub = 0
+            if log_meas is not None:
+                langd = safe_int(get_text(log_meas, 'LogLength', ns))
+                for dia_elem in find_all_elements(log_meas, 'LogDiameter', ns):
+                    cat = get_attr(dia_elem, 'logDiameterCategory').lower()
+                    val = safe_int(dia_elem.text) if dia_elem.text else 0
+                    if 'top ob' in cat or cat == 'top':
+                        toppdia_ob = val
+                    elif 'top ub' in cat:
+                        toppdia_ub = val
+                # Fallback: if only one value exists, use it as ob
+                if toppdia_ob == 0 and toppdia_ub > 0:
+                    toppdia_ob = toppdia_ub
+            toppdia = toppdia_ob  # used below for sortiment_volymer summary
+            
+            # Volymer
+            volym_sob = 0
+            volym_sub = 0
+            volym_price = 0
+            for vol_elem in find_all_elements(log, 'LogVolume', ns):
+                cat = get_attr(vol_elem, 'logVolumeCategory')
+                val = safe_float(vol_elem.text)
+                if 'm3sob' in cat.lower():
+                    volym_sob = val
+                elif 'm3sub' in cat.lower():
+                    volym_sub = val
+                elif 'm3' in cat.lower() and 'price' in cat.lower():
+                    volym_price = val  # m3 (price) = prisvolym, används som m3sub-fallback
+            # Fallback: om m3sub saknas, använd prisvolym
+            if volym_sub == 0 and volym_price > 0:
+                volym_sub = volym_price
+            
+            # Kaporsak
+            cutting_cat = find_element(log, 'CuttingCategory', ns)
+            kaporsak = ''
+            if cutting_cat is not None:
+                kaporsak = get_text(cutting_cat, 'CuttingReason', ns)
+            
+            _stock_objekt_id = obj_key_map.get(obj_key) if obj_key else None
+            stock_data = {
+                # Filnamn borta — HPR är kumulativa, dedupe sker på (maskin_id, stem_key, log_key)
+                'stock_key': f"{stem_key}_{log_key}",
+                'stem_key': stem_key,
+                'log_key': safe_int(log_key),
+                'maskin_id': maskin_id,
+                'objekt_id': _stock_objekt_id,
+                'sortiment_id': f"{maskin_id}_{prod_key}" if prod_key else None,
+                'sortiment_namn': product_names.get(prod_key, ''),
+                'langd_cm': langd,
+                'toppdia_ob_mm': toppdia_ob,
+                'toppdia_ub_mm': toppdia_ub,
+                'volym_m3sob': volym_sob,
+                'volym_m3sub': volym_sub,
+                'kaporsak': kaporsak,
+                'latitude': stem_lat,
+                'longitude': stem_lon,
+                'filnamn': filnamn,
+            }
+            data['stockar'].append(stock_data)
+
+            # Aggregera för hpr_stammar
+            hpr_antal_stockar += 1
+            hpr_total_volym += volym_sub
+            prod_namn = product_names.get(prod_key, '')
+            if prod_namn:
+                hpr_sortiment_list.append(prod_namn)
+
+            # Summera per sortiment - hoppa om obj_key saknas i kartan
+            _objekt_id = obj_key_map.get(obj_key) if obj_key else None
+            if not _objekt_id:
+                continue
+            sort_key = (datum, maskin_id, _objekt_id, f"{maskin_id}_{prod_key}")
+            sortiment_volymer[sort_key]['stockar'] += 1
+            sortiment_volymer[sort_key]['volym_m3sob'] += volym_sob
+            sortiment_volymer[sort_key]['volym_m3sub'] += volym_sub
+            sortiment_volymer[sort_key]['total_langd'] += langd
+            sortiment_volymer[sort_key]['total_dia'] += toppdia
+
+        # Lägg till hpr_stammar-fält i stam_data (efter log-loopen)
+        tradslag_namn = species_names.get(sp_key, sp_key or '')
+        hpr_sortiment = None
+        if hpr_sortiment_list:
+            dominant_group = Counter(hpr_sortiment_list).most_common(1)[0][0]
+            if dominant_group:
+                ts_cap = tradslag_namn.capitalize() if tradslag_namn else ''
+                hpr_sortiment = f"{ts_cap} {dominant_group}".strip() or None
+        stam_data['hpr_stam_nummer'] = hpr_stam_nummer
+        stam_data['hpr_tradslag_namn'] = tradslag_namn
+        stam_data['hpr_antal_stockar'] = hpr_antal_stockar
+        stam_data['hpr_total_volym'] = round(hpr_total_volym, 6) if hpr_total_volym > 0 else None
+        stam_data['hpr_bio_energy_adaption'] = bio_energy if bio_energy else None
+        stam_data['hpr_sortiment'] = hpr_sortiment
+
+    # Konvertera sortiment-summering - hoppa over rader med null objekt_id
+    for key, values in sortiment_volymer.items():
+        datum, maskin, objekt, sortiment = key
+        if not objekt or objekt.endswith('_'):
+            continue  # Hoppa over rader utan giltig objekt_id
+        medel_langd = values['total_langd'] / values['stockar'] if values['stockar'] > 0 else 0
+        medel_dia = values['total_dia'] / values['stockar'] if values['stockar'] > 0 else 0
+        
+        data['sortiment_summering'].append({
+            'datum': datum,
+            'maskin_id': maskin,
+            'objekt_id': objekt,
+            'sortiment_id': sortiment,
+            'stockar': values['stockar'],
+            'volym_m3sob': values['volym_m3sob'],
+            'volym_m3sub': values['volym_m3sub'],
+            'medel_langd_cm': medel_langd,
+            'medel_toppdia_mm': medel_dia,
+            'filnamn': filnamn
+        })
+    
+    logger.info(f"  Stammar: {len(data['stammar'])}, Stockar: {len(data['stockar'])}")
+    logger.info(f"  Sortiment: {len(data['sortiment_summering'])} olika")
+    
+    return data
+
+# ============================================================
+# HQC-PARSER
+# ============================================================
+
+def parse_hqc_file(filepath: str) -> Dict[str, Any]:
+    """Parsa HQC-fil (Harvesting Quality Control)"""
+    
+    with open_stanford(filepath) as f:
+        tree = ET.parse(f)
+    root = tree.getroot()
+    ns = get_namespace(root)
+    filnamn = stanford_namn(filepath)
+    
+    data = {
+        'maskin': {},
+        'kalibrering': [],
+        'kalibrering_historik': [],
+        'kontroll_stockar': [],
+        'kontroll_stammar': [],
+        'kontroll_matpunkter': [],
+        'filnamn': filnamn,
+        'filtyp': 'HQC'
+    }
+    
+    machine = find_element(root, 'Machine', ns)
+    if machine is None:
+        logger.warning(f"  Kunde inte hitta Machine-element i {filnamn}")
+        return data
+    
+    # === MASKINDATA ===
+    maskin_id = get_text(machine, 'BaseMachineManufacturerID', ns)
+    if not maskin_id:
+        maskin_id = get_text(machine, 'MachineKey', ns)
+    
+    tillverkare = get_text(machine, 'MachineBaseManufacturer', ns)
+    maskin_id = normalize_maskin_id(maskin_id, tillverkare)
+    
+    # HQC = Harvester
+    data['maskin'] = {'maskin_id': maskin_id, 'maskin_typ': 'Harvester'}
+    
+    # Hämta datum från header
+    header = find_element(root, 'HarvestingQualityControlHeader', ns)
+    creation_date = None
+    if header is not None:
+        creation_date = parse_datetime(get_text(header, 'CreationDate', ns))
+    
+    logger.info(f"  Maskin: {maskin_id}")
+
+    # === KONTROLLSTAMMAR ===
+    control_values = find_element(machine, 'ControlValues', ns)
+
+    # === PER-FIL-DATA (Stanford 2010) ===
+    application_version = get_text(header, 'ApplicationVersionCreated', ns) if header is not None else None
+
+    butt_log_length_adjustment_mm = None
+    calib_values_early = find_element(machine, 'CalibrationValues', ns)
+    if calib_values_early is not None:
+        butt_log_length_adjustment_mm = safe_int(get_text(calib_values_early, 'LengthCalibrationAdjustmentButtLog', ns))
+
+    object_name = None
+    object_area_ha = None
+    cutting_method = None
+    forest_certification = None
+    contract_number = None
+    first_obj = None
+    if control_values is not None:
+        first_obj = find_element(control_values, 'ObjectDefinition', ns)
+    if first_obj is None:
+        first_obj = find_element(machine, 'ObjectDefinition', ns)
+    if first_obj is not None:
+        object_name = get_text(first_obj, 'ObjectName', ns)
+        object_area_ha = safe_float(get_text(first_obj, 'ObjectArea', ns))
+        cutting_method = get_text(first_obj, 'CuttingMethod', ns)
+        forest_certification = get_text(first_obj, 'ForestCertification', ns)
+        contract_number = get_text(first_obj, 'ContractNumber', ns)
+
+    # === PRODUCT-DEFINITION LOOKUP ===
+    # ProductDefinition är nästlat djupt (under ObjectDefinition), så använd
+    # rekursiv search. ProductName/ProductGroupName/ProductUserID ligger inuti
+    # ClassifiedProductDefinition-subelementet.
+    product_lookup = {}
+    pd_path = (f'.//{ns}ProductDefinition' if ns else './/ProductDefinition')
+    for prod in root.findall(pd_path):
+        product_key = get_text(prod, 'ProductKey', ns)
+        if not product_key:
+            continue
+        classified = find_element(prod, 'ClassifiedProductDefinition', ns) or prod
+        product_lookup[product_key] = {
+            'sortiment_namn': get_text(classified, 'ProductName', ns) or None,
+            'sortiment_grupp': get_text(classified, 'ProductGroupName', ns) or None,
+            'sortiment_kod': get_text(classified, 'ProductUserID', ns) or None,
+        }
+
+    langd_avvikelser = []
+    dia_avvikelser = []
+    antal_stammar = 0
+    antal_stockar = 0
+    tradslag = ''
+    
+    if control_values is not None:
+        # Bygg obj_key_map från ObjectDefinition
+        obj_key_map_hqc = {}
+        for obj_def in find_all_elements(control_values, 'ObjectDefinition', ns):
+            ok = get_text(obj_def, 'ObjectKey', ns)
+            vo = get_text(obj_def, 'ContractNumber', ns)
+            if ok:
+                obj_key_map_hqc[ok] = make_objekt_id(vo, maskin_id, ok)
+        # Fallback till maskin-nivå ObjectDefinition
+        for obj_def in find_all_elements(machine, 'ObjectDefinition', ns):
+            ok = get_text(obj_def, 'ObjectKey', ns)
+            vo = get_text(obj_def, 'ContractNumber', ns)
+            if ok and ok not in obj_key_map_hqc:
+                obj_key_map_hqc[ok] = make_objekt_id(vo, maskin_id, ok)
+
+        for stem in find_all_elements(control_values, 'Stem', ns):
+            antal_stammar += 1
+            single_tree = find_element(stem, 'SingleTreeProcessedStem', ns)
+            if single_tree is None:
+                continue
+            
+            # ObjectKey och SpeciesGroupKey sitter på Stem-nivå i Ponsse
+            obj_key_hqc = get_text(stem, 'ObjectKey', ns)
+            sp_key = get_text(stem, 'SpeciesGroupKey', ns) or get_text(single_tree, 'SpeciesGroupKey', ns)
+            stam_nummer = antal_stammar
+
+            # === PER-STAM-FÄLT (Stanford 2010) ===
+            ctrl_stem_info = find_element(stem, 'ControlStemInfo', ns)
+            stem_selection = None
+            measurement_mode = None
+            rejected_reason = None
+            if ctrl_stem_info is not None:
+                stem_selection = get_text(ctrl_stem_info, 'RandomControlStemSelection', ns)
+                measurement_mode = get_text(ctrl_stem_info, 'RandomControlStemMeasurementMode', ns)
+                rejected_reason = get_text(ctrl_stem_info, 'RandomControlStemRejectedReason', ns)
+
+            ctrl_meas_def = find_element(stem, 'ControlMeasurementDefinition', ns)
+            measurer_name = None
+            caliper_id = None
+            if ctrl_meas_def is not None:
+                measurer = find_element(ctrl_meas_def, 'Measurer', ns)
+                if measurer is not None:
+                    measurer_name = get_text(measurer, 'FirstName', ns)
+                caliper_id = get_text(ctrl_meas_def, 'CaliperID', ns)
+
+            stem_sc = find_element(stem, 'StemCoordinates', ns)
+            if stem_sc is None:
+                stem_sc = find_element(single_tree, 'StemCoordinates', ns)
+            stem_lat = None
+            stem_lon = None
+            stem_alt = None
+            if stem_sc is not None:
+                stem_lat = safe_float(get_text(stem_sc, 'Latitude', ns))
+                stem_lon = safe_float(get_text(stem_sc, 'Longitude', ns))
+                stem_alt = safe_float(get_text(stem_sc, 'Altitude', ns))
+
+            harvest_date = parse_datetime(get_text(stem, 'HarvestDate', ns)) or \
+                           parse_datetime(get_text(single_tree, 'HarvestDate', ns))
+
+            processing_category = get_text(stem, 'ProcessingCategory', ns) or \
+                                  get_text(single_tree, 'ProcessingCategory', ns)
+
+            stem_dbh_mm = safe_int(get_text(single_tree, 'DBH', ns))
+
+            # StemDiameters → JSONB-profil (positioner i cm, diameter i mm)
+            # Stöder två format:
+            #   Ponsse: <DiameterValue diameterPosition="0">306</DiameterValue> (positioner i cm)
+            #   Spec:   <Diameter>306</Diameter> + DiameterStartHeight + DiameterMeasurementGap (mm)
+            stem_diameter_profile = []
+            sd = find_element(single_tree, 'StemDiameters', ns)
+            if sd is not None:
+                dvs = find_all_elements(sd, 'DiameterValue', ns)
+                if dvs:
+                    for d_elem in dvs:
+                        pos_attr = get_attr(d_elem, 'diameterPosition')
+                        pos_cm = safe_int(pos_attr) if pos_attr else None
+                        d_mm = safe_int(d_elem.text) if d_elem.text else None
+                        if pos_cm is None or d_mm is None:
+                            continue
+                        stem_diameter_profile.append({
+                            'position_cm': pos_cm,
+                            'diameter_mm': d_mm,
+                        })
+                else:
+                    d_start = safe_int(get_text(sd, 'DiameterStartHeight', ns)) or 0
+                    d_gap = safe_int(get_text(sd, 'DiameterMeasurementGap', ns)) or 100
+                    for i, d_elem in enumerate(find_all_elements(sd, 'Diameter', ns)):
+                        d_mm = safe_int(d_elem.text) if d_elem.text else None
+                        if d_mm is None:
+                            continue
+                        pos_mm = d_start + i * d_gap
+                        stem_diameter_profile.append({
+                            'position_cm': pos_mm // 10,
+                            'diameter_mm': d_mm,
+                        })
+
+            data['kontroll_stammar'].append({
+                'filnamn': filnamn,
+                'stam_nummer': stam_nummer,
+                'maskin_id': maskin_id,
+                'kontroll_datum': creation_date.date() if creation_date else None,
+                'stem_diameter_profile': stem_diameter_profile or None,
+            })
+
+            for log in find_all_elements(single_tree, 'Log', ns):
+                antal_stockar += 1
+                log_key = get_text(log, 'LogKey', ns)
+                
+                # Maskinmätning
+                maskin_langd = 0
+                maskin_dia = 0
+                maskin_volym = 0
+
+                # Operatörsmätning
+                operator_langd = 0
+                operator_dia = 0
+                operator_volym = 0
+
+                # Per-stock extra fält (Stanford 2010)
+                mid_ob_mm = None
+                butt_ob_mm = None
+                machine_measurement_date = None
+                operator_measurement_date = None
+                cutting_reason = get_text(log, 'CuttingReason', ns)
+                product_key_log = get_text(log, 'ProductKey', ns)
+                sortiment_log = product_lookup.get(product_key_log, {
+                    'sortiment_namn': None,
+                    'sortiment_grupp': None,
+                    'sortiment_kod': None,
+                })
+
+                for log_meas in find_all_elements(log, 'LogMeasurement', ns):
+                    cat = get_attr(log_meas, 'logMeasurementCategory')
+
+                    langd = safe_int(get_text(log_meas, 'LogLength', ns))
+
+                    # Iterera alla LogDiameter-element (Top/Mid/Butt) — Ponsse-format har
+                    # kategori "Top ob"/"Mid ob"/"Butt ob" med värdet i .text, äldre format
+                    # kan ha kategori "Top" med LogDiameterOb-child. Hoppa över UB och HKS.
+                    dia = 0
+                    for ld in find_all_elements(log_meas, 'LogDiameter', ns):
+                        ld_cat_raw = (get_attr(ld, 'logDiameterCategory') or '').strip()
+                        ld_cat_low = ld_cat_raw.lower()
+                        if 'ub' in ld_cat_low or 'hks' in ld_cat_low:
+                            continue
+                        ob_text = get_text(ld, 'LogDiameterOb', ns)
+                        ob_val = safe_int(ob_text) if ob_text else None
+                        if ob_val is None and ld.text and ld.text.strip().lstrip('-').isdigit():
+                            ob_val = safe_int(ld.text)
+                        if ob_val is None or ob_val == 0:
+                            continue
+                        if ld_cat_low.startswith('top') or not ld_cat_raw:
+                            if not dia:
+                                dia = ob_val
+                        elif ld_cat_low.startswith('mid') and mid_ob_mm is None:
+                            mid_ob_mm = ob_val
+                        elif ld_cat_low.startswith('butt') and butt_ob_mm is None:
+                            butt_ob_mm = ob_val
+
+                    mdate = parse_datetime(get_text(log_meas, 'MeasurementDate', ns))
+
+                    if cat == 'Machine':
+                        maskin_langd = langd
+                        maskin_dia = dia
+                        machine_measurement_date = mdate
+                    elif cat == 'Operator':
+                        operator_langd = langd
+                        # Toppdia läses bara från LogDiameter-Top. Toppstockar där
+                        # operatören bara har ControlLogDiameter (ingen LogDiameter)
+                        # → dia=0 → NULL (inte falsk 0). Matpunkterna bär den
+                        # riktiga per-position-jämförelsen.
+                        operator_dia = dia if dia else None
+                        operator_measurement_date = mdate
+                
+                # Beräkna avvikelser
+                if maskin_langd and operator_langd:
+                    langd_avvikelse = maskin_langd - operator_langd
+                    langd_avvikelser.append(langd_avvikelse)
+                
+                if maskin_dia and operator_dia:
+                    dia_avvikelse = maskin_dia - operator_dia
+                    dia_avvikelser.append(dia_avvikelse)
+                
+                # Volymer
+                maskin_volym_sub = 0.0
+                operator_volym_sub = 0.0
+                vols = list(find_all_elements(log, 'LogVolume', ns))
+                # Maskin = forsta sub, Operator = andra (kontrollmatt)
+                sub_vols = [v for v in vols if 'sub' in get_attr(v, 'logVolumeCategory').lower() or 'price' in get_attr(v, 'logVolumeCategory').lower()]
+                if len(sub_vols) >= 1:
+                    maskin_volym_sub = safe_float(sub_vols[0].text)
+                if len(sub_vols) >= 2:
+                    operator_volym_sub = safe_float(sub_vols[1].text)
+                
+                # GPS for kontrollstam - Ponsse: StemCoordinates på Stem-nivå
+                ctrl_lat = None
+                ctrl_lon = None
+                sc = find_element(stem, 'StemCoordinates', ns)
+                if sc is None:
+                    sc = find_element(single_tree, 'StemCoordinates', ns)
+                if sc is None:
+                    sc = find_element(single_tree, 'Coordinates', ns)
+                if sc is not None:
+                    ctrl_lat = safe_float(get_text(sc, 'Latitude', ns))
+                    ctrl_lon = safe_float(get_text(sc, 'Longitude', ns))
+                
+                # === PER-MÄTPUNKT-DATA (Stanford 2010 ControlLogDiameter) ===
+                stock_nummer = safe_int(log_key)
+                matpunkter_per_position = {}
+                for log_meas2 in find_all_elements(log, 'LogMeasurement', ns):
+                    category = get_attr(log_meas2, 'logMeasurementCategory')
+                    for cld in find_all_elements(log_meas2, 'ControlLogDiameter', ns):
+                        # Hoppa över UB-mätpunkter (vi sparar bara OB)
+                        cld_cat_low = (get_attr(cld, 'controlLogDiameterCategory') or '').strip().lower()
+                        if cld_cat_low == 'ub':
+                            continue
+                        pos_attr = get_attr(cld, 'diameterPosition')
+                        pos_cm = safe_int(pos_attr) if pos_attr else None
+                        if pos_cm is None:
+                            continue
+                        # diameterPosition är redan i cm (verifierat 2026-05-21
+                        # mot Ponsse + Rottne: 100/200/300/400 = jämna meter,
+                        # 130 = brösthöjd). Ingen division.
+
+                        # Värdet ligger antingen i LogDiameterOb-child eller cld.text direkt
+                        ob_text = get_text(cld, 'LogDiameterOb', ns)
+                        ob = safe_int(ob_text) if ob_text else None
+                        if ob is None and cld.text and cld.text.strip().lstrip('-').isdigit():
+                            ob = safe_int(cld.text)
+
+                        first_mm = None
+                        second_mm = None
+                        for ld in find_all_elements(cld, 'LogDiameter', ns):
+                            vc = get_attr(ld, 'diameterMeasurementCategory')
+                            v = safe_int(ld.text) if ld.text else None
+                            if vc == 'First':
+                                first_mm = v
+                            elif vc == 'Second':
+                                second_mm = v
+
+                        if pos_cm not in matpunkter_per_position:
+                            matpunkter_per_position[pos_cm] = {
+                                'filnamn': filnamn,
+                                'stam_nummer': stam_nummer,
+                                'stock_nummer': stock_nummer,
+                                'position_cm': pos_cm,
+                                'diameter_maskin_mm': None,
+                                'diameter_operator_mm': None,
+                                'klave_first_mm': None,
+                                'klave_second_mm': None,
+                            }
+                        rec = matpunkter_per_position[pos_cm]
+                        if category == 'Machine':
+                            rec['diameter_maskin_mm'] = ob
+                        elif category == 'Operator':
+                            rec['diameter_operator_mm'] = ob
+                            if first_mm is not None:
+                                rec['klave_first_mm'] = first_mm
+                            if second_mm is not None:
+                                rec['klave_second_mm'] = second_mm
+
+                for pos_cm in sorted(matpunkter_per_position):
+                    data['kontroll_matpunkter'].append(matpunkter_per_position[pos_cm])
+
+                data['kontroll_stockar'].append({
+                    'maskin_id': maskin_id,
+                    'objekt_id': obj_key_map_hqc.get(obj_key_hqc, f"{maskin_id}_{obj_key_hqc}") if obj_key_hqc else None,
+                    'kontroll_datum': creation_date.date() if creation_date else None,
+                    'stam_nummer': stam_nummer,
+                    'stock_nummer': stock_nummer,
+                    'maskin_langd_cm': maskin_langd,
+                    'maskin_toppdia_mm': maskin_dia,
+                    'maskin_volym_sub': maskin_volym_sub,
+                    'operator_langd_cm': operator_langd,
+                    'operator_toppdia_mm': operator_dia,
+                    'operator_volym_sub': operator_volym_sub,
+                    'langd_avvikelse_cm': maskin_langd - operator_langd if maskin_langd and operator_langd else None,
+                    'dia_avvikelse_mm': maskin_dia - operator_dia if maskin_dia and operator_dia else None,
+                    'volym_avvikelse': round(maskin_volym_sub - operator_volym_sub, 4) if maskin_volym_sub and operator_volym_sub else None,
+                    'latitude': ctrl_lat,
+                    'longitude': ctrl_lon,
+                    'filnamn': filnamn,
+                    # Per-stam-metadata (redundant på varje stock)
+                    'stem_lat': stem_lat,
+                    'stem_lon': stem_lon,
+                    'stem_alt': stem_alt,
+                    'harvest_date': harvest_date,
+                    'stem_dbh_mm': stem_dbh_mm,
+                    'stem_selection': nullif_empty(stem_selection),
+                    'measurement_mode': nullif_empty(measurement_mode),
+                    'rejected_reason': nullif_empty(rejected_reason),
+                    'measurer_name': nullif_empty(measurer_name),
+                    'caliper_id': nullif_empty(caliper_id),
+                    'processing_category': nullif_empty(processing_category),
+                    # Per-stock-egna
+                    'sortiment_namn': nullif_empty(sortiment_log['sortiment_namn']),
+                    'sortiment_grupp': nullif_empty(sortiment_log['sortiment_grupp']),
+                    'sortiment_kod': nullif_empty(sortiment_log['sortiment_kod']),
+                    'cutting_reason': nullif_empty(cutting_reason),
+                    'log_diameter_mid_ob_mm': mid_ob_mm,
+                    'log_diameter_butt_ob_mm': butt_ob_mm,
+                    'machine_measurement_date': machine_measurement_date,
+                    'operator_measurement_date': operator_measurement_date,
+                })
+    
+    # Beräkna statistik
+    if langd_avvikelser:
+        langd_snitt = sum(langd_avvikelser) / len(langd_avvikelser)
+        langd_min = min(langd_avvikelser)
+        langd_max = max(langd_avvikelser)
+    else:
+        langd_snitt = langd_min = langd_max = 0
+    
+    if dia_avvikelser:
+        dia_snitt = sum(dia_avvikelser) / len(dia_avvikelser)
+        dia_min = min(dia_avvikelser)
+        dia_max = max(dia_avvikelser)
+    else:
+        dia_snitt = dia_min = dia_max = 0
+    
+    # Status baserat på avvikelser
+    status = 'OK'
+    if abs(langd_snitt) > 2 or abs(dia_snitt) > 4:
+        status = 'VARNING'
+    if abs(langd_snitt) > 4 or abs(dia_snitt) > 6:
+        status = 'FEL'
+    
+    # Hämta trädslag från första SpeciesGroupDefinition
+    sp_def = find_element(machine, 'SpeciesGroupDefinition', ns)
+    if sp_def is not None:
+        tradslag = get_text(sp_def, 'SpeciesGroupName', ns)
+    
+    data['kalibrering'].append({
+        'datum': creation_date.date() if creation_date else None,
+        'maskin_id': maskin_id,
+        'tradslag': tradslag,
+        'antal_kontrollstammar': antal_stammar,
+        'antal_kontrollstockar': antal_stockar,
+        'langd_avvikelse_snitt_cm': langd_snitt,
+        'langd_avvikelse_min_cm': langd_min,
+        'langd_avvikelse_max_cm': langd_max,
+        'dia_avvikelse_snitt_mm': dia_snitt,
+        'dia_avvikelse_min_mm': dia_min,
+        'dia_avvikelse_max_mm': dia_max,
+        'status': status,
+        'filnamn': filnamn,
+        # Per-fil-fält (Stanford 2010)
+        'application_version': nullif_empty(application_version),
+        'object_name': nullif_empty(object_name),
+        'object_area_ha': object_area_ha,
+        'cutting_method': nullif_empty(cutting_method),
+        'forest_certification': nullif_empty(forest_certification),
+        'contract_number': nullif_empty(contract_number),
+        'butt_log_length_adjustment_mm': butt_log_length_adjustment_mm,
+        # Innehålls-hash för dedup (samma mätning, olika exportfilnamn)
+        'innehalls_hash': kontroll_innehalls_hash(data['kontroll_stockar']),
+    })
+
+    logger.info(f"  Kontrollstammar: {antal_stammar}, Stockar: {antal_stockar}")
+    logger.info(f"  Längdavvikelse: {langd_snitt:.1f} cm, Diameteravvikelse: {dia_snitt:.1f} mm")
+    logger.info(f"  Status: {status}")
+    
+    # === KALIBRERINGSHISTORIK ===
+    calib_values = find_element(machine, 'CalibrationValues', ns)
+    if calib_values is not None:
+        # Längdkalibreringar
+        for length_cal in find_all_elements(calib_values, 'LengthCalibration', ns):
+            sp_id = get_text(length_cal, 'SpeciesGroupUserID', ns)
+            cal_date = parse_datetime(get_text(length_cal, 'CalibrationDate', ns))
+            reason = get_text(length_cal, 'LengthCalibrationReason', ns)
+            desc = get_text(length_cal, 'LengthCalibrationDescription', ns)
+            
+            adj_elem = find_element(length_cal, 'LengthCalibrationAdjustment', ns)
+            adjustment = safe_int(adj_elem.text) if adj_elem is not None else 0
+            position = safe_int(get_attr(adj_elem, 'lengthCalibrationPosition')) if adj_elem is not None else 0
+            
+            data['kalibrering_historik'].append({
+                'datum': cal_date,
+                'maskin_id': maskin_id,
+                'typ': 'langd',
+                'tradslag': sp_id.replace('SE1_', '') if sp_id else '',
+                'orsak': reason,
+                'beskrivning': desc,
+                'langd_justering_mm': adjustment,
+                'dia_justering_mm': None,
+                'position_cm': position,
+                'filnamn': filnamn
+            })
+        
+        # Diameterkalibreringar
+        for dia_cal in find_all_elements(calib_values, 'DiameterCalibration', ns):
+            sp_id = get_text(dia_cal, 'SpeciesGroupUserID', ns)
+            cal_date = parse_datetime(get_text(dia_cal, 'CalibrationDate', ns))
+            reason = get_text(dia_cal, 'DiameterCalibrationReason', ns)
+            
+            adj_elem = find_element(dia_cal, 'DiameterCalibrationAdjustment', ns)
+            adjustment = safe_int(adj_elem.text) if adj_elem is not None else 0
+            position = safe_int(get_attr(adj_elem, 'diameterCalibrationPosition')) if adj_elem is not None else 0
+            
+            data['kalibrering_historik'].append({
+                'datum': cal_date,
+                'maskin_id': maskin_id,
+                'typ': 'diameter',
+                'tradslag': sp_id.replace('SE1_', '') if sp_id else '',
+                'orsak': reason,
+                'beskrivning': None,
+                'langd_justering_mm': None,
+                'dia_justering_mm': adjustment,
+                'position_cm': position,
+                'filnamn': filnamn
+            })
+    
+    logger.info(f"  Kalibreringshistorik: {len(data['kalibrering_historik'])} poster")
+    
+    return data
+
+# ============================================================
+# FPR-PARSER
+# ============================================================
+
+def parse_fpr_file(filepath: str) -> Dict[str, Any]:
+    """Parsa FPR-fil (Forwarded Production Report)"""
+    
+    with open_stanford(filepath) as f:
+        tree = ET.parse(f)
+    root = tree.getroot()
+    ns = get_namespace(root)
+    filnamn = stanford_namn(filepath)
+    
+    data = {
+        'maskin': {},
+        'operatorer': [],
+        'objekt': [],
+        'sortiment': [],
+        'destinationer': [],
+        'lass': [],
+        'lass_sortiment': [],
+        'skotning_status': [],
+        'filnamn': filnamn,
+        'filtyp': 'FPR'
+    }
+    obj_key_map = {}  # {obj_key: objekt_id}
+    
+    machine = find_element(root, 'Machine', ns)
+    if machine is None:
+        logger.warning(f"  Kunde inte hitta Machine-element i {filnamn}")
+        return data
+    
+    # === MASKINDATA ===
+    maskin_id = get_text(machine, 'BaseMachineManufacturerID', ns)
+    if not maskin_id:
+        maskin_id = get_text(machine, 'MachineOwnerID', ns)
+    if not maskin_id:
+        maskin_id = get_text(machine, 'MachineKey', ns)
+    
+    tillverkare = get_text(machine, 'MachineBaseManufacturer', ns)
+    maskin_id = normalize_maskin_id(maskin_id, tillverkare)
+    
+    # FPR = Forwarder
+    data['maskin'] = {
+        'maskin_id': maskin_id,
+        'tillverkare': tillverkare,
+        'modell': get_text(machine, 'MachineBaseModel', ns),
+        'maskin_typ': 'Forwarder'
+    }
+
+    logger.info(f"  Maskin: {maskin_id} (Skotare)")
+    
+    # === OPERATÖRER ===
+    for op_def in find_all_elements(machine, 'OperatorDefinition', ns):
+        op_key = get_text(op_def, 'OperatorKey', ns)
+        contact = find_element(op_def, 'ContactInformation', ns)
+
+        namn = ''
+        email = ''
+        if contact is not None:
+            fname = get_text(contact, 'FirstName', ns)
+            lname = get_text(contact, 'LastName', ns)
+            candidate = f"{fname} {lname}".strip()
+            if candidate and not _UUID_RE.match(candidate):
+                namn = candidate
+            email = (get_text(contact, 'Email', ns) or '').strip()
+        if not namn:
+            namn = f"Operatör {op_key}"
+
+        if op_key:
+            op_id = resolve_operator_id(maskin_id, op_key, email, namn)
+            entry = {
+                'operator_id': op_id,
+                'operator_key': op_key,
+                'operator_namn': namn,
+                'maskin_id': maskin_id,
+            }
+            if email:
+                entry['email'] = email
+            data['operatorer'].append(entry)
+
+    # Per-fil OperatorKey-karta — samma princip som MOM-parsen: OperatorKey är
+    # fil-lokal, identiteten normaliseras via e-post. Ingen tyst rå-fallback.
+    op_id_by_key = {o['operator_key']: o['operator_id'] for o in data['operatorer']}
+
+    def op_id_for_key(op_key: str, kontext: str):
+        if not op_key:
+            return None
+        oid = op_id_by_key.get(op_key)
+        if oid is None:
+            logger.warning(
+                f"  OPERATORKEY {op_key} SAKNAR OperatorDefinition i {filnamn} "
+                f"({kontext}) -- raden lamnas oattribuerad (operator_id=None)"
+            )
+        return oid
+
+    # Bygg location_coords_map tidigt så det är tillgängligt för objekt-parsning
+    location_coords_map = {}
+    for loc_def_pre in find_all_elements(machine, 'LocationDefinition', ns):
+        obj_key_pre = get_text(loc_def_pre, 'ObjectKey', ns)
+        loc_coords_pre = find_element(loc_def_pre, 'LocationCoordinates', ns)
+        if loc_coords_pre is not None and obj_key_pre:
+            lat_pre = safe_float(get_text(loc_coords_pre, 'Latitude', ns))
+            lon_pre = safe_float(get_text(loc_coords_pre, 'Longitude', ns))
+            if lat_pre and lon_pre:
+                location_coords_map[obj_key_pre] = (lat_pre, lon_pre)
+
+    # === OBJEKT ===
+    for obj_def in find_all_elements(machine, 'ObjectDefinition', ns):
+        obj_key = get_text(obj_def, 'ObjectKey', ns)
+        contract_number = get_text(obj_def, 'ContractNumber', ns)
+        vo_nummer = contract_number if contract_number else get_text(obj_def, 'ObjectUserID', ns)
+        
+        forest_owner = find_element(obj_def, 'ForestOwner', ns)
+        # Namn: gemensam härledning (filnamn primärt, hanterar även ominlästa
+        # kopiors _YYYYMMDD_HHMMSS-suffix som gamla regexen missade)
+        object_name = harled_objektnamn(filnamn, get_text(obj_def, 'ObjectName', ns))
+        
+        # Bolag från LoggingOrganisation
+        logging_org = find_element(obj_def, 'LoggingOrganisation', ns)
+        bolag = ''
+        if logging_org is not None:
+            contact = find_element(logging_org, 'ContactInformation', ns)
+            if contact is not None:
+                bolag = get_text(contact, 'BusinessName', ns)
+                if not bolag:
+                    bolag = get_text(contact, 'LastName', ns)
+        
+        # GPS
+        lat = None
+        lon = None
+        coords = find_element(obj_def, 'Coordinates', ns)
+        if coords is not None:
+            lat = safe_float(get_text(coords, 'Latitude', ns))
+            lon = safe_float(get_text(coords, 'Longitude', ns))
+        
+        # Start- och slutdatum för objektet
+        start_date = parse_datetime(get_text(obj_def, 'StartDate', ns))
+        end_date = parse_datetime(get_text(obj_def, 'EndDate', ns))
+        
+        # Avverkningsform
+        logging_form = find_element(obj_def, 'LoggingForm', ns)
+        avverkningsform = ''
+        avverkningsform_kod = ''
+        if logging_form is not None:
+            avverkningsform_kod = get_text(logging_form, 'LoggingFormCode', ns)
+            avverkningsform = get_text(logging_form, 'LoggingFormDescription', ns)
+        
+        certifiering = get_text(obj_def, 'ForestCertification', ns)
+        fastighetsnummer = get_text(obj_def, 'RealEstateIDObject', ns)
+        
+        # Skogsagare/säljare (ForestOwner)
+        skogsagare = ''
+        saljare = ''
+        if forest_owner is not None:
+            skogsagare = get_text(forest_owner, 'LastName', ns) or get_text(forest_owner, 'BusinessName', ns)
+            saljare = get_text(forest_owner, 'FirstName', ns) or ''
+        
+        # CuttingMethod
+        cutting_method = ''
+        ext = find_element(obj_def, 'Extension', ns)
+        if ext is not None:
+            for child in ext:
+                if 'Ponsse' in child.tag:
+                    cm = child.find('{http://www.ponsse.com}CuttingMethod')
+                    if cm is not None:
+                        cutting_method = cm.text or ''
+                    break
+        
+        objekt_id = make_objekt_id(vo_nummer, maskin_id, obj_key)
+        obj_key_map[obj_key] = objekt_id
+
+        # Koordinater: försök från ObjectDefinition, annars från LocationCoordinates
+        if not lat or not lon:
+            loc_coord = location_coords_map.get(obj_key)
+            if loc_coord:
+                lat, lon = loc_coord
+
+        objektnr = get_text(obj_def, 'ObjectUserID', ns)
+        data['objekt'].append({
+            'objekt_id': objekt_id,
+            'object_key': obj_key,
+            'object_name': object_name,
+            'vo_nummer': vo_nummer,
+            'objektnr': objektnr,
+            'bolag': normalize_bolag(bolag),
+            'maskin_id': maskin_id,
+            'skogsagare': skogsagare,
+            'saljare': saljare,
+            'fastighetsnummer': fastighetsnummer,
+            'latitude': lat,
+            'longitude': lon,
+            'avverkningsform': avverkningsform,
+            'certifiering': certifiering,
+            'cutting_method': cutting_method,
+            'start_date': start_date,
+            'end_date': end_date
+        })
+    
+    # === SORTIMENT/PRODUKTER ===
+    fpr_product_names = {}
+    for prod_def in find_all_elements(machine, 'ProductDefinition', ns):
+        prod_key = get_text(prod_def, 'ProductKey', ns)
+        # ProductName sitter inne i ClassifiedProductDefinition i FPR
+        classified = find_element(prod_def, 'ClassifiedProductDefinition', ns)
+        prod_name = ''
+        if classified is not None:
+            prod_name = get_text(classified, 'ProductName', ns)
+        if not prod_name:
+            prod_name = get_text(prod_def, 'ProductName', ns)
+        if prod_key and prod_name:
+            fpr_product_names[prod_key] = prod_name
+            data['sortiment'].append({
+                'sortiment_id': f"{maskin_id}_{prod_key}",
+                'product_key': prod_key,
+                'namn': prod_name,
+                'maskin_id': maskin_id
+            })
+
+    # Bygg location -> obj_key lookup + avlägg-destinationer från LocationDefinition
+    location_obj_map = {}
+    for loc_def in find_all_elements(machine, 'LocationDefinition', ns):
+        loc_key = get_text(loc_def, 'LocationKey', ns)
+        obj_key_loc = get_text(loc_def, 'ObjectKey', ns)
+        if loc_key and obj_key_loc:
+            location_obj_map[loc_key] = obj_key_loc
+        # Avlägg-koordinater till dim_destination
+        if loc_key:
+            loc_name = get_text(loc_def, 'LocationName', ns) or ''
+            loc_lat = None
+            loc_lon = None
+            loc_coords = find_element(loc_def, 'LocationCoordinates', ns)
+            if loc_coords is not None:
+                loc_lat = safe_float(get_text(loc_coords, 'Latitude', ns))
+                loc_lon = safe_float(get_text(loc_coords, 'Longitude', ns))
+            # fallback: direkt under LocationDefinition
+            if loc_lat is None:
+                loc_lat = safe_float(get_text(loc_def, 'Latitude', ns))
+            if loc_lon is None:
+                loc_lon = safe_float(get_text(loc_def, 'Longitude', ns))
+            data['destinationer'].append({
+                'destination_id': loc_key,
+                'namn': loc_name,
+                'latitude': loc_lat,
+                'longitude': loc_lon,
+            })
+
+    # Bygg DeliveryKey -> ProductKey lookup
+    delivery_product_map = {}
+    for del_def in find_all_elements(machine, 'DeliveryDefinition', ns):
+        del_key = get_text(del_def, 'DeliveryKey', ns)
+        prod_key_del = get_text(del_def, 'ProductKey', ns)
+        if del_key and prod_key_del:
+            delivery_product_map[del_key] = prod_key_del
+
+    # === DESTINATIONER ===
+    # FPR-filer har destinationer inuti DeliveryDefinition/DeliveryDestination,
+    # inte som separata DestinationDefinition-element.
+    seen_dest_keys = set()
+    for del_def in find_all_elements(machine, 'DeliveryDefinition', ns):
+        del_dest = find_element(del_def, 'DeliveryDestination', ns)
+        if del_dest is not None:
+            dest_key = get_text(del_dest, 'DestinationKey', ns)
+            if dest_key and dest_key not in seen_dest_keys:
+                seen_dest_keys.add(dest_key)
+                data['destinationer'].append({
+                    'destination_id': f"{maskin_id}_{dest_key}",
+                    'namn': get_text(del_dest, 'DestinationName', ns) or '',
+                    'mottagningsnummer': get_text(del_dest, 'DestinationUserID', ns) or ''
+                })
+
+    # Fallback: sök även DestinationDefinition (äldre format)
+    for dest_def in find_all_elements(machine, 'DestinationDefinition', ns):
+        dest_key = get_text(dest_def, 'DestinationKey', ns)
+        if dest_key and dest_key not in seen_dest_keys:
+            seen_dest_keys.add(dest_key)
+            data['destinationer'].append({
+                'destination_id': f"{maskin_id}_{dest_key}",
+                'namn': get_text(dest_def, 'DestinationName', ns) or '',
+                'mottagningsnummer': get_text(dest_def, 'DestinationUserID', ns) or ''
+            })
+
+    # Skapa lookup för dest_key -> namn (utan maskin_id-prefix)
+    dest_names = {}
+    for d in data['destinationer']:
+        # destination_id = "maskin_id_dest_key", plocka ut sista delen
+        parts = d['destination_id'].split('_')
+        dk = parts[-1] if parts else ''
+        dest_names[dk] = d['namn']
+    
+    # === LASS ===
+    for load in find_all_elements(machine, 'Load', ns):
+        load_num = safe_int(get_text(load, 'LoadNumber', ns))
+        op_key = get_text(load, 'OperatorKey', ns)
+        distance = safe_int(get_text(load, 'DistanceFromLastUnloading', ns))
+        
+        # Tider
+        loading_time_str = get_text(load, 'LoadingTime', ns)
+        unloading_time_str = get_text(load, 'UnloadingTime', ns)
+        loading_dt = parse_datetime(loading_time_str)
+        unloading_dt = parse_datetime(unloading_time_str)
+        
+        # Hämta volym och objekt från PartialLoad
+        total_volym = 0.0
+        obj_key = None
+        dest_key = None
+        
+        lass_sortiment = []
+        
+        for partial in find_all_elements(load, 'PartialLoad', ns):
+            location_key = get_text(partial, 'LocationKey', ns)
+            delivery_key_partial = get_text(partial, 'DeliveryKey', ns)
+            # ProductKey via DeliveryKey -> ProductKey mapping (Ponsse FPR)
+            product_key = get_text(partial, 'ProductKey', ns)
+            if not product_key and delivery_key_partial:
+                product_key = delivery_product_map.get(delivery_key_partial)
+            product_name = fpr_product_names.get(product_key, get_text(partial, 'ProductName', ns))
+            # Hämta obj_key via LocationKey -> ObjectKey
+            if not obj_key and location_key:
+                obj_key = location_obj_map.get(location_key)
+            
+            # Destination
+            dest_key_temp = get_text(partial, 'DestinationKey', ns) or delivery_key_partial
+            if dest_key_temp:
+                dest_key = dest_key_temp
+            
+            # Volym. Verifierat 2026-08-22 mot 60 skarpa FPR-filer (1 338
+            # volymtripplar): varje PartialLoad har loadVolumeCategory på
+            # samtliga LoadVolume — "Volume, m3sob", "Volume, m3sub" och
+            # "Solid volume of bundles ..., m3". Kategorigrenen nedan är alltså
+            # den som körs, och den läser rätt fält.
+            #
+            # (Att m3sob och m3sub innehåller samma tal i de filerna är hur
+            # maskinen rapporterar, inte något parsern gör. Rör inte det här.)
+            load_volumes = [safe_float(v.text) for v in find_all_elements(partial, 'LoadVolume', ns)]
+            volym_sob = 0.0
+            volym_sub = 0.0
+            if load_volumes:
+                # Kolla om kategori finns
+                has_category = any(get_attr(v, 'loadVolumeCategory') 
+                                   for v in find_all_elements(partial, 'LoadVolume', ns))
+                if has_category:
+                    for vol_elem in find_all_elements(partial, 'LoadVolume', ns):
+                        cat = get_attr(vol_elem, 'loadVolumeCategory').lower()
+                        val = safe_float(vol_elem.text)
+                        if 'm3sob' in cat:
+                            volym_sob = val
+                        elif 'm3sub' in cat:
+                            volym_sub = val
+                else:
+                    # Ingen kategori — ska inte hända. Gissa INTE.
+                    #
+                    # Den gamla koden tog index 0 som sob, index 1 som sub, och
+                    # vid ett enda värde skrev den samma tal i BÅDA. Det är ett
+                    # påhittat värde i en namngiven kolumn: ingen läsare kan se
+                    # att m3sub egentligen var okänd.
+                    #
+                    # Nu: sob får första värdet (lasset ska inte försvinna),
+                    # sub lämnas None = okänd. None skiljer sig från 0.0, som
+                    # skulle betyda "noll under bark" — ett annat påstående.
+                    volym_sob = load_volumes[0]
+                    volym_sub = None
+                    logger.error(
+                        f"  {filnamn}: LoadVolume utan loadVolumeCategory "
+                        f"({len(load_volumes)} värden) — m3sub lämnas okänd. "
+                        f"Maskinen exporterar i ett format parsern inte känner igen.")
+                total_volym += volym_sob
+
+            # (volym_sub or 0): fallbacken kan ge None, och None > 0 kastar.
+            if (volym_sob > 0 or (volym_sub or 0) > 0) and product_key:
+                lass_sortiment.append({
+                    'sortiment_id': f"{maskin_id}_{product_key}",
+                    'sortiment_namn': product_name,
+                    'volym_m3sob': volym_sob,
+                    'volym_m3sub': volym_sub
+                })
+        
+        # Hitta ObjectKey via LocationDefinition
+        if not obj_key:
+            for loc_def in find_all_elements(machine, 'LocationDefinition', ns):
+                obj_key_from_loc = get_text(loc_def, 'ObjectKey', ns)
+                if obj_key_from_loc:
+                    obj_key = obj_key_from_loc
+                    break
+        
+        datum = unloading_dt.date() if unloading_dt else (loading_dt.date() if loading_dt else None)
+        
+        total_volym_sub = sum(s['volym_m3sub'] for s in lass_sortiment if s.get('volym_m3sub'))
+        objekt_id_lass = obj_key_map.get(obj_key) if obj_key else None
+
+        lass_data = {
+            'datum': datum,
+            'maskin_id': maskin_id,
+            'operator_id': op_id_for_key(op_key, 'lass'),
+            'objekt_id': objekt_id_lass,
+            'lass_nummer': load_num,
+            'volym_m3sob': total_volym,
+            'volym_m3sub': total_volym_sub,
+            'korstracka_m': distance,
+            'lastnings_tid': loading_dt,
+            'lossnings_tid': unloading_dt,
+            'destination_id': f"{maskin_id}_{dest_key}" if dest_key else None,
+            'destination_namn': dest_names.get(dest_key, ''),
+            'filnamn': filnamn,
+            'sortiment': lass_sortiment
+        }
+        data['lass'].append(lass_data)
+    
+    total_volym = sum(l['volym_m3sob'] for l in data['lass'])
+    logger.info(f"  Lass: {len(data['lass'])} st, Total volym: {total_volym:.1f} m³")
+
+    # === FORWARDING STATUS (total skotnings tid per sortiment) ===
+    for fs in find_all_elements(machine, 'ForwardingStatus', ns):
+        loc_key_fs = get_text(fs, 'LocationKey', ns)
+        del_key_fs = get_text(fs, 'DeliveryKey', ns)
+        start_str = get_text(fs, 'ForwardStartDate', ns)
+        end_str = get_text(fs, 'ForwardEndDate', ns)
+        
+        obj_key_fs = location_obj_map.get(loc_key_fs) if loc_key_fs else None
+        objekt_id_fs = obj_key_map.get(obj_key_fs) if obj_key_fs else None
+        prod_key_fs = delivery_product_map.get(del_key_fs) if del_key_fs else None
+        sortiment_namn_fs = fpr_product_names.get(prod_key_fs, '') if prod_key_fs else ''
+        
+        if objekt_id_fs and start_str:
+            data['skotning_status'].append({
+                'maskin_id': maskin_id,
+                'objekt_id': objekt_id_fs,
+                'sortiment_id': f"{maskin_id}_{prod_key_fs}" if prod_key_fs else None,
+                'sortiment_namn': sortiment_namn_fs,
+                'start_tid': parse_datetime(start_str),
+                'slut_tid': parse_datetime(end_str) if end_str else None,
+                'filnamn': filnamn
+            })
+
+    return data
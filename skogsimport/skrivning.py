@@ -0,0 +1,1911 @@
+"""skogsimport.skrivning — skrivpolicyer och save_*_to_supabase per filtyp.
+
+Här bor reglerna för vad maskindata får skriva över (dim_objekt, dim_maskin,
+arbetsdag) och ombyggnaden av fakt_tid/mom_tider ur Behandlade-arkivet.
+"""
+import hashlib
+import json
+import os
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+import import_matning
+import mom_timmar
+from gps_forenkling import GPS_TOLERANS_M, forenkla_spar, till_segment
+from stanford_arkiv import ar_stanford, lista_stanford, stanford_namn
+
+from .klient import (BATCH_STORLEK, SUPABASE_HEADERS, kor_batcher_parallellt, requests,
+                     upsert_batcher_parallellt, upsert_data)
+from .konfig import BEHANDLADE, MOM_SYNK_FRAN, SUPABASE_URL, _env, logger
+from .parsers import ar_tidsstampelnamn, parse_datetime, parse_mom_file, remap_vo
+
+# Global entry-level registry för korrekt deduplicering av fakt_tid
+# över filer. Nyckel: (start_time_str, maskin_id, objekt_id) → entry dict.
+# Operator-mappning: (datum, maskin_id, objekt_id) → operator_id.
+_GLOBAL_TID_ENTRIES = {}
+_GLOBAL_TID_OPERATORS = {}
+
+
+# ── Körspår: förenkling före skrivning ────────────────────────────────────
+# Varje TrackCoordinates blev en rad i detalj_gps_spar, och kumulativa filer
+# laddade upp hela spåret igen vid varje omimport. gps_forenkling tar bort
+# punkter som inte syns på kartan (tidssynkroniserad Douglas–Peucker, 5 m).
+#   GPS_LAGRING=punkter  förenklade punkter i detalj_gps_spar (standard —
+#                        samma radformat, läsarna märker inget)
+#   GPS_LAGRING=segment  en polyline-rad per segment i detalj_gps_segment
+#   GPS_LAGRING=raa      alla punkter, som förr (felsökning)
+# Förenklingen görs vid SKRIVNING, inte i parsern: data['gps_spar'] är
+# fortfarande komplett för allt annat som läser det (t.ex. login-position).
+GPS_LAGRING = (_env.get('GPS_LAGRING') or os.getenv('GPS_LAGRING') or 'punkter').lower()
+GPS_TOLERANS = float(_env.get('GPS_TOLERANS_M') or os.getenv('GPS_TOLERANS_M') or GPS_TOLERANS_M)
+
+
+def gps_skrivjobb(gps_spar: List[Dict], unika: Optional[List[str]]) -> List[tuple]:
+    """Jobb för upsert_batcher_parallellt enligt GPS_LAGRING."""
+    if not gps_spar:
+        return []
+    if GPS_LAGRING == 'raa':
+        return [('detalj_gps_spar', gps_spar, unika)]
+    if GPS_LAGRING == 'segment':
+        segment = till_segment(gps_spar, GPS_TOLERANS)
+        logger.info(f"  GPS: {len(gps_spar)} punkter -> {len(segment)} segment "
+                    f"({sum(r['antal_punkter'] for r in segment)} punkter kvar)")
+        return [('detalj_gps_segment', segment, ['filnamn', 'maskin_id', 'segment_nr'])]
+    enkla = forenkla_spar(gps_spar, GPS_TOLERANS)
+    logger.info(f"  GPS: {len(gps_spar)} -> {len(enkla)} punkter (tolerans {GPS_TOLERANS:g} m)")
+    return [('detalj_gps_spar', enkla, unika)]
+
+# ── dim_objekt-skrivpolicy ────────────────────────────────────────────────
+# GRUNDREGEL: maskindata FYLLER LUCKOR — den skriver aldrig över mänsklig
+# kunskap. Martin rättade namn manuellt och nästa kumulativa fil skrev över
+# dem, om och om igen. Aldrig mer.
+#
+# Skyddade fält (import får bara fylla tomma):
+#   bolag, skogsagare, saljare, vo_nummer
+# vo_nummer: Martin sätter egna VO (t.ex. "P-1013") som limmar ihop
+# skördare+skotare på privata objekt — de får aldrig skrivas över av
+# maskinens ContractNumber/ObjectUserID. OBS: vo ingår i objekt_id-BYGGET
+# för NYA rader, men en befintlig rads objekt_id muteras aldrig — skyddet
+# bryter inga kopplingar (fakta pekar på objekt_id, inte vo).
+# object_name har en extra regel: ett befintligt TIDSSTÄMPEL-namn får
+# ersättas av ett riktigt namn (uppgradering), men ett riktigt namn rörs
+# aldrig. (huvudtyp/inkopare/atgard/exkludera skickas aldrig av importen —
+# de är redan helt manuella.)
+# Fält importen äger fritt: start_date, end_date, areal_ha, avverkningsform,
+# certifiering, cutting_method, koordinater, objektnr m.fl.
+SKYDDADE_OBJEKTFALT = ('bolag', 'skogsagare', 'saljare', 'vo_nummer')
+
+def _arv_skotartilldelning(nyfodda: Dict[str, Optional[str]]):
+    """Nyfödda dim_objekt-rader ärver Martins planerade skotare EN gång.
+
+    objekt.skotare_maskin_id (planeringen) -> dim_objekt.tilldelad_skotare.
+    Matchar på dim_objekt_id (FK = sanningskällan) eller exakt vo_nummer.
+    nyfodda: objekt_id -> vo_nummer som raden föddes med (en ny rad har
+    inget skyddat värde, så det som skrevs är det som står).
+
+    Skriver ALDRIG över ett satt tilldelad_skotare — filtret
+    tilldelad_skotare=is.null gör det i databasen, så en mänsklig ändring
+    vinner även om den skedde mellan läsning och skrivning. Ett PATCH per
+    skotare (objekt_id=in.(...)), inte per objekt.
+
+    Engångshändelse vid födsel. Ingen läs-tid-fallback: vyerna läser bara
+    dim_objekt.tilldelad_skotare (ett begrepp = ett ställe). Misslyckas arvet
+    loggas det — objektet hamnar under "Ej tilldelad" tills någon tilldelar.
+    """
+    if not nyfodda:
+        return
+    try:
+        # Planeringsrader med skotare satt
+        resp = requests.get(
+            f"{SUPABASE_URL}/rest/v1/objekt",
+            params={'skotare_maskin_id': 'not.is.null',
+                    'select': 'dim_objekt_id,vo_nummer,skotare_maskin_id'},
+            headers=SUPABASE_HEADERS, timeout=30)
+        if resp.status_code != 200:
+            logger.warning("  tilldelad_skotare: kunde inte lasa planeringen — arv hoppas over")
+            return
+        plan = resp.json() or []
+        per_fk = {p['dim_objekt_id']: p['skotare_maskin_id']
+                  for p in plan if p.get('dim_objekt_id')}
+        per_vo = {p['vo_nummer']: p['skotare_maskin_id']
+                  for p in plan if p.get('vo_nummer') and not p.get('dim_objekt_id')}
+        if not per_fk and not per_vo:
+            return
+
+        per_skotare = defaultdict(list)
+        for oid, vo in nyfodda.items():
+            skotare = per_fk.get(oid) or per_vo.get(vo)
+            if skotare:
+                per_skotare[skotare].append(oid)
+
+        for skotare, oids in per_skotare.items():
+            id_list = ','.join(f'"{i}"' for i in oids)
+            resp3 = requests.patch(
+                f"{SUPABASE_URL}/rest/v1/dim_objekt",
+                params={'objekt_id': f'in.({id_list})', 'tilldelad_skotare': 'is.null'},
+                headers={**SUPABASE_HEADERS, 'Prefer': 'return=representation'},
+                json={'tilldelad_skotare': skotare}, timeout=30)
+            if resp3.status_code == 200:
+                for rad in resp3.json() or []:
+                    logger.info(f"  tilldelad_skotare: {rad.get('objekt_id')} arvde {skotare} fran planeringen")
+    except Exception as e:
+        logger.warning(f"  tilldelad_skotare: arv hoppades over ({e})")
+
+@import_matning.matt('dim_objekt')
+def upsert_dim_objekt(objekt_rows: List[Dict]) -> int:
+    """ALL skrivning till dim_objekt går genom denna (MOM/HPR/FPR).
+    Skyddspolicyn bestäms per rad; skrivningen sker sedan i ETT anrop per
+    exakt kolumnuppsättning (upsert_data:s normalisering fyller saknade
+    nycklar med None, vilket skulle nolla kolumner — inom en grupp saknas
+    inga). Misslyckas en grupp skrivs dess rader en och en, så en trasig rad
+    inte fäller de andra. Returnerar antal sparade rader."""
+    if not objekt_rows:
+        return 0
+
+    # Hämta befintliga rader för skydds-jämförelsen
+    ids = sorted({o['objekt_id'] for o in objekt_rows if o.get('objekt_id')})
+    befintliga = {}
+    hamtning_ok = True
+    try:
+        id_list = ','.join(f'"{i}"' for i in ids)
+        resp = requests.get(
+            f"{SUPABASE_URL}/rest/v1/dim_objekt",
+            params={'objekt_id': f'in.({id_list})',
+                    'select': 'objekt_id,object_name,bolag,skogsagare,saljare'},
+            headers=SUPABASE_HEADERS, timeout=30)
+        if resp.status_code == 200:
+            for rad in resp.json():
+                befintliga[rad['objekt_id']] = rad
+        else:
+            hamtning_ok = False
+    except Exception:
+        hamtning_ok = False
+    if not hamtning_ok:
+        # Kan vi inte läsa befintligt kan vi inte veta vad som är mänskligt
+        # underhållet -> skicka INGA skyddade fält alls (fail-safe: hellre
+        # missad uppdatering än överskriven rättning). Larm i loggen.
+        logger.warning("  dim_objekt: kunde inte läsa befintliga rader — "
+                       "skyddade fält (namn/bolag/skogsägare) hoppas över denna körning")
+
+    # objekt_id -> raden som ska skrivas. Samma objekt två gånger slås ihop
+    # (senare vinner per fält) — som två upserts i följd, men ett objekt kan
+    # inte stå två gånger i samma upsert-anrop.
+    att_skriva: Dict[str, Dict] = {}
+    for obj in objekt_rows:
+        # Nulla aldrig: skicka bara fält med värde
+        clean = {k: v for k, v in obj.items() if v not in (None, '')}
+        clean['objekt_id'] = obj['objekt_id']
+        clean['maskin_id'] = obj.get('maskin_id', '')
+
+        ex = befintliga.get(obj.get('objekt_id'))
+        if ex is not None:
+            for falt in SKYDDADE_OBJEKTFALT:
+                if falt in clean and ex.get(falt) not in (None, ''):
+                    clean.pop(falt)  # fyll bara luckor
+            if 'object_name' in clean:
+                if not ar_tidsstampelnamn(ex.get('object_name')):
+                    clean.pop('object_name')  # riktigt namn — rörs aldrig
+                elif ar_tidsstampelnamn(clean['object_name']):
+                    clean.pop('object_name')  # nytt är inte bättre
+        elif not hamtning_ok:
+            for falt in SKYDDADE_OBJEKTFALT + ('object_name',):
+                clean.pop(falt, None)
+
+        att_skriva.setdefault(clean['objekt_id'], {}).update(clean)
+
+    grupper = defaultdict(list)
+    for clean in att_skriva.values():
+        grupper[frozenset(clean)].append(clean)
+    sparade_id = []
+    for rader in grupper.values():
+        if upsert_data('dim_objekt', rader, ['objekt_id']) > 0:
+            sparade_id.extend(r['objekt_id'] for r in rader)
+        elif len(rader) > 1:
+            for rad in rader:
+                if upsert_data('dim_objekt', [rad], ['objekt_id']) > 0:
+                    sparade_id.append(rad['objekt_id'])
+
+    # Skotartilldelning foljer med fran planeringen vid FODSEL — sa Martins
+    # planering inte tappas nar maskindatan skapar objektets dim_objekt-rad.
+    # Nyfodda = fanns inte fore denna korning. Kraver att lasningen av
+    # befintliga lyckades — annars vet vi inte vad som ar nytt och avstar.
+    if hamtning_ok:
+        _arv_skotartilldelning({oid: att_skriva[oid].get('vo_nummer')
+                                for oid in sparade_id if oid not in befintliga})
+    return len(sparade_id)
+
+# Fält som en ombyggnad ALDRIG får röra på en skyddad dag (tid + bekräftelse).
+# arbetad_min är genererad i DB men listas för tydlighet — vi PATCHar den aldrig.
+_ARBETSDAG_TIDSFALT = ('start_tid', 'slut_tid', 'rast_min', 'arbetad_min')
+# Tomma fält som FÅR kompletteras även på en skyddad dag (ifyllnad, ej
+# överskrivning — bevarar #312: bekräftelse med maskin_id=NULL läks i efterhand).
+_ARBETSDAG_KOMPLETTFALT = ('maskin_id', 'objekt_id')
+
+
+def upsert_arbetsdag(rows: List[Dict]) -> int:
+    """Central, skyddad skrivväg för arbetsdag — ETT ställe för skyddet.
+
+    Regel (samma oavsett anropspunkt): en rad vars BEFINTLIGA DB-rad har
+    redigerad=true ELLER bekraftad=true är SKYDDAD. På en skyddad dag rörs
+    ALDRIG tider (start_tid/slut_tid/rast_min/arbetad_min) eller bekräftelse.
+    MEN tomma fält (maskin_id/objekt_id = NULL) får kompletteras — det är
+    ifyllnad, inte överskrivning (#312: en dag kan bekräftas innan skiftet
+    importerats och då sakna maskin). Oskyddade/nya rader upsert:as fullt ut.
+
+    Loggar (INFO) varje gång skyddet hindrar en tid-överskrivning, så att man
+    kan se i drift att det verkar — tyst skydd går inte att verifiera.
+
+    Bakgrund: Vercel-synken (app/api/mom-import/route.ts) hade skyddet via sin
+    delete-väg, men Python-importern (_create_arbetsdag -> upsert_data) skrev
+    ALLTID över tider oavsett flaggor. Python kör oftare = gjorde skadan
+    (Oskars 3 aug: rättade 16:23 -> skiftets 14:59, om och om)."""
+    if not rows:
+        return 0
+
+    by_key = {(r['medarbetare_id'], str(r['datum'])): r for r in rows}
+    medarb_ids = sorted({r['medarbetare_id'] for r in rows})
+
+    # Hämta befintliga rader (flaggor + tider + kompletterbara fält)
+    befintliga = {}
+    for mid in medarb_ids:
+        resp = requests.get(
+            f"{SUPABASE_URL}/rest/v1/arbetsdag?medarbetare_id=eq.{mid}"
+            f"&select=id,medarbetare_id,datum,start_tid,slut_tid,rast_min,"
+            f"maskin_id,objekt_id,redigerad,bekraftad",
+            headers=SUPABASE_HEADERS, timeout=30)
+        if resp.status_code == 200:
+            for row in resp.json():
+                befintliga[(row['medarbetare_id'], str(row['datum']))] = row
+
+    def _hhmm(v):
+        return (v or '')[:5]
+
+    oskyddade = []  # full upsert
+    for key, ny in by_key.items():
+        bef = befintliga.get(key)
+        skyddad = bool(bef) and (bef.get('redigerad') is True or bef.get('bekraftad') is True)
+        if not skyddad:
+            oskyddade.append(ny)
+            continue
+
+        # SKYDDAD dag: rör aldrig tider. Logga om en tid SKULLE ha ändrats.
+        tid_andrad = (
+            _hhmm(bef.get('start_tid')) != _hhmm(ny.get('start_tid')) or
+            _hhmm(bef.get('slut_tid')) != _hhmm(ny.get('slut_tid')) or
+            int(bef.get('rast_min') or 0) != int(ny.get('rast_min') or 0))
+        if tid_andrad:
+            flagga = 'redigerad' if bef.get('redigerad') else 'bekräftad'
+            logger.info(
+                f"  Skydd: arbetsdag {key[0]} {key[1]} är {flagga} — hindrade "
+                f"tid-överskrivning (slut {_hhmm(bef.get('slut_tid'))}->"
+                f"{_hhmm(ny.get('slut_tid'))}, rast {bef.get('rast_min')}->"
+                f"{ny.get('rast_min')})")
+
+        # Komplettering: fyll BARA fält som är NULL i DB. is.null-guard gör
+        # PATCHen idempotent och ofarlig vid samtidig ifyllnad (Vercel 5e).
+        for fld in _ARBETSDAG_KOMPLETTFALT:
+            if not bef.get(fld) and ny.get(fld):
+                pr = requests.patch(
+                    f"{SUPABASE_URL}/rest/v1/arbetsdag?id=eq.{bef['id']}&{fld}=is.null",
+                    headers=SUPABASE_HEADERS, data=json.dumps({fld: ny[fld]}), timeout=30)
+                if pr.status_code in (200, 204):
+                    logger.info(
+                        f"  Komplettering: arbetsdag {key[0]} {key[1]} "
+                        f"fyllde tomt {fld}={ny[fld]} (skyddad dag, tider orörda)")
+
+    n = 0
+    if oskyddade:
+        n = upsert_data('arbetsdag', oskyddade, ['medarbetare_id', 'datum'])
+    return n
+
+
+@import_matning.matt('arbetsdag')
+def _create_arbetsdag(tid_rows: List[Dict], skift: List[Dict]):
+    """Skapa arbetsdag-rader från fakt_skift (start/slut) + fakt_tid (rast).
+
+    BUGGFIX 2026-05-21: tidigare aggregerades bara den AKTUELLA FILENS skift,
+    vilket gjorde att multi-skift-dagar kollapsade vid varje fil-import (UPSERT
+    skrev över raden, senaste filen vann). Nu hämtas ALLA fakt_skift och fakt_tid
+    från DB för berörda datum, så aggregeringen ser hela dagen oavsett hur många
+    filer den är fördelad på.
+
+    Parameter `skift`/`tid_rows` används bara för att identifiera vilka
+    (medarbetare, datum) som påverkas av denna import — själva aggregeringen
+    läser från DB.
+
+    Skift under 300 sek (5 min) filtreras som artefakter.
+    slut_tid = NULL om utloggning saknas (tidigare default '16:00' gav negativa
+    pass när skiftet började efter 16:00).
+
+    Skriver inte över rader där bekraftad = true — separat rebuild-skript
+    hanterar bekräftade rader selektivt vid behov.
+    Aggregerar per (medarbetare_id, datum) — en person som kör flera maskiner
+    samma dag får en rad med huvudmaskinen (den med mest tid)."""
+    try:
+        # 1. Hämta operator_id → medarbetare_id
+        resp = requests.get(
+            f"{SUPABASE_URL}/rest/v1/operator_medarbetare?select=operator_id,medarbetare_id",
+            headers=SUPABASE_HEADERS, timeout=30
+        )
+        if resp.status_code != 200:
+            return
+        op_to_medarb = {}
+        for row in resp.json():
+            if row.get('operator_id') and row.get('medarbetare_id'):
+                op_to_medarb[row['operator_id']] = row['medarbetare_id']
+
+        # 2. Hämta operatörsnamn från dim_operator (för loggning)
+        op_resp = requests.get(
+            f"{SUPABASE_URL}/rest/v1/dim_operator?select=operator_id,operator_namn",
+            headers=SUPABASE_HEADERS, timeout=30
+        )
+        op_namn = {}
+        if op_resp.status_code == 200:
+            for row in op_resp.json():
+                if row.get('operator_id') and row.get('operator_namn'):
+                    op_namn[row['operator_id']] = row['operator_namn']
+
+        # 3. Identifiera berörda datum från filens skift + tid_rows.
+        # Vi aggregerar bara för dessa dagar, inte hela DB:n.
+        beforda_datum = set()
+        for s in skift:
+            datum = s.get('datum')
+            op_id = s.get('operator_id')
+            if datum and op_id and op_to_medarb.get(op_id):
+                beforda_datum.add(str(datum))
+        for row in tid_rows:
+            datum = str(row.get('datum', ''))
+            op_id = row.get('operator_id')
+            if datum and op_id and op_to_medarb.get(op_id):
+                beforda_datum.add(datum)
+
+        if not beforda_datum:
+            return
+
+        # Synk-gränsen (se MOM_SYNK_FRAN vid env-inläsningen): bygg ALDRIG
+        # arbetsdagar bakåt förbi gränsen — gamla fakt_skift bär pre-#145-
+        # felattribution och historiska dagar är manuellt rättade.
+        fore_grans = {d for d in beforda_datum if d < MOM_SYNK_FRAN}
+        if fore_grans:
+            logger.info(
+                f"  Arbetsdag: hoppar {len(fore_grans)} datum före synk-gränsen "
+                f"{MOM_SYNK_FRAN}: {', '.join(sorted(fore_grans))} — rätta "
+                f"fakt_skift-attributionen först och flytta gränsen medvetet "
+                f"via MOM_SYNK_FRAN om bakåtbygge verkligen behövs")
+            beforda_datum -= fore_grans
+        if not beforda_datum:
+            return
+
+        datum_in = ','.join(beforda_datum)
+
+        # 4. Hämta ALLA fakt_skift för berörda datum (inte bara filens egna).
+        # Detta är scope-fixen — multi-fil-dagar aggregeras nu korrekt.
+        skift_resp = requests.get(
+            f"{SUPABASE_URL}/rest/v1/fakt_skift?datum=in.({datum_in})"
+            f"&select=operator_id,maskin_id,datum,inloggning_tid,utloggning_tid,langd_sek",
+            headers=SUPABASE_HEADERS, timeout=30
+        )
+        if skift_resp.status_code != 200:
+            logger.warning(f"  Arbetsdag: kunde inte hämta fakt_skift ({skift_resp.status_code})")
+            return
+        alla_skift = skift_resp.json()
+
+        # 5. Hämta ALLA fakt_tid för rast-summering över hela dagen.
+        tid_resp = requests.get(
+            f"{SUPABASE_URL}/rest/v1/fakt_tid?datum=in.({datum_in})"
+            f"&select=operator_id,datum,rast_sek,objekt_id",
+            headers=SUPABASE_HEADERS, timeout=30
+        )
+        if tid_resp.status_code != 200:
+            logger.warning(f"  Arbetsdag: kunde inte hämta fakt_tid ({tid_resp.status_code})")
+            return
+        alla_tid = tid_resp.json()
+
+        # 6. Bygg rast-lookup + objekt-lookup från DB-datat.
+        rast_lookup = {}
+        objekt_lookup = {}
+        for row in alla_tid:
+            op_id = row.get('operator_id')
+            datum = str(row.get('datum', ''))
+            if op_id and datum:
+                key = (op_id, datum)
+                rast_lookup[key] = rast_lookup.get(key, 0) + (row.get('rast_sek', 0) or 0)
+                if not objekt_lookup.get(key) and row.get('objekt_id'):
+                    objekt_lookup[key] = row['objekt_id']
+
+        # 7. Aggregera skift per (medarbetare_id, datum) — MIN(start), MAX(slut)
+        # över ALLA dagens skift. Skräpfilter < 300 sek.
+        dag_agg = {}
+        logged_unknown = set()
+        for s in alla_skift:
+            op_id = s.get('operator_id')
+            maskin = s.get('maskin_id')
+            datum = s.get('datum')
+            inl = s.get('inloggning_tid')
+            utl = s.get('utloggning_tid')
+            if not op_id or not maskin or not datum or not inl:
+                continue
+
+            medarb_id = op_to_medarb.get(op_id)
+            if not medarb_id:
+                if op_id not in logged_unknown:
+                    namn = op_namn.get(op_id, '?')
+                    logger.info(f"  Ny operatör: {op_id} {namn} på {maskin} — behöver kopplas")
+                    logged_unknown.add(op_id)
+                continue
+
+            datum_str = str(datum)
+            inl_dt = parse_datetime(str(inl)) if inl else None
+            utl_dt = parse_datetime(str(utl)) if utl else None
+            if not inl_dt:
+                continue
+
+            # Skräpfilter: skift under 5 min är artefakter (motorn startad
+            # men inget riktigt pass). Hoppa över denna skift-rad — andra
+            # skift för samma dag aggregeras fortfarande.
+            if utl_dt:
+                sek = int((utl_dt - inl_dt).total_seconds())
+                if sek < 300:
+                    continue
+            else:
+                sek = 0
+
+            key = (medarb_id, datum_str)
+            if key not in dag_agg:
+                dag_agg[key] = {'start': inl_dt, 'end': utl_dt, 'op_id': op_id, 'maskin_sek': {}}
+            else:
+                if inl_dt and (not dag_agg[key]['start'] or inl_dt < dag_agg[key]['start']):
+                    dag_agg[key]['start'] = inl_dt
+                if utl_dt and (not dag_agg[key]['end'] or utl_dt > dag_agg[key]['end']):
+                    dag_agg[key]['end'] = utl_dt
+            dag_agg[key]['maskin_sek'][maskin] = dag_agg[key]['maskin_sek'].get(maskin, 0) + sek
+
+        # 8. Bygg arbetsdag-rader (en per medarbetare+datum)
+        arbetsdag_rows = []
+        for (medarb_id, datum_str), agg in dag_agg.items():
+            if not agg['start']:
+                continue
+
+            start_tid = agg['start'].strftime('%H:%M')
+            # NULL om utloggning saknas — tidigare default '16:00' gav negativa
+            # pass och dolde att data var ofullständig.
+            slut_tid = agg['end'].strftime('%H:%M') if agg['end'] else None
+            maskin = max(agg['maskin_sek'], key=agg['maskin_sek'].get) if agg['maskin_sek'] else None
+
+            rast_sek = rast_lookup.get((agg['op_id'], datum_str), 0)
+            rast_min = int(rast_sek / 60)
+            objekt_id = objekt_lookup.get((agg['op_id'], datum_str))
+
+            arbetsdag_rows.append({
+                'medarbetare_id': medarb_id,
+                'datum': datum_str,
+                'maskin_id': maskin,
+                'dagtyp': 'Produktion',
+                'start_tid': start_tid,
+                'slut_tid': slut_tid,
+                'rast_min': max(rast_min, 0),
+                'bekraftad': False,
+                'objekt_id': objekt_id,
+            })
+
+        if not arbetsdag_rows:
+            return
+
+        # 9. Skriv via den centrala skyddade upsert-vägen. Skyddet (redigerad/
+        # bekraftad fredar tider, tomma fält kompletteras ändå) bor i
+        # upsert_arbetsdag — ETT ställe — så ingen framtida anropspunkt kan
+        # glömma det (vilket var exakt hur denna läcka uppstod: Vercel-synken
+        # fick skyddet, Python-vägen glömdes).
+        n = upsert_arbetsdag(arbetsdag_rows)
+        if n > 0:
+            logger.info(f"  Arbetsdag: {n} dagar skapade/uppdaterade")
+    except Exception as e:
+        logger.warning(f"  Arbetsdag: kunde inte skapa ({e})")
+
+
+_SIDA = 1000
+
+
+def _hamta_alla(tabell: str, params: Dict) -> List[Dict]:
+    """GET sida för sida (limit/offset) tills sidan inte är full. params ska
+    ha en entydig order. Kastar requests.HTTPError vid felstatus."""
+    rader, offset = [], 0
+    while True:
+        resp = requests.get(
+            f"{SUPABASE_URL}/rest/v1/{tabell}",
+            params={**params, 'limit': _SIDA, 'offset': offset},
+            headers=SUPABASE_HEADERS, timeout=30)
+        resp.raise_for_status()
+        sida = resp.json() or []
+        rader.extend(sida)
+        if len(sida) < _SIDA:
+            return rader
+        offset += _SIDA
+
+
+# ── MOM: inkrementell skrivning per dag ───────────────────────────────────
+# MOM är kumulativ: varje timexport bär hela historiken, och allt skrevs om —
+# fakt_tid raderades och byggdes om för varje dag i filen, gps/avbrott/
+# service/produktion skickades om. Det importen skulle skriva hashas nu per
+# (maskin, dag, del) och jämförs med meta_mom_dag; oförändrade dagar hoppas
+# över helt (ingen delete, ingen insert). En timexport som lägger till en
+# timme rör en dag, inte historiken. Arkivskanningen (_keep) görs fortfarande
+# för filens alla dagar — fingeravtrycket gäller dess RESULTAT.
+# MOM_INKREMENTELL=0 skriver alla dagar (och uppdaterar fingeravtrycken) —
+# för omskrivning efter att fakta raderats utanför importern.
+MOM_INKREMENTELL = (_env.get('MOM_INKREMENTELL') or os.getenv('MOM_INKREMENTELL') or '1') != '0'
+
+# del → (nyckel i parsad data, maskinfält, datumfält). tid/mom_tider byggs i
+# save_mom_to_supabase; deras datum hämtas ur tid_entries.
+_MOM_DELAR = {
+    'tid': (None, 'maskin_id', 'datum'),
+    'mom_tider': (None, 'maskin_id', 'timme'),
+    'skift': ('skift', 'maskin_id', 'datum'),
+    'gps': ('gps_spar', 'maskin_id', 'tidpunkt'),
+    'produktion': ('produktion', 'maskin_id', 'datum'),
+    'avbrott': ('avbrott', 'maskin_id', 'datum'),
+    'service': ('maskin_service', 'maskin_stanford_id', 'datum'),
+}
+
+
+def _dag(varde) -> Optional[str]:
+    # date, datetime och ISO-text ('2026-05-04T06:00:00Z') → 'YYYY-MM-DD'
+    return str(varde)[:10] if varde else None
+
+
+def _fingeravtryck(rader: List[Dict]) -> str:
+    """Ordningsoberoende hash över raderna, utan filnamn."""
+    h = hashlib.blake2b(digest_size=16)
+    for rad in sorted(json.dumps({k: v for k, v in r.items() if k != 'filnamn'},
+                                 sort_keys=True, default=str) for r in rader):
+        h.update(rad.encode() + b'\n')
+    return 'b2:' + h.hexdigest()
+
+
+def _mom_inkrement(data: Dict) -> Dict:
+    """Läs lagrade fingeravtryck för filens maskiner från filens första dag.
+
+    {'lagrade': {(maskin, datum, del): fingeravtryck} | None, 'registrera':
+    {del: [rader]}, 'oforandrade': {del: [hoppade, totalt]}}. lagrade är None
+    när meta_mom_dag saknas — då skrivs allt och inget registreras. Annat
+    läsfel eller MOM_INKREMENTELL=0 → {} (allt skrivs, registreras)."""
+    inkr = {'lagrade': {}, 'registrera': {}, 'oforandrade': {}}
+    forsta: Dict[str, str] = {}
+
+    def se(maskin, datum):
+        d = _dag(datum)
+        if maskin and d and (maskin not in forsta or d < forsta[maskin]):
+            forsta[maskin] = d
+
+    for ek, entry in (data.get('tid_entries') or {}).items():
+        se(ek[1], entry.get('datum'))
+    for nyckel, maskin_falt, datum_falt in _MOM_DELAR.values():
+        for rad in (data.get(nyckel) or []) if nyckel else []:
+            se(rad.get(maskin_falt), rad.get(datum_falt))
+    if not MOM_INKREMENTELL or not forsta:
+        return inkr
+    try:
+        for maskin_id, fran in forsta.items():
+            # mom_tider grupperas på UTC-dag, som kan ligga en dag före lokal
+            fran = (datetime.fromisoformat(fran) - timedelta(days=1)).date().isoformat()
+            for rad in _hamta_alla('meta_mom_dag', {
+                    'maskin_id': f'eq.{maskin_id}', 'datum': f'gte.{fran}',
+                    'select': 'maskin_id,datum,del,fingeravtryck', 'order': 'datum,del'}):
+                inkr['lagrade'][(rad['maskin_id'], _dag(rad['datum']), rad['del'])] = rad['fingeravtryck']
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            logger.warning("  meta_mom_dag saknas — alla dagar skrivs (migrationen 20261026 ej körd?)")
+            inkr['lagrade'] = None
+        else:
+            logger.warning(f"  Kunde inte läsa meta_mom_dag ({e}) — alla dagar skrivs")
+            inkr['lagrade'] = {}
+    except Exception as e:
+        logger.warning(f"  Kunde inte läsa meta_mom_dag: {e} — alla dagar skrivs")
+        inkr['lagrade'] = {}
+    return inkr
+
+
+def _nya_dagar(inkr: Dict, del_: str, rader: List[Dict]) -> List[Dict]:
+    """Raderna för de dagar vars fingeravtryck ändrats sedan förra importen.
+
+    Nya fingeravtryck läggs i inkr['registrera'][del_] och sparas först när
+    delen skrivits (_registrera_mom_dagar) — misslyckas skrivningen plockar
+    anroparen bort delen, och dagen skrivs om nästa gång."""
+    lagrade = inkr['lagrade']
+    if lagrade is None or not rader:
+        return rader
+    _, maskin_falt, datum_falt = _MOM_DELAR[del_]
+    per_dag = defaultdict(list)
+    for rad in rader:
+        per_dag[(rad.get(maskin_falt), _dag(rad.get(datum_falt)))].append(rad)
+    kvar = []
+    hoppade = 0
+    for (maskin, datum), grupp in per_dag.items():
+        if not maskin or not datum:
+            kvar.extend(grupp)
+            continue
+        fa = _fingeravtryck(grupp)
+        if lagrade.get((maskin, datum, del_)) == fa:
+            hoppade += 1
+            continue
+        kvar.extend(grupp)
+        inkr['registrera'].setdefault(del_, []).append(
+            {'maskin_id': maskin, 'datum': datum, 'del': del_, 'fingeravtryck': fa})
+    inkr['oforandrade'][del_] = [hoppade, len(per_dag)]
+    if hoppade:
+        import_matning.rakna('mom_dagar_oforandrade', hoppade)
+    return kvar
+
+
+def _registrera_mom_dagar(inkr: Dict, filnamn: str) -> None:
+    """Spara fingeravtrycken för de delar som skrevs utan fel."""
+    if any(h for h, _ in inkr['oforandrade'].values()):
+        logger.info("  Oförändrade dagar: " + ', '.join(
+            f"{d} {h}/{t}" for d, (h, t) in inkr['oforandrade'].items()))
+    rader = [{**r, 'filnamn': filnamn, 'uppdaterad': datetime.now(timezone.utc).isoformat()}
+             for del_rader in inkr['registrera'].values() for r in del_rader]
+    if rader and upsert_data('meta_mom_dag', rader, ['maskin_id', 'datum', 'del']) == 0:
+        # Inte kritiskt: nästa import skriver samma dagar en gång till
+        logger.warning("  Kunde inte spara fingeravtryck i meta_mom_dag")
+
+
+@import_matning.matt('spara')
+def save_mom_to_supabase(data: Dict) -> bool:
+    """Spara MOM-data till Supabase. Bara dagar som ändrats sedan förra
+    importen skrivs (se _MOM_DELAR/meta_mom_dag)."""
+    try:
+        fel = []
+        inkr = _mom_inkrement(data)
+
+        import_matning.etapp('maskin')
+        # Maskin
+        if data.get('maskin'):
+            log_if_new_maskin(data['maskin'].get('maskin_id', ''), data['maskin'].get('maskin_typ', 'Okänd'))
+            if upsert_maskin(data['maskin']) == 0:
+                fel.append('dim_maskin')
+
+        import_matning.etapp('operatorer')
+        # Operatörer
+        if data.get('operatorer'):
+            if upsert_data('dim_operator', data['operatorer'], ['operator_id']) == 0:
+                fel.append('dim_operator')
+
+        import_matning.etapp('objekt')
+        # Objekt — gemensam skrivpolicy (fyller luckor, skriver aldrig över
+        # mänskligt underhållna fält)
+        if data.get('objekt'):
+            upsert_dim_objekt(data['objekt'])
+
+        import_matning.etapp('tradslag')
+        # Trädslag
+        if data.get('tradslag'):
+            if upsert_data('dim_tradslag', data['tradslag'], ['tradslag_id']) == 0:
+                fel.append('dim_tradslag')
+
+        import_matning.etapp('gps')
+        # GPS-spår (ej kritiskt – logga bara fel). Batcherna är oberoende
+        # av varandra och skickas samtidigt.
+        gps_spar = _nya_dagar(inkr, 'gps', data.get('gps_spar'))
+        if gps_spar:
+            res = upsert_batcher_parallellt(gps_skrivjobb(gps_spar, None))
+            if any(t['fel'] for t in res.values()):
+                inkr['registrera'].pop('gps', None)
+
+        import_matning.etapp('skift')
+        # Skift — nyckel (maskin_id, datum, shift_key), INTE filnamn/inloggning_tid:
+        # timvisa MOM-filer gav en NY rad per fil (filnamn i gamla nyckeln) och
+        # starttiden glider mellan ögonblicksbilder. ShifKey är skiftets äkta
+        # identitet; datum i nyckeln = billig försäkring mot framtida
+        # ShifKey-reset (maskindatorbyte); startdatum är verifierat stabilt.
+        #
+        # KUVERT-MERGE — ren överskrivning räcker inte: timfilernas fönster
+        # GLIDER (19 juli key 625: 08:01→09:02 ... 14:05→14:46), så sista
+        # rapporten täcker inte fragmenterade dagar. Raden slås ihop med
+        # befintlig: inloggning = min, utloggning = max, langd = spännet.
+        # Ordningsoberoende — omimport och kumulativa arkivfiler ger samma
+        # kuvert oavsett i vilken ordning filerna kommer.
+        #
+        # OBS: läs-ändra-skriv (GET + upsert) — säkert ENDAST för att importen
+        # är serialiserad (en fil i taget). Parallelliseras importen någon gång
+        # måste kuvertet flyttas in i databasen: ON CONFLICT DO UPDATE med
+        # LEAST(inloggning_tid)/GREATEST(utloggning_tid).
+        # Fingeravtrycket tas på filens rader FÖRE kuvert-mergen nedan
+        skift_rader = _nya_dagar(inkr, 'skift', data.get('skift'))
+        if skift_rader:
+            for rad in skift_rader:
+                if not rad.get('datum') or not rad.get('shift_key'):
+                    # Ska inte kunna hända (alla rader får shift_key i parsern)
+                    # — men om det gör det ska det SYNAS, inte tappas tyst.
+                    logger.warning(
+                        f"  SKIFT UTAN NYCKEL hoppar kuvert-merge: "
+                        f"{rad.get('maskin_id')} {rad.get('inloggning_tid')} "
+                        f"(datum={rad.get('datum')}, shift_key={rad.get('shift_key')})")
+                    continue
+                try:
+                    resp = requests.get(
+                        f"{SUPABASE_URL}/rest/v1/fakt_skift",
+                        params={'maskin_id': f"eq.{rad['maskin_id']}",
+                                'datum': f"eq.{rad['datum']}",
+                                'shift_key': f"eq.{rad['shift_key']}",
+                                'select': 'inloggning_tid,utloggning_tid'},
+                        headers=SUPABASE_HEADERS, timeout=30)
+                    bef = resp.json() if resp.ok else []
+                except Exception:
+                    bef = []  # kuvertet är best effort — upserten sker ändå
+                if bef:
+                    bef_in = parse_datetime(bef[0].get('inloggning_tid'))
+                    bef_ut = parse_datetime(bef[0].get('utloggning_tid'))
+                    if bef_in and rad.get('inloggning_tid') and bef_in < rad['inloggning_tid']:
+                        rad['inloggning_tid'] = bef_in
+                    if bef_ut and rad.get('utloggning_tid') and bef_ut > rad['utloggning_tid']:
+                        rad['utloggning_tid'] = bef_ut
+                if rad.get('inloggning_tid') and rad.get('utloggning_tid'):
+                    rad['langd_sek'] = int((rad['utloggning_tid'] - rad['inloggning_tid']).total_seconds())
+            if upsert_data('fakt_skift', skift_rader, ['maskin_id', 'datum', 'shift_key']) == 0:
+                inkr['registrera'].pop('skift', None)
+                # Detta ÄR kritiskt — skiftrader bär lönedata (arbetsdagens
+                # start/slut). Wisent-regressionen 21/7 upptäcktes bara för
+                # att Martin råkade kolla sin dag: gamla constrainten
+                # fakt_skift_unik låg kvar och fällde hela batchen tyst.
+                forlorade = '; '.join(
+                    f"{r.get('maskin_id')}/{r.get('datum')}/key={r.get('shift_key')}"
+                    for r in skift_rader)
+                skift_fil = skift_rader[0].get('filnamn', 'okänd fil')
+                logger.error(
+                    f"  SKIFT-DATA FÖRLORAD ({len(skift_rader)} rader ur {skift_fil}): "
+                    f"{forlorade} — lönedata saknas tills filen omimporteras!")
+
+        import_matning.etapp('tid')
+        # Tid — re-aggregera från ALLA filer i Behandlade/<maskin>/mom/ för
+        # berörda (datum, maskin). Segment-IDENTITET är (start_time, maskin);
+        # objekt/operator är ATTRIBUT som senaste exportversionen äger. Berörda
+        # dagar raderas och byggs om i sin helhet (delete + insert) — se _keep.
+        #
+        # Bakgrund: auto_import_watch.py kör skogsmaskin_import_version_6.py via
+        # subprocess.run() per filevent → ny Python-process varje gång, så
+        # _GLOBAL_TID_ENTRIES (modulvariabel) var ALLTID tom vid start. Det
+        # gjorde att en liten "morgon-export" (1 entry, 5 min) som kom efter
+        # en stor "kvällsexport" (12h) aggregerade till bara 5 min, sedan
+        # UPSERT-överskrev tidigare rad → upp till 99 % förlust på dagar med
+        # flera filer. Vi läser nu samtliga filer i Behandlade vid varje import
+        # så summan är oberoende av filordning.
+        #
+        # OBS: 'runtime = P + T + OW' i tomgang-härledningen är KORREKT och
+        # avsiktlig — motorn arbetar under other work, så OW ska dras av från
+        # motortiden precis som P+T (annars felklassas OW-tid som tomgång).
+        # Blanda inte ihop med G15h-VISNINGEN i appen, som är P + T utan OW
+        # (transform.ts) — det är två olika mått. (Tidigare kommentar här
+        # kallade OW-inkluderingen "en separat bugg" — det var fel.)
+        rows = []
+        if data.get('tid_entries'):
+            global _GLOBAL_TID_ENTRIES, _GLOBAL_TID_OPERATORS
+            # _GLOBAL_TID_OPERATORS används som fallback för legacy 3-tuple-keys
+            # där operator inte ingår direkt i entry_key.
+            _GLOBAL_TID_OPERATORS.update(data.get('tid_operator', {}))
+
+            # Steg 1: identifiera vilka (maskin, datum) som påverkas av NUVARANDE
+            # fil. Dessa dagar byggs om i sin HELHET (alla objekt/operatörer) från
+            # samtliga Behandlade-filer + nuvarande fil.
+            affected = set()        # set of (maskin, datum_str)
+            for entry_key, entry in data['tid_entries'].items():
+                if len(entry_key) == 4:
+                    _, maskin, _, _ = entry_key
+                else:
+                    _, maskin, _ = entry_key
+                datum_str = str(entry.get('datum') or '')
+                if not datum_str:
+                    continue
+                affected.add((maskin, datum_str))
+
+            if affected:
+                import_matning.etapp('tid_arkiv')
+                # Steg 2: scanna ALLA MOM-filer i Behandlade/<maskin>/mom/ för
+                # de berörda datumen.
+                #
+                # IDENTITET = (start_time, maskin). Objekt och operatör är ATTRIBUT
+                # — kumulativa exportversioner kan OM-ATTRIBUERA samma segment
+                # (bevisat A110148 maj–juni 2026: första versionen satte
+                # OperatorKey 1 på dagens alla segment, alla senare versioner
+                # satte 2 → med attribution i identiteten fick BÅDA generationerna
+                # egna rader och hela dagar dubblades: 26,6 h motortid på en dag).
+                #
+                # TVÅ SEPARATA VINNARE per identitet (steg 4-sweepens läxa 2026-07-11):
+                #   BELOPP     = varianten med STÖRST vikt (segmentets totala duration
+                #                över alla tidshinkar; tie → högst recency). Ponsse
+                #                exporterar ibland samma starttid med OLIKA durationer
+                #                (segment skrivs om mellan/inom exportversioner —
+                #                bevisat PONS 2026-03-17 06:32:46: fem varianter
+                #                4987–13015 s). En senare version med KORTARE variant
+                #                får aldrig klubba den mest kompletta (#40-skyddet).
+                #   ATTRIBUTION = versionen med HÖGST recency (suffix/mtime; tie →
+                #                störst vikt) äger (objekt, operator) — senaste
+                #                exportversionens bokföring gäller (op-flip-fixen).
+                merged_entries = {}   # (start_time, maskin) -> värde-vinnande entry
+                merged_attr = {}      # (start_time, maskin) -> (recency, objekt, operator, vikt)
+                _varde_meta = {}      # (start_time, maskin) -> (vikt, recency) för värde-vinnaren
+                files_scanned = 0
+
+                def _fil_recency(namn_eller_path):
+                    """Exportversionens ålder: sista _YYYYMMDD_HHMMSS-suffixet i
+                    filnamnet (sätts av vår Behandlade-flytt vid namnkrock, rad
+                    ~3450), annars filens mtime, annars 0. OBS: suffix och mtime
+                    är olika klockor — en suffixlös basfil vars mtime bumpas i
+                    efterhand (t.ex. OneDrive-omsynk) kan tillfälligt rankas
+                    före senare suffixade versioner; byten loggas alltid (INFO)
+                    och nästa nyare export rättar attributionen."""
+                    bas = os.path.basename(namn_eller_path)
+                    # Maskin-genererade filnamn: 14 sammanhängande siffror (_YYYYMMDDHHMMSS)
+                    m14 = re.search(r'_(\d{14})(?=\.|_|$)', bas)
+                    if m14:
+                        try:
+                            return datetime.strptime(m14.group(1), '%Y%m%d%H%M%S').timestamp()
+                        except ValueError:
+                            pass
+                    # Behandlade-suffix: _YYYYMMDD_HHMMSS (sätts vid namnkrock)
+                    m = re.findall(r'_(\d{8})_(\d{6})', bas)
+                    if m:
+                        try:
+                            return datetime.strptime(m[-1][0] + m[-1][1], '%Y%m%d%H%M%S').timestamp()
+                        except ValueError:
+                            pass
+                    try:
+                        return os.path.getmtime(namn_eller_path)
+                    except OSError:
+                        return 0.0
+
+                def _keep(ek, entry, recency):
+                    ident = (ek[0], ek[1])
+                    objekt, operator = ek[2], ek[3]
+                    # vikt = segmentets hela duration oavsett klass (RUN/DOWN/UNUT) —
+                    # P+T räcker inte: DOWN-/rast-varianter har P+T = 0.
+                    vikt = sum((entry.get(f) or 0) for f in (
+                        'processing_sek', 'terrain_sek', 'other_work_sek',
+                        'maintenance_sek', 'disturbance_sek', 'rast_sek', 'avbrott_sek'))
+                    # 1) VÄRDE-vinnaren: störst vikt (tie → högst recency)
+                    v = _varde_meta.get(ident)
+                    if v is None or vikt > v[0] or (vikt == v[0] and recency > v[1]):
+                        merged_entries[ident] = entry
+                        _varde_meta[ident] = (vikt, recency)
+                    # 2) ATTRIBUTIONS-vinnaren: högst recency (tie → störst vikt)
+                    a = merged_attr.get(ident)
+                    if a is None or recency > a[0] or (recency == a[0] and vikt > a[3]):
+                        if a is not None and (a[1], a[2]) != (objekt, operator):
+                            logger.info(f"  Attribution bytt för segment {ek[0]} ({ek[1]}): "
+                                        f"({a[1]}, {a[2]}) -> ({objekt}, {operator}) — senaste exportversion vinner")
+                        merged_attr[ident] = (recency, objekt, operator, vikt)
+                affected_maskins = sorted({m for m, _ in affected})
+                affected_dates_all = sorted({d for _, d in affected})
+                logger.info(f"  Re-aggregerar tid för maskin={affected_maskins} datum={affected_dates_all[0]}->{affected_dates_all[-1]}")
+
+                for maskin_id in affected_maskins:
+                    dates_for_maskin = {d for m, d in affected if m == maskin_id}
+                    mom_dir = os.path.join(BEHANDLADE, maskin_id, 'mom')
+                    if not os.path.isdir(mom_dir):
+                        continue
+                    # Pre-filter: MOM-filnamn innehåller maskintidsstämpeln (_YYYYMMDDHHMMSS).
+                    # Hoppa filer vars datum-prefix (8 siffror) INTE finns bland berörda datum
+                    # — minskar parse-anrop drastiskt vid timrapportering med 10+ filer/dag.
+                    dates_ren_set = {d.replace('-', '') for d in dates_for_maskin}
+
+                    def _datum_i_filnamn(fname):
+                        m = re.search(r'_(\d{8})\d{6}(?=\.|_|$)', fname)
+                        if m:
+                            return m.group(1) in dates_ren_set
+                        return True  # inget datummönster → inkludera för säkerhets skull
+
+                    mom_files = [
+                        f for f in lista_stanford(mom_dir, '.mom')
+                        if _datum_i_filnamn(stanford_namn(f))
+                    ]
+                    for f in mom_files:
+                        try:
+                            file_data = parse_mom_file(f)
+                        except Exception as e:
+                            logger.warning(f"  Kunde inte re-parsa {os.path.basename(f)}: {e}")
+                            continue
+                        files_scanned += 1
+                        f_recency = _fil_recency(f)
+                        for ek, entry in file_data.get('tid_entries', {}).items():
+                            if len(ek) != 4:
+                                continue
+                            _, ek_maskin, _, _ = ek
+                            if ek_maskin != maskin_id:
+                                continue
+                            if str(entry.get('datum') or '') in dates_for_maskin:
+                                _keep(ek, entry, f_recency)
+
+                # Steg 3: lägg explicit in nuvarande filens entries — filen kan
+                # ännu inte ha flyttats till Behandlade av import-pipelinen.
+                # Recency ur inkommande filnamnets suffix om det finns; annars
+                # "nu" (nyss anländ = senaste kända export). OBS: en gammal
+                # export som återlevereras under basnamn kan därmed tillfälligt
+                # vinna attributionen — nästa import av en nyare version rättar,
+                # och attribution-byten loggas alltid (INFO) för spårbarhet.
+                bas_namn = data.get('filnamn', '') or ''
+                if re.search(r'_\d{14}(?=\.|_|$)|_\d{8}_\d{6}', bas_namn):
+                    aktuell_recency = _fil_recency(bas_namn)
+                else:
+                    aktuell_recency = datetime.now().timestamp()
+                for ek, entry in data['tid_entries'].items():
+                    if len(ek) == 4:
+                        _keep(ek, entry, aktuell_recency)
+
+                logger.info(f"  Scannade {files_scanned} filer, {len(merged_entries)} unika entries efter dedup")
+                import_matning.rakna('arkivfiler_skannade', files_scanned)
+                import_matning.etapp('tid')
+
+                tid_fields = ['processing_sek', 'terrain_sek', 'other_work_sek',
+                              'maintenance_sek', 'disturbance_sek', 'rast_sek',
+                              'avbrott_sek', 'kort_stopp_sek', 'bransle_liter',
+                              'engine_time_sek', 'korstracka_m',
+                              'terrain_korstracka_m', 'terrain_bransle_liter']
+
+                # Steg 4: aggregera per (datum, maskin, objekt, operator) för ALLA
+                # segment på berörda (maskin, datum) — attributionen kommer från
+                # den vinnande (senaste) exportversionen. Dagen byggs om komplett;
+                # äkta fleroperatörs-/flerobjektsdagar behåller sin uppdelning
+                # eftersom olika segment (olika start_time) behåller var sin
+                # attribution.
+                dates_by_maskin = {m: {d for m2, d in affected if m2 == m}
+                                   for m in affected_maskins}
+                agg = defaultdict(lambda: {**{f: 0 for f in tid_fields},
+                                           'other_work_kategorier': {}})
+                for ident, entry in merged_entries.items():
+                    _, maskin = ident
+                    _, objekt, operator, _ = merged_attr[ident]
+                    datum = str(entry.get('datum') or '')
+                    if not datum or datum not in dates_by_maskin.get(maskin, ()):
+                        continue
+                    dag_key = (datum, maskin, objekt, operator)
+                    for f in tid_fields:
+                        agg[dag_key][f] += (entry.get(f) or 0)
+                    # other_work_kategorier mergas (ej summeras som skalär) —
+                    # {kategori: sekunder} följer med **values till upserten.
+                    okat = agg[dag_key]['other_work_kategorier']
+                    for k, v in (entry.get('other_work_kategorier') or {}).items():
+                        okat[k] = okat.get(k, 0) + v
+
+                for dag_key, values in agg.items():
+                    datum, maskin, objekt, operator = dag_key
+                    runtime = values['processing_sek'] + values['terrain_sek'] + values['other_work_sek']
+                    g0 = runtime - values['kort_stopp_sek']
+                    tomgang = max(0, values['engine_time_sek'] - g0)
+                    rows.append({
+                        'datum': datum,
+                        'maskin_id': maskin,
+                        'operator_id': operator,
+                        'objekt_id': objekt,
+                        **values,
+                        'tomgang_sek': tomgang,
+                        'filnamn': data.get('filnamn', ''),
+                    })
+
+            # Fallback: om WorkCategory saknas i MOM-filen → processing_sek = 0 och terrain_sek = 0
+            # men engine_time_sek > 0. Sätt processing_sek = 88% av engine_time_sek som uppskattning.
+            for row in rows:
+                if row.get('processing_sek', 0) == 0 and row.get('terrain_sek', 0) == 0 and row.get('engine_time_sek', 0) > 0:
+                    fallback_sek = int(row['engine_time_sek'] * 0.88)
+                    row['processing_sek'] = fallback_sek
+                    # Håll raden konsistent: tomgang_sek beräknades i Steg 4 med
+                    # proc = 0 (≈ hela motortiden blev tomgång) — räkna om med
+                    # fallback-procen. Fallbacken påstår 88 % arbete ⇒ tomgången
+                    # är resterande ~12 % + ev. kort_stopp. Utan detta bokförs
+                    # motortiden DUBBELT i raden (som proc OCH tomgång) — bevisat
+                    # 41 rader / +7,3 h fejk-tomgång 2026-07-10.
+                    g0_fb = (fallback_sek + row.get('terrain_sek', 0)
+                             + row.get('other_work_sek', 0) - row.get('kort_stopp_sek', 0))
+                    row['tomgang_sek'] = max(0, row['engine_time_sek'] - g0_fb)
+                    logger.warning(f"  VARNING: Fallback G15h från EngineTime för {row.get('maskin_id')} {row.get('datum')} — WorkCategory saknas i MOM-fil (engine={row['engine_time_sek']}s → processing={fallback_sek}s, tomgang={row['tomgang_sek']}s)")
+
+            if rows:
+                # Dagar vars omaggregering blev identisk med förra gången rörs
+                # inte — varken delete eller insert nedan.
+                alla_dagar = {(r['maskin_id'], str(r['datum'])) for r in rows}
+                rows = _nya_dagar(inkr, 'tid', rows)
+                affected -= alla_dagar - {(r['maskin_id'], str(r['datum'])) for r in rows}
+                affected_maskins = sorted({m for m, _ in affected})
+
+            if rows:
+                # DAG-REBUILD: raderna är en KOMPLETT omaggregering av berörda
+                # (maskin, datum) från samtliga Behandlade-filer + nuvarande fil.
+                # Radera dagens gamla rader först — om-attribuerade objekt/
+                # operatörer lämnar annars kvar dubblettrader för evigt, eftersom
+                # upsert-nyckeln (datum, maskin, objekt, operator) aldrig träffar
+                # den gamla attributionens rad (A110148-dubbleringen maj–juni-26).
+                # Ej atomärt (delete + insert är två anrop): kraschar importen
+                # mittemellan är meta ej satt → filen omimporteras → självläker.
+                for del_maskin in affected_maskins:
+                    del_datum = sorted({d for m, d in affected if m == del_maskin})
+                    for i in range(0, len(del_datum), 50):
+                        chunk = ','.join(del_datum[i:i+50])
+                        try:
+                            requests.delete(
+                                f"{SUPABASE_URL}/rest/v1/fakt_tid"
+                                f"?maskin_id=eq.{del_maskin}&datum=in.({chunk})",
+                                headers=SUPABASE_HEADERS, timeout=60)
+                        except Exception as e:
+                            logger.warning(f"  Kunde inte städa fakt_tid före insert ({del_maskin}): {e}")
+                if upsert_data('fakt_tid', rows, ['datum', 'maskin_id', 'objekt_id', 'operator_id']) == 0:
+                    fel.append('fakt_tid')
+                    inkr['registrera'].pop('tid', None)
+
+        import_matning.etapp('arbetsdag')
+        # Arbetsdag — skapa automatiskt från fakt_tid + skift (bara ändrade dagar)
+        if rows or skift_rader:
+            _create_arbetsdag(rows, skift_rader or [])
+
+        import_matning.etapp('produktion')
+        # Produktion - upsert pa monitoring_start, samma period i flera filer blockeras
+        produktion = _nya_dagar(inkr, 'produktion', data.get('produktion'))
+        if produktion:
+            if upsert_data('fakt_produktion', produktion,
+                           ['maskin_id', 'operator_id', 'objekt_id', 'tradslag_id', 'processtyp', 'monitoring_start']) == 0:
+                fel.append('fakt_produktion')
+                inkr['registrera'].pop('produktion', None)
+
+        import_matning.etapp('avbrott')
+        # Avbrott — deduplicate in Python, then upsert with ON CONFLICT DO NOTHING
+        if data.get('avbrott'):
+            seen = set()
+            deduped = []
+            for a in data['avbrott']:
+                key = (a.get('maskin_id'), a.get('datum'), str(a.get('klockslag', '')), a.get('langd_sek'), a.get('kategori_kod'))
+                if key not in seen:
+                    seen.add(key)
+                    deduped.append(a)
+            if len(deduped) < len(data['avbrott']):
+                logger.info(f"  Avbrott dedup: {len(data['avbrott'])} → {len(deduped)} (tog bort {len(data['avbrott']) - len(deduped)} dubletter i batch)")
+            deduped = _nya_dagar(inkr, 'avbrott', deduped)
+            if deduped and upsert_data('fakt_avbrott', deduped,
+                                       ['maskin_id', 'datum', 'klockslag', 'kategori_kod'],
+                                       on_conflict='ignore') == 0:
+                fel.append('fakt_avbrott')
+                inkr['registrera'].pop('avbrott', None)
+
+        import_matning.etapp('mom_tider')
+        # mom_tider — timvisa tidssegment per maskin/operator (Alternativ A: 5 typer).
+        # Källa: raw_tid_entries (individuella MOM-segment, ej dagsaggregat).
+        # Timdelningen och skrivningen delas med backfill-skripten (mom_timmar):
+        # bara timmar vars innehåll ändrats raderas och skrivs om.
+        tid_entries = data.get('tid_entries', {})
+        if tid_entries:
+            tider_agg = mom_timmar.timhinkar(mom_timmar.segment_ur_tid_entries(tid_entries))
+
+            # mom_tider-skydd: om Behandlade redan har en nyare MOM-fil för
+            # maskinen+datumet hoppar vi mom_tider-skrivningen för den maskinen —
+            # annars skriver en sent importerad gammal fil över en nyare fils
+            # tim-data och G15h-kurvan sjunker (samma grundbugg som recency-fixen
+            # i _fil_recency / aktuell_recency ovan).
+            skip_maskiner: set = set()
+            maskin_datum_sett: set = set()
+            for (e_maskin, _, timme_utc, _) in list(tider_agg.keys()):
+                maskin_datum_sett.add((e_maskin, timme_utc[:10].replace('-', '')))
+            for (e_maskin, datum_prefix) in maskin_datum_sett:
+                behandlad_mapp = os.path.join(BEHANDLADE, e_maskin, 'mom')
+                if not os.path.isdir(behandlad_mapp):
+                    continue
+                for bfil in os.listdir(behandlad_mapp):
+                    if not ar_stanford(bfil, '.mom'):
+                        continue
+                    if datum_prefix not in bfil:
+                        continue
+                    if _fil_recency(os.path.join(behandlad_mapp, bfil)) > aktuell_recency:
+                        skip_maskiner.add(e_maskin)
+                        logger.info(
+                            f"  mom_tider: hoppar {e_maskin} ({datum_prefix})"
+                            f" – nyare fil finns i Behandlade ({bfil})")
+                        break
+            if skip_maskiner:
+                tider_agg = {k: v for k, v in tider_agg.items()
+                             if k[0] not in skip_maskiner}
+
+            mom_rows = _nya_dagar(inkr, 'mom_tider', mom_timmar.till_rader(tider_agg))
+            if mom_rows:
+                res = mom_timmar.skriv_timmar(mom_rows, SUPABASE_URL, SUPABASE_HEADERS, requests)
+                for varning in res['varningar']:
+                    logger.warning(f"  mom_tider: {varning}")
+                if not res['ok']:
+                    fel.append('mom_tider')
+                    inkr['registrera'].pop('mom_tider', None)
+                else:
+                    logger.info(f"  mom_tider: {res['rader']} timrader sparade "
+                                f"({res['andrade']}/{res['timmar']} timmar ändrade)")
+
+        import_matning.etapp('maskin_service')
+        # MOM-genererade maskin_service-rader (en per Repair-event, dedup på mom_event_id).
+        # Stanford-id (text) konverteras till maskiner.id (uuid) här. Saknas mappningen
+        # skipp:as raden — fakt_avbrott-raden är redan källa-of-truth med text-id.
+        service = _nya_dagar(inkr, 'service', data.get('maskin_service'))
+        if service:
+            maskin_uuid_map = _fetch_maskin_uuid_map()
+            op_namn_map = {op['operator_id']: op['operator_namn'] for op in data.get('operatorer', [])}
+            ms_rows = []
+            for r in service:
+                stanford_id = r.pop('maskin_stanford_id', None)
+                op_key = r.pop('operator_key', None)
+                uuid_id = maskin_uuid_map.get(stanford_id)
+                if not uuid_id:
+                    logger.warning(f"  ⚠ maskin_service-rad skippas: ingen maskiner.id-mappning för Stanford-id={stanford_id} (mom_event_id={r.get('mom_event_id')})")
+                    # Dagen är inte skriven — ta den igen när mappningen finns
+                    inkr['registrera'].pop('service', None)
+                    continue
+                r['maskin_id'] = uuid_id
+                if op_key:
+                    r['utford_av'] = op_namn_map.get(f"{stanford_id}_{op_key}")
+                ms_rows.append(r)
+
+            if ms_rows:
+                if upsert_data('maskin_service', ms_rows,
+                               ['mom_event_id'],
+                               on_conflict='ignore') == 0:
+                    fel.append('maskin_service')
+                    inkr['registrera'].pop('service', None)
+
+        import_matning.etapp('statistik')
+        # Maskinstatistik
+        if data.get('maskin_statistik'):
+            if upsert_data('fakt_maskin_statistik', [data['maskin_statistik']], ['maskin_id', 'filnamn']) == 0:
+                fel.append('fakt_maskin_statistik')
+
+        _registrera_mom_dagar(inkr, data.get('filnamn', ''))
+
+        if fel:
+            logger.error(f"  ✗ Misslyckades spara till: {', '.join(fel)}")
+            return False
+
+        return True
+    except Exception as e:
+        logger.error(f"  Fel vid sparande av MOM: {e}")
+        return False
+
+def _fetch_objekt_uuid_map() -> Dict[str, str]:
+    """Hämta mapping vo_nummer → objekt.id (uuid) från objekt-tabellen."""
+    url = f"{SUPABASE_URL}/rest/v1/objekt?select=id,vo_nummer&vo_nummer=not.is.null"
+    headers = {**SUPABASE_HEADERS, 'Prefer': 'return=representation'}
+    resp = requests.get(url, headers=headers, timeout=30)
+    if resp.status_code != 200:
+        return {}
+    return {r['vo_nummer']: r['id'] for r in resp.json() if r.get('vo_nummer')}
+
+
+def _fetch_maskin_uuid_map() -> Dict[str, str]:
+    """Hämta mapping maskiner.maskin_id (Stanford-id, text) → maskiner.id (uuid)."""
+    url = f"{SUPABASE_URL}/rest/v1/maskiner?select=id,maskin_id"
+    resp = requests.get(url, headers=SUPABASE_HEADERS, timeout=30)
+    if resp.status_code != 200:
+        return {}
+    return {r['maskin_id']: r['id'] for r in resp.json() if r.get('maskin_id')}
+
+
+def make_objekt_nyckel(maskin_id: str, vo_nummer: str, obj_key: str) -> Optional[str]:
+    """Stabil kompositnyckel per objekt för snapshot-dedup (oberoende av objekt-tabellen).
+    Format: '<maskin_id>:<numeriskt vo_nummer>'  annars  '<maskin_id>:k<ObjectKey>'.
+    Kompositen (maskin_id:) undviker krock mellan maskiner/objekt på korta vo-nummer.
+    Identisk med import_hpr.make_objekt_nyckel — BÅDA skrivarna måste ge samma nyckel."""
+    vo = remap_vo(vo_nummer)
+    ok = (obj_key or '').strip()
+    ident = vo if vo.isdigit() else (f"k{ok}" if ok else None)
+    if not maskin_id or ident is None:
+        return None
+    return f"{maskin_id}:{ident}"
+
+
+def _delete_existing_hpr_by_nyckel(objekt_nyckel: str) -> int:
+    """Radera hpr_filer + hpr_stammar för ALLA filer med samma objekt_nyckel (stammar först,
+    förlitar sig EJ på FK-cascade). Körs oavsett objekt_id — stoppar snapshot-ackumulering
+    även för objekt som saknar rad i objekt-tabellen. Returnerar antal raderade filer."""
+    q = quote(str(objekt_nyckel), safe='')
+    resp = requests.get(f"{SUPABASE_URL}/rest/v1/hpr_filer?select=id&objekt_nyckel=eq.{q}",
+                        headers=SUPABASE_HEADERS, timeout=30)
+    if resp.status_code != 200 or not resp.json():
+        return 0
+    fil_ids = [r['id'] for r in resp.json()]
+    for fid in fil_ids:
+        requests.delete(f"{SUPABASE_URL}/rest/v1/hpr_stam_kluster?hpr_fil_id=eq.{fid}",
+                        headers=SUPABASE_HEADERS, timeout=60)
+        requests.delete(f"{SUPABASE_URL}/rest/v1/hpr_stammar?hpr_fil_id=eq.{fid}",
+                        headers=SUPABASE_HEADERS, timeout=60)
+    requests.delete(f"{SUPABASE_URL}/rest/v1/hpr_filer?objekt_nyckel=eq.{q}",
+                    headers=SUPABASE_HEADERS, timeout=30)
+    return len(fil_ids)
+
+
+@import_matning.matt('hpr_tabeller')
+def _save_hpr_tables(data: Dict):
+    """Spara HPR-data till hpr_filer och hpr_stammar tabellerna."""
+    filnamn = data.get('filnamn', '')
+    maskin_id = data.get('maskin', {}).get('maskin_id', '')
+    stammar = data.get('stammar', [])
+    if not stammar or not filnamn:
+        return
+
+    # Hämta objekt UUID-mapping
+    objekt_map = _fetch_objekt_uuid_map()
+
+    # Bestäm objekt_id (uuid) via vo_nummer från objekt-listan
+    objekt_uuid = None
+    for obj in data.get('objekt', []):
+        vo = obj.get('vo_nummer', '')
+        if vo and vo in objekt_map:
+            objekt_uuid = objekt_map[vo]
+            break
+
+    # Beräkna stammar med koordinater
+    stammar_med_koordinat = sum(1 for s in stammar if s.get('latitude') and s.get('longitude'))
+
+    # Upsert hpr_filer
+    fil_row = {
+        'filnamn': filnamn,
+        'stammar_count': len(stammar),
+        'has_coordinates': stammar_med_koordinat > 0,
+        'stammar_med_koordinat': stammar_med_koordinat,
+    }
+    if objekt_uuid:
+        fil_row['objekt_id'] = objekt_uuid
+
+    # Fil-datum från äldsta stam-tidpunkt
+    earliest = None
+    for s in stammar:
+        t = s.get('tidpunkt')
+        if t and (earliest is None or t < earliest):
+            earliest = t
+    if earliest:
+        fil_row['fil_datum'] = earliest.isoformat() if hasattr(earliest, 'isoformat') else str(earliest)
+
+    # Snapshot-dedup per objekt_nyckel (frikopplad från objekt-tabellen). Utan detta blir
+    # varje kumulativt snapshot en ny rad (on_conflict=filnamn) -> ackumulering + dubbel-
+    # räknade stammar. Ersätt BARA om nya snapshotet är >= största befintliga keyed-snapshot
+    # (subset-säkert + ordningsoberoende — samma princip som MOM _keep). Legacy-rader med
+    # objekt_nyckel NULL matchas EJ -> rörs ej här; de städas i lager c med delmängds-bevis.
+    objekt_nyckel = None
+    for obj in data.get('objekt', []):
+        objekt_nyckel = make_objekt_nyckel(maskin_id, obj.get('vo_nummer', ''), obj.get('object_key', ''))
+        if objekt_nyckel:
+            break
+    if objekt_nyckel:
+        fil_row['objekt_nyckel'] = objekt_nyckel
+        q = quote(str(objekt_nyckel), safe='')
+        ex = requests.get(
+            f"{SUPABASE_URL}/rest/v1/hpr_filer?select=stammar_count&objekt_nyckel=eq.{q}",
+            headers=SUPABASE_HEADERS, timeout=30)
+        existing_counts = [(r.get('stammar_count') or 0) for r in ex.json()] if ex.status_code == 200 else []
+        existing_max = max(existing_counts) if existing_counts else 0
+        if existing_counts and len(stammar) < existing_max:
+            logger.info(f"  hpr_filer: hoppar {filnamn} — {len(stammar)} stammar < befintlig "
+                        f"komplett snapshot ({existing_max}) för {objekt_nyckel} (ingen nedgradering)")
+            return
+        deleted = _delete_existing_hpr_by_nyckel(objekt_nyckel)
+        if deleted:
+            logger.info(f"  Ersätter: raderade {deleted} tidigare snapshot(s) för objekt {objekt_nyckel}")
+    else:
+        logger.warning(f"  {filnamn}: ingen objekt_nyckel kunde härledas — upsert per filnamn (kan ackumulera)")
+
+    headers_repr = {**SUPABASE_HEADERS, 'Prefer': 'resolution=merge-duplicates,return=representation'}
+    resp = requests.post(
+        f"{SUPABASE_URL}/rest/v1/hpr_filer?on_conflict=filnamn",
+        json=fil_row,
+        headers=headers_repr,
+        timeout=30
+    )
+    if resp.status_code not in [200, 201]:
+        logger.warning(f"  hpr_filer upsert misslyckades: {resp.status_code} {resp.text}")
+        return
+
+    fil_data = resp.json()
+    if isinstance(fil_data, list):
+        fil_data = fil_data[0]
+    hpr_fil_id = fil_data['id']
+
+    # Insert hpr_stammar med ON CONFLICT DO NOTHING. Beror på hpr_fil_id ovan
+    # — därför först här; batcherna sinsemellan är oberoende och körs samtidigt.
+    headers_ignore = {**SUPABASE_HEADERS, 'Prefer': 'resolution=ignore-duplicates'}
+
+    def _skriv_stam_batch(i, rows):
+        resp = requests.post(
+            f"{SUPABASE_URL}/rest/v1/hpr_stammar?on_conflict=hpr_fil_id,stam_nummer",
+            json=rows,
+            headers=headers_ignore,
+            timeout=60
+        )
+        if resp.status_code not in [200, 201]:
+            logger.warning(f"  hpr_stammar insert batch {i} misslyckades: {resp.status_code} {resp.text}")
+            return 0
+        return len(rows)
+
+    uppgifter = []
+    for i in range(0, len(stammar), BATCH_STORLEK):
+        batch = stammar[i:i + BATCH_STORLEK]
+        rows = []
+        for s in batch:
+            row = {
+                'hpr_fil_id': hpr_fil_id,
+                'stam_nummer': s.get('hpr_stam_nummer'),
+                'tradslag': s.get('hpr_tradslag_namn'),
+            }
+            if s.get('dbh_mm') is not None:
+                row['dbh'] = s['dbh_mm']
+            if s.get('latitude'):
+                row['lat'] = s['latitude']
+            if s.get('longitude'):
+                row['lng'] = s['longitude']
+            if s.get('hpr_antal_stockar'):
+                row['antal_stockar'] = s['hpr_antal_stockar']
+            if s.get('hpr_total_volym') is not None:
+                row['total_volym'] = s['hpr_total_volym']
+            row['bio_energy_adaption'] = s.get('hpr_bio_energy_adaption')
+            row['sortiment'] = s.get('hpr_sortiment')
+            rows.append(row)
+        uppgifter.append(('hpr_stammar', len(rows),
+                          lambda i=i, rows=rows: _skriv_stam_batch(i, rows)))
+
+    kor_batcher_parallellt(uppgifter)
+    logger.info(f"  hpr_filer + hpr_stammar: {len(stammar)} stammar sparade")
+    rebuild_hpr_stam_kluster(hpr_fil_id)
+
+
+@import_matning.matt('hpr_stam_kluster')
+def rebuild_hpr_stam_kluster(hpr_fil_id: str) -> Optional[int]:
+    """Bygg om kartans klusterpyramid (hpr_stam_kluster) för EN HPR-fil ur
+    dess hpr_stammar. MÅSTE anropas efter att stammarna skrivits. Gamla
+    snapshots celler försvinner med sina hpr_filer-rader — se
+    20261022_hpr_stam_kluster.sql. Ej kritiskt: fel loggas, importen fortsätter
+    (kartan faller då tillbaka på stammarna)."""
+    try:
+        resp = requests.post(
+            f"{SUPABASE_URL}/rest/v1/rpc/rebuild_hpr_stam_kluster",
+            json={'p_hpr_fil_id': hpr_fil_id},
+            headers=SUPABASE_HEADERS,
+            timeout=60,
+        )
+        if resp.status_code not in (200, 201):
+            logger.warning(f"  rebuild_hpr_stam_kluster {hpr_fil_id}: "
+                           f"{resp.status_code} - {resp.text[:200]}")
+            return None
+        logger.info(f"  hpr_stam_kluster: {resp.json()} celler")
+        return resp.json()
+    except Exception as e:
+        logger.warning(f"  rebuild_hpr_stam_kluster {hpr_fil_id}: {e}")
+        return None
+
+
+@import_matning.matt('fakt_sortiment')
+def rebuild_fakt_sortiment(maskin_id: str, objekt_id: str) -> Optional[Dict]:
+    """Bygg om fakt_sortiment för ETT (maskin, objekt) ur detalj_stock.
+
+    Ersätter den gamla per-fil-upserten. HPR-filerna för ett objekt är en MIX
+    av en 4000-kapad fil och små inkrementfiler — med merge-duplicates skrev
+    inkrementet ÖVER den stora filens dagssiffror istället för att läggas till.
+    detalj_stock är redan deduplicerad på (maskin_id, stem_key, log_key) och
+    bär unionen, så härledning därifrån är både korrekt och ominläsningssäker.
+
+    MÅSTE anropas EFTER att detalj_stock och detalj_stam skrivits.
+
+    Funktionen i DB rör ingenting om den härledda mängden är tom — se
+    20260822_rebuild_fakt_sortiment.sql. Returnerar None vid fel (anroparen
+    ska då flagga import-fel), annars dict med status ombyggd/hoppad."""
+    try:
+        resp = requests.post(
+            f"{SUPABASE_URL}/rest/v1/rpc/rebuild_fakt_sortiment",
+            json={'p_maskin_id': maskin_id, 'p_objekt_id': objekt_id},
+            headers=SUPABASE_HEADERS,
+            timeout=60,
+        )
+        if resp.status_code not in (200, 201):
+            logger.error(f"  rebuild_fakt_sortiment {maskin_id}/{objekt_id}: "
+                         f"{resp.status_code} - {resp.text[:200]}")
+            return None
+        return resp.json()
+    except Exception as e:
+        logger.error(f"  rebuild_fakt_sortiment {maskin_id}/{objekt_id}: {e}")
+        return None
+
+
+@import_matning.matt('spara')
+def save_hpr_to_supabase(data: Dict) -> bool:
+    """Spara HPR-data till Supabase"""
+    try:
+        fel = []
+
+        import_matning.etapp('maskin')
+        if data.get('maskin'):
+            log_if_new_maskin(data['maskin'].get('maskin_id', ''), data['maskin'].get('maskin_typ', 'Okänd'))
+            if upsert_maskin(data['maskin']) == 0:
+                fel.append('dim_maskin')
+
+        import_matning.etapp('objekt')
+        if data.get('objekt'):
+            # Gemensam skrivpolicy — tidigare skrevs ALLA kolumner över vid
+            # varje kumulativ fil (inkl. None), vilket raderade manuella namn
+            if upsert_dim_objekt(data['objekt']) == 0:
+                fel.append('dim_objekt')
+
+        import_matning.etapp('sortiment')
+        if data.get('sortiment'):
+            # Filtrera bort sortiment utan namn - behåll FPR-importerade namn
+            sortiment_med_namn = [s for s in data['sortiment'] if s.get('namn')]
+            sortiment_utan_namn = [s for s in data['sortiment'] if not s.get('namn')]
+            if sortiment_med_namn:
+                if upsert_data('dim_sortiment', sortiment_med_namn, ['sortiment_id']) == 0:
+                    fel.append('dim_sortiment')
+            if sortiment_utan_namn:
+                # Bara insert om sortiment saknas, skriv inte över befintliga namn
+                upsert_data('dim_sortiment', sortiment_utan_namn, ['sortiment_id'])
+
+        # Pris-matris från ProductMatrixItem (en rad per lower-threshold-kombination)
+        if data.get('sortiment_pris'):
+            batch_size = 500
+            for i in range(0, len(data['sortiment_pris']), batch_size):
+                batch = data['sortiment_pris'][i:i+batch_size]
+                upsert_data('dim_sortiment_pris', batch,
+                            ['sortiment_id', 'langd_min_cm', 'dia_min_mm'])
+
+        if data.get('tradslag'):
+            if upsert_data('dim_tradslag', data['tradslag'], ['tradslag_id']) == 0:
+                fel.append('dim_tradslag')
+
+        import_matning.etapp('detalj')
+        # Stammar, körspår och stockar (batchas, ej kritiskt att stoppa vid
+        # fel). Tre oberoende tabeller — alla batcher skickas samtidigt och
+        # anropet returnerar först när ALLA är klara, så rebuild_fakt_sortiment
+        # nedan ser hela detalj_stock.
+        detalj_jobb = []
+        if data.get('stammar'):
+            # Filtrera bort hpr_*-fält som inte finns i detalj_stam
+            hpr_keys = {'hpr_stam_nummer', 'hpr_tradslag_namn', 'hpr_antal_stockar',
+                        'hpr_total_volym', 'hpr_bio_energy_adaption', 'hpr_sortiment'}
+            clean_stammar = [{k: v for k, v in s.items() if k not in hpr_keys} for s in data['stammar']]
+            detalj_jobb.append(('detalj_stam', clean_stammar, ['maskin_id', 'stam_key']))
+
+        if data.get('gps_spar'):
+            detalj_jobb.extend(gps_skrivjobb(data['gps_spar'], ['tracking_key', 'filnamn']))
+
+        if data.get('stockar'):
+            # Composite-dedupe — HPR är kumulativa, filnamn ingår inte i logisk identitet
+            detalj_jobb.append(('detalj_stock', data['stockar'], ['maskin_id', 'stem_key', 'log_key']))
+
+        if detalj_jobb:
+            upsert_batcher_parallellt(detalj_jobb)
+
+        import_matning.etapp('cert')
+        # UPDATE objekt SET cert via PATCH (bara om cert finns)
+        if data.get('objekt_cert_updates'):
+            for objekt_id, cert in data['objekt_cert_updates']:
+                try:
+                    import urllib.parse
+                    enc = urllib.parse.quote(str(objekt_id))
+                    requests.patch(
+                        f"{SUPABASE_URL}/rest/v1/objekt?dim_objekt_id=eq.{enc}",
+                        headers={**SUPABASE_HEADERS, 'Prefer': 'return=minimal'},
+                        json={'cert': cert}, timeout=10
+                    )
+                except Exception as e:
+                    logger.warning(f"  Kunde inte uppdatera cert för {objekt_id}: {e}")
+
+        import_matning.etapp('fakt_sortiment')
+        # Sortiment-summering – KRITISK.
+        #
+        # HÄRLEDS ur detalj_stock, skrivs INTE per fil. Den gamla upserten
+        # (merge-duplicates på datum+maskin+objekt+sortiment) lät en liten
+        # inkrementfil skriva ÖVER en stor kapad fils dagssiffror istället för
+        # att läggas till dem. Mätt 2026-08-07/objekt 11217392: 459 stockar
+        # lagrade mot 2 651 verkliga. Se 20260822_rebuild_fakt_sortiment.sql.
+        #
+        # Paren tas ur data['stockar'] och inte ur sortiment_summering, för att
+        # sortiment_summering hoppar över rader vars obj_key saknas i kartan
+        # (parse_hpr_file: "if not _objekt_id: continue") — då hade objektet
+        # aldrig byggts om. Stockarna är dessutom exakt det som just skrevs.
+        if data.get('stockar'):
+            par = sorted({(s['maskin_id'], s['objekt_id']) for s in data['stockar']
+                          if s.get('maskin_id') and s.get('objekt_id')})
+            for _maskin_id, _objekt_id in par:
+                res = rebuild_fakt_sortiment(_maskin_id, _objekt_id)
+                if res is None:
+                    fel.append('fakt_sortiment')
+                elif res.get('status') == 'hoppad':
+                    # Inte ett fel: objektets stockar saknar dedupe-nyckel
+                    # (legacy före 20260507) och kan inte joinas mot stammarna.
+                    # Befintliga rader lämnas orörda — hellre gammalt än raderat.
+                    logger.warning(f"  fakt_sortiment: hoppade {_objekt_id} — "
+                                   f"inga joinbara stockar, behåller "
+                                   f"{res.get('rader_fore')} befintliga rader")
+                else:
+                    logger.info(f"  fakt_sortiment {_objekt_id}: "
+                                f"{res.get('rader_fore')} → {res.get('rader_efter')} rader, "
+                                f"{res.get('volym_fore')} → {res.get('volym_efter')} m³")
+
+        import_matning.etapp('hpr_tabeller')
+        # === HPR-filer och HPR-stammar ===
+        if data.get('stammar'):
+            _save_hpr_tables(data)
+
+        if fel:
+            logger.error(f"  ✗ Misslyckades spara till: {', '.join(fel)}")
+            return False
+
+        return True
+    except Exception as e:
+        logger.error(f"  Fel vid sparande av HPR: {e}")
+        return False
+
+@import_matning.matt('spara')
+def save_hqc_to_supabase(data: Dict) -> bool:
+    """Spara HQC-data till Supabase"""
+    try:
+        fel = []
+
+        # === Innehålls-grind: hoppa över om samma mätning redan importerats
+        #     under ett ANNAT filnamn (samma innehalls_hash). Fil-checken på
+        #     filnamn (i process_file) fångar samma-filnamn-omkörning. ===
+        kal = (data.get('kalibrering') or [{}])[0]
+        h = kal.get('innehalls_hash')
+        maskin_id = kal.get('maskin_id')
+        filnamn = data.get('filnamn')
+        if h and maskin_id:
+            url = (
+                f"{SUPABASE_URL}/rest/v1/fakt_kalibrering"
+                f"?maskin_id=eq.{quote(str(maskin_id), safe='')}"
+                f"&innehalls_hash=eq.{h}&select=filnamn&limit=1"
+            )
+            try:
+                r = requests.get(url, headers=SUPABASE_HEADERS, timeout=30)
+                if r.status_code == 200 and r.json():
+                    befintlig = r.json()[0].get('filnamn')
+                    if befintlig != filnamn:
+                        logger.info(
+                            f"  ↷ Innehåll redan importerat som '{befintlig}' "
+                            f"— hoppar över dubblett"
+                        )
+                        return True  # filen hanteras (markeras/flyttas), inga nya rader
+            except Exception as e:
+                logger.warning(f"  ⚠ Kunde inte kontrollera innehålls-hash: {e}")
+
+        # Kontroll-raden skapas BARA om filen har kontrollstockar. Tom fil
+        # (0 stockar) → ingen kontroll-rad/hash — men historiken nedan körs ändå
+        # (36 av 67 kalibreringshändelser kommer från 0-stock-filer).
+        if data.get('kalibrering') and data.get('kontroll_stockar'):
+            if upsert_data(
+                'fakt_kalibrering',
+                data['kalibrering'],
+                unique_columns=['filnamn']
+            ) == 0:
+                fel.append('fakt_kalibrering')
+        elif not data.get('kontroll_stockar'):
+            logger.info("  ↷ Tom fil (0 kontrollstockar) — ingen kontroll-rad (behåller ev. kalibreringshistorik)")
+
+        if data.get('kalibrering_historik'):
+            if upsert_data(
+                'fakt_kalibrering_historik',
+                data['kalibrering_historik'],
+                unique_columns=['datum', 'maskin_id', 'tradslag', 'typ']
+            ) == 0:
+                fel.append('fakt_kalibrering_historik')
+
+        if data.get('kontroll_stockar'):
+            if upsert_data(
+                'detalj_kontroll_stock',
+                data['kontroll_stockar'],
+                unique_columns=['filnamn', 'stam_nummer', 'stock_nummer']
+            ) == 0:
+                fel.append('detalj_kontroll_stock')
+
+        if data.get('kontroll_stammar'):
+            if upsert_data(
+                'detalj_kontroll_stam',
+                data['kontroll_stammar'],
+                unique_columns=['filnamn', 'stam_nummer']
+            ) == 0:
+                fel.append('detalj_kontroll_stam')
+
+        # Matpunkter behöver detalj_kontroll_stock.id (FK), som genereras
+        # av databasen vid INSERT. Slå upp id per (stam_nummer, stock_nummer)
+        # via REST efter stock-upserten.
+        if data.get('kontroll_matpunkter'):
+            import urllib.parse
+            filnamn = data.get('filnamn')
+            stock_id_lookup = {}
+            if filnamn:
+                enc = urllib.parse.quote(filnamn, safe='')
+                url = (
+                    f"{SUPABASE_URL}/rest/v1/detalj_kontroll_stock"
+                    f"?filnamn=eq.{enc}"
+                    f"&select=id,stam_nummer,stock_nummer"
+                )
+                try:
+                    resp = requests.get(url, headers=SUPABASE_HEADERS, timeout=30)
+                    if resp.status_code == 200:
+                        for row in resp.json():
+                            stock_id_lookup[(row['stam_nummer'], row['stock_nummer'])] = row['id']
+                    else:
+                        logger.warning(
+                            f"  ⚠ Kunde inte slå upp detalj_kontroll_stock.id: "
+                            f"{resp.status_code} {resp.text[:200]}"
+                        )
+                except Exception as e:
+                    logger.warning(f"  ⚠ Fel vid stock-id-lookup: {e}")
+
+            matpunkter_med_id = []
+            for mp in data['kontroll_matpunkter']:
+                stock_id = stock_id_lookup.get((mp['stam_nummer'], mp['stock_nummer']))
+                if stock_id is None:
+                    continue
+                matpunkter_med_id.append({
+                    'detalj_kontroll_stock_id': stock_id,
+                    'position_cm': mp['position_cm'],
+                    'diameter_maskin_mm': mp['diameter_maskin_mm'],
+                    'diameter_operator_mm': mp['diameter_operator_mm'],
+                    'klave_first_mm': mp['klave_first_mm'],
+                    'klave_second_mm': mp['klave_second_mm'],
+                })
+
+            saknade = len(data['kontroll_matpunkter']) - len(matpunkter_med_id)
+            if saknade > 0:
+                logger.warning(
+                    f"  ⚠ {saknade} matpunkter saknade detalj_kontroll_stock_id, ej sparade"
+                )
+
+            if matpunkter_med_id:
+                if upsert_data(
+                    'detalj_kontroll_stock_matpunkt',
+                    matpunkter_med_id,
+                    unique_columns=['detalj_kontroll_stock_id', 'position_cm']
+                ) == 0:
+                    fel.append('detalj_kontroll_stock_matpunkt')
+
+        if fel:
+            logger.error(f"  ✗ Misslyckades spara till: {', '.join(fel)}")
+            return False
+
+        return True
+    except Exception as e:
+        logger.error(f"  Fel vid sparande av HQC: {e}")
+        return False
+
+
+# ── fakt_lass: bara nya/ändrade lass ─────────────────────────────────────
+# FPR är kumulativ per objekt: varje ny fil bär objektets ALLA lass hittills,
+# och alla skickades om i ETT anrop per tabell — ett anrop som växte med
+# objektet tills det riskerade 30 s-timeouten (och då föll hela filen).
+# Varje lass får nu en innehålls-hash (lassets fält + dess sortimentrader,
+# utan filnamn). Lass vars (maskin, objekt, lass_nummer, datum) redan står med
+# samma hash skickas inte; resten skrivs i batcher (upsert_batcher_parallellt).
+# Ett oförändrat lass behåller alltså filnamnet från filen som först bar det.
+# Hashen täcker sortimentraderna och får därför stå först när de är sparade:
+# lassen skrivs med innehalls_hash = NULL och hashen sätts i ett andra anrop
+# (RPC fakt_lass_satt_hash, bara nyckel + hash) när fakt_lass_sortiment gått
+# igenom. Föll något ligger lasset kvar utan hash och skrivs om av nästa FPR.
+LASS_NYCKEL = ('maskin_id', 'objekt_id', 'lass_nummer', 'datum')
+
+
+def _lass_nyckel(rad: Dict) -> tuple:
+    # str(): datum är date i parsern men text från PostgREST
+    return tuple(None if rad.get(k) is None else str(rad[k]) for k in LASS_NYCKEL)
+
+
+def _lass_hash(lass: Dict, sortiment: List[Dict]) -> str:
+    innehall = {k: v for k, v in lass.items() if k not in ('filnamn', 'innehalls_hash')}
+    innehall['sortiment'] = sorted(
+        ({k: v for k, v in s.items() if k != 'filnamn'} for s in sortiment),
+        key=lambda s: str(s.get('sortiment_id')))
+    kanon = json.dumps(innehall, sort_keys=True, default=str).encode()
+    return 'b2:' + hashlib.blake2b(kanon, digest_size=16).hexdigest()
+
+
+def _lagrade_lass_hashar(lass: List[Dict]) -> Optional[Dict[tuple, str]]:
+    """LASS_NYCKEL → innehalls_hash för lagrade lass i filens maskiner/objekt.
+
+    None = kolumnen finns inte (migrationen 20261025 ej körd) → skriv som förr,
+    utan hash. Annat läsfel → {} (allt skrivs, med hash)."""
+    per_maskin = defaultdict(set)
+    for l in lass:
+        per_maskin[l['maskin_id']].add(l['objekt_id'])
+    lagrade = {}
+    try:
+        for maskin_id, objekt in per_maskin.items():
+            id_list = ','.join(f'"{o}"' for o in sorted(objekt))
+            for rad in _hamta_alla('fakt_lass', {
+                    'maskin_id': f'eq.{maskin_id}', 'objekt_id': f'in.({id_list})',
+                    'select': 'maskin_id,objekt_id,lass_nummer,datum,innehalls_hash',
+                    'order': 'id'}):
+                if rad.get('innehalls_hash'):
+                    lagrade[_lass_nyckel(rad)] = rad['innehalls_hash']
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 400 and 'innehalls_hash' in e.response.text:
+            logger.warning("  fakt_lass.innehalls_hash saknas — alla lass skrivs, utan hash")
+            return None
+        logger.warning(f"  Kunde inte läsa lagrade lass ({e}) — alla lass skrivs")
+        return {}
+    except Exception as e:
+        logger.warning(f"  Kunde inte läsa lagrade lass: {e} — alla lass skrivs")
+        return {}
+    return lagrade
+
+
+def _satt_lass_hashar(rader: List[Dict]) -> bool:
+    """Sätt innehalls_hash på redan skrivna lass (LASS_NYCKEL + hash per rad).
+    Saknas RPC:n (migrationen 20261025 delvis körd) skrivs hela raderna igen."""
+    nycklar = [{**{k: (r[k].isoformat() if hasattr(r[k], 'isoformat') else r[k]) for k in LASS_NYCKEL},
+                'innehalls_hash': r['innehalls_hash']} for r in rader]
+    for i in range(0, len(nycklar), BATCH_STORLEK):
+        try:
+            resp = requests.post(f"{SUPABASE_URL}/rest/v1/rpc/fakt_lass_satt_hash",
+                                 json={'p_rader': nycklar[i:i + BATCH_STORLEK]},
+                                 headers=SUPABASE_HEADERS, timeout=60)
+        except Exception as e:
+            logger.warning(f"  fakt_lass_satt_hash: {e}")
+            return False
+        if resp.status_code == 404:
+            logger.warning("  fakt_lass_satt_hash saknas — lassen skrivs om med hash")
+            res = upsert_batcher_parallellt([('fakt_lass', rader[i:], list(LASS_NYCKEL))])
+            return not res['fakt_lass']['fel']
+        if resp.status_code not in (200, 201):
+            logger.warning(f"  fakt_lass_satt_hash: {resp.status_code} - {resp.text[:200]}")
+            return False
+    return True
+
+
+@import_matning.matt('spara')
+def save_fpr_to_supabase(data: Dict) -> bool:
+    """Spara FPR-data till Supabase"""
+    try:
+        fel = []
+
+        if data.get('maskin'):
+            log_if_new_maskin(data['maskin'].get('maskin_id', ''), data['maskin'].get('maskin_typ', 'Okänd'))
+            if upsert_maskin(data['maskin']) == 0:
+                fel.append('dim_maskin')
+
+        if data.get('operatorer'):
+            if upsert_data('dim_operator', data['operatorer'], ['operator_id']) == 0:
+                fel.append('dim_operator')
+
+        if data.get('objekt'):
+            # Gemensam skrivpolicy — fyller luckor, skriver aldrig över
+            # mänskligt underhållna fält
+            if upsert_dim_objekt(data['objekt']) == 0:
+                fel.append('dim_objekt')
+
+        if data.get('destinationer'):
+            if upsert_data('dim_destination', data['destinationer'], ['destination_id']) == 0:
+                fel.append('dim_destination')
+
+        if data.get('sortiment'):
+            sortiment_med_namn = [s for s in data['sortiment'] if s.get('namn')]
+            if sortiment_med_namn:
+                upsert_data('dim_sortiment', sortiment_med_namn, ['sortiment_id'])
+
+        # Lass – KRITISK
+        jobb = []
+        med_hash = []   # ändrade lass med hash, skrivs när sortimentet står i DB
+        if data.get('lass'):
+            per_lass = []
+            for l in data['lass']:
+                sortiment_list = l.get('sortiment', [])
+                lass_copy = {k: v for k, v in l.items() if k != 'sortiment'}
+                # Hoppa lass utan objekt_id
+                if not lass_copy.get('objekt_id'):
+                    continue
+                egna = []
+                per_lass.append((lass_copy, egna))
+                # Bygg sortiment per lass
+                for s in sortiment_list:
+                    # (… or 0): volym_m3sub kan vara None när FPR-filen saknade
+                    # loadVolumeCategory (= okänd, inte noll). None > 0 kastar.
+                    if s.get('sortiment_id') and ((s.get('volym_m3sob') or 0) > 0 or (s.get('volym_m3sub') or 0) > 0):
+                        egna.append({
+                            'maskin_id': lass_copy['maskin_id'],
+                            'objekt_id': lass_copy['objekt_id'],
+                            'datum': lass_copy['datum'],
+                            'lass_nummer': lass_copy['lass_nummer'],
+                            'sortiment_id': s['sortiment_id'],
+                            'sortiment_namn': s.get('sortiment_namn', ''),
+                            'volym_m3sob': s.get('volym_m3sob', 0),
+                            # None bevaras — okänd volym ska stå som NULL i DB,
+                            # aldrig som 0 (vilket vore ett annat påstående).
+                            'volym_m3sub': s.get('volym_m3sub'),
+                            'filnamn': lass_copy['filnamn']
+                        })
+
+            lagrade = _lagrade_lass_hashar([lc for lc, _ in per_lass]) if per_lass else None
+            lass_data = []
+            lass_sortiment_data = []
+            for lass_copy, egna in per_lass:
+                if lagrade is not None:
+                    h = _lass_hash(lass_copy, egna)
+                    if lagrade.get(_lass_nyckel(lass_copy)) == h:
+                        continue
+                    lass_copy['innehalls_hash'] = None
+                    med_hash.append({**lass_copy, 'innehalls_hash': h})
+                lass_data.append(lass_copy)
+                lass_sortiment_data.extend(egna)
+            oforandrade = len(per_lass) - len(lass_data)
+            if oforandrade:
+                import_matning.rakna('lass_oforandrade', oforandrade)
+                logger.info(f"  Lass: {oforandrade} oförändrade hoppas över, {len(lass_data)} skrivs")
+
+            # fakt_lass först (sortimentraderna hör till lassen), sedan resten
+            if lass_data:
+                res = upsert_batcher_parallellt([('fakt_lass', lass_data, list(LASS_NYCKEL))])
+                if res['fakt_lass']['fel']:
+                    fel.append('fakt_lass')
+            if lass_sortiment_data:
+                jobb.append(('fakt_lass_sortiment', lass_sortiment_data,
+                             ['maskin_id', 'objekt_id', 'datum', 'lass_nummer', 'sortiment_id']))
+
+        if data.get('skotning_status'):
+            jobb.append(('fakt_skotning_status', data['skotning_status'],
+                         ['maskin_id', 'objekt_id', 'sortiment_id', 'start_tid']))
+        if jobb:
+            res = upsert_batcher_parallellt(jobb)
+            fel.extend(t for t, r in res.items() if r['fel'])
+
+        # Hashen sist — bara när lassen och deras sortimentrader står i DB
+        if med_hash and not {'fakt_lass', 'fakt_lass_sortiment'} & set(fel):
+            if not _satt_lass_hashar(med_hash):
+                # Ingen dataförlust — lassen står utan hash och skrivs om nästa gång
+                logger.warning("  Kunde inte sätta innehalls_hash på alla lass — skrivs om av nästa FPR")
+
+        if fel:
+            logger.error(f"  ✗ Misslyckades spara till: {', '.join(fel)}")
+            return False
+
+        return True
+    except Exception as e:
+        logger.error(f"  Fel vid sparande av FPR: {e}")
+        return False
+
+def log_if_new_maskin(maskin_id: str, maskin_typ: str):
+    """Loggar om maskinen är ny i dim_maskin."""
+    try:
+        response = requests.get(
+            f"{SUPABASE_URL}/rest/v1/dim_maskin?maskin_id=eq.{maskin_id}&select=maskin_id",
+            headers=SUPABASE_HEADERS, timeout=10
+        )
+        if response.status_code == 200 and len(response.json()) == 0:
+            logger.info(f"  ✓ Ny maskin registrerad automatiskt: {maskin_id} ({maskin_typ})")
+    except Exception:
+        pass
+
+# Beskrivande fält som admin ÄGER så snart maskinen är bekräftad. Importen får
+# aldrig skriva över dem då — maskindata skriver aldrig över mänsklig kunskap
+# (speglar arbetsdag.bekraftad-guarden + objekt-namnpolicyn). Obekräftade
+# maskiner uppdateras fortfarande fullt ut så metadatan hålls färsk tills Martin
+# bekräftar i admin. Övriga fält (aggregat, ägare, chassi …) är rent fil-ägda
+# och uppdateras alltid.
+MASKIN_ADMIN_FALT = ('tillverkare', 'modell', 'maskin_typ')
+
+def maskin_ar_bekraftad(maskin_id: str) -> bool:
+    """True om maskinen finns i dim_maskin med bekraftad = true.
+    Osäkert svar (nätfel etc.) → False = importen uppdaterar som vanligt;
+    en bekräftad maskin får då i värsta fall ett fil-värde tillbakaskrivet,
+    aldrig tvärtom (aldrig radering av mänsklig kunskap på falsk grund)."""
+    try:
+        r = requests.get(
+            f"{SUPABASE_URL}/rest/v1/dim_maskin?maskin_id=eq.{maskin_id}&select=bekraftad",
+            headers=SUPABASE_HEADERS, timeout=10
+        )
+        if r.status_code == 200:
+            rows = r.json()
+            return bool(rows) and rows[0].get('bekraftad') is True
+    except Exception:
+        pass
+    return False
+
+def upsert_maskin(maskin: dict) -> int:
+    """Upsert dim_maskin med människa-vinner-guard. Bekräftade maskiner behåller
+    sina admin-ägda fält (MASKIN_ADMIN_FALT); nya/obekräftade maskiner skapas
+    och uppdateras fullt ut (föds bekraftad = false via DB-default). Returnerar
+    antal påverkade rader (0 = fel), eller 1 om inget kvarstod att skriva."""
+    mid = maskin.get('maskin_id')
+    if not mid:
+        return upsert_data('dim_maskin', [maskin], ['maskin_id'])
+    payload = dict(maskin)
+    if maskin_ar_bekraftad(mid):
+        for f in MASKIN_ADMIN_FALT:
+            payload.pop(f, None)
+        # Bara nyckel/fil-speglingar kvar utan eget värde → inget att uppdatera.
+        if all(k in ('maskin_id', 'chassi') for k in payload):
+            return 1
+    return upsert_data('dim_maskin', [payload], ['maskin_id'])
@@ -0,0 +1,296 @@
+"""stanford_arkiv.py — komprimerat Behandlade-arkiv och EN läsväg för Stanford-filer.
+
+Behandlade/ läses om hela tiden: _keep-omskanningen i importern, gap_check,
+backfillerna, import_hpr.find_hpr_files och reimport_allt. Stanford-XML
+komprimeras 10–20×, och läsningen av stora HPR-arkiv är I/O-bunden — mindre
+på disk betyder både mindre OneDrive-synk och snabbare kalla läsningar.
+
+  ARKIV_KOMPRIMERING=av|gzip|zstd   (importerns .env; standard 'av')
+     av    filen flyttas orörd, som förut
+     gzip  Behandlade/<maskin>/<typ>/<namn>.gz    (stdlib)
+     zstd  Behandlade/<maskin>/<typ>/<namn>.zst   (kräver paketet zstandard;
+           saknas det blir det gzip)
+
+Originalnamnet är alltid arkivnamnet minus .gz/.zst, och står dessutom i
+mappens katalog (_katalog.jsonl, en rad per arkiverad fil: arkivnamn,
+originalnamn, originalstorlek, komprimering, tid). Okomprimerade och
+komprimerade filer kan blandas i samma mapp — läsarna ser ingen skillnad:
+
+  open_stanford(path)          binär filström; dekomprimerar strömmande
+                               (känner igen formatet på magiska bytes, inte
+                               på ändelsen) — ges direkt till ET.parse/iterparse
+  stanford_namn(path)          originalfilnamnet (det som står i databasen)
+  ar_stanford(namn, *ext)      ändelsetest som tål .gz/.zst
+  lista_stanford(mapp, *ext)   filerna i en mapp, alla varianter
+  hitta_stanford(rot, *ext)    rekursivt (os.walk)
+  originalstorlek(path)        okomprimerad storlek (katalog, annars gzip-trailern)
+  arkivera(src, dest, komp)    skriv (ev. komprimerat) till dest, radera src
+
+Befintligt arkiv komprimeras i efterhand med
+  python stanford_arkiv.py komprimera <Behandlade> [--zstd]
+och storleken visas med
+  python stanford_arkiv.py info <Behandlade>
+"""
+import argparse
+import gzip
+import json
+import os
+import shutil
+import struct
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import zstandard as _zstd
+except ImportError:
+    _zstd = None
+
+STANFORD_EXT = ('.mom', '.hpr', '.hqc', '.fpr')
+KOMPRESSIONS_EXT = {'gzip': '.gz', 'zstd': '.zst'}
+KATALOG_NAMN = '_katalog.jsonl'
+GZIP_NIVA = 6
+ZSTD_NIVA = 10
+_BLOCK = 1024 * 1024
+
+_GZIP_MAGI = b'\x1f\x8b'
+_ZSTD_MAGI = b'\x28\xb5\x2f\xfd'
+
+
+def arkiv_komprimering(val: Optional[str]) -> str:
+    """Normalisera inställningen till 'av' | 'gzip' | 'zstd'."""
+    val = (val or 'av').strip().lower()
+    if val in ('', '0', 'av', 'nej', 'off', 'none'):
+        return 'av'
+    if val in ('zstd', 'zst'):
+        return 'zstd' if _zstd is not None else 'gzip'
+    return 'gzip'
+
+
+def _utan_komprimering(namn: str) -> str:
+    low = namn.lower()
+    for suffix in KOMPRESSIONS_EXT.values():
+        if low.endswith(suffix):
+            return namn[:-len(suffix)]
+    return namn
+
+
+def stanford_namn(path: str) -> str:
+    """Originalfilnamnet: basename utan .gz/.zst."""
+    return _utan_komprimering(os.path.basename(path))
+
+
+def stanford_ext(path: str) -> str:
+    """'.mom' / '.hpr' / ... (gemener), oavsett komprimering."""
+    return os.path.splitext(stanford_namn(path))[1].lower()
+
+
+def ar_stanford(namn: str, *ext: str) -> bool:
+    """True om namn är en Stanford-fil med någon av ändelserna (standard: alla fyra)."""
+    return stanford_ext(namn) in (tuple(e.lower() for e in ext) or STANFORD_EXT)
+
+
+def lista_stanford(mapp: str, *ext: str) -> List[str]:
+    """Sorterade sökvägar i mapp (ej rekursivt), komprimerade som okomprimerade."""
+    try:
+        namn = os.listdir(mapp)
+    except OSError:
+        return []
+    return sorted(os.path.join(mapp, n) for n in namn if ar_stanford(n, *ext))
+
+
+def hitta_stanford(rot: str, *ext: str) -> List[str]:
+    """Som lista_stanford men rekursivt under rot."""
+    ut = []
+    for dirpath, _, filer in os.walk(rot):
+        ut.extend(os.path.join(dirpath, n) for n in filer if ar_stanford(n, *ext))
+    return sorted(ut)
+
+
+def _format(path: str) -> str:
+    with open(path, 'rb') as f:
+        magi = f.read(4)
+    if magi[:2] == _GZIP_MAGI:
+        return 'gzip'
+    if magi == _ZSTD_MAGI:
+        return 'zstd'
+    return 'av'
+
+
+def open_stanford(path: str):
+    """Öppna en Stanford-fil binärt. Komprimerade filer dekomprimeras
+    strömmande — hela filen hamnar aldrig i minnet. Används som
+    `with open_stanford(p) as f: tree = ET.parse(f)`."""
+    fmt = _format(path)
+    if fmt == 'gzip':
+        return gzip.open(path, 'rb')
+    if fmt == 'zstd':
+        if _zstd is None:
+            raise RuntimeError(f"{os.path.basename(path)} är zstd-komprimerad men "
+                               f"paketet zstandard saknas (pip install zstandard)")
+        return _zstd.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+
+# ── Katalog ──────────────────────────────────────────────────────────────
+
+_katalog_cache: Dict[str, tuple] = {}
+
+
+def las_katalog(mapp: str) -> Dict[str, dict]:
+    """{arkivnamn: post} för mappen. Cachas per mapp tills katalogfilen ändras."""
+    path = os.path.join(mapp, KATALOG_NAMN)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return {}
+    nyckel = (st.st_mtime_ns, st.st_size)
+    cachad = _katalog_cache.get(mapp)
+    if cachad and cachad[0] == nyckel:
+        return cachad[1]
+    poster = {}
+    with open(path, encoding='utf-8') as f:
+        for rad in f:
+            try:
+                post = json.loads(rad)
+            except ValueError:
+                continue   # halvskriven rad efter krasch — resten gäller
+            poster[post.get('arkivnamn')] = post
+    _katalog_cache[mapp] = (nyckel, poster)
+    return poster
+
+
+def _skriv_katalog(mapp: str, post: dict) -> None:
+    with open(os.path.join(mapp, KATALOG_NAMN), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(post, ensure_ascii=False) + '\n')
+
+
+def originalstorlek(path: str) -> int:
+    """Okomprimerad storlek. Katalogen i första hand; gzip bär storleken
+    (mod 2^32) i sina sista fyra bytes; zstd utan katalogpost ger den
+    komprimerade storleken."""
+    storlek = os.path.getsize(path)
+    if stanford_namn(path) == os.path.basename(path):
+        return storlek
+    post = las_katalog(os.path.dirname(path)).get(os.path.basename(path))
+    if post and post.get('storlek') is not None:
+        return int(post['storlek'])
+    if path.lower().endswith('.gz') and storlek >= 18:
+        with open(path, 'rb') as f:
+            f.seek(-4, os.SEEK_END)
+            return struct.unpack('<I', f.read(4))[0]
+    return storlek
+
+
+# ── Skrivning ────────────────────────────────────────────────────────────
+
+def _komprimera(src: str, dest: str, komprimering: str) -> None:
+    with open(src, 'rb') as fin, open(dest, 'wb') as fout:
+        if komprimering == 'zstd':
+            with _zstd.ZstdCompressor(level=ZSTD_NIVA).stream_writer(fout, closefd=False) as z:
+                shutil.copyfileobj(fin, z, _BLOCK)
+        else:
+            # mtime=0: samma innehåll ger samma bytes
+            with gzip.GzipFile(filename=os.path.basename(src), mode='wb', fileobj=fout,
+                               compresslevel=GZIP_NIVA, mtime=0) as z:
+                shutil.copyfileobj(fin, z, _BLOCK)
+
+
+def arkiv_dest(dest_path: str, komprimering: str) -> str:
+    """Sökvägen filen faktiskt får i arkivet för dest_path."""
+    komprimering = arkiv_komprimering(komprimering)
+    return dest_path + KOMPRESSIONS_EXT.get(komprimering, '')
+
+
+def arkivera(src: str, dest_path: str, komprimering: str = 'av') -> str:
+    """Flytta src till dest_path, komprimerad om så valts (dest_path + .gz/.zst).
+    Skrivs till .part och byts in atomiskt; src raderas först när kopian är
+    klar. mtime följer med (recency-logiken faller tillbaka på mtime).
+    Returnerar den faktiska sökvägen. Fel (t.ex. OneDrive-lås) kastas."""
+    komprimering = arkiv_komprimering(komprimering)
+    if komprimering == 'av':
+        shutil.move(src, dest_path)
+        return dest_path
+    dest = arkiv_dest(dest_path, komprimering)
+    part = dest + '.part'
+    st = os.stat(src)
+    try:
+        _komprimera(src, part, komprimering)
+        os.utime(part, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(part, dest)
+    except BaseException:
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    mapp = os.path.dirname(dest)
+    _skriv_katalog(mapp, {
+        'arkivnamn': os.path.basename(dest),
+        'originalnamn': os.path.basename(src),
+        'storlek': st.st_size,
+        'komprimerad': os.path.getsize(dest),
+        'komprimering': komprimering,
+        'arkiverad': datetime.now().isoformat(timespec='seconds'),
+    })
+    os.remove(src)
+    return dest
+
+
+# ── CLI: komprimera befintligt arkiv / visa storlek ──────────────────────
+
+def komprimera_befintliga(rot: str, komprimering: str = 'gzip', torrkorning: bool = False) -> dict:
+    """Komprimera alla okomprimerade Stanford-filer under rot på plats."""
+    stat = {'filer': 0, 'fore': 0, 'efter': 0, 'fel': 0}
+    for path in hitta_stanford(rot):
+        if stanford_namn(path) != os.path.basename(path) or _format(path) != 'av':
+            continue
+        storlek = os.path.getsize(path)
+        stat['filer'] += 1
+        stat['fore'] += storlek
+        if torrkorning:
+            continue
+        try:
+            stat['efter'] += os.path.getsize(arkivera(path, path, komprimering))
+        except OSError as e:
+            stat['fel'] += 1
+            print(f"  FEL {path}: {e}", file=sys.stderr)
+    return stat
+
+
+def arkiv_info(rot: str) -> dict:
+    per_typ: Dict[str, dict] = {}
+    for path in hitta_stanford(rot):
+        t = per_typ.setdefault(stanford_ext(path), {'filer': 0, 'komprimerade': 0,
+                                                     'disk': 0, 'original': 0})
+        t['filer'] += 1
+        t['komprimerade'] += stanford_namn(path) != os.path.basename(path)
+        t['disk'] += os.path.getsize(path)
+        t['original'] += originalstorlek(path)
+    return per_typ
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    k = sub.add_parser('komprimera', help='komprimera befintliga filer på plats')
+    k.add_argument('rot')
+    k.add_argument('--zstd', action='store_true', help='zstd i stället för gzip')
+    k.add_argument('--torr', action='store_true', help='visa bara vad som skulle göras')
+    i = sub.add_parser('info', help='storlek per filtyp, på disk och okomprimerat')
+    i.add_argument('rot')
+    args = ap.parse_args(argv)
+
+    mb = 1024 * 1024
+    if args.cmd == 'komprimera':
+        s = komprimera_befintliga(args.rot, arkiv_komprimering('zstd' if args.zstd else 'gzip'),
+                                  args.torr)
+        print(f"{s['filer']} filer, {s['fore'] / mb:.1f} MB"
+              + ('' if args.torr else f" -> {s['efter'] / mb:.1f} MB, {s['fel']} fel"))
+    else:
+        for ext, t in sorted(arkiv_info(args.rot).items()):
+            kvot = t['original'] / t['disk'] if t['disk'] else 0
+            print(f"{ext:5} {t['filer']:6} filer ({t['komprimerade']} komprimerade)  "
+                  f"{t['disk'] / mb:9.1f} MB på disk  {t['original'] / mb:9.1f} MB original  {kvot:4.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,985 @@
+"""stanford_syntet.py — seedade, syntetiska Stanford2010-filer (MOM/HPR/HQC/FPR).
+
+Det riktiga arkivet ligger under ONEDRIVE_BASE på Windows och går inte att
+köra tester eller benchmarks mot. Här tillverkas filer i samma form som
+maskinerna exporterar (docs/stanford2010/), med de egenheter importern är
+byggd för:
+
+  kumulativa filer   MOM/HPR/FPR innehåller hela objektet hittills; varje
+                     ögonblicksbild (per timme eller per dag) är en ny fil
+  pågående block     ett IndividualMachineWorkTime som pågår vid exporten
+                     skrivs med sin MonitoringStartTime och den längd det
+                     hunnit få, och ett pågående avbrott står som 'Default'
+                     tills föraren registrerat orsaken. Nästa fil har samma
+                     start med ny längd och kategori — överlappande varianter
+  skift              ShiftEndTime glider medan skiftet pågår
+  dialekt ponsse     BaseMachineManufacturerID = chassinummer, ShifKey,
+                     Coordinates + ProcessingDate i SingleTreeProcessedStem
+  dialekt rottne     numeriskt maskin-ID (importern sätter R framför), ingen
+                     ShifKey, StemCoordinates + HarvestDate på Stem-nivå,
+                     UUID som förarnamn (namnet bara i OperatorUserID)
+
+Samma frö ger byte-identiska filer med samma mtime, så benchmarkkörningar går
+att upprepa. Varje maskin har en egen slumpström (frö + maskin-ID): att lägga
+till en maskin ändrar inte de andras filer. Tider skrivs i svensk lokaltid med
+rätt offset (+01:00/+02:00) över sommartidsbytena.
+
+Storleken styrs av dagar, maskiner, stammar per objekt och hur tätt
+ögonblicksbilderna tas — HPR per timme över några veckor blir flera GB.
+Stam- och blockfragmenten byggs en gång och återanvänds i varje
+ögonblicksbild, och ett objekt i taget hålls i minnet.
+
+  python stanford_syntet.py <ut> [--seed 1] [--start 2026-05-04] [--dagar 5]
+        [--maskiner PONS20SDJAA270231,A030353,64101]
+        [--stammar-per-objekt 3000] [--mom timme|dag] [--hpr dag|timme]
+        [--layout inkommande|behandlade] [--komprimering av|gzip|zstd]
+
+--layout inkommande lägger allt platt i <ut> (som Inkommande/); behandlade
+lägger filerna i <ut>/<maskin>/<typ>/ som move_to_behandlade, komprimerade
+med stanford_arkiv om --komprimering anges. Egna maskiner skrivs
+ID:Harvester|Forwarder:ponsse|rottne i --maskiner.
+"""
+import argparse
+import hashlib
+import math
+import os
+import random
+import sys
+import uuid
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from stanford_arkiv import arkiv_komprimering, arkivera
+
+NS = 'urn:skogforsk:stanford2010'
+
+STANDARD_MASKINER = {
+    'PONS20SDJAA270231': {'typ': 'Harvester', 'dialekt': 'ponsse', 'tillverkare': 'Ponsse',
+                          'modell': 'Scorpion Giant 8W', 'modell_ar': '2020',
+                          'aggregat_tillverkare': 'Ponsse', 'aggregat': 'H7HD', 'aggregat_ar': '2020'},
+    'A030353': {'typ': 'Forwarder', 'dialekt': 'ponsse', 'tillverkare': 'Ponsse',
+                'modell': 'Wisent 2015', 'modell_ar': '2015'},
+    '64101': {'typ': 'Harvester', 'dialekt': 'rottne', 'tillverkare': 'Rottne',
+              'modell': 'H8E', 'modell_ar': '2019',
+              'aggregat_tillverkare': 'Rottne', 'aggregat': 'EGS 406', 'aggregat_ar': '2019'},
+}
+MASKINAGARE = 'Kompersmåla Skog AB'
+
+DIALEKTER = {
+    'ponsse': {'app': 'Ponsse Opti4G 4.785', 'shifkey': True, 'stam_niva': False, 'uuid_namn': False},
+    'rottne': {'app': 'Rottne D5 3.2.1', 'shifkey': False, 'stam_niva': True, 'uuid_namn': True},
+}
+
+TRADSLAG = [('1', 'Tall'), ('2', 'Gran'), ('3', 'Björk'), ('4', 'Övrigt löv')]
+
+# (ProductKey, namn, grupp, trädslag, min toppdiameter ob mm, längder cm)
+PRODUKTER = [
+    ('11', 'Tall Sågtimmer', 'Tall', '1', 140, (430, 460, 490, 520, 550)),
+    ('12', 'Tall Massaved', 'Tall', '1', 60, (300, 360, 420, 480, 540)),
+    ('21', 'Gran Sågtimmer', 'Gran', '2', 140, (430, 460, 490, 520, 550)),
+    ('22', 'Gran Massaved', 'Gran', '2', 60, (300, 360, 420, 480, 540)),
+    ('31', 'Björk Massaved', 'Björk', '3', 60, (300, 360, 420, 480, 540)),
+    ('41', 'Löv Massaved', 'Löv', '4', 60, (300, 360, 420, 480, 540)),
+]
+_PRODUKTER_PER_TRADSLAG = {
+    sp: [p for p in PRODUKTER if p[3] == sp] for sp, _ in TRADSLAG
+}
+
+AVVERKNINGSFORMER = [
+    # (kod, beskrivning, trädslagsvikter, medel-dbh mm, sekunder per stam)
+    ('10', 'Slutavverkning', (45, 45, 8, 2), 290, 55),
+    ('20', 'Gallring', (40, 40, 15, 5), 160, 32),
+]
+BOLAG = ['VIDA', 'Södra', 'Stora Enso', 'Sveaskog']
+CERTIFIERINGAR = ['FSC', 'PEFC', 'FSC/PEFC']
+MOTTAGARE = [('101', 'Vida Alvesta', '4411'), ('102', 'Södra Mönsterås', '2203'),
+             ('103', 'Stora Enso Nymölla', '3107')]
+
+FORNAMN = ['Anders', 'Johan', 'Erik', 'Lars', 'Karl', 'Per', 'Mikael', 'Joacim',
+           'Fredrik', 'Magnus', 'Anna', 'Maria', 'Sara', 'Emma', 'Linnea', 'Oskar']
+EFTERNAMN = ['Moliis', 'Andersson', 'Johansson', 'Karlsson', 'Nilsson', 'Eriksson',
+             'Larsson', 'Olsson', 'Persson', 'Svensson', 'Gustafsson', 'Pettersson',
+             'Jonsson', 'Lindberg', 'Axelsson', 'Berg']
+
+# Block i MOM: (typ, vikt, min s, max s, motor-andel, l/h, m/s)
+HARVESTER_BLOCK = [
+    ('Processing', 70, 300, 2400, 1.0, 18.0, 0.05),
+    ('Terrain travel', 12, 60, 600, 1.0, 14.0, 0.8),
+    ('Other work', 3, 300, 1200, 1.0, 9.0, 0.3),
+    ('Disturbance', 6, 60, 900, 0.3, 3.0, 0.0),
+    ('Maintenance', 4, 600, 2400, 0.2, 2.0, 0.0),
+    ('Repair', 1, 1800, 10800, 0.1, 1.0, 0.0),
+    ('OtherDown', 2, 600, 3600, 0.1, 1.0, 0.0),
+]
+_BLOCKPARAM = {b[0]: b for b in HARVESTER_BLOCK}
+_BLOCKPARAM['Break'] = ('Break', 0, 1800, 1800, 0.0, 0.0, 0.0)
+_BLOCKPARAM['Loading'] = ('Processing', 0, 900, 2400, 1.0, 12.0, 0.05)
+_BLOCKPARAM['Unloading'] = ('Processing', 0, 600, 1200, 1.0, 10.0, 0.02)
+SKOTARCYKEL = ('Terrain travel', 'Loading', 'Terrain travel', 'Unloading')
+
+MAINTENANCE_KODER = ['Daily maintenance', 'Service', 'Refuelling']
+DISTURBANCE_KODER = ['Planning', 'Communication', 'Operator break']
+REPAIR_ORSAKER = [('HarvestingHeadRepairReason', 'Hydraulics', 'Hose (pipe)'),
+                  ('HarvestingHeadRepairReason', 'Mechanical', 'Saw bar'),
+                  ('LoaderLinkageRepairReason', 'Hydraulics', 'Cylinder'),
+                  ('CarrierRepairReason', 'Electrical', 'Sensor')]
+OTHERDOWN_KODER = ['Waiting for other machine production', 'Unproductive terrain work']
+OTHER_WORK = ['Road travel', 'Preparing strip roads', 'Unspecified']
+
+GPS_INTERVALL_S = 120
+START_LAT, START_LON = 56.60, 15.05
+
+
+# ── Tid ───────────────────────────────────────────────────────────────────
+
+def _sista_sondag(ar: int, manad: int) -> date:
+    d = date(ar, manad, 31)
+    return d - timedelta(days=(d.weekday() + 1) % 7)
+
+
+def _offset_h(utc: datetime) -> int:
+    """Svensk offset mot UTC: sommartid sista söndagen i mars–oktober, 01:00 UTC."""
+    sommar = datetime.combine(_sista_sondag(utc.year, 3), time(1))
+    vinter = datetime.combine(_sista_sondag(utc.year, 10), time(1))
+    return 2 if sommar <= utc < vinter else 1
+
+
+def _lokal(utc: datetime) -> datetime:
+    return utc + timedelta(hours=_offset_h(utc))
+
+
+def _fran_lokal(lokal: datetime) -> datetime:
+    utc = lokal - timedelta(hours=2)
+    return utc if _offset_h(utc) == 2 else lokal - timedelta(hours=1)
+
+
+def _ts(utc: datetime) -> str:
+    """ISO-tid i lokaltid med offset, som maskinerna skriver den."""
+    off = _offset_h(utc)
+    return f"{(utc + timedelta(hours=off)).isoformat(timespec='seconds')}+0{off}:00"
+
+
+def _fil_jitter(seed, *delar) -> int:
+    """Exporten tar några sekunder efter timslaget — deterministiskt per fil."""
+    h = hashlib.md5('|'.join(str(d) for d in (seed,) + delar).encode()).hexdigest()
+    return 5 + int(h[:8], 16) % 46
+
+
+# ── Maskin, förare, objekt ───────────────────────────────────────────────
+
+def tolka_maskin(spec: str) -> dict:
+    """'PONS20SDJAA270231' (känd) eller 'ID:Harvester|Forwarder:ponsse|rottne'."""
+    delar = spec.strip().split(':')
+    maskin_id = delar[0]
+    if len(delar) == 1:
+        if maskin_id not in STANDARD_MASKINER:
+            raise ValueError(f"Okänd maskin {maskin_id} — ange ID:typ:dialekt")
+        m = dict(STANDARD_MASKINER[maskin_id])
+    else:
+        typ = delar[1] if len(delar) > 1 else 'Harvester'
+        dialekt = delar[2].lower() if len(delar) > 2 else 'ponsse'
+        if typ not in ('Harvester', 'Forwarder') or dialekt not in DIALEKTER:
+            raise ValueError(f"Ogiltig maskin {spec}")
+        m = {'typ': typ, 'dialekt': dialekt, 'tillverkare': dialekt.capitalize(),
+             'modell': 'H8E' if dialekt == 'rottne' else 'Scorpion',
+             'modell_ar': '2020'}
+        if typ == 'Harvester':
+            m.update({'aggregat_tillverkare': m['tillverkare'], 'aggregat': 'H7', 'aggregat_ar': '2020'})
+    m['maskin_id'] = maskin_id
+    # Filnamnet bär det normaliserade ID:t, som Behandlade-mapparna
+    m['fil_id'] = f"R{maskin_id}" if maskin_id.isdigit() else maskin_id
+    return m
+
+
+def _forare(m: dict, rng: random.Random) -> List[dict]:
+    dialekt = DIALEKTER[m['dialekt']]
+    ut = []
+    for nr in (1, 2):
+        fornamn, efternamn = rng.choice(FORNAMN), rng.choice(EFTERNAMN)
+        ut.append({'nyckel': str(nr), 'fornamn': fornamn, 'efternamn': efternamn,
+                   'uuid': str(uuid.UUID(int=rng.getrandbits(128), version=4)) if dialekt['uuid_namn'] else None})
+    return ut
+
+
+def _nytt_objekt(m: dict, rng: random.Random, nr: int, start: datetime,
+                 stammar_per_objekt: int, motor: float) -> dict:
+    form = AVVERKNINGSFORMER[0] if rng.random() < 0.7 else AVVERKNINGSFORMER[1]
+    mal = max(50, int(stammar_per_objekt * rng.uniform(0.8, 1.2)))
+    lat = START_LAT + rng.uniform(-0.3, 0.3)
+    lon = START_LON + rng.uniform(-0.5, 0.5)
+    return {
+        'nr': nr,
+        'nyckel': str(100 + nr),
+        'vo': str(rng.randint(11000000, 11999999)),
+        'namn': f"{rng.choice(FORNAMN)} {rng.choice(EFTERNAMN)}",
+        'agare': rng.choice(EFTERNAMN),
+        'form': form,
+        'cert': rng.choice(CERTIFIERINGAR),
+        'bolag': rng.choice(BOLAG),
+        'areal': round(mal / (700 if form[0] == '10' else 1400), 1),
+        'start': start,
+        'slut': start,
+        'mal_stammar': mal,
+        # skotaren kör tills volymen motsvarar ett objekt av samma storlek
+        'mal_volym': mal * (0.45 if form[0] == '10' else 0.12),
+        'lat0': lat, 'lon0': lon, 'lat': lat, 'lon': lon,
+        'alt': round(rng.uniform(60, 180), 1),
+        'block': [], 'stammar': [], 'kortstopp': [], 'delar': [], 'inlogg': [],
+        'gps': [], 'lass': [], 'volym': 0.0, 'motor_fore': motor,
+    }
+
+
+# ── Stammar och stockar ──────────────────────────────────────────────────
+
+def _flytta(obj: dict, rng: random.Random, steg: float) -> None:
+    """Slumpvandring kring objektets mittpunkt (grader)."""
+    obj['lat'] += rng.gauss(0, steg) + (obj['lat0'] - obj['lat']) * 0.01
+    obj['lon'] += rng.gauss(0, steg * 1.8) + (obj['lon0'] - obj['lon']) * 0.01
+
+
+def _koord_xml(tagg: str, lat: float, lon: float, alt: float, tid: Optional[str], indrag: str) -> str:
+    rader = [f'{indrag}<{tagg}>',
+             f'{indrag}  <Latitude latitudeCategory="North">{lat:.7f}</Latitude>',
+             f'{indrag}  <Longitude longitudeCategory="East">{lon:.7f}</Longitude>',
+             f'{indrag}  <Altitude>{alt:.1f}</Altitude>']
+    if tid:
+        rader.append(f'{indrag}  <CoordinateDate>{tid}</CoordinateDate>')
+    rader.append(f'{indrag}</{tagg}>')
+    return '\n'.join(rader)
+
+
+def _stockar(rng: random.Random, sp: str, dbh: int) -> List[dict]:
+    """Kapa stammen från roten: timmer så länge toppen räcker, sedan massa."""
+    rot_ob = dbh * 1.12
+    avsmalning = rng.uniform(8.0, 11.0)     # mm per meter
+    pos = 0
+    ut = []
+    for prod in _PRODUKTER_PER_TRADSLAG[sp]:
+        while True:
+            langd = rng.choice(prod[5])
+            topp_ob = rot_ob - avsmalning * (pos + langd) / 100
+            if topp_ob < prod[4]:
+                break
+            bas_ob = rot_ob - avsmalning * pos / 100
+            bark = 4 + 0.04 * topp_ob
+            medel_ub = (bas_ob + topp_ob) / 2 - bark
+            sub = math.pi / 4 * (medel_ub / 1000) ** 2 * langd / 100
+            ut.append({'produkt': prod[0], 'langd': langd, 'topp_ob': int(topp_ob),
+                       'topp_ub': int(topp_ob - bark), 'sub': sub, 'sob': sub * 1.12})
+            pos += langd
+    if not ut:
+        # klen stam: en massabit ändå, annars blir det ingen volym alls
+        prod = _PRODUKTER_PER_TRADSLAG[sp][-1]
+        langd = prod[5][0]
+        topp_ob = max(40, int(rot_ob - avsmalning * langd / 100))
+        sub = math.pi / 4 * ((rot_ob + topp_ob) / 2000) ** 2 * langd / 100
+        ut.append({'produkt': prod[0], 'langd': langd, 'topp_ob': topp_ob,
+                   'topp_ub': topp_ob - 4, 'sub': sub, 'sob': sub * 1.12})
+    return ut
+
+
+def _log_xml(nr: int, s: dict, orsak: str) -> str:
+    return (f'        <Log>\n'
+            f'          <LogKey>{nr}</LogKey>\n'
+            f'          <ProductKey>{s["produkt"]}</ProductKey>\n'
+            f'          <LogVolume logVolumeCategory="m3sob">{s["sob"]:.4f}</LogVolume>\n'
+            f'          <LogVolume logVolumeCategory="m3sub">{s["sub"]:.4f}</LogVolume>\n'
+            f'          <CuttingCategory>\n'
+            f'            <CuttingReason>{orsak}</CuttingReason>\n'
+            f'          </CuttingCategory>\n'
+            f'          <LogMeasurement logMeasurementCategory="Machine">\n'
+            f'            <LogLength>{s["langd"]}</LogLength>\n'
+            f'            <LogDiameter logDiameterCategory="Top ob">{s["topp_ob"]}</LogDiameter>\n'
+            f'            <LogDiameter logDiameterCategory="Top ub">{s["topp_ub"]}</LogDiameter>\n'
+            f'          </LogMeasurement>\n'
+            f'        </Log>')
+
+
+def _ny_stam(m: dict, obj: dict, rng: random.Random, stam_key: int, tid: datetime, op: str) -> dict:
+    form = obj['form']
+    sp = rng.choices([t[0] for t in TRADSLAG], weights=form[2])[0]
+    dbh = max(60, min(650, int(rng.gauss(form[3], form[3] * 0.25))))
+    _flytta(obj, rng, 0.00004)
+    stockar = _stockar(rng, sp, dbh)
+    stam = {'key': stam_key, 'tid': tid, 'sp': sp, 'dbh': dbh, 'op': op,
+            'lat': obj['lat'], 'lon': obj['lon'], 'alt': obj['alt'], 'stockar': stockar,
+            'sob': sum(s['sob'] for s in stockar), 'sub': sum(s['sub'] for s in stockar)}
+    ts = _ts(tid)
+    loggar = '\n'.join(_log_xml(i, s, 'EndOfStem' if i == len(stockar) else 'Automatic')
+                       for i, s in enumerate(stockar, 1))
+    stubbe = 'true' if sp == '2' else 'false'
+    if DIALEKTER[m['dialekt']]['stam_niva']:
+        stam['xml'] = (
+            f'    <Stem>\n'
+            f'      <StemKey>{stam_key}</StemKey>\n'
+            f'      <ObjectKey>{obj["nyckel"]}</ObjectKey>\n'
+            f'      <SpeciesGroupKey>{sp}</SpeciesGroupKey>\n'
+            f'      <OperatorKey>{op}</OperatorKey>\n'
+            f'      <HarvestDate>{ts}</HarvestDate>\n'
+            f'      <ProcessingCategory>SingleTreeProcessing</ProcessingCategory>\n'
+            f'{_koord_xml("StemCoordinates", stam["lat"], stam["lon"], stam["alt"], ts, "      ")}\n'
+            f'      <SingleTreeProcessedStem>\n'
+            f'        <DBH>{dbh}</DBH>\n'
+            f'{loggar}\n'
+            f'      </SingleTreeProcessedStem>\n'
+            f'    </Stem>\n')
+    else:
+        stam['xml'] = (
+            f'    <Stem>\n'
+            f'      <StemKey>{stam_key}</StemKey>\n'
+            f'      <ObjectKey>{obj["nyckel"]}</ObjectKey>\n'
+            f'      <SpeciesGroupKey>{sp}</SpeciesGroupKey>\n'
+            f'      <OperatorKey>{op}</OperatorKey>\n'
+            f'      <ProcessingCategory>SingleTreeProcessing</ProcessingCategory>\n'
+            f'      <StumpTreatment>{stubbe}</StumpTreatment>\n'
+            f'      <SingleTreeProcessedStem>\n'
+            f'        <DBH>{dbh}</DBH>\n'
+            f'        <ProcessingDate>{ts}</ProcessingDate>\n'
+            f'{_koord_xml("Coordinates", stam["lat"], stam["lon"], stam["alt"], None, "        ")}\n'
+            f'{loggar}\n'
+            f'      </SingleTreeProcessedStem>\n'
+            f'    </Stem>\n')
+    return stam
+
+
+# ── MOM-block ────────────────────────────────────────────────────────────
+
+def _block_xml(obj: dict, b: dict, langd: int, kategori: str, stammar: List[dict]) -> str:
+    """Ett IndividualMachineWorkTime. langd < b['langd'] = pågående block."""
+    andel = langd / b['langd'] if b['langd'] else 1.0
+    motor = int(b['motor'] * andel)
+    rader = [
+        '    <IndividualMachineWorkTime>',
+        f'      <OperatorKey>{b["op"]}</OperatorKey>',
+        f'      <ObjectKey>{obj["nyckel"]}</ObjectKey>',
+        f'      <MonitoringStartTime>{_ts(b["start"])}</MonitoringStartTime>',
+        f'      <MonitoringTimeLength>{langd}</MonitoringTimeLength>',
+        '      <OtherMachineData>',
+        f'        <EngineTime>{motor}</EngineTime>',
+        f'        <DrivenDistance>{int(b["distans"] * andel)}</DrivenDistance>',
+        f'        <FuelConsumption>{b["bransle"] * andel:.2f}</FuelConsumption>',
+    ]
+    per_sp: Dict[str, List[dict]] = {}
+    for s in stammar:
+        per_sp.setdefault(s['sp'], []).append(s)
+    for sp in sorted(per_sp):
+        grupp = per_sp[sp]
+        rader += [
+            '        <HarvesterData>',
+            f'          <SpeciesGroupKey>{sp}</SpeciesGroupKey>',
+            '          <ProcessingCategory>Single tree processing</ProcessingCategory>',
+            f'          <NumberOfHarvestedStems>{len(grupp)}</NumberOfHarvestedStems>',
+            f'          <TotalVolumeOfHarvestedLogs harvestedLogsVolumeCategory="m3sob">'
+            f'{sum(s["sob"] for s in grupp):.4f}</TotalVolumeOfHarvestedLogs>',
+            f'          <TotalVolumeOfHarvestedLogs harvestedLogsVolumeCategory="m3sub">'
+            f'{sum(s["sub"] for s in grupp):.4f}</TotalVolumeOfHarvestedLogs>',
+            '        </HarvesterData>',
+        ]
+    rader.append('      </OtherMachineData>')
+    if kategori == 'Other work':
+        rader.append(f'      <IndividualMachineRunTimeCategory otherWorkCategory="{b["kod"]}">'
+                     f'Other work</IndividualMachineRunTimeCategory>')
+    elif kategori in ('Processing', 'Terrain travel'):
+        rader.append(f'      <IndividualMachineRunTimeCategory>{kategori}</IndividualMachineRunTimeCategory>')
+    elif kategori == 'Break':
+        rader.append('      <IndividualUnutilizedTimeCategory>Break</IndividualUnutilizedTimeCategory>')
+    else:
+        rader.append('      <IndividualMachineDownTime>')
+        if kategori == 'Maintenance':
+            rader.append(f'        <Maintenance>\n          <MaintenanceStandardCode>{b["kod"]}'
+                         f'</MaintenanceStandardCode>\n        </Maintenance>')
+        elif kategori == 'Disturbance':
+            rader.append(f'        <Disturbance>\n          <DisturbanceStandardCode>{b["kod"]}'
+                         f'</DisturbanceStandardCode>\n        </Disturbance>')
+        elif kategori == 'Repair':
+            delsystem, underorsak, detalj = b['kod']
+            rader.append(f'        <Repair>\n          <{delsystem}>\n'
+                         f'            <{underorsak}>{detalj}</{underorsak}>\n'
+                         f'          </{delsystem}>\n        </Repair>')
+        else:
+            kod = b['kod'] if kategori == 'OtherDown' else 'Default'
+            rader.append(f'        <OtherMachineDownTimeCategory>\n'
+                         f'          <OtherMachineDownTimeStandardCode>{kod}</OtherMachineDownTimeStandardCode>\n'
+                         f'        </OtherMachineDownTimeCategory>')
+        rader.append('      </IndividualMachineDownTime>')
+    rader.append('    </IndividualMachineWorkTime>\n')
+    return '\n'.join(rader)
+
+
+def _block_vid(obj: dict, b: dict, cutoff: datetime) -> str:
+    """Blocket som det såg ut i en export vid cutoff."""
+    slut = b['start'] + timedelta(seconds=b['langd'])
+    if slut <= cutoff:
+        if b['xml'] is None:
+            b['xml'] = _block_xml(obj, b, b['langd'], b['typ'], b['stammar'])
+        return b['xml']
+    langd = int((cutoff - b['start']).total_seconds())
+    # Orsaken till ett pågående avbrott är inte registrerad än
+    kategori = b['typ'] if b['typ'] in ('Processing', 'Terrain travel', 'Other work', 'Break') else 'Default'
+    return _block_xml(obj, b, langd, kategori, [s for s in b['stammar'] if s['tid'] <= cutoff])
+
+
+# ── Simulering ───────────────────────────────────────────────────────────
+
+def simulera(m: dict, seed, start: date, dagar: int, stammar_per_objekt: int) -> Iterator[dict]:
+    """Kör maskinen dag för dag och ge varje objekt när det är färdigt
+    (eller när perioden tar slut). Skördare avslutar ett objekt vid
+    stamantalet, skotare vid volymen; flytten dit är en Trailer
+    transportation i det gamla objektet."""
+    rng = random.Random(f'{seed}:{m["maskin_id"]}')
+    skordare = m['typ'] == 'Harvester'
+    m['forare'] = _forare(m, rng)
+    kvallsskift = rng.random() < 0.5
+    stam_key = rng.randint(1000, 90000)
+    skift_key = rng.randint(1, 500)
+    lass_nr = 0
+    motor = rng.uniform(2000, 12000) * 3600
+    fas = 0                                  # skotarens cykel: tom, lastning, lastad, lossning
+    obj = None
+    nr = 0
+
+    for dagnr in range(dagar):
+        dag = start + timedelta(days=dagnr)
+        if dag.weekday() >= 5:
+            continue
+        skift = [(0, datetime.combine(dag, time(6)) + timedelta(minutes=rng.randint(-20, 20)),
+                  rng.randint(510, 630))]
+        if kvallsskift and rng.random() < 0.7:
+            skift.append((1, datetime.combine(dag, time(16, 30)) + timedelta(minutes=rng.randint(0, 30)),
+                          rng.randint(420, 510)))
+        for forar_idx, lokal_start, minuter in skift:
+            t = _fran_lokal(lokal_start)
+            skift_slut = t + timedelta(minutes=minuter)
+            op = m['forare'][forar_idx]['nyckel']
+            if obj is None:
+                nr += 1
+                obj = _nytt_objekt(m, rng, nr, t, stammar_per_objekt, motor)
+            obj['inlogg'].append((op, t))
+            skift_key += 1
+            obj['delar'].append({'nyckel': skift_key, 'op': op, 'start': t, 'slut': skift_slut})
+            skift_start = t
+            rast_klar = False
+
+            while (skift_slut - t).total_seconds() > 60:
+                kvar = int((skift_slut - t).total_seconds())
+                klart = (len(obj['stammar']) >= obj['mal_stammar'] if skordare
+                         else obj['volym'] >= obj['mal_volym'])
+                if klart:
+                    b = _nytt_block(rng, 'OtherDown', t, min(rng.randint(3600, 9000), kvar), op)
+                    b['kod'] = 'Trailer transportation'
+                    obj['block'].append(b)
+                    t += timedelta(seconds=b['langd'])
+                    motor += b['motor']
+                    obj['delar'][-1]['slut'] = t
+                    obj['slut'] = t
+                    yield obj
+                    nr += 1
+                    obj = _nytt_objekt(m, rng, nr, t, stammar_per_objekt, motor)
+                    skift_key += 1
+                    obj['delar'].append({'nyckel': skift_key, 'op': op, 'start': t, 'slut': skift_slut})
+                    continue
+
+                if not rast_klar and (t - skift_start).total_seconds() > 4 * 3600:
+                    typ = 'Break'
+                    rast_klar = True
+                elif skordare:
+                    typ = rng.choices([b[0] for b in HARVESTER_BLOCK],
+                                      weights=[b[1] for b in HARVESTER_BLOCK])[0]
+                elif rng.random() < 0.85:
+                    typ = SKOTARCYKEL[fas]
+                    fas = (fas + 1) % len(SKOTARCYKEL)
+                else:
+                    typ = rng.choice(['Disturbance', 'Maintenance', 'OtherDown', 'Other work'])
+                b = _nytt_block(rng, typ, t, kvar, op)
+
+                if skordare and b['typ'] == 'Processing':
+                    _skorda(m, obj, rng, b, stam_key)
+                    stam_key += len(b['stammar'])
+                elif typ == 'Unloading':
+                    lass_nr += 1
+                    _nytt_lass(obj, rng, lass_nr, b)
+                if b['typ'] in ('Processing', 'Terrain travel'):
+                    _spara_gps(obj, rng, b)
+                    if rng.random() < 0.3:
+                        kort = rng.randint(20, 300)
+                        off = rng.randint(0, max(0, b['langd'] - kort))
+                        obj['kortstopp'].append((op, b['start'] + timedelta(seconds=off), kort))
+                obj['block'].append(b)
+                t += timedelta(seconds=b['langd'])
+                motor += b['motor']
+            obj['slut'] = t
+    if obj is not None and obj['block']:
+        yield obj
+
+
+def _nytt_block(rng: random.Random, typ: str, start: datetime, kvar: int, op: str) -> dict:
+    mom_typ, _, lo, hi, motor_andel, l_per_h, m_per_s = _BLOCKPARAM[typ]
+    langd = min(rng.randint(lo, hi), kvar)
+    kod = None
+    if mom_typ == 'Maintenance':
+        kod = rng.choice(MAINTENANCE_KODER)
+    elif mom_typ == 'Disturbance':
+        kod = rng.choice(DISTURBANCE_KODER)
+    elif mom_typ == 'Repair':
+        kod = rng.choice(REPAIR_ORSAKER)
+    elif mom_typ == 'OtherDown':
+        kod = rng.choice(OTHERDOWN_KODER)
+    elif mom_typ == 'Other work':
+        kod = rng.choice(OTHER_WORK)
+    return {'typ': mom_typ, 'kod': kod, 'start': start, 'langd': langd, 'op': op,
+            'motor': int(langd * motor_andel),
+            'distans': int(langd * m_per_s * rng.uniform(0.7, 1.3)),
+            'bransle': langd / 3600 * l_per_h * rng.uniform(0.85, 1.15),
+            'stammar': [], 'xml': None}
+
+
+def _skorda(m: dict, obj: dict, rng: random.Random, b: dict, stam_key: int) -> None:
+    """Stammar jämnt fördelade med spridning över ett Processing-block. Nås
+    objektets mål kortas blocket av efter sista stammen."""
+    per_stam = obj['form'][4]
+    t = rng.uniform(0.3, 1.0) * per_stam
+    while t < b['langd'] and len(obj['stammar']) < obj['mal_stammar']:
+        stam = _ny_stam(m, obj, rng, stam_key + len(b['stammar']),
+                        b['start'] + timedelta(seconds=int(t)), b['op'])
+        b['stammar'].append(stam)
+        obj['stammar'].append(stam)
+        t += rng.uniform(0.5, 1.5) * per_stam
+    if len(obj['stammar']) >= obj['mal_stammar'] and b['stammar']:
+        ny = int((b['stammar'][-1]['tid'] - b['start']).total_seconds()) + 30
+        if ny < b['langd']:
+            andel = ny / b['langd']
+            b['langd'] = ny
+            b['motor'] = int(b['motor'] * andel)
+            b['distans'] = int(b['distans'] * andel)
+            b['bransle'] *= andel
+
+
+def _spara_gps(obj: dict, rng: random.Random, b: dict) -> None:
+    steg = 0.0002 if b['typ'] == 'Terrain travel' else 0.00005
+    for off in range(0, b['langd'], GPS_INTERVALL_S):
+        _flytta(obj, rng, steg)
+        obj['gps'].append((b['start'] + timedelta(seconds=off), obj['lat'], obj['lon'],
+                           obj['alt'] + rng.uniform(-2, 2)))
+
+
+def _nytt_lass(obj: dict, rng: random.Random, lass_nr: int, b: dict) -> None:
+    sob = rng.uniform(10.0, 19.0)
+    produkter = rng.sample([p[0] for p in PRODUKTER], rng.choice((1, 1, 2)))
+    delar = []
+    kvar = sob
+    for i, prod in enumerate(produkter):
+        v = kvar if i == len(produkter) - 1 else round(kvar * rng.uniform(0.3, 0.7), 2)
+        kvar -= v
+        delar.append((prod, v))
+    obj['volym'] += sob
+    obj['lass'].append({'nr': lass_nr, 'op': b['op'], 'lossning': b['start'] + timedelta(seconds=b['langd']),
+                        'distans': rng.randint(150, 1500), 'delar': delar})
+
+
+# ── Ögonblicksbilder ─────────────────────────────────────────────────────
+
+def ogonblick(obj: dict, lage: str) -> List[datetime]:
+    """Exporttider (UTC, före jitter) för ett objekt: varje hel timme inom
+    ett skift plus skiftslut ('timme'), eller sista skiftslut per dag ('dag').
+    Objektets sista tid är alltid med."""
+    tider = set()
+    per_dag: Dict[date, datetime] = {}
+    for d in obj['delar']:
+        slut = min(d['slut'], obj['slut']) if d is obj['delar'][-1] else d['slut']
+        if slut <= d['start']:
+            continue
+        if lage == 'timme':
+            h = d['start'].replace(minute=0, second=0) + timedelta(hours=1)
+            while h < slut:
+                tider.add(h)
+                h += timedelta(hours=1)
+            tider.add(slut)
+        dag = _lokal(slut).date()
+        per_dag[dag] = max(per_dag.get(dag, slut), slut)
+    if lage != 'timme':
+        tider.update(per_dag.values())
+    tider.add(obj['slut'])
+    return sorted(tider)
+
+
+# ── Filskrivning ─────────────────────────────────────────────────────────
+
+def _maskin_xml(m: dict, med_agare: bool = True) -> str:
+    rader = [f'    <MachineKey>{uuid.uuid5(uuid.NAMESPACE_URL, "stanford_syntet/" + m["maskin_id"])}</MachineKey>']
+    if not m.get('utan_maskin_id'):
+        rader.append(f'    <BaseMachineManufacturerID>{m["maskin_id"]}</BaseMachineManufacturerID>')
+    rader += [f'    <MachineBaseManufacturer>{m["tillverkare"]}</MachineBaseManufacturer>',
+              f'    <MachineBaseModel baseModelYear="{m["modell_ar"]}">{m["modell"]}</MachineBaseModel>']
+    if m.get('aggregat'):
+        rader += [f'    <MachineHeadManufacturer>{m["aggregat_tillverkare"]}</MachineHeadManufacturer>',
+                  f'    <MachineHeadModel headModelYear="{m["aggregat_ar"]}">{m["aggregat"]}</MachineHeadModel>']
+    if med_agare:
+        rader.append(f'    <MachineOwner>\n      <BusinessName>{MASKINAGARE}</BusinessName>\n    </MachineOwner>')
+    return '\n'.join(rader) + '\n'
+
+
+def _forare_xml(m: dict) -> str:
+    ut = []
+    for f in m['forare']:
+        namn = f"{f['fornamn']} {f['efternamn']}"
+        if f['uuid']:
+            # Rottne: UUID i namnfälten, riktiga namnet bara i OperatorUserID
+            kontakt = f'        <FirstName>{f["uuid"]}</FirstName>\n'
+            anvandare = namn
+        else:
+            epost = f"{f['fornamn']}.{f['efternamn']}@kompersmala.se".lower()
+            kontakt = (f'        <FirstName>{f["fornamn"]}</FirstName>\n'
+                       f'        <LastName>{f["efternamn"]}</LastName>\n'
+                       f'        <Email>{epost}</Email>\n')
+            anvandare = f"{f['fornamn'][0]}{f['efternamn'][0]}{f['nyckel'].zfill(2)}"
+        ut.append(f'    <OperatorDefinition>\n'
+                  f'      <OperatorKey>{f["nyckel"]}</OperatorKey>\n'
+                  f'      <OperatorUserID>{anvandare}</OperatorUserID>\n'
+                  f'      <ContactInformation>\n{kontakt}      </ContactInformation>\n'
+                  f'    </OperatorDefinition>\n')
+    return ''.join(ut)
+
+
+def _objekt_xml(obj: dict) -> str:
+    return (f'    <ObjectDefinition>\n'
+            f'      <ObjectKey>{obj["nyckel"]}</ObjectKey>\n'
+            f'      <ObjectUserID>{obj["vo"]}</ObjectUserID>\n'
+            f'      <ContractNumber>{obj["vo"]}</ContractNumber>\n'
+            f'      <ObjectName>{obj["namn"]}</ObjectName>\n'
+            f'      <LoggingForm>\n'
+            f'        <LoggingFormCode>{obj["form"][0]}</LoggingFormCode>\n'
+            f'        <LoggingFormDescription>{obj["form"][1]}</LoggingFormDescription>\n'
+            f'      </LoggingForm>\n'
+            f'      <ForestCertification>{obj["cert"]}</ForestCertification>\n'
+            f'      <StartDate>{_ts(obj["start"])}</StartDate>\n'
+            f'      <ForestOwner>\n        <LastName>{obj["agare"]}</LastName>\n      </ForestOwner>\n'
+            f'      <LoggingOrganisation>\n        <ContactInformation>\n'
+            f'          <BusinessName>{obj["bolag"]}</BusinessName>\n'
+            f'        </ContactInformation>\n      </LoggingOrganisation>\n'
+            f'      <ObjectArea>{obj["areal"]}</ObjectArea>\n'
+            f'    </ObjectDefinition>\n')
+
+
+def _tradslag_xml() -> str:
+    return ''.join(f'    <SpeciesGroupDefinition>\n'
+                   f'      <SpeciesGroupKey>{k}</SpeciesGroupKey>\n'
+                   f'      <SpeciesGroupName>{n}</SpeciesGroupName>\n'
+                   f'      <DBHHeight>130</DBHHeight>\n'
+                   f'    </SpeciesGroupDefinition>\n' for k, n in TRADSLAG)
+
+
+def _produkt_xml() -> str:
+    return ''.join(f'    <ProductDefinition>\n'
+                   f'      <ProductKey>{p[0]}</ProductKey>\n'
+                   f'      <ClassifiedProductDefinition>\n'
+                   f'        <ProductName>{p[1]}</ProductName>\n'
+                   f'        <ProductGroupName>{p[2]}</ProductGroupName>\n'
+                   f'        <SpeciesGroupKey>{p[3]}</SpeciesGroupKey>\n'
+                   f'        <Color1>{"true" if "timmer" in p[1] else "false"}</Color1>\n'
+                   f'      </ClassifiedProductDefinition>\n'
+                   f'    </ProductDefinition>\n' for p in PRODUKTER)
+
+
+def _huvud(rot: str, m: dict, cutoff: datetime, kategori: Optional[str] = None) -> str:
+    typ = f' machineCategory="{kategori}"' if kategori else ''
+    return (f'<?xml version="1.0" encoding="utf-8"?>\n'
+            f'<{rot} xmlns="{NS}" version="3.1">\n'
+            f'  <{rot}Header>\n'
+            f'    <CreationDate>{_ts(cutoff)}</CreationDate>\n'
+            f'    <ApplicationVersionCreated>{DIALEKTER[m["dialekt"]]["app"]}</ApplicationVersionCreated>\n'
+            f'  </{rot}Header>\n'
+            f'  <Machine{typ}>\n')
+
+
+def _mom_delar(m: dict, obj: dict, cutoff: datetime) -> Iterator[str]:
+    yield _huvud('OperationalMonitoring', m, cutoff, m['typ'])
+    yield _maskin_xml(m)
+    yield _forare_xml(m)
+    yield _objekt_xml(obj)
+    if m['typ'] == 'Harvester':
+        yield _tradslag_xml()
+    for b in obj['block']:
+        if b['start'] >= cutoff:
+            break
+        yield _block_vid(obj, b, cutoff)
+    for op, start, langd in obj['kortstopp']:
+        if start >= cutoff:
+            continue
+        langd = min(langd, int((cutoff - start).total_seconds()))
+        yield (f'    <IndividualShortDownTime>\n'
+               f'      <OperatorKey>{op}</OperatorKey>\n'
+               f'      <ObjectKey>{obj["nyckel"]}</ObjectKey>\n'
+               f'      <MonitoringStartTime>{_ts(start)}</MonitoringStartTime>\n'
+               f'      <MonitoringTimeLength>{langd}</MonitoringTimeLength>\n'
+               f'    </IndividualShortDownTime>\n')
+    for op, t in obj['inlogg']:
+        if t <= cutoff:
+            yield (f'    <OperatorLoginTime>\n'
+                   f'      <OperatorKey>{op}</OperatorKey>\n'
+                   f'      <MonitoringStartTime>{_ts(t)}</MonitoringStartTime>\n'
+                   f'    </OperatorLoginTime>\n')
+    rapport_slut = obj['start']
+    shifkey = DIALEKTER[m['dialekt']]['shifkey']
+    for d in obj['delar']:
+        if d['start'] > cutoff:
+            continue
+        slut = min(d['slut'], cutoff)
+        rapport_slut = max(rapport_slut, slut)
+        nyckel = f'      <ShifKey>{d["nyckel"]}</ShifKey>\n' if shifkey else ''
+        yield (f'    <OperatorShiftDefinition>\n{nyckel}'
+               f'      <OperatorKey>{d["op"]}</OperatorKey>\n'
+               f'      <ObjectKey>{obj["nyckel"]}</ObjectKey>\n'
+               f'      <ShiftStartTime>{_ts(d["start"])}</ShiftStartTime>\n'
+               f'      <ShiftEndTime>{_ts(slut)}</ShiftEndTime>\n'
+               f'    </OperatorShiftDefinition>\n')
+    motor = obj['motor_fore'] + sum(b['motor'] for b in obj['block']
+                                    if b['start'] + timedelta(seconds=b['langd']) <= cutoff)
+    yield (f'    <ReportInterval>\n'
+           f'      <ReportStartTime>{_ts(obj["start"])}</ReportStartTime>\n'
+           f'      <ReportEndTime>{_ts(rapport_slut)}</ReportEndTime>\n'
+           f'    </ReportInterval>\n'
+           f'    <MachineEngineTime>{int(motor)}</MachineEngineTime>\n'
+           f'  </Machine>\n</OperationalMonitoring>\n')
+
+
+def _hpr_delar(m: dict, obj: dict, cutoff: datetime) -> Iterator[str]:
+    yield _huvud('HarvestedProduction', m, cutoff)
+    yield _maskin_xml(m)
+    yield _forare_xml(m)
+    yield _objekt_xml(obj)
+    yield _tradslag_xml()
+    yield _produkt_xml()
+    if obj['gps']:
+        if 'gps_xml' not in obj:
+            obj['gps_xml'] = []
+        cache = obj['gps_xml']
+        for i in range(len(cache), len(obj['gps'])):
+            t, lat, lon, alt = obj['gps'][i]
+            cache.append(
+                f'      <TrackCoordinates>\n'
+                f'        <TrackingKey>{i + 1}</TrackingKey>\n'
+                f'        <ObjectKey>{obj["nyckel"]}</ObjectKey>\n'
+                f'        <Latitude>{lat:.7f}</Latitude>\n'
+                f'        <Longitude>{lon:.7f}</Longitude>\n'
+                f'        <Altitude>{alt:.1f}</Altitude>\n'
+                f'        <CoordinateDate>{_ts(t)}</CoordinateDate>\n'
+                f'      </TrackCoordinates>\n')
+        yield '    <Tracking>\n'
+        for (t, *_), rad in zip(obj['gps'], cache):
+            if t > cutoff:
+                break
+            yield rad
+        yield '    </Tracking>\n'
+    for s in obj['stammar']:
+        if s['tid'] > cutoff:
+            break
+        yield s['xml']
+    yield '  </Machine>\n</HarvestedProduction>\n'
+
+
+def _hqc_delar(m: dict, obj: dict, cutoff: datetime, stammar: List[dict], rng: random.Random) -> Iterator[str]:
+    yield _huvud('HarvestingQualityControl', m, cutoff)
+    yield _maskin_xml(m, med_agare=False)
+    yield _tradslag_xml()
+    yield '    <ControlValues>\n'
+    yield _produkt_xml()
+    yield _objekt_xml(obj)
+    matare = m['forare'][0]['fornamn']
+    klave = 53000 + int(hashlib.md5(m['maskin_id'].encode()).hexdigest()[:4], 16) % 1000
+    for s in stammar:
+        ts = _ts(s['tid'])
+        matt_ts = _ts(cutoff)
+        loggar = []
+        for i, st in enumerate(s['stockar'], 1):
+            op_langd = st['langd'] + rng.randint(-3, 3)
+            op_dia = st['topp_ob'] + rng.randint(-6, 6)
+            op_sub = st['sub'] * (op_langd / st['langd']) * (op_dia / st['topp_ob']) ** 2
+            loggar.append(
+                f'        <Log>\n'
+                f'          <LogKey>{i}</LogKey>\n'
+                f'          <ProductKey>{st["produkt"]}</ProductKey>\n'
+                f'          <LogVolume logVolumeCategory="m3sub">{st["sub"]:.4f}</LogVolume>\n'
+                f'          <LogVolume logVolumeCategory="m3sub">{op_sub:.4f}</LogVolume>\n'
+                f'          <LogMeasurement logMeasurementCategory="Machine">\n'
+                f'            <LogLength>{st["langd"]}</LogLength>\n'
+                f'            <LogDiameter logDiameterCategory="Top ob">{st["topp_ob"]}</LogDiameter>\n'
+                f'            <MeasurementDate>{ts}</MeasurementDate>\n'
+                f'          </LogMeasurement>\n'
+                f'          <LogMeasurement logMeasurementCategory="Operator">\n'
+                f'            <LogLength>{op_langd}</LogLength>\n'
+                f'            <LogDiameter logDiameterCategory="Top ob">{op_dia}</LogDiameter>\n'
+                f'            <MeasurementDate>{matt_ts}</MeasurementDate>\n'
+                f'          </LogMeasurement>\n'
+                f'        </Log>\n')
+        koord = _koord_xml('StemCoordinates', s['lat'], s['lon'], s['alt'], ts, '      ')
+        yield (f'    <Stem>\n'
+               f'      <StemKey>{s["key"]}</StemKey>\n'
+               f'      <ObjectKey>{obj["nyckel"]}</ObjectKey>\n'
+               f'      <SpeciesGroupKey>{s["sp"]}</SpeciesGroupKey>\n'
+               f'      <OperatorKey>{s["op"]}</OperatorKey>\n'
+               f'      <HarvestDate>{ts}</HarvestDate>\n'
+               f'      <ProcessingCategory>SingleTreeProcessing</ProcessingCategory>\n'
+               f'{koord}\n'
+               f'      <ControlMeasurementDefinition logMeasurementCategory="Operator">\n'
+               f'        <Measurer>\n          <FirstName>{matare}</FirstName>\n        </Measurer>\n'
+               f'        <CaliperID>{klave}</CaliperID>\n'
+               f'      </ControlMeasurementDefinition>\n'
+               f'      <ControlStemInfo>\n'
+               f'        <RandomControlStemRejectedReason>Not rejected</RandomControlStemRejectedReason>\n'
+               f'        <RandomControlStemMeasurementMode>Both diameters and lengths registered'
+               f'</RandomControlStemMeasurementMode>\n'
+               f'        <RandomControlStemSelection>Random by control system</RandomControlStemSelection>\n'
+               f'      </ControlStemInfo>\n'
+               f'      <SingleTreeProcessedStem>\n'
+               f'        <DBH>{s["dbh"]}</DBH>\n'
+               f'{"".join(loggar)}'
+               f'      </SingleTreeProcessedStem>\n'
+               f'    </Stem>\n')
+    yield '    </ControlValues>\n  </Machine>\n</HarvestingQualityControl>\n'
+
+
+def _fpr_delar(m: dict, obj: dict, cutoff: datetime) -> Iterator[str]:
+    yield _huvud('ForwardedProduction', m, cutoff)
+    yield _maskin_xml(m, med_agare=False)
+    yield _tradslag_xml()
+    yield _produkt_xml()
+    yield _objekt_xml(obj)
+    plats = f'{obj["nyckel"]}1'
+    yield (f'    <LocationDefinition>\n'
+           f'      <LocationKey>{plats}</LocationKey>\n'
+           f'      <ObjectKey>{obj["nyckel"]}</ObjectKey>\n'
+           f'      <LocationName>Avlägg {obj["namn"]}</LocationName>\n'
+           f'      <LocationCoordinates>\n'
+           f'        <Latitude>{obj["lat0"]:.7f}</Latitude>\n'
+           f'        <Longitude>{obj["lon0"]:.7f}</Longitude>\n'
+           f'      </LocationCoordinates>\n'
+           f'    </LocationDefinition>\n')
+    for i, p in enumerate(PRODUKTER):
+        dest_key, dest_namn, dest_id = MOTTAGARE[i % len(MOTTAGARE)]
+        yield (f'    <DeliveryDefinition>\n'
+               f'      <DeliveryKey>{p[0]}0</DeliveryKey>\n'
+               f'      <ProductKey>{p[0]}</ProductKey>\n'
+               f'      <DeliveryDestination>\n'
+               f'        <DestinationKey>{dest_key}</DestinationKey>\n'
+               f'        <DestinationName>{dest_namn}</DestinationName>\n'
+               f'        <DestinationUserID>{dest_id}</DestinationUserID>\n'
+               f'      </DeliveryDestination>\n'
+               f'    </DeliveryDefinition>\n')
+    yield _forare_xml(m)
+    for lass in obj['lass']:
+        if lass['lossning'] > cutoff:
+            break
+        if 'xml' not in lass:
+            delar = ''.join(
+                f'      <PartialLoad>\n'
+                f'        <PartialLoadKey>{lass["nr"] * 10 + j}</PartialLoadKey>\n'
+                f'        <DeliveryKey>{prod}0</DeliveryKey>\n'
+                f'        <LocationKey>{plats}</LocationKey>\n'
+                f'        <LoadVolume loadVolumeCategory="Volume, m3sob">{v:.2f}</LoadVolume>\n'
+                f'        <LoadVolume loadVolumeCategory="Volume, m3sub">{v * 0.89:.2f}</LoadVolume>\n'
+                f'      </PartialLoad>\n' for j, (prod, v) in enumerate(lass['delar'], 1))
+            lass['xml'] = (f'    <Load>\n'
+                           f'      <LoadKey>{lass["nr"]}</LoadKey>\n'
+                           f'      <OperatorKey>{lass["op"]}</OperatorKey>\n'
+                           f'      <LoadNumber>{lass["nr"]}</LoadNumber>\n'
+                           f'      <DistanceFromLastUnloading>{lass["distans"]}</DistanceFromLastUnloading>\n'
+                           f'      <UnloadingTime>{_ts(lass["lossning"])}</UnloadingTime>\n'
+                           f'{delar}'
+                           f'    </Load>\n')
+        yield lass['xml']
+    yield '  </Machine>\n</ForwardedProduction>\n'
+
+
+_UNDERMAPP = {'.mom': 'mom', '.hpr': 'HPR', '.hqc': 'HQC', '.fpr': 'FPR'}
+
+
+def _skriv(ut: str, layout: str, komprimering: str, m: dict, obj: dict, ext: str,
+           cutoff: datetime, delar: Iterator[str]) -> int:
+    namn = f"{obj['namn']}_{m['fil_id']}_{_lokal(cutoff).strftime('%Y%m%d%H%M%S')}{ext}"
+    mapp = ut if layout == 'inkommande' else os.path.join(ut, m['fil_id'], _UNDERMAPP[ext])
+    os.makedirs(mapp, exist_ok=True)
+    path = os.path.join(mapp, namn)
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.writelines(delar)
+    storlek = os.path.getsize(path)
+    mtime = (cutoff - datetime(1970, 1, 1)).total_seconds()
+    os.utime(path, (mtime, mtime))
+    if layout == 'behandlade' and komprimering != 'av':
+        arkivera(path, path, komprimering)
+    return storlek
+
+
+def generera(ut: str, maskiner: List[dict], seed=1, start: date = date(2026, 5, 4), dagar: int = 5,
+             stammar_per_objekt: int = 3000, mom: str = 'timme', hpr: str = 'dag',
+             layout: str = 'inkommande', komprimering: str = 'av') -> Dict[str, dict]:
+    """Skriv hela korpusen. Returnerar {filtyp: {'filer', 'bytes'}} (okomprimerat)."""
+    komprimering = arkiv_komprimering(komprimering)
+    stat = {t: {'filer': 0, 'bytes': 0} for t in ('MOM', 'HPR', 'HQC', 'FPR')}
+
+    def bokfor(typ, storlek):
+        stat[typ]['filer'] += 1
+        stat[typ]['bytes'] += storlek
+
+    for m in maskiner:
+        for obj in simulera(m, seed, start, dagar, stammar_per_objekt):
+            for t in ogonblick(obj, mom):
+                cutoff = t + timedelta(seconds=_fil_jitter(seed, m['maskin_id'], 'mom', t))
+                bokfor('MOM', _skriv(ut, layout, komprimering, m, obj, '.mom', cutoff,
+                                     _mom_delar(m, obj, cutoff)))
+            if m['typ'] == 'Harvester':
+                for t in ogonblick(obj, hpr):
+                    cutoff = t + timedelta(seconds=_fil_jitter(seed, m['maskin_id'], 'hpr', t))
+                    bokfor('HPR', _skriv(ut, layout, komprimering, m, obj, '.hpr', cutoff,
+                                         _hpr_delar(m, obj, cutoff)))
+                for t in ogonblick(obj, 'dag'):
+                    dag = _lokal(t).date()
+                    dagens = [s for s in obj['stammar'] if _lokal(s['tid']).date() == dag]
+                    if not dagens:
+                        continue
+                    rng = random.Random(f'{seed}:{m["maskin_id"]}:hqc:{dag}')
+                    kontroll = sorted(rng.sample(dagens, min(2, len(dagens))), key=lambda s: s['tid'])
+                    cutoff = t + timedelta(seconds=_fil_jitter(seed, m['maskin_id'], 'hqc', t))
+                    bokfor('HQC', _skriv(ut, layout, komprimering, m, obj, '.hqc', cutoff,
+                                         _hqc_delar(m, obj, cutoff, kontroll, rng)))
+            else:
+                for t in ogonblick(obj, 'dag'):
+                    if not any(lass['lossning'] <= t for lass in obj['lass']):
+                        continue
+                    cutoff = t + timedelta(seconds=_fil_jitter(seed, m['maskin_id'], 'fpr', t))
+                    bokfor('FPR', _skriv(ut, layout, komprimering, m, obj, '.fpr', cutoff,
+                                         _fpr_delar(m, obj, cutoff)))
+    return stat
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Seedade syntetiska Stanford2010-filer (MOM/HPR/HQC/FPR)')
+    p.add_argument('ut', help='Målmapp')
+    p.add_argument('--seed', default='1')
+    p.add_argument('--start', default='2026-05-04', help='Första dag (YYYY-MM-DD, lokaltid)')
+    p.add_argument('--dagar', type=int, default=5)
+    p.add_argument('--maskiner', default=','.join(STANDARD_MASKINER),
+                   help='Kommaseparerat: känt ID eller ID:Harvester|Forwarder:ponsse|rottne')
+    p.add_argument('--stammar-per-objekt', type=int, default=3000)
+    p.add_argument('--mom', choices=('timme', 'dag'), default='timme')
+    p.add_argument('--hpr', choices=('dag', 'timme'), default='dag')
+    p.add_argument('--layout', choices=('inkommande', 'behandlade'), default='inkommande')
+    p.add_argument('--komprimering', choices=('av', 'gzip', 'zstd'), default='av')
+    a = p.parse_args(argv)
+
+    try:
+        maskiner = [tolka_maskin(s) for s in a.maskiner.split(',') if s.strip()]
+    except ValueError as e:
+        p.error(str(e))
+    stat = generera(a.ut, maskiner, seed=a.seed, start=date.fromisoformat(a.start), dagar=a.dagar,
+                    stammar_per_objekt=a.stammar_per_objekt, mom=a.mom, hpr=a.hpr,
+                    layout=a.layout, komprimering=a.komprimering)
+    totalt = 0
+    for typ, s in stat.items():
+        totalt += s['bytes']
+        print(f"{typ}: {s['filer']:6d} filer  {s['bytes'] / 1e6:10.1f} MB")
+    print(f"Totalt {sum(s['filer'] for s in stat.values())} filer, {totalt / 1e6:.1f} MB okomprimerat -> {a.ut}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
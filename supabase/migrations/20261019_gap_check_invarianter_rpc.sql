@@ -0,0 +1,101 @@
+-- gap_check-invarianterna som aggregatfrågor i databasen.
+--
+-- ─────────────────────────────────────────────────────────────────────────
+-- VARFÖR
+-- ─────────────────────────────────────────────────────────────────────────
+-- gap_check.check_invarianter laddade ner HELA fakt_tid vid varje körning
+-- för att räkna fyra saker som alla är en GROUP BY eller ett WHERE. Överföringen
+-- växer med historiken (O(historik) per vecka) — trots att svaret nästan
+-- alltid är "inga brott". Här räknas de i databasen och BARA brotten skickas.
+--
+-- Semantiken är EXAKT gap_check.py:s (HÅLL I SYNK):
+--   gap_inv_motortid            (a) SUM(engine_time_sek) per (maskin, datum) > gräns
+--   gap_inv_dubbletter          (b) >=2 rader samma (datum, maskin, objekt) med
+--                                   identiska (proc, terr, engine, bränsle), P+T+E > 0
+--   gap_inv_tomgang             (c) antal rader där tomgang_sek avviker >1 s från
+--                                   max(0, engine − (P + T + OW − kort_stopp))
+--   gap_inv_other_work_kategorier   registry-invarianten: returnerar KANDIDAT-
+--                                   rader (en övermängd) — Python-funktionen i
+--                                   FYSIK_INVARIANTER avgör och formulerar larmet,
+--                                   så registryts regel finns på ETT ställe.
+--
+-- Ny registry-invariant: skriv Python-funktionen som förut, och lägg (om den
+-- ska kunna köras server-side) en gap_inv_<namn>() här som returnerar samma
+-- kolumner som funktionen läser, filtrerat till kandidater.
+--
+-- READ-ONLY (STABLE). Bara service_role (gap_check) ska anropa.
+
+CREATE OR REPLACE FUNCTION gap_inv_motortid(p_max_sek numeric DEFAULT 86400)
+RETURNS TABLE (maskin_id text, datum text, engine_sek numeric)
+LANGUAGE sql STABLE AS $fn$
+  SELECT t.maskin_id, t.datum::text, SUM(COALESCE(t.engine_time_sek, 0))::numeric
+  FROM fakt_tid t
+  GROUP BY t.maskin_id, t.datum
+  HAVING SUM(COALESCE(t.engine_time_sek, 0)) > p_max_sek
+  ORDER BY 1, 2
+$fn$;
+
+CREATE OR REPLACE FUNCTION gap_inv_dubbletter()
+RETURNS TABLE (datum text, maskin_id text, objekt_id text, operatorer text[], engine_sek numeric)
+LANGUAGE sql STABLE AS $fn$
+  SELECT t.datum::text, t.maskin_id, t.objekt_id,
+         array_agg(t.operator_id ORDER BY t.id),
+         MAX(COALESCE(t.engine_time_sek, 0))::numeric
+  FROM fakt_tid t
+  WHERE COALESCE(t.processing_sek, 0) + COALESCE(t.terrain_sek, 0)
+        + COALESCE(t.engine_time_sek, 0) > 0
+  GROUP BY t.datum, t.maskin_id, t.objekt_id,
+           COALESCE(t.processing_sek, 0), COALESCE(t.terrain_sek, 0),
+           COALESCE(t.engine_time_sek, 0), COALESCE(t.bransle_liter, 0)
+  HAVING COUNT(*) > 1
+  ORDER BY 1, 2, 3
+$fn$;
+
+CREATE OR REPLACE FUNCTION gap_inv_tomgang()
+RETURNS TABLE (rader bigint, inkonsistenta bigint)
+LANGUAGE sql STABLE AS $fn$
+  SELECT COUNT(*),
+         COUNT(*) FILTER (WHERE abs(
+           COALESCE(t.tomgang_sek, 0)
+           - GREATEST(0, COALESCE(t.engine_time_sek, 0)
+                         - (COALESCE(t.processing_sek, 0) + COALESCE(t.terrain_sek, 0)
+                            + COALESCE(t.other_work_sek, 0) - COALESCE(t.kort_stopp_sek, 0)))
+         ) > 1)
+  FROM fakt_tid t
+$fn$;
+
+-- Kandidater: icke-tomma kategorier där något värde inte är ett jsonb-tal
+-- ELLER talsumman avviker från other_work_sek. Strängtal ("120") kommer med
+-- som kandidater — Python-funktionen accepterar dem om summan stämmer.
+CREATE OR REPLACE FUNCTION gap_inv_other_work_kategorier()
+RETURNS TABLE (maskin_id text, datum text, objekt_id text, operator_id text,
+               other_work_sek numeric, other_work_kategorier jsonb)
+LANGUAGE sql STABLE AS $fn$
+  SELECT t.maskin_id, t.datum::text, t.objekt_id, t.operator_id,
+         t.other_work_sek::numeric, t.other_work_kategorier
+  FROM fakt_tid t
+  WHERE t.other_work_kategorier IS NOT NULL
+    AND t.other_work_kategorier <> '{}'::jsonb
+    AND (
+      EXISTS (SELECT 1 FROM jsonb_each(t.other_work_kategorier) k
+              WHERE jsonb_typeof(k.value) <> 'number')
+      OR COALESCE((SELECT SUM(k.value::text::numeric)
+                   FROM jsonb_each(t.other_work_kategorier) k
+                   WHERE jsonb_typeof(k.value) = 'number'), 0)
+         <> COALESCE(t.other_work_sek, 0)
+    )
+  ORDER BY 1, 2
+$fn$;
+
+REVOKE ALL ON FUNCTION gap_inv_motortid(numeric) FROM PUBLIC;
+REVOKE ALL ON FUNCTION gap_inv_motortid(numeric) FROM anon, authenticated;
+REVOKE ALL ON FUNCTION gap_inv_dubbletter() FROM PUBLIC;
+REVOKE ALL ON FUNCTION gap_inv_dubbletter() FROM anon, authenticated;
+REVOKE ALL ON FUNCTION gap_inv_tomgang() FROM PUBLIC;
+REVOKE ALL ON FUNCTION gap_inv_tomgang() FROM anon, authenticated;
+REVOKE ALL ON FUNCTION gap_inv_other_work_kategorier() FROM PUBLIC;
+REVOKE ALL ON FUNCTION gap_inv_other_work_kategorier() FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION gap_inv_motortid(numeric) TO service_role;
+GRANT EXECUTE ON FUNCTION gap_inv_dubbletter() TO service_role;
+GRANT EXECUTE ON FUNCTION gap_inv_tomgang() TO service_role;
+GRANT EXECUTE ON FUNCTION gap_inv_other_work_kategorier() TO service_role;
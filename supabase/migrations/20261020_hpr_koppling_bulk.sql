@@ -0,0 +1,60 @@
+-- Bulk-RPC:er för scripts/link-hpr-data.py.
+--
+-- Koordinatmatchningen av namnlösa HPR-filer gjorde en GET per fil för att få
+-- EN stams koordinat (den första som råkade komma), och main PATCH:ade sedan
+-- varje hpr_filer-rad för sig — 2N rundresor, och en enda felplacerad stam
+-- räckte för att koppla filen till fel objekt.
+--
+--   hpr_fil_centroider(p_fil_ids)  median-lat/lng + bbox + antal stammar per
+--                                  fil i ETT anrop. Median i stället för medel
+--                                  så att enstaka GPS-hopp inte flyttar punkten.
+--   hpr_filer_koppla(p_rader)      sätter maskin_id/objekt_id för många rader
+--                                  i ETT anrop. NULL i en rad = lämna kolumnen.
+--
+-- Typoberoende: id/maskin_id/objekt_id läses via jsonb_populate_record mot
+-- hpr_filer:s egen radtyp, så funktionerna följer tabellens kolumntyper.
+-- p_fil_ids tas emot som text (skriptet skickar strängar) och kastas till
+-- uuid[] — en kast av kolumnen (hpr_fil_id::text) skulle skanna hela
+-- hpr_stammar vid varje anrop.
+--
+-- Bara service_role (skriptet) ska anropa.
+
+CREATE OR REPLACE FUNCTION hpr_fil_centroider(p_fil_ids text[])
+RETURNS TABLE (hpr_fil_id text, lat double precision, lng double precision,
+               lat_min double precision, lat_max double precision,
+               lng_min double precision, lng_max double precision, stammar bigint)
+LANGUAGE sql STABLE AS $fn$
+  SELECT h.hpr_fil_id::text,
+         percentile_cont(0.5) WITHIN GROUP (ORDER BY h.lat),
+         percentile_cont(0.5) WITHIN GROUP (ORDER BY h.lng),
+         MIN(h.lat), MAX(h.lat), MIN(h.lng), MAX(h.lng),
+         COUNT(*)
+  FROM hpr_stammar h
+  WHERE h.hpr_fil_id = ANY(p_fil_ids::uuid[])   -- kasta parametern, inte kolumnen: indexet på hpr_fil_id används
+    AND h.lat IS NOT NULL AND h.lng IS NOT NULL
+  GROUP BY h.hpr_fil_id
+$fn$;
+
+CREATE OR REPLACE FUNCTION hpr_filer_koppla(p_rader jsonb)
+RETURNS integer
+LANGUAGE plpgsql AS $fn$
+DECLARE
+  n integer;
+BEGIN
+  UPDATE hpr_filer f
+  SET maskin_id = COALESCE((r.rad).maskin_id, f.maskin_id),
+      objekt_id = COALESCE((r.rad).objekt_id, f.objekt_id)
+  FROM (SELECT jsonb_populate_record(NULL::hpr_filer, e) AS rad
+        FROM jsonb_array_elements(p_rader) e) r
+  WHERE f.id = (r.rad).id;
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END
+$fn$;
+
+REVOKE ALL ON FUNCTION hpr_fil_centroider(text[]) FROM PUBLIC;
+REVOKE ALL ON FUNCTION hpr_fil_centroider(text[]) FROM anon, authenticated;
+REVOKE ALL ON FUNCTION hpr_filer_koppla(jsonb) FROM PUBLIC;
+REVOKE ALL ON FUNCTION hpr_filer_koppla(jsonb) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION hpr_fil_centroider(text[]) TO service_role;
+GRANT EXECUTE ON FUNCTION hpr_filer_koppla(jsonb) TO service_role;
@@ -0,0 +1,40 @@
+-- detalj_gps_segment — körspår som förenklade, polyline-kodade segment.
+-- Skrivs av importern när GPS_LAGRING=segment (se gps_forenkling.py), i
+-- stället för en rad per punkt i detalj_gps_spar.
+--
+-- Ett segment = en (maskin, objekt, fil) utan glapp > 10 min, förenklat med
+-- tidssynkroniserad Douglas–Peucker (tolerans GPS_TOLERANS_M, 5 m).
+--   polyline  (lat, lng), 5 decimaler, Googles polyline-format
+--             (läses t.ex. med @mapbox/polyline)
+--   tider     sekunder från start_tid per punkt, polyline-kodade med 0
+--             decimaler; tom sträng om filen saknade CoordinateDate
+--   antal_raa punkter i filen före förenkling (uppföljning av kvoten)
+--
+-- Nyckel (filnamn, maskin_id, segment_nr) — samma filbundna identitet som
+-- detalj_gps_spar (tracking_key, filnamn), så omimport av samma fil skriver
+-- över i stället för att duplicera. Råpunkterna finns kvar i arkivfilen.
+
+CREATE TABLE IF NOT EXISTS detalj_gps_segment (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  maskin_id text NOT NULL,
+  objekt_id text,
+  filnamn text NOT NULL,
+  segment_nr integer NOT NULL,
+  start_tid timestamp,
+  slut_tid timestamp,
+  antal_punkter integer NOT NULL,
+  antal_raa integer NOT NULL,
+  polyline text NOT NULL,
+  tider text NOT NULL DEFAULT '',
+  skapad timestamptz NOT NULL DEFAULT now(),
+  UNIQUE (filnamn, maskin_id, segment_nr)
+);
+
+CREATE INDEX IF NOT EXISTS detalj_gps_segment_objekt_idx
+  ON detalj_gps_segment (maskin_id, objekt_id, start_tid);
+
+-- RLS som övriga detalj-tabeller: inloggade läser, bara service role skriver.
+ALTER TABLE detalj_gps_segment ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS detalj_gps_segment_select ON detalj_gps_segment;
+CREATE POLICY detalj_gps_segment_select ON detalj_gps_segment
+  FOR SELECT TO authenticated USING (true);
@@ -0,0 +1,97 @@
+-- hpr_stam_kluster — förberäknad klusterpyramid över hpr_stammar per HPR-fil.
+--
+-- Kartan (SkordarKarta) hämtade VARJE stam för ett objekt, 1000 rader per
+-- anrop — 4 000+ stammar = fem rundresor och tusentals prickar som ändå
+-- överlappar på skärmen. Här aggregeras stammarna en gång per import till
+-- rutnätsceller per zoomnivå; kartan hämtar cellerna för sin nivå.
+--
+-- Cellerna är web-mercator-tiles på nivå zoom+2, dvs 4×4 celler per kartplatta
+-- (64 px på skärmen vid den zoomen). Vid Kompersmåla (56,6°N):
+--   zoom 12 ≈ 1,3 km   zoom 15 ≈ 170 m   zoom 17 ≈ 42 m   zoom 19 ≈ 10 m
+--
+-- Per cell: antal stammar, summerad volym, medel-dbh (av stammar med dbh),
+-- stammarnas tyngdpunkt (där pricken ritas) och trädslagsfördelning
+-- {tradslag: antal}.
+--
+-- Vilka nivåer: p_min_zoom..p_max_zoom. Standard är bara zoom 19 — den enda
+-- nivå SkordarKarta läser (KLUSTER_ZOOM). Grövre nivåer byggs med lägre
+-- p_min_zoom när kartan börjar hämta cellerna för sin aktuella zoom.
+--
+-- Kostnad: stammar × nivåer rader i c, två hash-aggregeringar (per cell och
+-- per cell+trädslag) och en join — linjärt i antal stammar, inte per cell.
+--
+-- INKREMENTELLT per snapshot: importen anropar rebuild_hpr_stam_kluster för
+-- den fil den just skrev. Ersätts ett snapshot raderas den gamla hpr_filer-
+-- raden, och dess celler försvinner med den (FK ON DELETE CASCADE, och
+-- importerna raderar dem även explicit, som hpr_stammar). Inga andra filer rörs.
+
+CREATE TABLE IF NOT EXISTS hpr_stam_kluster (
+  hpr_fil_id uuid NOT NULL REFERENCES hpr_filer(id) ON DELETE CASCADE,
+  zoom smallint NOT NULL,
+  cx integer NOT NULL,
+  cy integer NOT NULL,
+  antal integer NOT NULL,
+  volym numeric,
+  dbh_medel numeric,
+  lat double precision NOT NULL,
+  lng double precision NOT NULL,
+  tradslag jsonb NOT NULL DEFAULT '{}'::jsonb,
+  PRIMARY KEY (hpr_fil_id, zoom, cx, cy)
+);
+
+ALTER TABLE hpr_stam_kluster ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS hpr_stam_kluster_select ON hpr_stam_kluster;
+CREATE POLICY hpr_stam_kluster_select ON hpr_stam_kluster
+  FOR SELECT TO authenticated USING (true);
+
+CREATE OR REPLACE FUNCTION rebuild_hpr_stam_kluster(
+  p_hpr_fil_id uuid, p_min_zoom integer DEFAULT 19, p_max_zoom integer DEFAULT 19)
+RETURNS integer
+LANGUAGE plpgsql AS $fn$
+DECLARE
+  n integer;
+BEGIN
+  DELETE FROM hpr_stam_kluster WHERE hpr_fil_id = p_hpr_fil_id;
+
+  WITH s AS (
+    SELECT h.lat, h.lng, h.total_volym, h.dbh, COALESCE(h.tradslag, '?') AS tradslag,
+           (h.lng + 180.0) / 360.0 AS mx,
+           (1.0 - ln(tan(radians(h.lat)) + 1.0 / cos(radians(h.lat))) / pi()) / 2.0 AS my
+    FROM hpr_stammar h
+    WHERE h.hpr_fil_id = p_hpr_fil_id
+      AND h.lat IS NOT NULL AND h.lng IS NOT NULL
+  ),
+  c AS (
+    SELECT z.zoom, floor(s.mx * (2 ^ (z.zoom + 2)))::integer AS cx,
+           floor(s.my * (2 ^ (z.zoom + 2)))::integer AS cy, s.*
+    FROM s CROSS JOIN generate_series(p_min_zoom, p_max_zoom) AS z(zoom)
+  ),
+  per_tradslag AS (
+    SELECT zoom, cx, cy, tradslag, COUNT(*) AS antal
+    FROM c GROUP BY zoom, cx, cy, tradslag
+  ),
+  tradslag_per_cell AS (
+    SELECT zoom, cx, cy, jsonb_object_agg(tradslag, antal) AS tradslag
+    FROM per_tradslag GROUP BY zoom, cx, cy
+  ),
+  cell AS (
+    SELECT zoom, cx, cy, COUNT(*)::integer AS antal, SUM(total_volym) AS volym,
+           AVG(dbh) AS dbh_medel, AVG(lat) AS lat, AVG(lng) AS lng
+    FROM c GROUP BY zoom, cx, cy
+  )
+  INSERT INTO hpr_stam_kluster (hpr_fil_id, zoom, cx, cy, antal, volym, dbh_medel, lat, lng, tradslag)
+  SELECT p_hpr_fil_id, k.zoom, k.cx, k.cy, k.antal, k.volym, k.dbh_medel, k.lat, k.lng, t.tradslag
+  FROM cell k
+  JOIN tradslag_per_cell t ON t.zoom = k.zoom AND t.cx = k.cx AND t.cy = k.cy;
+
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END
+$fn$;
+
+REVOKE ALL ON FUNCTION rebuild_hpr_stam_kluster(uuid, integer, integer) FROM PUBLIC;
+REVOKE ALL ON FUNCTION rebuild_hpr_stam_kluster(uuid, integer, integer) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION rebuild_hpr_stam_kluster(uuid, integer, integer) TO service_role;
+
+-- Engångsfyllning för befintliga filer
+SELECT rebuild_hpr_stam_kluster(f.id) FROM hpr_filer f;
@@ -0,0 +1,16 @@
+-- meta_importerade_filer.innehalls_hash — innehållsdedup vid intag.
+--
+-- Filnamnskollen släpper igenom när OneDrive levererar OFÖRÄNDRAT innehåll
+-- under nytt namn; filen parsas och skrivs då om i sin helhet. Importern
+-- (process_file) hashar nu varje fil en gång vid intag och hoppar över
+-- innehåll som redan står här med status OK.
+--
+-- Värdet bär algoritmen som prefix ('xxh3:<hex>' / 'b2:<hex>'), se
+-- skogsmaskin_import_version_6.get_file_hash. Äldre rader är NULL och
+-- matchar aldrig — de fylls på allteftersom filer importeras.
+
+ALTER TABLE meta_importerade_filer ADD COLUMN IF NOT EXISTS innehalls_hash text;
+
+CREATE INDEX IF NOT EXISTS meta_importerade_filer_innehalls_hash_idx
+  ON meta_importerade_filer (innehalls_hash)
+  WHERE innehalls_hash IS NOT NULL AND status = 'OK';
@@ -0,0 +1,33 @@
+-- meta_import_matning — mätning per importerad fil (import_matning.py).
+--
+-- Importern loggar alltid en IMPORT_MATNING-rad per fil; med
+-- IMPORT_MATNING_TABELL=1 skrivs samma rad även hit, så att långsamma
+-- importer kan sökas fram utan att läsa import_logg.txt på importdatorn.
+--   faser     {"parse": {"s": 0.8, "n": 1}, "spara.tid_arkiv": {...}, ...}
+--             (faser ligger i varandra — summan är inte total_s)
+--   tabeller  {"POST fakt_tid": {"anrop", "rader", "bytes_ut", "bytes_in", "fel", "s"}, ...}
+--   raknare   {"arkivfiler_skannade": 49, "flytt_forsok": 1}
+
+CREATE TABLE IF NOT EXISTS meta_import_matning (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  skapad timestamptz NOT NULL DEFAULT now(),
+  filnamn text NOT NULL,
+  filtyp text,
+  maskin_id text,
+  status text,
+  start_tid timestamptz,
+  total_s numeric,
+  http_anrop integer,
+  http_bytes_ut bigint,
+  faser jsonb,
+  tabeller jsonb,
+  raknare jsonb
+);
+
+CREATE INDEX IF NOT EXISTS meta_import_matning_start_idx ON meta_import_matning (start_tid DESC);
+CREATE INDEX IF NOT EXISTS meta_import_matning_filnamn_idx ON meta_import_matning (filnamn);
+
+-- RLS: inloggade får läsa, bara service role skriver (Python-importen).
+ALTER TABLE meta_import_matning ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS meta_import_matning_las ON meta_import_matning;
+CREATE POLICY meta_import_matning_las ON meta_import_matning FOR SELECT TO authenticated USING (true);
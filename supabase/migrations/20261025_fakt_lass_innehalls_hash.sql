@@ -0,0 +1,42 @@
+-- fakt_lass.innehalls_hash — inkrementell FPR-skrivning.
+--
+-- FPR är kumulativ per objekt: varje ny fil bär objektets alla lass hittills,
+-- och importern skickade om samtliga (fakt_lass + fakt_lass_sortiment) varje
+-- gång. save_fpr_to_supabase hashar nu varje lass (lassets fält + dess
+-- sortimentrader, utan filnamn) och hoppar över lass som redan står här med
+-- samma hash för (maskin_id, objekt_id, lass_nummer, datum).
+--
+-- Värdet bär algoritmen som prefix ('b2:<hex>'). Äldre rader är NULL och
+-- matchar aldrig — nästa FPR per objekt skriver om dem en gång med hash.
+-- Utan kolumnen skriver importern som förr (allt, utan hash).
+--
+-- Hashen sätts först när lassets sortimentrader är sparade, i ett andra steg:
+-- fakt_lass_satt_hash(p_rader) tar [{maskin_id, objekt_id, lass_nummer, datum,
+-- innehalls_hash}, ...] och uppdaterar bara hash-kolumnen — så att lassen inte
+-- skickas två gånger. Typoberoende via jsonb_populate_record mot fakt_lass:s
+-- radtyp (som hpr_filer_koppla). Bara service_role (importern) ska anropa.
+
+ALTER TABLE fakt_lass ADD COLUMN IF NOT EXISTS innehalls_hash text;
+
+CREATE OR REPLACE FUNCTION fakt_lass_satt_hash(p_rader jsonb)
+RETURNS integer
+LANGUAGE plpgsql AS $fn$
+DECLARE
+  n integer;
+BEGIN
+  UPDATE fakt_lass l
+  SET innehalls_hash = (r.rad).innehalls_hash
+  FROM (SELECT jsonb_populate_record(NULL::fakt_lass, e) AS rad
+        FROM jsonb_array_elements(p_rader) e) r
+  WHERE l.maskin_id = (r.rad).maskin_id
+    AND l.objekt_id = (r.rad).objekt_id
+    AND l.lass_nummer = (r.rad).lass_nummer
+    AND l.datum = (r.rad).datum;
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END
+$fn$;
+
+REVOKE ALL ON FUNCTION fakt_lass_satt_hash(jsonb) FROM PUBLIC;
+REVOKE ALL ON FUNCTION fakt_lass_satt_hash(jsonb) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION fakt_lass_satt_hash(jsonb) TO service_role;
@@ -0,0 +1,30 @@
+-- meta_mom_dag — fingeravtryck per (maskin, dag, del) för inkrementell MOM-import.
+--
+-- MOM-filerna är kumulativa: varje timexport bär hela historiken, och
+-- save_mom_to_supabase raderade och byggde om fakt_tid för VARJE dag i filen
+-- samt skickade om filens alla gps-, avbrott-, service- och produktionsrader.
+-- Importern hashar nu det den skulle skriva, per dag och del, och hoppar över
+-- dagar vars fingeravtryck står oförändrat här — ingen delete, ingen insert.
+--   del            tid (fakt_tid efter _keep-sammanslagningen), mom_tider,
+--                  skift, gps, produktion, avbrott, service
+--   fingeravtryck  'b2:<hex>' över dagens rader (utan filnamn)
+--
+-- Ett fingeravtryck skrivs först när delens skrivning lyckats. Raderas
+-- fakta utanför importern måste dagens rader här raderas också (eller
+-- importen köras med MOM_INKREMENTELL=0) — annars hoppas dagen över.
+-- Saknas tabellen skriver importern allt, som förr.
+
+CREATE TABLE IF NOT EXISTS meta_mom_dag (
+  maskin_id text NOT NULL,
+  datum date NOT NULL,
+  del text NOT NULL,
+  fingeravtryck text NOT NULL,
+  filnamn text,
+  uppdaterad timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (maskin_id, datum, del)
+);
+
+-- RLS: inloggade får läsa, bara service role skriver (Python-importen).
+ALTER TABLE meta_mom_dag ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS meta_mom_dag_las ON meta_mom_dag;
+CREATE POLICY meta_mom_dag_las ON meta_mom_dag FOR SELECT TO authenticated USING (true);
@@ -0,0 +1,176 @@
+"""supabase_hamtning.py — strömmande hämtning av hela tabeller via PostgREST.
+
+offset/limit blir långsammare för varje sida: Postgres måste räkna fram och
+kasta `offset` rader innan sidan börjar, så en full fakt_tid-skanning växer
+kvadratiskt med historiken. Här pagineras med KEYSET i stället — varje sida
+börjar där förra slutade (`<nyckel>=gt.<senaste>`), ordnat på nyckeln, så
+varje sida kostar lika mycket oavsett hur långt in i tabellen vi är.
+
+Generator-gränssnitt: anroparen får rad för rad (eller sida för sida) och
+kan aggregera utan att hålla hela tabellen i minnet.
+
+    from supabase_hamtning import hamta_rader
+    for r in hamta_rader(URL, 'fakt_tid', headers, select='datum,engine_time_sek'):
+        ...
+
+Bara stdlib (urllib) — används både av importern/skripten (requests) och
+gap_check (urllib), och ska inte dra in något nytt beroende.
+
+OBS sidstorlek: Supabase kapar svar till `max-rows` (standard 1000) oavsett
+vad vi begär. En kort sida betyder därför INTE att tabellen är slut — bara en
+TOM sida gör det. Det kostar en extra (tom) förfrågan per skanning men kan
+aldrig tappa rader när servern kapar.
+"""
+import json
+import queue
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Dict, Iterator, List, Optional, Union
+
+SIDA = 5000          # begärd sidstorlek — servern kan kapa (se ovan)
+TIMEOUT = 120
+FORSOK = 3           # försök per sida vid nätverksfel/5xx
+
+
+def _filter_par(filter: Union[None, str, Dict[str, str]]) -> List[tuple]:
+    """Filter som rå querysträng ('maskin_id=eq.X&datum=gte.Y') eller dict."""
+    if not filter:
+        return []
+    if isinstance(filter, dict):
+        return list(filter.items())
+    return urllib.parse.parse_qsl(filter, keep_blank_values=True)
+
+
+def _get_json(url: str, headers: Dict[str, str], timeout: int):
+    senaste_fel = None
+    for _ in range(FORSOK):
+        try:
+            req = urllib.request.Request(url, headers=headers)
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                return json.load(resp)
+        except urllib.error.HTTPError as e:
+            if e.code < 500:
+                raise  # 4xx blir inte bättre av omförsök
+            senaste_fel = e
+        except (urllib.error.URLError, TimeoutError) as e:
+            senaste_fel = e
+    raise senaste_fel
+
+
+def hamta_sidor(bas_url: str, tabell: str, headers: Dict[str, str], select: str = '*',
+                filter: Union[None, str, Dict[str, str]] = None, nyckel: str = 'id',
+                sida: int = SIDA, timeout: int = TIMEOUT,
+                fran: Optional[object] = None, till: Optional[object] = None) -> Iterator[list]:
+    """Keyset-paginera `tabell` ordnat på `nyckel` (unik, indexerad kolumn).
+    Yieldar en lista rader per sida. `fran` (exklusiv) och `till` (exklusiv)
+    begränsar nyckelintervallet — används av hamta_rader_parallellt.
+
+    `order`/`limit`/`offset` i filtret ignoreras: ordningen ÄR nyckeln."""
+    par = [(k, v) for k, v in _filter_par(filter) if k not in ('order', 'limit', 'offset', 'select')]
+    kolumner = [c.strip() for c in select.split(',')]
+    if select != '*' and nyckel not in kolumner:
+        select = f'{select},{nyckel}'  # behövs för nästa sidas startpunkt
+    if till is not None:
+        par.append((nyckel, f'lt.{till}'))
+    hdr = {'Accept': 'application/json', **{k: v for k, v in headers.items()
+                                            if k.lower() not in ('range', 'range-unit')}}
+    senaste = fran
+    while True:
+        q = [('select', select)] + par
+        if senaste is not None:
+            q.append((nyckel, f'gt.{senaste}'))
+        q += [('order', f'{nyckel}.asc'), ('limit', str(sida))]
+        url = f"{bas_url}/rest/v1/{tabell}?{urllib.parse.urlencode(q, safe=',.()*:')}"
+        rader = _get_json(url, hdr, timeout)
+        if not rader:
+            return
+        yield rader
+        senaste = rader[-1][nyckel]
+
+
+def hamta_rader(bas_url: str, tabell: str, headers: Dict[str, str], **kw) -> Iterator[dict]:
+    """Som hamta_sidor men rad för rad. Konstant minne oavsett tabellstorlek."""
+    for rader in hamta_sidor(bas_url, tabell, headers, **kw):
+        yield from rader
+
+
+def _nyckel_granser(bas_url, tabell, headers, filter, nyckel, timeout):
+    """(min, max) för en numerisk nyckel inom filtret, eller None om tomt."""
+    hdr = {'Accept': 'application/json', **headers}
+    par = [(k, v) for k, v in _filter_par(filter) if k not in ('order', 'limit', 'offset', 'select')]
+    granser = []
+    for riktning in ('asc', 'desc'):
+        q = [('select', nyckel)] + par + [('order', f'{nyckel}.{riktning}'), ('limit', '1')]
+        url = f"{bas_url}/rest/v1/{tabell}?{urllib.parse.urlencode(q, safe=',.()*:')}"
+        rad = _get_json(url, hdr, timeout)
+        if not rad:
+            return None
+        granser.append(rad[0][nyckel])
+    return granser[0], granser[1]
+
+
+def hamta_rader_parallellt(bas_url: str, tabell: str, headers: Dict[str, str],
+                           delar: int = 4, **kw) -> Iterator[dict]:
+    """Dela NUMERISKT nyckelintervall i `delar` lika stora bitar och keyset-
+    paginera dem samtidigt (en tråd per bit). Rader kommer i den ordning
+    sidorna blir klara — INTE sorterade. Minnet begränsas av en kö om
+    2×delar sidor; producenterna väntar om anroparen inte hinner med.
+
+    Icke-numerisk nyckel (uuid, text) eller delar <= 1 → vanlig hamta_rader."""
+    nyckel = kw.get('nyckel', 'id')
+    timeout = kw.get('timeout', TIMEOUT)
+    if delar <= 1:
+        yield from hamta_rader(bas_url, tabell, headers, **kw)
+        return
+    granser = _nyckel_granser(bas_url, tabell, headers, kw.get('filter'), nyckel, timeout)
+    if granser is None:
+        return
+    lo, hi = granser
+    if not all(isinstance(v, int) for v in granser) or hi - lo < delar:
+        yield from hamta_rader(bas_url, tabell, headers, **kw)
+        return
+
+    steg = (hi - lo) // delar + 1
+    # fran är exklusiv (gt) → starta en under lo. Sista biten är öppen uppåt
+    # så rader som skrivs under skanningen inte faller mellan stolarna.
+    intervall = [(lo - 1 + i * steg, lo + (i + 1) * steg if i < delar - 1 else None)
+                 for i in range(delar)]
+    ko: 'queue.Queue' = queue.Queue(maxsize=2 * delar)
+    KLAR = object()
+    stopp = threading.Event()
+
+    def _producent(fran, till):
+        try:
+            for rader in hamta_sidor(bas_url, tabell, headers, fran=fran, till=till, **kw):
+                if stopp.is_set():
+                    return
+                ko.put(rader)
+        except Exception as e:
+            ko.put(e)
+        finally:
+            ko.put(KLAR)
+
+    tradar = [threading.Thread(target=_producent, args=iv, daemon=True,
+                               name=f'hamta-{tabell}-{n}') for n, iv in enumerate(intervall)]
+    for t in tradar:
+        t.start()
+    kvar = len(tradar)
+    try:
+        while kvar:
+            post = ko.get()
+            if post is KLAR:
+                kvar -= 1
+            elif isinstance(post, Exception):
+                raise post
+            else:
+                yield from post
+    finally:
+        stopp.set()
+        # Töm kön så att blockerade producenter kan avsluta
+        while any(t.is_alive() for t in tradar):
+            try:
+                ko.get(timeout=0.1)
+            except queue.Empty:
+                pass
@@ -9,6 +9,8 @@ import sys, os, glob, requests, urllib.parse
 from datetime import datetime, timedelta
 from collections import defaultdict
 
+from supabase_hamtning import hamta_rader
+
 sys.stdout.reconfigure(encoding='utf-8')
 sys.stderr.reconfigure(encoding='utf-8')
 
@@ -31,20 +33,9 @@ MOM_BASE = r"C:\Users\lindq\Kompersmåla Skog\Maskindata - Dokument\MOM-filer\Be
 
 
 def fetch_all(table, select, filters):
-    """Fetch with pagination (Supabase max 1000 rows)."""
-    rows = []
-    offset = 0
-    while True:
-        params = f"select={select}&{filters}&limit=1000&offset={offset}"
-        r = requests.get(f"{SUPABASE_URL}/rest/v1/{table}?{params}", headers=HEADERS)
-        batch = r.json()
-        if not batch:
-            break
-        rows.extend(batch)
-        if len(batch) < 1000:
-            break
-        offset += 1000
-    return rows
+    """Strömma alla rader (keyset-paginering på id — se supabase_hamtning).
+    Ordningen är id, inte filtrets order=; anroparna aggregerar per datum."""
+    return hamta_rader(SUPABASE_URL, table, HEADERS, select=select, filter=filters)
 
 
 def find_missing_tid():
@@ -129,24 +120,25 @@ def reimport_files(maskin_id, dates, files):
         enc = urllib.parse.quote(fn)
         requests.delete(f"{SUPABASE_URL}/rest/v1/meta_importerade_filer?filnamn=eq.{enc}", headers=HEADERS_DEL)
 
-    # Delete fakt_tid for affected dates
+    # Delete fakt_tid for affected dates — and the day fingerprints, otherwise
+    # the importer sees the days as unchanged and never writes them back
     for d in dates:
-        requests.delete(
-            f"{SUPABASE_URL}/rest/v1/fakt_tid?maskin_id=eq.{maskin_id}&datum=eq.{d}",
-            headers=HEADERS_DEL
-        )
+        for table in ('fakt_tid', 'meta_mom_dag'):
+            requests.delete(
+                f"{SUPABASE_URL}/rest/v1/{table}?maskin_id=eq.{maskin_id}&datum=eq.{d}",
+                headers=HEADERS_DEL
+            )
 
     # Import files in order using the import engine
-    import skogsmaskin_import_version_6 as imp
-    if not hasattr(imp, '_supabase_initialized'):
-        imp.init_supabase()
-        imp._supabase_initialized = True
-    imp._GLOBAL_TID_ENTRIES = {}
-    imp._GLOBAL_TID_OPERATORS = {}
+    from skogsimport import intag, klient, skrivning
+    if not klient.SUPABASE_HEADERS:
+        klient.init_supabase()
+    skrivning._GLOBAL_TID_ENTRIES.clear()
+    skrivning._GLOBAL_TID_OPERATORS.clear()
 
     success = 0
     for f in files:
-        result = imp.process_file(f)
+        result = intag.process_file(f)
         if result:
             success += 1
 